@@ -167,6 +167,13 @@ option(MDL_ENABLE_D3D12_EXAMPLES "Enable examples that require Direct3D and Dire
 option(MDL_ENABLE_OPTIX7_EXAMPLES "Enable examples that require OptiX 7." OFF)
 option(MDL_ENABLE_MATERIALX "Enable MaterialX in examples that support it." OFF)
 
+# how generated sources embed binary data like bitcode and tables
+set(MDL_EMBED_BINARY_MODE "hex" CACHE STRING "How binary data is embedded into generated sources: hex (hex literals), embed (#embed, requires C23/C++26 support) or incbin (assembler, GCC and Clang only).")
+set_property(CACHE MDL_EMBED_BINARY_MODE PROPERTY STRINGS "hex" "embed" "incbin")
+option(MDL_COMPRESS_MULTISCATTER_TABLES "Store the libbsdf multi-scatter tables compressed (quantized to 16 bits) and decompress them on first use." OFF)
+option(MDL_PREBUILT_INTRINSICS "Share the bodies of type-only intrinsic functions between JIT code generator instances through a process-wide bitcode library." OFF)
+option(MDL_JIT_INTRINSIC_STATS "Instrument the generated JIT intrinsic functions to record per-intrinsic usage and construction times." OFF)
+
 if(EXISTS ${MDL_BASE_FOLDER}/cmake/tests/CMakeLists.txt)
     option(MDL_ENABLE_TESTS "Generates unit and example tests." ON)
 else()
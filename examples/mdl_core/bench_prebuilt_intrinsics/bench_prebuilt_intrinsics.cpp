@@ -0,0 +1,320 @@
+/******************************************************************************
+ * Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ *  * Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  * Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in the
+ *    documentation and/or other materials provided with the distribution.
+ *  * Neither the name of NVIDIA CORPORATION nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ *****************************************************************************/
+
+// examples/mdl_core/bench_prebuilt_intrinsics/bench_prebuilt_intrinsics.cpp
+//
+// Measures the JIT warm-up with and without the prebuilt intrinsic library.
+//
+// Every compilation creates a new link unit, so every material is compiled by a fresh code
+// generator with a fresh LLVM context, like a renderer compiling materials on demand.
+// The first compilation with the library enabled fills the library and is reported separately.
+// The library only exists if the MDL Core library was built with MDL_PREBUILT_INTRINSICS,
+// otherwise both runs measure the same code path.
+// With --intrinsic-stats, the usage statistics of the intrinsic functions are written as JSON
+// after both runs. They are only recorded if MDL Core was built with MDL_JIT_INTRINSIC_STATS.
+
+#include <algorithm>
+#include <chrono>
+#include <iomanip>
+#include <iostream>
+#include <string>
+#include <vector>
+
+#include "example_shared.h"
+
+typedef std::chrono::steady_clock Clock;
+
+// Compiles the distribution functions of material instances into new PTX link units.
+class Material_bench_compiler : public Material_compiler
+{
+public:
+    /// Constructor.
+    ///
+    /// \param mdl_compiler  the MDL compiler interface
+    Material_bench_compiler(mi::mdl::IMDL *mdl_compiler)
+    : Material_compiler(mdl_compiler)
+    , m_jit_be(mi::base::make_handle(mdl_compiler->load_code_generator("jit"))
+        .get_interface<mi::mdl::ICode_generator_jit>())
+    {
+    }
+
+    /// Create an instance of the given material, initialized with its default parameters.
+    Material_instance create_default_instance(std::string const &material_name)
+    {
+        Material_instance mat_inst = create_material_instance(material_name);
+        if (!mat_inst)
+            return mat_inst;
+
+        mi::mdl::IGenerated_code_dag::Error_code err = initialize_material_instance(
+            mat_inst, {}, /*class_compilation=*/ false);
+        if (err != mi::mdl::IGenerated_code_dag::EC_NONE)
+            return Material_instance();
+        return mat_inst;
+    }
+
+    /// Compile "surface.scattering" of a material instance into a new link unit.
+    ///
+    /// \param mat_inst       the material instance
+    /// \param use_prebuilt   value of the "jit_prebuilt_intrinsics" option
+    ///
+    /// \return the time needed in seconds, or a negative value on failure
+    double compile(Material_instance &mat_inst, bool use_prebuilt)
+    {
+        Clock::time_point start = Clock::now();
+
+        mi::mdl::Options &options = m_jit_be->access_options();
+        options.set_option(MDL_JIT_OPTION_PREBUILT_INTRINSICS, use_prebuilt ? "true" : "false");
+
+        mi::base::Handle<mi::mdl::ILink_unit> link_unit(m_jit_be->create_link_unit(
+            mi::mdl::ICode_generator_jit::CM_PTX,
+            /*enable_simd=*/ false,
+            /*sm_version=*/ 30,
+            /*num_texture_spaces=*/ 1,
+            /*num_texture_results=*/ 16));
+
+        mi::base::Handle<mi::mdl::IGenerated_code_dag::IMaterial_instance> mat_instance(
+            mat_inst.get_material_instance());
+
+        // Create the distribution function and import the material into its main lambda
+        mi::base::Handle<mi::mdl::IDistribution_function> dist_func(
+            m_dag_be->create_distribution_function());
+        mi::base::Handle<mi::mdl::ILambda_function> root_lambda(dist_func->get_root_lambda());
+        root_lambda->set_name("bench_init");
+
+        mi::mdl::DAG_node const *material_constructor =
+            root_lambda->import_expr(mat_instance->get_constructor());
+
+        mi::mdl::IDistribution_function::Requested_function req_func(
+            "surface.scattering", "bench");
+
+        if (dist_func->initialize(
+                material_constructor,
+                &req_func,
+                1,
+                /*include_geometry_normal=*/ true,
+                /*calc_derivatives=*/ false,
+                /*allow_double_expr_lambdas=*/ false,
+                &m_module_manager) != mi::mdl::IDistribution_function::EC_NONE)
+            return -1.0;
+
+        size_t arg_block_index = ~0;
+        size_t main_func_index = 0;
+        if (!link_unit->add(
+                dist_func.get(),
+                &m_module_manager,
+                &arg_block_index,
+                &main_func_index,
+                1))
+            return -1.0;
+
+        mi::base::Handle<mi::mdl::IGenerated_code_executable> code(
+            m_jit_be->compile_unit(link_unit.get()));
+        if (!code)
+            return -1.0;
+
+        return std::chrono::duration<double>(Clock::now() - start).count();
+    }
+
+    /// Write the usage statistics of the intrinsic functions of all compilations as JSON.
+    ///
+    /// \param filename  the name of the output file
+    ///
+    /// \return false if the statistics are not available or could not be written
+    bool write_intrinsic_stats(char const *filename)
+    {
+        // the statistics interface is only handed out by the const get_interface()
+        mi::mdl::ICode_generator_jit const *jit_be = m_jit_be.get();
+        mi::base::Handle<mi::mdl::IJIT_intrinsic_stats const> stats(
+            jit_be->get_interface<mi::mdl::IJIT_intrinsic_stats>());
+        if (!stats)
+            return false;
+
+        mi::base::Handle<mi::mdl::IOutput_stream> out(
+            m_mdl_compiler->create_file_output_stream(filename));
+        if (!out)
+            return false;
+        return stats->print(out.get());
+    }
+
+private:
+    mi::base::Handle<mi::mdl::ICode_generator_jit> m_jit_be;
+};
+
+// Compiles n materials and prints the timings of one run.
+bool run(
+    Material_bench_compiler        &mc,
+    std::vector<Material_instance> &instances,
+    size_t                         n,
+    bool                           use_prebuilt)
+{
+    std::vector<double> times;
+    for (size_t i = 0; i < n; ++i) {
+        double t = mc.compile(instances[i % instances.size()], use_prebuilt);
+        if (t < 0.0) {
+            mc.print_messages();
+            return false;
+        }
+        times.push_back(t);
+    }
+
+    double first = times[0];
+    double total = 0.0;
+    for (double t : times)
+        total += t;
+    double rest = n > 1 ? (total - first) / double(n - 1) : 0.0;
+
+    std::sort(times.begin(), times.end());
+
+    std::cout
+        << std::left << std::setw(10) << (use_prebuilt ? "prebuilt" : "generated")
+        << std::right << std::fixed << std::setprecision(2)
+        << std::setw(12) << total * 1000.0
+        << std::setw(12) << first * 1000.0
+        << std::setw(12) << rest * 1000.0
+        << std::setw(12) << times[n / 2] * 1000.0
+        << std::endl;
+    return true;
+}
+
+void usage()
+{
+    std::cerr
+        << "Usage: bench_prebuilt_intrinsics [options] [<material_name> ...]\n"
+        << "-n <num>        number of compilations per run (default: 20)\n"
+        << "--module <name> compile all materials of this module if no materials are given\n"
+        << "                (default: ::nvidia::sdk_examples::tutorials)\n"
+        << "--mdl_path      mdl search path, can occur multiple times\n"
+        << "--intrinsic-stats <file>\n"
+        << "                write the usage statistics of the intrinsic functions as JSON\n"
+        << std::endl;
+
+    keep_console_open();
+    exit(EXIT_FAILURE);
+}
+
+int MAIN_UTF8(int argc, char *argv[])
+{
+    // Collect command line parameters
+    std::vector<std::string> mdl_paths;
+    mdl_paths.push_back(get_samples_mdl_root());
+
+    std::vector<std::string> material_names;
+    std::string module_name = "::nvidia::sdk_examples::tutorials";
+    std::string stats_filename;
+    size_t n = 20;
+    for (int i = 1; i < argc; ++i) {
+        if (strcmp(argv[i], "-n") == 0) {
+            if (i + 1 < argc)
+                n = std::max(atoi(argv[++i]), 1);
+            else
+                usage();
+        }
+        else if (strcmp(argv[i], "--module") == 0) {
+            if (i + 1 < argc)
+                module_name = argv[++i];
+            else
+                usage();
+        }
+        else if (strcmp(argv[i], "--mdl_path") == 0) {
+            if (i + 1 < argc)
+                mdl_paths.push_back(argv[++i]);
+            else
+                usage();
+        }
+        else if (strcmp(argv[i], "--intrinsic-stats") == 0) {
+            if (i + 1 < argc)
+                stats_filename = argv[++i];
+            else
+                usage();
+        }
+        else if (argv[i][0] == '-')
+            usage();
+        else
+            material_names.push_back(argv[i]);
+    }
+
+    // Access the MDL Core compiler
+    mi::base::Handle<mi::mdl::IMDL> mdl_compiler(load_mdl_compiler());
+    check_success(mdl_compiler);
+
+    bool success = true;
+    {
+        Material_bench_compiler mc(mdl_compiler.get());
+        for (auto path : mdl_paths)
+            mc.add_module_path(path.c_str());
+
+        if (material_names.empty())
+            material_names = mc.get_material_names(module_name);
+
+        // Instantiate all materials up front, only the JIT compilation is measured
+        std::vector<Material_instance> instances;
+        for (auto const &name : material_names) {
+            Material_instance inst = mc.create_default_instance(name);
+            if (inst)
+                instances.push_back(inst);
+            else
+                std::cerr << "Skipping material " << name << std::endl;
+        }
+        check_success(!instances.empty());
+
+        std::cout << n << " compilations of " << instances.size() << " materials, times in ms\n"
+            << std::left << std::setw(10) << "mode"
+            << std::right
+            << std::setw(12) << "total"
+            << std::setw(12) << "first"
+            << std::setw(12) << "avg rest"
+            << std::setw(12) << "median"
+            << std::endl;
+
+        // the run without the library goes first, so it cannot profit from a filled library
+        success = run(mc, instances, n, /*use_prebuilt=*/ false) &&
+            run(mc, instances, n, /*use_prebuilt=*/ true);
+
+        if (success && !stats_filename.empty()) {
+            if (mc.write_intrinsic_stats(stats_filename.c_str()))
+                std::cout << "Intrinsic statistics written to " << stats_filename << std::endl;
+            else {
+                std::cerr << "Intrinsic statistics are not available, MDL Core must be built "
+                    "with MDL_JIT_INTRINSIC_STATS" << std::endl;
+                success = false;
+            }
+        }
+    }
+
+    // Free MDL compiler before shutting down MDL Core
+    mdl_compiler = 0;
+
+    // Unload MDL Core
+    check_success(unload());
+
+    keep_console_open();
+    return success ? EXIT_SUCCESS : EXIT_FAILURE;
+}
+
+// Convert command line arguments to UTF8 on Windows
+COMMANDLINE_TO_UTF8
@@ -143,6 +143,7 @@ struct Mdl_resource_handler
         m_tex_handler.vtable = &TEX_VTABLE;   // only required in 'vtable' mode, otherwise NULL
         data.shared_data = NULL;
         data.texture_handler = reinterpret_cast<Texture_handler_base *>(&m_tex_handler);
+        data.print_buffer = NULL;
     }
 
     // reuse the handler with a different target code index
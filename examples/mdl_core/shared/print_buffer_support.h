@@ -0,0 +1,238 @@
+/******************************************************************************
+ * Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ *  * Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  * Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in the
+ *    documentation and/or other materials provided with the distribution.
+ *  * Neither the name of NVIDIA CORPORATION nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ *****************************************************************************/
+
+// examples/mdl_core/shared/print_buffer_support.h
+//
+// Host side support for code generated with the "jit_buffered_print" option: allocation of
+// the print buffer and formatting of the debug::print() records it received.
+//
+// Native code executed through IGenerated_code_lambda_function does not need this helper, it
+// prints the collected output itself when a call returns. Other native code can drain the
+// buffer directly. For CUDA code, copy the Print_buffer structure and its data to the host,
+// drain the copy and copy the head, tail and dropped fields back before launching the next
+// kernel.
+
+#ifndef PRINT_BUFFER_SUPPORT_H
+#define PRINT_BUFFER_SUPPORT_H
+
+#include <cstdio>
+#include <cstring>
+#include <string>
+#include <vector>
+
+#include <mi/mdl/mdl_target_types.h>
+
+typedef mi::mdl::Print_buffer Print_buffer;
+
+
+// A print buffer with its data allocated on the host.
+struct Host_print_buffer : Print_buffer
+{
+    // Constructor, capacity is the number of words and must be a power of two.
+    explicit Host_print_buffer(unsigned capacity_words)
+    : words(capacity_words, 0u)
+    {
+        data     = words.data();
+        capacity = capacity_words;
+        head     = 0;
+        tail     = 0;
+        dropped  = 0;
+    }
+
+    std::vector<unsigned> words;   // the storage of data
+};
+
+// Options for formatting print buffer records.
+struct Print_format_options
+{
+    Print_format_options()
+    : string_table(NULL)
+    , num_strings(0)
+    , string_pointers_valid(false)
+    {
+    }
+
+    char const * const *string_table;           // the string constants of the target code,
+                                                // used for PRINT_VALUE_STRING_ID values
+    size_t              num_strings;            // the number of entries in string_table
+    bool                string_pointers_valid;  // true, if PRINT_VALUE_STRING_PTR values point
+                                                // into the address space of the host
+};
+
+// Reads the word at the given position of the ring buffer.
+static inline unsigned print_buffer_word(Print_buffer const &buffer, unsigned pos)
+{
+    return buffer.data[pos & (buffer.capacity - 1)];
+}
+
+// Appends one element of a printed value to a line.
+static inline void format_print_element(
+    std::string                &line,
+    Print_buffer const         &buffer,
+    unsigned                   &pos,
+    unsigned                    kind,
+    Print_format_options const &options)
+{
+    char buf[64];
+
+    switch (kind) {
+    case mi::mdl::PRINT_VALUE_BOOL:
+        line += print_buffer_word(buffer, pos++) != 0 ? "true" : "false";
+        return;
+    case mi::mdl::PRINT_VALUE_INT:
+        snprintf(buf, sizeof(buf), "%d", int(print_buffer_word(buffer, pos++)));
+        break;
+    case mi::mdl::PRINT_VALUE_FLOAT:
+        {
+            unsigned bits = print_buffer_word(buffer, pos++);
+            float    f;
+            memcpy(&f, &bits, sizeof(f));
+            snprintf(buf, sizeof(buf), "%f", f);
+        }
+        break;
+    case mi::mdl::PRINT_VALUE_DOUBLE:
+        {
+            unsigned long long lo = print_buffer_word(buffer, pos++);
+            unsigned long long hi = print_buffer_word(buffer, pos++);
+            unsigned long long bits = lo | (hi << 32);
+            double             d;
+            memcpy(&d, &bits, sizeof(d));
+            snprintf(buf, sizeof(buf), "%f", d);
+        }
+        break;
+    case mi::mdl::PRINT_VALUE_STRING_ID:
+        {
+            unsigned id = print_buffer_word(buffer, pos++);
+            if (options.string_table != NULL && id < options.num_strings) {
+                line += options.string_table[id];
+                return;
+            }
+            snprintf(buf, sizeof(buf), "<string %u>", id);
+        }
+        break;
+    case mi::mdl::PRINT_VALUE_STRING_PTR:
+        {
+            unsigned long long lo = print_buffer_word(buffer, pos++);
+            unsigned long long hi = print_buffer_word(buffer, pos++);
+            unsigned long long adr = lo | (hi << 32);
+            if (options.string_pointers_valid && adr != 0) {
+                line += reinterpret_cast<char const *>(size_t(adr));
+                return;
+            }
+            snprintf(buf, sizeof(buf), "<string at 0x%llx>", adr);
+        }
+        break;
+    default:
+        snprintf(buf, sizeof(buf), "<unknown value kind %u>", kind);
+        break;
+    }
+    line += buf;
+}
+
+// Formats the record starting at pos into a line, like debug::print() does without buffering.
+static inline std::string format_print_record(
+    Print_buffer const         &buffer,
+    unsigned                    pos,
+    Print_format_options const &options)
+{
+    std::string line;
+    unsigned    end = pos + print_buffer_word(buffer, pos);
+
+    for (++pos; pos != end;) {
+        unsigned tag   = print_buffer_word(buffer, pos++);
+        unsigned kind  = tag & 0xff;
+        unsigned count = (tag >> 8) & 0xff;
+        unsigned flags = tag >> 16;
+
+        char const *open  = "";
+        char const *close = "";
+        if (flags & mi::mdl::PRINT_FLAG_COLOR) {
+            open  = "(";
+            close = ")";
+        } else if (flags & mi::mdl::PRINT_FLAG_VECTOR) {
+            open  = "<";
+            close = ">";
+        }
+
+        line += open;
+        for (unsigned i = 0; i < count; ++i) {
+            if (i > 0)
+                line += ", ";
+            format_print_element(line, buffer, pos, kind, options);
+        }
+        line += close;
+    }
+    return line;
+}
+
+// Formats all records of a print buffer and empties it.
+// Must not be called while generated code writing to the buffer is running.
+//
+// Returns the number of records dropped because the buffer was full.
+static inline unsigned drain_print_buffer(
+    Print_buffer               &buffer,
+    std::vector<std::string>   &lines,
+    Print_format_options const &options = Print_format_options())
+{
+    unsigned used = buffer.head - buffer.tail;
+    if (used > buffer.capacity)
+        used = buffer.capacity;
+    unsigned end = buffer.tail + used;
+    unsigned pos = buffer.tail;
+
+    // records are complete up to the head or the first dropped record
+    while (pos != end) {
+        unsigned n_words = print_buffer_word(buffer, pos);
+        if (n_words == MDL_PRINT_RECORD_DROPPED || n_words == 0 || n_words > end - pos)
+            break;
+        lines.push_back(format_print_record(buffer, pos, options));
+        pos += n_words;
+    }
+
+    unsigned dropped = buffer.dropped;
+    buffer.tail    = buffer.head;
+    buffer.dropped = 0;
+    return dropped;
+}
+
+// Formats all records of a print buffer, prints them to the given file and empties the buffer.
+static inline void print_print_buffer(
+    Print_buffer               &buffer,
+    FILE                       *file,
+    Print_format_options const &options = Print_format_options())
+{
+    std::vector<std::string> lines;
+    unsigned dropped = drain_print_buffer(buffer, lines, options);
+
+    for (size_t i = 0, n = lines.size(); i < n; ++i)
+        fprintf(file, "%s\n", lines[i].c_str());
+    if (dropped > 0)
+        fprintf(file, "[%u debug::print() calls dropped, the print buffer is full]\n", dropped);
+}
+
+#endif // PRINT_BUFFER_SUPPORT_H
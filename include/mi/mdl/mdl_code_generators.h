@@ -45,6 +45,7 @@ class ISerializer;
 class IDeserializer;
 class IValue_texture;
 class IValue_resource;
+class IOutput_stream;
 class Options;
 
 /// The base interface for all code generators of the MDL core compiler.
@@ -1012,6 +1013,9 @@ class ICode_generator_jit : public
     mi::base::Interface_declare<0x059c7e80,0x696c,0x4684,0xad,0x08,0xb7,0x17,0x72,0x5a,0x55,0x20,
     ICode_generator>
 {
+    /// The name of the option to write the output of debug::print() into a print buffer.
+    #define MDL_JIT_OPTION_BUFFERED_PRINT "jit_buffered_print"
+
     /// The name of the option to disable exception handling in the JIT code generator.
     #define MDL_JIT_OPTION_DISABLE_EXCEPTIONS "jit_disable_exceptions"
 
@@ -1040,6 +1044,9 @@ class ICode_generator_jit : public
     /// The name of the option to inline functions aggressively.
     #define MDL_JIT_OPTION_INLINE_AGGRESSIVELY "jit_inline_aggressively"
 
+    /// The name of the option to share intrinsic function bodies between code generators.
+    #define MDL_JIT_OPTION_PREBUILT_INTRINSICS "jit_prebuilt_intrinsics"
+
     /// The name of the option to evaluate the ternary operator on the DAG strictly.
     #define MDL_JIT_OPTION_EVAL_DAG_TERNARY_STRICTLY "jit_eval_dag_ternary_strictly"
 
@@ -1052,6 +1059,9 @@ class ICode_generator_jit : public
     /// The name of the option to use bitangent instead of tangent_u, tangent_v in the MDL state.
     #define MDL_JIT_OPTION_USE_BITANGENT "jit_use_bitangent"
 
+    /// The name of the option to compute float vector math with SIMD-wide runtime functions.
+    #define MDL_JIT_OPTION_VECTOR_RUNTIME "jit_vector_runtime"
+
     /// The name of the option to generate auxiliary methods on distribution functions.
     #define MDL_JIT_OPTION_ENABLE_AUXILIARY "jit_enable_auxiliary"
 
@@ -1364,6 +1374,29 @@ public:
     virtual IGenerated_code_value_layout *create_value_layout() const = 0;
 };
 
+/// Usage statistics of the intrinsic functions generated by the JIT code generator.
+///
+/// This interface can be retrieved from a const #mi::mdl::ICode_generator_jit via
+/// \c get_interface<mi::mdl::IJIT_intrinsic_stats>(). The statistics are process-wide and
+/// contain all code generators that have finished their compilation so far.
+class IJIT_intrinsic_stats : public
+    mi::base::Interface_declare<0x2d9c8c3a,0x1928,0x46b2,0xae,0x45,0x01,0x93,0xfb,0xca,0xd0,0x1b,
+    mi::base::IInterface>
+{
+public:
+    /// Print the usage statistics of the intrinsic functions as JSON.
+    ///
+    /// For every intrinsic function requested so far the statistics contain the number of
+    /// requests and constructions, the construction time and the runtime functions used,
+    /// each split by whether derivatives are returned.
+    ///
+    /// \param out  the output stream
+    ///
+    /// \return false if the JIT code generator was built without intrinsic instrumentation
+    ///         (MDL_JIT_INTRINSIC_STATS), in this case nothing is printed
+    virtual bool print(IOutput_stream *out) const = 0;
+};
+
 /*!
 \page mdl_code_generator_options Options for the MDL code generators
 
@@ -1384,6 +1417,7 @@ These options are specific to the MDL DAG code generator:
 
 These options are specific to the MDL JIT code generator:
 
+- \ref mdl_option_jit_buffered_print             "jit_buffered_print"
 - \ref mdl_option_jit_disable_exceptions         "jit_disable_exceptions"
 - \ref mdl_option_jit_enable_ro_segment          "jit_enable_ro_segment"
 - \ref mdl_option_jit_fast_math                  "jit_fast_math"
@@ -1395,11 +1429,13 @@ These options are specific to the MDL JIT code generator:
 - \ref mdl_option_jit_llvm_renderer_module       "jit_llvm_renderer_module"
 - \ref mdl_option_jit_map_strings_to_ids         "jit_map_strings_to_ids"
 - \ref mdl_option_jit_opt_level                  "jit_opt_level"
+- \ref mdl_option_jit_prebuilt_intrinsics        "jit_prebuilt_intrinsics"
 - \ref mdl_option_jit_tex_lookup_call_mode       "jit_tex_lookup_call_mode"
 - \ref mdl_option_jit_tex_runtime_with_derivs    "jit_tex_runtime_with_derivs"
 - \ref mdl_option_jit_use_bitangent              "jit_use_bitangent"*/
 /*!
 - \ref mdl_option_jit_use_builtin_res_h       "jit_use_builtin_resource_handler_cpu"
+- \ref mdl_option_jit_vector_runtime          "jit_vector_runtime"
 - \ref mdl_option_jit_visible_functions       "jit_visible_functions"
 
 \section mdl_cg_options Generic MDL code generator options
@@ -1443,6 +1479,15 @@ These options are specific to the MDL JIT code generator:
 
 \section mdl_cg_jit_options Specific MDL JIT code generator options
 
+\anchor mdl_option_jit_buffered_print
+- <b>jit_buffered_print</b>: If set to \c "true", calls to \c debug::print() in PTX and native
+  code append records to the mi::mdl::Print_buffer referenced by the resource data instead of
+  printing immediately. The records can be formatted on the host after the generated code has
+  finished. If no print buffer is provided, the output is discarded. Native code executed through
+  mi::mdl::IGenerated_code_lambda_function uses a print buffer per call and writes the collected
+  output to the debug log when the call returns.
+  Default: \c "false"
+
 \anchor mdl_option_jit_disable_exceptions
 - <b>jit_disable_exceptions</b>: If set to \c "true", support for exceptions through special runtime
   function calls is disabled. For PTX JIT compilation, this is always disabled.
@@ -1496,6 +1541,15 @@ These options are specific to the MDL JIT code generator:
 - <b>jit_opt_level</b>: The optimization level for the JIT code generator.
   Default: \c "2"
 
+\anchor mdl_option_jit_prebuilt_intrinsics
+- <b>jit_prebuilt_intrinsics</b>: If set to \c "true", the JIT code generator takes the bodies of
+  intrinsic functions which only depend on their parameter types from a process-wide library
+  instead of generating them again for every compilation. The library is filled on first use
+  per code generator configuration and holds at most 32 MiB of bitcode, the oldest bodies are
+  dropped first. This option has only an effect if the JIT code generator
+  was built with prebuilt intrinsic support.
+  Default: \c "true"
+
 \anchor mdl_option_jit_tex_lookup_call_mode
 - <b>jit_tex_lookup_call_mode</b>: Specifies the call mode for texture lookup functions on GPU.
   Possible values:
@@ -1527,6 +1581,14 @@ These options are specific to the MDL JIT code generator:
   functions via the tex_data parameter.
   Default: \c "false"
 
+\anchor mdl_option_jit_vector_runtime
+- <b>jit_vector_runtime</b>: If set to \c "true", native code on x86-64 computes the component-wise
+  \c sin, \c cos, \c exp and \c log of float vectors with approximating SIMD-wide runtime
+  functions. The results may differ slightly from the scalar functions, so \c sin(float3(x)).x is
+  not necessarily equal to \c sin(x). This option has only an effect if
+  \ref mdl_option_jit_fast_math is enabled.
+  Default: \c "false"
+
 \anchor mdl_option_jit_visible_functions
 - <b>jit_visible_functions</b>: Specifies a comma-separated list of names of functions which will be
   visible in the generated code (empty string means no special restriction).
@@ -785,11 +785,55 @@ struct Texture_handler_deriv_base {
 };
 
 
+/// The kinds of values stored in a print buffer record.
+enum Print_value_kind {
+    PRINT_VALUE_BOOL       = 0,  ///< one word per element, 0 or 1
+    PRINT_VALUE_INT        = 1,  ///< one word per element
+    PRINT_VALUE_FLOAT      = 2,  ///< one word per element, the bits of the float
+    PRINT_VALUE_DOUBLE     = 3,  ///< two words per element, low word first
+    PRINT_VALUE_STRING_ID  = 4,  ///< one word per element, an index into the string constant table
+    PRINT_VALUE_STRING_PTR = 5   ///< two words per element, the address of a C string in the
+                                 ///< address space of the generated code, low word first
+};
+
+/// Flags of the values stored in a print buffer record.
+enum Print_value_flags {
+    PRINT_FLAG_VECTOR = 1,       ///< the elements form a vector, printed as "<x, y, z>"
+    PRINT_FLAG_COLOR  = 2        ///< the elements form a color, printed as "(r, g, b)"
+};
+
+/// The header word of a record which did not fit into the print buffer.
+/// Records are written in reservation order, so no complete record follows it.
+#define MDL_PRINT_RECORD_DROPPED 0xffffffffu
+
+/// A ring buffer receiving the output of debug::print() when the code was generated with
+/// buffered printing enabled.
+///
+/// Every call of debug::print() appends one record of 32-bit words. The first word of a record
+/// is the number of words of the record including this header word. It is followed by one
+/// entry per argument: a tag word (kind | (count << 8) | (flags << 16)) with a
+/// #Print_value_kind, the number of elements and #Print_value_flags, followed by the words of
+/// the elements.
+///
+/// The generated code reserves the words of a record atomically, so a buffer may be shared by
+/// several threads. The host must only read the buffer while no generated code is running.
+/// If a record does not fit, it is dropped and \c dropped is incremented.
+struct Print_buffer {
+    tct_uint *data;              ///< the words of the ring buffer
+    tct_uint  capacity;          ///< the number of words in data, must be a power of two
+    tct_uint  head;              ///< the next word to write, advanced by the generated code
+    tct_uint  tail;              ///< the first word not yet read, advanced by the host
+    tct_uint  dropped;           ///< the number of dropped records
+};
+
+
 /// The data structure providing access to resources for generated code.
 struct Resource_data {
     void const                  *shared_data;      ///< currently unused, should be NULL
     Texture_handler_base const  *texture_handler;  ///< will be provided as "self" parameter to
                                                    ///< texture functions
+    Print_buffer                *print_buffer;     ///< receives the output of debug::print()
+                                                   ///< in buffered print mode, may be NULL
 };
 
 /// The type of events created by BSDF importance sampling.
@@ -141,6 +141,21 @@ struct HLSL_intrinsic {
     HLSL_intrinsic_argument const *pArgs;        ///< Pointer to first argument.
 };
 
+struct HLSL_intrinsic_name {
+    char const *pName;   ///< Name of the intrinsic.
+    unsigned   uFirst;   ///< Index of the first overload in the intrinsic table.
+    unsigned   uLast;    ///< Index of the last overload in the intrinsic table.
+};
+
+/// A perfect hash from intrinsic names to their overloads, generated for every intrinsic table.
+struct HLSL_intrinsic_index {
+    HLSL_intrinsic_name const *pNames;       ///< The names of the table, sorted.
+    unsigned                  uNumNames;     ///< Count of names in pNames.
+    unsigned short const      *pSeeds;       ///< The hash seed of every bucket.
+    unsigned                  uNumBuckets;   ///< Count of seeds in pSeeds.
+    unsigned short const      *pSlots;       ///< The index into pNames of every hash slot.
+};
+
 #include "hlsl_intrinsics.i"
 
 class Intrinsic_generator {
@@ -192,6 +207,37 @@ private:
     /// Generate one intrinsic (with overloads).
     void generate_intrinsic(HLSL_intrinsic const &intrinsic);
 
+    /// Hash an intrinsic name, must match hash_intrinsic_name() of gen_hlsl_intrinsics.py.
+    static unsigned hash_intrinsic_name(unsigned seed, char const *name)
+    {
+        unsigned h = 2166136261u ^ seed;
+        for (; *name != '\0'; ++name) {
+            h ^= (unsigned char)*name;
+            h *= 16777619u;
+        }
+        h ^= h >> 16;
+        h *= 0x85ebca6bu;
+        h ^= h >> 13;
+        return h;
+    }
+
+    /// Find the overloads of an intrinsic by name.
+    ///
+    /// \param index  the index of an intrinsic table
+    /// \param name   the name of the intrinsic
+    ///
+    /// \return the name entry holding the overload range or NULL if the table has no such name
+    static HLSL_intrinsic_name const *find_intrinsic(
+        HLSL_intrinsic_index const &index,
+        char const                 *name)
+    {
+        unsigned bucket = hash_intrinsic_name(0, name) % index.uNumBuckets;
+        unsigned slot   = hash_intrinsic_name(index.pSeeds[bucket], name) % index.uNumNames;
+
+        HLSL_intrinsic_name const *entry = &index.pNames[index.pSlots[slot]];
+        return strcmp(entry->pName, name) == 0 ? entry : NULL;
+    }
+
 private:
     /// Constructor.
     ///
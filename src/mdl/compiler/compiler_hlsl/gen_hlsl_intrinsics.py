@@ -383,10 +383,90 @@ g_templ_name = None
 def get_db_hlsl():
     global g_db_hlsl
     if g_db_hlsl is None:
-        with open(g_templ_name, "rU") as f:
+        with open(g_templ_name, "r") as f:
             g_db_hlsl = db_hlsl(f)
     return g_db_hlsl
 
+def hash_intrinsic_name(seed, name):
+    "The FNV-1a hash of an intrinsic name with a final mix, must match hash_intrinsic_name() of the compiler."
+    h = (2166136261 ^ seed) & 0xffffffff
+    for c in bytearray(name, "ascii"):
+        h ^= c
+        h = (h * 16777619) & 0xffffffff
+    # fold the high bits into the low bits, the table sizes are not prime
+    h ^= h >> 16
+    h = (h * 0x85ebca6b) & 0xffffffff
+    h ^= h >> 13
+    return h
+
+def build_perfect_hash(names):
+    "Build a minimal perfect hash over names by hash and displace, return the seeds and slots."
+    n = len(names)
+    n_buckets = max(1, (n + 1) // 2)
+    buckets = [[] for b in range(n_buckets)]
+    for idx, name in enumerate(names):
+        buckets[hash_intrinsic_name(0, name) % n_buckets].append(idx)
+
+    seeds = [0] * n_buckets
+    slots = [None] * n
+    # place the largest buckets first, they are the hardest to fit
+    for b in sorted(range(n_buckets), key=lambda b: -len(buckets[b])):
+        if not buckets[b]:
+            break
+        seed = 1
+        while True:
+            assert seed <= 0xffff, "no perfect hash seed found for bucket %d" % b
+            taken = set()
+            for idx in buckets[b]:
+                slot = hash_intrinsic_name(seed, names[idx]) % n
+                if slots[slot] is not None or slot in taken:
+                    break
+                taken.add(slot)
+            else:
+                break
+            seed += 1
+        seeds[b] = seed
+        for idx in buckets[b]:
+            slots[hash_intrinsic_name(seed, names[idx]) % n] = idx
+    return seeds, slots
+
+def format_number_list(numbers):
+    "Format a list of numbers as initializer lines."
+    lines = []
+    for i in range(0, len(numbers), 16):
+        lines.append("    " + ", ".join([str(n) for n in numbers[i:i + 16]]) + ",\n")
+    return "".join(lines)
+
+def get_hlsl_intrinsic_index(ns, intrinsics):
+    "Return the sorted name index and its perfect hash for the table of one namespace."
+    names = []
+    ranges = {}
+    for idx, i in enumerate(intrinsics):
+        if i.name not in ranges:
+            names.append(i.name)
+            ranges[i.name] = [idx, idx]
+        else:
+            ranges[i.name][1] = idx
+    # the table is sorted by name, so are the names and every overload range is contiguous
+    assert names == sorted(names), "intrinsics of namespace %s are not sorted by name" % ns
+    seeds, slots = build_perfect_hash(names)
+
+    result = "static HLSL_intrinsic_name const g_%s_Names[] =\n{\n" % ns
+    for name in names:
+        result += "    { \"%s\", %d, %d },\n" % (name, ranges[name][0], ranges[name][1])
+    result += "};\n\n"
+    result += "static unsigned short const g_%s_Hash_seeds[] =\n{\n" % ns
+    result += format_number_list(seeds)
+    result += "};\n\n"
+    result += "static unsigned short const g_%s_Hash_slots[] =\n{\n" % ns
+    result += format_number_list(slots)
+    result += "};\n\n"
+    result += "static HLSL_intrinsic_index const g_%s_Index =\n{\n" % ns
+    result += "    g_%s_Names, %d, g_%s_Hash_seeds, %d, g_%s_Hash_slots\n" % (
+        ns, len(names), ns, len(seeds), ns)
+    result += "};\n"
+    return result
+
 def get_hlsl_intrinsics():
     db = get_db_hlsl()
     result = ""
@@ -395,18 +475,21 @@ def get_hlsl_intrinsics():
     is_vk_table = False  # SPIRV Change
     id_prefix = ""
     arg_idx = 0
+    ns_intrinsics = []
     opcode_namespace = db.opcode_namespace
     for i in sorted(db.intrinsics, key=lambda x: x.key):
         if last_ns != i.ns:
-            last_ns = i.ns
-            id_prefix = "DS_IOP" if last_ns == "Intrinsics" else "DS_MOP"
             if (len(ns_table)):
-                result += ns_table + "};\n"
+                result += ns_table + "};\n\n"
+                result += get_hlsl_intrinsic_index(last_ns, ns_intrinsics)
                 # SPIRV Change Starts
                 if is_vk_table:
                     result += "\n#endif // ENABLE_SPIRV_CODEGEN\n"
                     is_vk_table = False
                 # SPIRV Change Ends
+            last_ns = i.ns
+            id_prefix = "DS_IOP" if last_ns == "Intrinsics" else "DS_MOP"
+            ns_intrinsics = []
             result += "\n//\n// Start of %s\n//\n\n" % (last_ns)
             # This used to be qualified as __declspec(selectany), but that's no longer necessary.
             ns_table = "static HLSL_intrinsic const g_%s[] =\n{\n" % (last_ns)
@@ -422,6 +505,7 @@ def get_hlsl_intrinsics():
         elif i.readnone:
             ma = "MA_READ_NONE"
 
+        ns_intrinsics.append(i)
         ns_table += "    { %s::%s_%s, %s, %d, %d, g_%s_Args%s },\n" % (opcode_namespace, id_prefix, i.name, ma, i.overload_param_index,len(i.params), last_ns, arg_idx)
         result += "static HLSL_intrinsic_argument const g_%s_Args%s[] =\n{\n" % (last_ns, arg_idx)
         for p in i.params:
@@ -430,7 +514,8 @@ def get_hlsl_intrinsics():
                 p.component_id, p.component_list, p.rows, p.cols)
         result += "};\n\n"
         arg_idx += 1
-    result += ns_table + "};\n"
+    result += ns_table + "};\n\n"
+    result += get_hlsl_intrinsic_index(last_ns, ns_intrinsics)
     result += "\n#endif // ENABLE_SPIRV_CODEGEN\n" if is_vk_table else ""  # SPIRV Change
     return result
 
@@ -445,14 +530,14 @@ def enum_hlsl_intrinsics():
     db = get_db_hlsl()
     result = "  DS_HLSL_INTRINSIC_FIRST,\n"
     first = " = DS_HLSL_INTRINSIC_FIRST"
-    enumed = []
+    enumed = set()
     last = None
     for i in sorted(db.intrinsics, key=lambda x: x.key):
         if (i.enum_name not in enumed):
             enumerant = "  %s%s,\n" % (i.enum_name, first)
             first =""
             result += wrap_with_ifdef_if_vulkan_specific(i, enumerant)  # SPIRV Change
-            enumed.append(i.enum_name)
+            enumed.add(i.enum_name)
             last = i.enum_name
     # unsigned
     result += "  // unsigned\n"
@@ -462,7 +547,7 @@ def enum_hlsl_intrinsics():
           if (i.unsigned_op not in enumed):
             result += "  %s%s,\n" % (i.unsigned_op, first)
             first = ""
-            enumed.append(i.unsigned_op)
+            enumed.add(i.unsigned_op)
             last = i.unsigned_op
 
     result += "  DS_HLSL_INTRINSIC_LAST = %s,\n" % last
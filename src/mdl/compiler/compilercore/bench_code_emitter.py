@@ -0,0 +1,202 @@
+#!/bin/env python
+#
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#  * Neither the name of NVIDIA CORPORATION nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Benchmark for the code output of the intrinsic generators.
+#
+# Runs gen_intrinsic_eval.py and gen_intrinsic_func.py end to end, once with the
+# former writers (one write call per character of a code template, written directly
+# to the output) and once with code_emitter.py, checks that both produce the same output and
+# reports the generation times. The stdmodule IR is cached before, so parsing the
+# standard modules is not measured.
+#
+import sys
+import os
+import shutil
+import tempfile
+import time
+from optparse import OptionParser
+try:
+	from StringIO import StringIO
+except ImportError:
+	from io import StringIO
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(this_dir, "..", "..", "jit", "generator_jit"))
+
+import code_emitter
+import gen_intrinsic_eval
+import gen_intrinsic_func
+
+
+def legacy_write_indented(f, indent, s, newlines_first = False):
+	"""The former writer: one write call per indentation level."""
+	if newlines_first:
+		i = 0
+		for c in s:
+			if c != '\n':
+				break
+			f.write(c)
+			i += 1
+		s = s[i:]
+		if s == "":
+			return
+	for i in range(indent):
+		f.write("    ")
+	f.write(s)
+
+def legacy_format_code(f, indent, code):
+	"""The former code formater: one write call per character."""
+	skip_spaces = True
+	for c in code:
+		if skip_spaces:
+			# skip spaces
+			if c == '\n':
+				f.write(c)
+			if c.isspace():
+				continue
+			if c == '}' or c == ')':
+				indent -= 1
+			for i in range(indent):
+				f.write("    ")
+			skip_spaces = False
+			if c == '}' or c == ')':
+				f.write(c)
+				continue
+
+		if not skip_spaces:
+			# copy mode
+			f.write(c)
+			if c == '\n':
+				skip_spaces = True
+			elif c == '{' or c == '(':
+				indent += 1
+			elif c == '}' or c == ')':
+				indent -= 1
+	return indent
+
+class LegacyOutput:
+	"""The former output: the generated code is written directly to the file."""
+
+	def __init__(self, fout = None, chunk_strings = 0):
+		"""constructor, without an output file the code is written to a StringIO"""
+		if fout == None:
+			fout = StringIO()
+			self.getvalue = fout.getvalue
+		self.m_fout = fout
+		self.write  = fout.write
+		self.tell   = fout.tell
+
+	def flush(self):
+		"""Nothing is buffered."""
+		pass
+
+	def close(self):
+		"""Close the output file."""
+		self.m_fout.close()
+
+
+def use_legacy_writers(legacy):
+	"""Switch code_emitter between the former writers and the buffered emitter."""
+	if not hasattr(use_legacy_writers, "current"):
+		use_legacy_writers.current = (
+			code_emitter.write_indented, code_emitter.format_code, code_emitter.CodeEmitter)
+	if legacy:
+		code_emitter.write_indented = legacy_write_indented
+		code_emitter.format_code    = legacy_format_code
+		code_emitter.CodeEmitter    = LegacyOutput
+	else:
+		(code_emitter.write_indented,
+			code_emitter.format_code,
+			code_emitter.CodeEmitter) = use_legacy_writers.current
+
+
+def run_generator(generator, stdlib_dir, ir_cache, out_name):
+	"""Run a generator, return the time needed."""
+	args = [generator.__name__, "--ir-cache", ir_cache]
+	if generator == gen_intrinsic_func:
+		args.append("--no-cache")
+	t = time.time()
+	if generator.main(args + [stdlib_dir, out_name]) != 0:
+		raise Exception("%s failed" % generator.__name__)
+	return time.time() - t
+
+
+def read_file(filename):
+	"""Return the content of a file."""
+	with open(filename) as f:
+		return f.read()
+
+
+def main(args):
+	parser = OptionParser(usage="usage: %prog [options]")
+	parser.add_option("-d", "--stdlib-dir",
+		help="directory of the standard modules (default ../stdmodule)",
+		dest="stdlib_dir", default=os.path.join(this_dir, "..", "stdmodule"))
+	parser.add_option("-r", "--repeat",
+		help="number of runs per writer, the fastest one is reported (default 3)",
+		type="int", dest="repeat", default=3)
+	(options, args) = parser.parse_args(args[1:])
+
+	tmp_dir = tempfile.mkdtemp()
+	try:
+		ir_cache = os.path.join(tmp_dir, "stdmodule_ir")
+
+		print("%-20s %12s %12s %8s %10s" % ("generator", "former [s]", "emitter [s]", "speedup", "size [KB]"))
+		for generator in [gen_intrinsic_eval, gen_intrinsic_func]:
+			# fill the IR cache
+			run_generator(generator, options.stdlib_dir, ir_cache, os.path.join(tmp_dir, "warmup.i"))
+
+			times = {}
+			outputs = {}
+			for legacy in [True, False]:
+				use_legacy_writers(legacy)
+				out_name = os.path.join(tmp_dir, "%s_%d.i" % (generator.__name__, legacy))
+				t_best = None
+				for i in range(options.repeat):
+					t = run_generator(generator, options.stdlib_dir, ir_cache, out_name)
+					if t_best == None or t < t_best:
+						t_best = t
+				times[legacy] = t_best
+				outputs[legacy] = read_file(out_name)
+			use_legacy_writers(False)
+
+			if outputs[True] != outputs[False]:
+				print("%s: the outputs differ" % generator.__name__)
+				return 1
+			print("%-20s %12.3f %12.3f %7.2fx %10d" % (
+				generator.__name__,
+				times[True],
+				times[False],
+				times[True] / times[False],
+				len(outputs[False]) // 1024))
+	finally:
+		shutil.rmtree(tmp_dir)
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv))
@@ -0,0 +1,296 @@
+#!/bin/env python
+#
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#  * Neither the name of NVIDIA CORPORATION nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Benchmark for the constant folding of component-wise math intrinsics.
+#
+# Writes a standalone C++ program that folds constant calls of every component-wise
+# signature supported by gen_intrinsic_eval.py twice: with the former generated code
+# (unpack, compute and create one component at a time) and with the kernel based code
+# (unpack all arguments into arrays, run one kernel, create the result). Half of the
+# vector arguments are splats. Values are modelled by virtual accessors and a
+# hash-consing value factory, so the program does not need the compiler libraries. The program is compiled with $CXX (default c++) and
+# run, unless --emit-only is given.
+#
+import sys
+import os
+import subprocess
+import tempfile
+from optparse import OptionParser
+
+from gen_intrinsic_eval import SignatureParser
+
+preamble = """
+#include <chrono>
+#include <cstdio>
+#include <cstring>
+#include <map>
+#include <utility>
+#include <vector>
+
+struct Value {
+    explicit Value(int kind) : m_kind(kind) {}
+    virtual ~Value() {}
+    int m_kind;
+};
+
+enum { K_INT, K_FLOAT, K_DOUBLE, K_VECTOR };
+
+template<typename T> struct Kind {};
+template<> struct Kind<int>    { enum { value = K_INT }; };
+template<> struct Kind<float>  { enum { value = K_FLOAT }; };
+template<> struct Kind<double> { enum { value = K_DOUBLE }; };
+
+template<typename T>
+struct Atomic : public Value {
+    explicit Atomic(T v) : Value(Kind<T>::value), m_v(v) {}
+    virtual T get_value() const { return m_v; }
+    T m_v;
+};
+
+struct Vector : public Value {
+    Vector(Value const * const *c, int n) : Value(K_VECTOR), m_n(n) {
+        for (int i = 0; i < n; ++i) m_c[i] = c[i];
+    }
+    virtual Value const *get_value(int i) const { return m_c[i]; }
+    Value const *m_c[4];
+    int          m_n;
+};
+
+template<typename T> struct Kind_of {};
+template<typename T> struct Kind_of<Atomic<T> > { enum { value = Kind<T>::value }; };
+template<> struct Kind_of<Vector> { enum { value = K_VECTOR }; };
+
+template<typename T, typename V>
+T const *cast(V const *v) {
+    if (v->m_kind != Kind_of<T>::value) throw 1;
+    return static_cast<T const *>(v);
+}
+
+class Factory {
+public:
+    template<typename T>
+    Value const *create(T v) {
+        std::map<T, Value const *> &m = table(v);
+        typename std::map<T, Value const *>::iterator it = m.find(v);
+        if (it != m.end()) return it->second;
+        Value const *r = new Atomic<T>(v);
+        m[v] = r;
+        return r;
+    }
+    Value const *create_vector(Value const * const *c, int n) {
+        std::vector<Value const *> key(c, c + n);
+        std::map<std::vector<Value const *>, Value const *>::iterator it = m_vectors.find(key);
+        if (it != m_vectors.end()) return it->second;
+        Value const *r = new Vector(c, n);
+        m_vectors[key] = r;
+        return r;
+    }
+private:
+    std::map<int, Value const *>    &table(int)    { return m_ints; }
+    std::map<float, Value const *>  &table(float)  { return m_floats; }
+    std::map<double, Value const *> &table(double) { return m_doubles; }
+
+    std::map<int, Value const *>                        m_ints;
+    std::map<float, Value const *>                      m_floats;
+    std::map<double, Value const *>                     m_doubles;
+    std::map<std::vector<Value const *>, Value const *> m_vectors;
+};
+
+// the math itself is the same for both schemes, so simple stand-ins are used
+template<typename T> inline T op1(T a)           { return a * a + T(1); }
+template<typename T> inline T op2(T a, T b)      { return a * b + a; }
+template<typename T> inline T op3(T a, T b, T c) { return a * b + c; }
+
+template<typename T>
+void load_components(T *dst, Value const *v, int n) {
+    if (v->m_kind == K_VECTOR) {
+        Vector const *c = static_cast<Vector const *>(v);
+        for (int j = 0; j < n; ++j) dst[j] = cast<Atomic<T> >(c->get_value(j))->get_value();
+    } else {
+        T a = cast<Atomic<T> >(v)->get_value();
+        for (int j = 0; j < n; ++j) dst[j] = a;
+    }
+}
+
+template<typename T, int N_ARGS, int N, void (*KERNEL)(T *, T const * const [], int)>
+Value const *fold_component_wise(Factory &f, Value const * const args[])
+{
+    T data[N_ARGS][N];
+    T const *a[N_ARGS];
+    T r[N];
+    for (int i = 0; i < N_ARGS; ++i) { load_components(data[i], args[i], N); a[i] = data[i]; }
+    KERNEL(r, a, N);
+    Value const *res[N];
+    res[0] = f.create(r[0]);
+    for (int j = 1; j < N; ++j)
+        res[j] = memcmp(&r[j], &r[j - 1], sizeof(T)) == 0 ? res[j - 1] : f.create(r[j]);
+    return f.create_vector(res, N);
+}
+
+template<typename T> void kernel_op1(T *res, T const * const args[], int n) {
+    T const *a = args[0];
+    for (int j = 0; j < n; ++j) res[j] = op1(a[j]);
+}
+template<typename T> void kernel_op2(T *res, T const * const args[], int n) {
+    T const *a = args[0]; T const *b = args[1];
+    for (int j = 0; j < n; ++j) res[j] = op2(a[j], b[j]);
+}
+template<typename T> void kernel_op3(T *res, T const * const args[], int n) {
+    T const *a = args[0]; T const *b = args[1]; T const *c = args[2];
+    for (int j = 0; j < n; ++j) res[j] = op3(a[j], b[j], c[j]);
+}
+"""
+
+def emit_scalar_fold(idx, kind, n, params, is_atomic):
+	"""The former generated code for one signature."""
+	lines = ["static Value const *fold_scalar_%d(Factory &f, Value const * const arguments[])" % idx, "{"]
+	lines.append("    Value const *res[%d];" % n)
+	names = []
+	for i, param in enumerate(params):
+		a = chr(ord('a') + i)
+		if is_atomic[i]:
+			lines.append("    Atomic<%s> const *%s = cast<Atomic<%s> >(arguments[%d]);" % (kind, a, kind, i))
+		else:
+			lines.append("    Vector const *v_%s = cast<Vector>(arguments[%d]);" % (a, i))
+		names.append(a)
+	lines.append("    for (int j = 0; j < %d; ++j) {" % n)
+	for i, a in enumerate(names):
+		if not is_atomic[i]:
+			lines.append("        Atomic<%s> const *%s = cast<Atomic<%s> >(v_%s->get_value(j));" % (kind, a, kind, a))
+	lines.append("        res[j] = f.create(op%d(%s));" % (
+		len(params), ", ".join([a + "->get_value()" for a in names])))
+	lines.append("    }")
+	lines.append("    return f.create_vector(res, %d);" % n)
+	lines.append("}")
+	return "\n".join(lines)
+
+def emit_kernel_fold(idx, kind, n, params):
+	"""The kernel based generated code for one signature."""
+	return ("static Value const *fold_kernel_%d(Factory &f, Value const * const arguments[])\n"
+		"{\n"
+		"    return fold_component_wise<%s, %d, %d, kernel_op%d<%s> >(f, arguments);\n"
+		"}") % (idx, kind, len(params), n, len(params), kind)
+
+def create_program(cases, n_calls):
+	"""Create the benchmark program for the given (kind, n, params, is_atomic) cases."""
+	out = [preamble]
+	for idx, (kind, n, params, is_atomic) in enumerate(cases):
+		out.append(emit_scalar_fold(idx, kind, n, params, is_atomic))
+		out.append(emit_kernel_fold(idx, kind, n, params))
+
+	out.append("typedef Value const *(*Fold)(Factory &, Value const * const []);")
+	out.append("struct Call { Fold scalar; Fold kernel; Value const *args[3]; };")
+	out.append("")
+	out.append("int main()")
+	out.append("{")
+	out.append("    Factory f;")
+	out.append("    std::vector<Call> calls;")
+	for idx, (kind, n, params, is_atomic) in enumerate(cases):
+		out.append("    for (int i = 0; i < %d; ++i) {" % n_calls)
+		out.append("        Call c = { fold_scalar_%d, fold_kernel_%d, { 0, 0, 0 } };" % (idx, idx))
+		for i in range(len(params)):
+			out.append("        {")
+			out.append("            %s x = %s(0.25 + 0.5 * ((i * 7 + %d) %% 11));" % (kind, kind, i * 3))
+			if is_atomic[i]:
+				out.append("            c.args[%d] = f.create(x);" % i)
+			else:
+				out.append("            Value const *comps[%d];" % n)
+				out.append("            for (int j = 0; j < %d; ++j) comps[j] = f.create(%s(x + (i & 1) * j));" % (n, kind))
+				out.append("            c.args[%d] = f.create_vector(comps, %d);" % (i, n))
+			out.append("        }")
+		out.append("        calls.push_back(c);")
+		out.append("    }")
+	out.append("""
+    for (int pass = 0; pass < 2; ++pass) {
+        // first pass warms up the value tables
+        for (int scheme = 0; scheme < 2; ++scheme) {
+            std::chrono::steady_clock::time_point t0 = std::chrono::steady_clock::now();
+            for (int r = 0; r < 10; ++r) {
+                for (size_t i = 0, n = calls.size(); i < n; ++i) {
+                    Call const &c = calls[i];
+                    (scheme == 0 ? c.scalar : c.kernel)(f, c.args);
+                }
+            }
+            double t = std::chrono::duration<double>(std::chrono::steady_clock::now() - t0).count();
+            if (pass == 1) {
+                printf("%-8s %12.0f folds/s\\n", scheme == 0 ? "scalar" : "kernel", 10 * calls.size() / t);
+            }
+        }
+    }
+    return 0;
+}""")
+	return "\n\n".join(out) + "\n"
+
+def main(args):
+	parser = OptionParser(usage="usage: %prog [options] stdlib_directory")
+	parser.add_option("-n", "--calls",
+		help="number of constant calls folded per signature",
+		type="int", dest="n_calls", default=200)
+	parser.add_option("--emit-only",
+		help="only write the benchmark program to the given file",
+		dest="emit_only", default=None)
+	(options, args) = parser.parse_args(args[1:])
+
+	if len(args) != 1:
+		parser.print_usage()
+		return 1
+
+	sigparser = SignatureParser(sys.argv[0], args[0], None, True)
+	sigparser.parse("math")
+
+	cases = []
+	for intrinsic in sorted(sigparser.m_intrinsics.keys()):
+		for sig in sorted(sigparser.m_intrinsics[intrinsic].keys()):
+			if sigparser.intrinsic_modes.get(intrinsic + sig) != "math::component_wise":
+				continue
+			ret_type, params = sigparser.split_signature(sig)
+			kind, n = sigparser.get_vector_type_and_size(ret_type)
+			cases.append((kind, n, params, [sigparser.is_atomic_type(p) for p in params]))
+
+	program = create_program(cases, options.n_calls)
+	print("%d component-wise signatures, %d constant calls" % (len(cases), len(cases) * options.n_calls))
+
+	if options.emit_only:
+		f = open(options.emit_only, "w")
+		f.write(program)
+		f.close()
+		return 0
+
+	tmp_dir = tempfile.mkdtemp()
+	src_name = os.path.join(tmp_dir, "bench_intrinsic_eval.cpp")
+	exe_name = os.path.join(tmp_dir, "bench_intrinsic_eval")
+	f = open(src_name, "w")
+	f.write(program)
+	f.close()
+
+	cxx = os.environ.get("CXX", "c++")
+	subprocess.check_call([cxx, "-O2", "-o", exe_name, src_name])
+	return subprocess.call([exe_name])
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv))
@@ -0,0 +1,150 @@
+#!/bin/env python
+#
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#  * Neither the name of NVIDIA CORPORATION nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Benchmark for the MDL declaration scanner.
+#
+# Parses a synthetic module with many intrinsic declarations carrying long default
+# argument expressions. With --legacy, the former slicing based scanner is timed on
+# the same input for comparison.
+#
+import sys
+import re
+import time
+from optparse import OptionParser
+
+import mdl_decl_scanner
+
+def create_module(n_decls, n_params, default_len):
+	"""Create the lines of a synthetic module."""
+	default = " + ".join(["float3(%d.0, (%d.5), max(1.0, 2.0))" % (i, i) for i in range(default_len)])
+	lines = []
+	for i in range(n_decls):
+		lines.append("// declaration %d" % i)
+		lines.append("export float3 func_%d(" % i)
+		for j in range(n_params):
+			lines.append("    uniform float3 p%d = %s," % (j, default))
+		lines.append("    float x")
+		lines.append(") uniform [[ intrinsic(), anno::unused() ]];")
+	return lines
+
+def legacy_skip_until(token_set, tokens):
+	"""The former scanner: skip tokens by slicing the token list."""
+	r = 0
+	l = len(tokens)
+	while l > 0:
+		tok = tokens[0]
+		if r == 0 and tok in token_set:
+			return tokens
+		if tok == '(':
+			r += 1
+		elif tok == ')':
+			r -= 1
+		tokens = tokens[1:]
+		l -= 1
+	return [None]
+
+def legacy_get_type(tokens):
+	"""The former type decoder: return the remaining tokens by slicing."""
+	start = 0
+	if tokens[0] == "uniform" or tokens[0] == "varying":
+		start = 1
+	return tokens[start + 1:], tokens[start]
+
+def legacy_parse(lines):
+	"""The former scanner: concatenate declarations, then tokenize and slice."""
+	n = 0
+	start = False
+	curr_line = ""
+	for line in lines:
+		l = line.strip()
+		idx = l.find('//')
+		if idx != -1:
+			l = l[:idx]
+		if not start:
+			if l[:6] == "export":
+				start = True
+				curr_line = l[7:].strip()
+		else:
+			curr_line += l
+		if start and l[-1] == ";":
+			start = False
+			decl = mdl_decl_scanner.as_intrinsic_function(curr_line)
+			tokens = re.sub(r'[,()]', lambda m: ' ' + m.group(0) + ' ', decl).split()
+			tokens, _ = legacy_get_type(tokens)
+			tokens = tokens[2:]
+			while tokens[0] != ')':
+				tokens, _ = legacy_get_type(tokens)
+				tokens = tokens[1:]
+				if tokens[0] == '=':
+					tokens = legacy_skip_until({',':None, ')':None}, tokens[1:])
+				if tokens[0] == ',':
+					tokens = tokens[1:]
+			n += 1
+	return n
+
+def scanner_parse(lines):
+	"""The shared scanner."""
+	n = 0
+	for decl in mdl_decl_scanner.scan_intrinsics(lines):
+		mdl_decl_scanner.parse_declaration(decl)
+		n += 1
+	return n
+
+def run(name, func, lines):
+	"""Time one parser run."""
+	t = time.time()
+	n = func(lines)
+	t = time.time() - t
+	print("%-8s %8d declarations in %8.3f s (%.0f decls/s)" % (name, n, t, n / max(t, 1e-9)))
+
+def main(args):
+	parser = OptionParser()
+	parser.add_option("-n", "--decls",
+		help="number of declarations",
+		type="int", dest="n_decls", default=100000)
+	parser.add_option("-p", "--params",
+		help="number of parameters with default arguments per declaration",
+		type="int", dest="n_params", default=4)
+	parser.add_option("-d", "--default-length",
+		help="number of terms in each default argument expression",
+		type="int", dest="default_len", default=8)
+	parser.add_option("--legacy",
+		help="also time the former slicing based scanner",
+		action="store_true", dest="legacy", default=False)
+	(options, args) = parser.parse_args(args[1:])
+
+	lines = create_module(options.n_decls, options.n_params, options.default_len)
+	print("synthetic module: %d lines, %d bytes" % (len(lines), sum(len(l) for l in lines)))
+
+	run("scanner", scanner_parse, lines)
+	if options.legacy:
+		run("legacy", legacy_parse, lines)
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv))
@@ -0,0 +1,158 @@
+#!/bin/env python
+#
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#  * Neither the name of NVIDIA CORPORATION nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Indentation-aware code output of the intrinsic generators.
+#
+# The code templates are formatted line by line and every call writes a single
+# string, the CodeEmitter collects these strings and writes them to the output
+# file in large chunks. write_if_changed() leaves generated files untouched if their
+# content did not change, so dependent sources are not rebuilt.
+# Used by:
+#  - gen_intrinsic_eval.py
+#  - gen_intrinsic_func.py
+#  - gen_libbsdf_runtime_header.py
+#  - gen_user_modules_runtime_header.py
+#  - gen_runtime_headers.py
+#
+
+# one indentation level
+INDENT = "    "
+
+# number of strings collected before they are written to the output file
+CHUNK_STRINGS = 4096
+
+# indentation strings by level
+indentations = [INDENT * i for i in range(32)]
+
+def indentation(indent):
+	"""Return the indentation string of the given level."""
+	if indent < 0:
+		return ""
+	while indent >= len(indentations):
+		indentations.append(INDENT * len(indentations))
+	return indentations[indent]
+
+def write_indented(f, indent, s, newlines_first = False):
+	"""Write string s to file f after the indentation.
+	   If newlines_first is set, leading newlines are written before the indentation and
+	   nothing is indented if s consists of newlines only."""
+	if newlines_first:
+		text = s.lstrip("\n")
+		if text == "":
+			f.write(s)
+			return
+		f.write(s[:len(s) - len(text)] + indentation(indent) + text)
+	else:
+		f.write(indentation(indent) + s)
+
+def format_code(f, indent, code):
+	"""The (not so) smart code formater.
+	   Strips the leading white space of every line of code, indents it by the nesting
+	   of braces and parentheses, and returns the indentation level after code."""
+	out = []
+	lines = code.split("\n")
+	last = len(lines) - 1
+	for i, line in enumerate(lines):
+		text = line.lstrip()
+		if text != "":
+			if text[0] == '}' or text[0] == ')':
+				indent -= 1
+				rest = text[1:]
+			else:
+				rest = text
+			out.append(indentation(indent))
+			out.append(text)
+			indent += (rest.count('{') + rest.count('(')) - (rest.count('}') + rest.count(')'))
+		if i != last:
+			out.append("\n")
+	f.write("".join(out))
+	return indent
+
+class CodeEmitter:
+	"""Collects the generated code and writes it in large chunks."""
+
+	def __init__(self, fout = None, chunk_strings = CHUNK_STRINGS):
+		"""constructor, without an output file all code is kept for getvalue()"""
+		self.m_fout          = fout
+		self.m_chunk_strings = chunk_strings
+		self.m_chunks        = []
+		self.m_counted       = 0
+		self.m_size          = 0
+
+	def write(self, s):
+		"""Append string s to the output."""
+		self.m_chunks.append(s)
+		if self.m_fout != None and len(self.m_chunks) >= self.m_chunk_strings:
+			self.flush()
+
+	def tell(self):
+		"""Return the number of characters written so far."""
+		self.m_size += sum(map(len, self.m_chunks[self.m_counted:]))
+		self.m_counted = len(self.m_chunks)
+		return self.m_size
+
+	def getvalue(self):
+		"""Return the code not written to the output file yet."""
+		self.tell()
+		self.m_chunks  = ["".join(self.m_chunks)]
+		self.m_counted = 1
+		return self.m_chunks[0]
+
+	def flush(self):
+		"""Write the collected code to the output file."""
+		if self.m_fout == None:
+			return
+		self.tell()
+		self.m_fout.write("".join(self.m_chunks))
+		self.m_chunks  = []
+		self.m_counted = 0
+
+	def close(self):
+		"""Write the collected code and close the output file."""
+		self.flush()
+		if self.m_fout != None:
+			self.m_fout.close()
+
+def write_if_changed(fname, content):
+	"""Write content to file fname, but only if its bytes would differ.
+
+	Keeping an unchanged file untouched preserves its mtime, so dependent
+	sources are not rebuilt. Returns True if the file was (re)written."""
+	data = content.encode("utf-8")
+	try:
+		f = open(fname, "rb")
+		old = f.read()
+		f.close()
+		if old == data:
+			return False
+	except IOError:
+		pass
+	f = open(fname, "wb")
+	f.write(data)
+	f.close()
+	return True
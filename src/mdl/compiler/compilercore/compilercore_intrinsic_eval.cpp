@@ -29,6 +29,9 @@
 #include "pch.h"
 
 #include <cmath>
+#include <cstring>
+#include <algorithm>
+#include <vector>
 
 #include <mi/mdl/mdl_definitions.h>
 #include <mi/mdl/mdl_values.h>
@@ -97,6 +100,123 @@ static IValue const *do_luminance_color(
     return value_factory->create_float(lum);
 }
 
+/// The CIE 1931 color matching functions transformed into linear sRGB and scaled from
+/// radiometric to photometric units, so converting a spectrum sampled on the CIE grid
+/// into a color is one dot product per channel.
+struct CIE_sRGB_table {
+    float rgb[spectral::SPECTRAL_XYZ_RES][3];
+
+    /// Constructor.
+    CIE_sRGB_table()
+    {
+        float const *m     = spectral::get_XYZ_to_cs(spectral::CS_sRGB);
+        float const  scale = float(683.002) * spectral::SPECTRAL_XYZ_LAMBDA_STEP;
+
+        for (unsigned i = 0; i < spectral::SPECTRAL_XYZ_RES; ++i) {
+            float const XYZ[3] = {
+                spectral::SPECTRAL_XYZ1931_X[i] * scale,
+                spectral::SPECTRAL_XYZ1931_Y[i] * scale,
+                spectral::SPECTRAL_XYZ1931_Z[i] * scale
+            };
+            for (unsigned j = 0; j < 3; ++j) {
+                rgb[i][j] = m[3 * j] * XYZ[0] + m[3 * j + 1] * XYZ[1] + m[3 * j + 2] * XYZ[2];
+            }
+        }
+    }
+};
+
+/// Get the CIE table, computed once on first use.
+static CIE_sRGB_table const &get_cie_sRGB_table()
+{
+    static CIE_sRGB_table const table;
+    return table;
+}
+
+/// Helper for emission_color(float[<N>], float[N])
+static IValue const *do_emission_color_spectrum(
+    IValue_factory       *value_factory,
+    IValue const * const arguments[])
+{
+    IValue_array const *wavelengths = cast<IValue_array>(arguments[0]);
+    IValue_array const *amplitudes  = cast<IValue_array>(arguments[1]);
+
+    float rgb[3] = { 0.0f, 0.0f, 0.0f };
+
+    int n = wavelengths->get_component_count();
+    if (n > 0 && n == amplitudes->get_component_count()) {
+        std::vector<float> lambda(n), value(n);
+        for (int i = 0; i < n; ++i) {
+            lambda[i] = cast<IValue_float>(wavelengths->get_value(i))->get_value();
+            value[i]  = cast<IValue_float>(amplitudes->get_value(i))->get_value();
+        }
+
+        // resample onto the grid of the color matching functions, then integrate
+        float values[spectral::SPECTRAL_XYZ_RES];
+        spectral::spectrum_resample_input(
+            values,
+            spectral::SPECTRAL_XYZ_RES,
+            spectral::SPECTRAL_XYZ_LAMBDA_MIN,
+            spectral::SPECTRAL_XYZ_LAMBDA_MAX,
+            value.data(),
+            lambda.data(),
+            unsigned(n));
+
+        CIE_sRGB_table const &cie = get_cie_sRGB_table();
+        for (unsigned i = 0; i < spectral::SPECTRAL_XYZ_RES; ++i) {
+            rgb[0] += cie.rgb[i][0] * values[i];
+            rgb[1] += cie.rgb[i][1] * values[i];
+            rgb[2] += cie.rgb[i][2] * values[i];
+        }
+
+        // emission is never negative
+        rgb[0] = std::max(rgb[0], 0.0f);
+        rgb[1] = std::max(rgb[1], 0.0f);
+        rgb[2] = std::max(rgb[2], 0.0f);
+    }
+
+    IValue_float const *r = value_factory->create_float(rgb[0]);
+    IValue_float const *g = value_factory->create_float(rgb[1]);
+    IValue_float const *b = value_factory->create_float(rgb[2]);
+    return value_factory->create_rgb_color(r, g, b);
+}
+
+/// Helper for eval_at_wavelength(color, float)
+static IValue const *do_eval_at_wavelength(
+    IValue_factory       *value_factory,
+    IValue const * const arguments[])
+{
+    IValue_rgb_color const *a      = cast<IValue_rgb_color>(arguments[0]);
+    float                   lambda = cast<IValue_float>(arguments[1])->get_value();
+
+    float const rgb[3] = {
+        a->get_value(0)->get_value(),
+        a->get_value(1)->get_value(),
+        a->get_value(2)->get_value()
+    };
+
+    // gray colors (including black) have a constant spectrum
+    if (rgb[0] == rgb[1] && rgb[1] == rgb[2])
+        return value_factory->create_float(rgb[0]);
+
+    // colors are linear sRGB: reconstruct the spectrum with Smits' method, like
+    // mdl_eval_at_wavelength() of libmdlrt does in generated code
+    float values[spectral::SPECTRAL_XYZ_RES];
+    spectral::cs_refl_to_spectrum(values, rgb, spectral::CS_sRGB, /*aggressive=*/true);
+
+    // the spectrum is continued constantly outside the tabulated range
+    if (!(lambda > spectral::SPECTRAL_XYZ_LAMBDA_MIN))
+        lambda = spectral::SPECTRAL_XYZ_LAMBDA_MIN;
+    else if (lambda > spectral::SPECTRAL_XYZ_LAMBDA_MAX)
+        lambda = spectral::SPECTRAL_XYZ_LAMBDA_MAX;
+
+    return value_factory->create_float(spectral::get_value_lerp(
+        values,
+        spectral::SPECTRAL_XYZ_RES,
+        spectral::SPECTRAL_XYZ_LAMBDA_MIN,
+        spectral::SPECTRAL_XYZ_LAMBDA_MAX,
+        lambda));
+}
+
 template <typename T>
 struct Value_type_trait {};
 
@@ -122,6 +242,93 @@ static inline IValue const *create_value(IValue_factory *factory, double value)
     return factory->create_double(value);
 }
 
+template <>
+struct Value_type_trait<int> {
+    typedef IValue_int Value_type;
+    typedef int        IM_type;
+};
+
+static inline IValue const *create_value(IValue_factory *factory, int value)
+{
+    return factory->create_int(value);
+}
+
+/// Unpack the components of a vector, color or atomic value into an array.
+/// Atomic values are replicated into all n components.
+template <
+    typename T
+>
+static void load_components(
+    T            *dst,
+    IValue const *v,
+    int          n)
+{
+    typedef typename Value_type_trait<T>::Value_type VT;
+
+    if (IValue_compound const *c = as<IValue_compound>(v)) {
+        for (int j = 0; j < n; ++j) {
+            dst[j] = cast<VT>(c->get_value(j))->get_value();
+        }
+    } else {
+        T a = cast<VT>(v)->get_value();
+        for (int j = 0; j < n; ++j) {
+            dst[j] = a;
+        }
+    }
+}
+
+/// Helper for component-wise intrinsics: unpacks all arguments into arrays, runs the kernel
+/// once over all N components and packs the result.
+///
+/// \tparam T       the component type
+/// \tparam N_ARGS  the number of arguments
+/// \tparam N       the number of result components
+/// \tparam KERNEL  the kernel computing all result components
+///
+/// \param value_factory  the value factory used to create the result
+/// \param v_type         the vector type of the result or NULL for a color result
+/// \param arguments      the N_ARGS arguments
+template <
+    typename T,
+    int      N_ARGS,
+    int      N,
+    void     (*KERNEL)(T *res, T const * const args[], int n)
+>
+static IValue const *fold_component_wise(
+    IValue_factory       *value_factory,
+    IType_vector const   *v_type,
+    IValue const * const arguments[])
+{
+    T       data[N_ARGS][N];
+    T const *args[N_ARGS];
+    T       r[N];
+
+    for (int i = 0; i < N_ARGS; ++i) {
+        load_components(data[i], arguments[i], N);
+        args[i] = data[i];
+    }
+
+    KERNEL(r, args, N);
+
+    // equal neighbor components (splats) share one value, saving the value table lookups
+    IValue const *res[N];
+    res[0] = create_value(value_factory, r[0]);
+    for (int j = 1; j < N; ++j) {
+        if (memcmp(&r[j], &r[j - 1], sizeof(T)) == 0) {
+            res[j] = res[j - 1];
+        } else {
+            res[j] = create_value(value_factory, r[j]);
+        }
+    }
+
+    if (v_type == NULL) {
+        MDL_ASSERT(N == 3);
+        return value_factory->create_rgb_color(
+            cast<IValue_float>(res[0]), cast<IValue_float>(res[1]), cast<IValue_float>(res[2]));
+    }
+    return value_factory->create_vector(v_type, res, N);
+}
+
 /// Helper for cross.
 template <
     typename T
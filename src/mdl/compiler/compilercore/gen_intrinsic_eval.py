@@ -34,6 +34,12 @@ import sys
 import os
 import re
 
+import mdl_decl_scanner
+import stdmodule_ir
+import generator_stats
+import code_emitter
+from optparse import OptionParser
+
 def error(msg):
 	"""Write a message to stderr"""
 	sys.stderr.write("gen_intrinsic_eval: Error: " + msg + "\n")
@@ -51,12 +57,17 @@ def make_temp_file():
 class SignatureParser:
 	"""main signature parser"""
 
-	def __init__(self, script_name, indir, out_name, strict):
+	def __init__(self, script_name, indir, out_name, strict, ir = None, stats = None):
 		"""constructor"""
 		self.debug = False
 		self.indir  = indir
+		if ir == None:
+			ir = stdmodule_ir.IntrinsicIR(indir)
+		self.ir = ir
+		if stats == None:
+			stats = generator_stats.GeneratorStats("gen_intrinsic_eval")
+		self.stats = stats
 		self.out_name = out_name
-		self.r_intrinsic = re.compile(r"\[\[\s+intrinsic\(\)[^]]*\]\];")
 		self.curr_module = ""
 		self.m_intrinsics = {}
 		self.m_intrinsic_mods = {}
@@ -209,47 +220,18 @@ class SignatureParser:
 
 	def write(self, f, s):
 		"""write string s to file f after doing indent."""
-		for i in range(self.indent):
-			f.write("    ")
-		f.write(s)
+		code_emitter.write_indented(f, self.indent, s)
 
 	def parse(self, mdl_name):
 		"""Parse a mdl module."""
 		self.curr_module = mdl_name
-		fname = self.indir + "/" + mdl_name + ".mdl"
-		f = open(fname, "r")
-		o = self.parse_file(f)
-		f.close()
-		
-	def as_intrinsic_function(self, decl):
-		"""Check if the given declaration is an intrinsic function declaration."""
-		if decl[:5] == "const":
-			return None
-		if decl[:4] == "enum":
-			return None
-		if decl[:5] == "struct":
-			return None
-		if decl[:8] == "material":
-			return None
-		m = self.r_intrinsic.search(decl)
-		if m:
-			decl = decl[:m.start()]
-			# kill all other annotations
-			return re.sub(r'\[\[[^]]*\]\]', "", decl).strip()
-		return None
+		for decl in self.ir.get_declarations(mdl_name):
+			if self.debug:
+				print(decl.decl)
+			sig = self.get_signature(decl)
+			if self.debug:
+				print(sig)
 		
-	def get_type(self, tokens):
-		"""decode a type"""
-		start = 0
-		end   = 1
-		if tokens[0] == "uniform" or tokens[0] == "varying":
-			# skip uniform and varying modifier
-			end += 1
-			start += 1
-		ret_type = " ".join(tokens[start:end])
-		
-		return tokens[end:], ret_type
-
 	def do_get_type_code(self, s):
 		"""get the type code"""
 		try:
@@ -452,44 +434,16 @@ class SignatureParser:
 
 	def get_signature(self, decl):
 		"""Get the signature for a given function declaration."""
-		# poor man's scanner :-)
-		tokens = re.sub(r'[,()]', lambda m: ' ' + m.group(0) + ' ', decl).split()
-		
-		tokens, ret_type = self.get_type(tokens)
-		
-		name = tokens[0]
+		name = decl.name
 		
 		self.m_intrinsic_mods[name] = self.curr_module
 		
-		if tokens[1] != '(':
-			error("unknown token '" + tokens[1] + "' while processing '" + decl + "': '(' expected")
-			sys.exit(1)
-			
-		tokens = tokens[2:]
-		
-		args = []
-		
-		if tokens[0] != ')':
-			while True:
-				tokens, t = self.get_type(tokens)
-				args.append(t)
-				
-				# throw away the name
-				tokens = tokens[1:]
-				
-				if tokens[0] == ')':
-					break
-				if tokens[0] != ',':
-					error("unknown token '" + tokens[1] + "' while processing '"
-					      + decl + "': ',' expected")
-					sys.exit(1)
-				# skip the comma
-				tokens = tokens[1:]
+		args = [t for t, _, _ in decl.params]
 
-		signature = self.create_signature(ret_type, args)
+		signature = self.create_signature(decl.ret_type, args)
 
 		if self.debug:
-			print("%s %s" % (decl, signature))
+			print("%s %s" % (decl.decl, signature))
 
 		if self.is_supported(self.curr_module, name, signature):
 			# insert the new signature for the given name
@@ -500,36 +454,10 @@ class SignatureParser:
 			_, params = self.split_signature(signature)
 			self.m_signatures["_".join(params)] = True
 		else:
-			warning("Cannot evaluate %s" % decl)
+			warning("Cannot evaluate %s" % decl.decl)
 
 		return ""
 		
-	def parse_file(self, f):
-		"""Parse a file and retrieve intrinsic function definitions."""
-		
-		start = False
-		curr_line = ""
-		for line in f.readlines():
-			l = line.strip();
-			
-			if not start:
-				if l[:6] == "export":
-					start = True
-					curr_line = l[7:].strip()
-			else:
-				curr_line += l
-			if start:
-				if l[-1] == ";":
-					start = False
-					decl = self.as_intrinsic_function(curr_line)
-					if not decl:
-						continue
-					if self.debug:
-						print(decl)
-					sig = self.get_signature(decl)
-					if self.debug:
-						print(sig)
-
 	def gen_condition(self, f, params, as_assert, pre_if = ""):
 		"""Generate the condition for the parameter type check."""
 		if as_assert:
@@ -565,8 +493,7 @@ class SignatureParser:
 			return
 
 		elif mode == "math::eval_at_wavelength":
-			# FIXME: not supported yet
-			self.write(f, "return value_factory->create_float(0.0f);\n")
+			self.write(f, "return do_eval_at_wavelength(value_factory, arguments);\n")
 			return
 
 		elif mode == "math::blackbody":
@@ -579,13 +506,12 @@ class SignatureParser:
 			return
 
 		elif mode == "math::emission_color_spectrum":
-			# FIXME: so far black
-			self.write(f, "IValue_float const *zero = value_factory->create_float(0.0f);\n")
-			self.write(f, "return value_factory->create_rgb_color(zero, zero, zero);\n")
+			self.write(f, "return do_emission_color_spectrum(value_factory, arguments);\n")
 			return
 
 		elif mode == "math::emission_color_color":
-			# FIXME: so far no-op
+			# colors are linear sRGB tristimulus values already, so converting them into an
+			# emission spectrum and back is the identity (this is what the JIT backend does, too)
 			self.write(f, "return arguments[0];\n")
 			return
 
@@ -843,57 +769,22 @@ class SignatureParser:
 
 		elif mode == "math::component_wise":
 			vt = self.get_vector_type_and_size(ret_type)
-			# vector/color all same base arguments
+			# vector/color all same base arguments, unpacked into arrays and folded by one kernel
 
 			if ret_type == "CC":
-				self.write(f, "IValue_float const *res[3];\n")
+				v_type = "NULL"
 			else:
 				if self.get_vector_type_and_size(params[0]):
 					self.write(f, "IType_vector const *v_type = cast<IValue_vector>(arguments[0])->get_type();\n")
 				else:
 					self.write(f, "IType_vector const *v_type = cast<IValue_vector>(arguments[1])->get_type();\n")
-				self.write(f, "IValue const *res[%d];\n" % (vt[1]))
-
-			idx = 0
-			for param in params:
-				if self.is_atomic_type(param):
-					self.write(f, "IValue_%s const *%s = cast<IValue_%s>(arguments[%d]);\n" % 
-						(vt[0], chr(ord('a') + idx), vt[0], idx))
-				elif param == "CC":
-					self.write(f, "IValue_rgb_color const *v_%s = cast<IValue_rgb_color>(arguments[%d]);\n" % 
-						(chr(ord('a') + idx), idx))
-				else:
-					self.write(f, "IValue_vector const *v_%s = cast<IValue_vector>(arguments[%d]);\n" % 
-						(chr(ord('a') + idx), idx))
-				idx += 1
+				v_type = "v_type"
 
-			self.write(f, "for (int j = 0; j < %d; ++j) {\n" % vt[1])
+			self.write(f, "return fold_component_wise<%s, %d, %d, kernel_%s<%s> >(\n" % (
+				vt[0], len(params), vt[1], intrinsic, vt[0]))
 			self.indent += 1
-			idx = 0
-			for param in params:
-				if not self.is_atomic_type(param):
-					self.write(f, "IValue_%s const *%s = cast<IValue_%s>(v_%s->get_value(j));\n" % 
-								(vt[0], chr(ord('a') + idx), vt[0], chr(ord('a') + idx)))
-				idx += 1
-
-			call = ("res[j] = value_factory->create_%s(" + intrinsic + "(") % vt[0]
-			idx = 0
-			comma = ""
-			for param in params:
-				call += comma
-				comma = ", "
-				call += chr(ord('a') + idx)
-				call += "->get_value()"
-				idx += 1
-			call += "));\n"
-			self.write(f, call);
-
+			self.write(f, "value_factory, %s, arguments);\n" % v_type)
 			self.indent -= 1
-			self.write(f, "}\n")
-			if ret_type == "CC":
-				self.write(f, "return value_factory->create_rgb_color(res[0], res[1], res[2]);\n")
-			else:
-				self.write(f, "return value_factory->create_vector(v_type, res, %d);\n" % vt[1])
 			return
 
 		elif mode == None:
@@ -1100,11 +991,51 @@ class SignatureParser:
 			
 			self.write(f, "}\n\n")
 
+	def create_component_kernels(self, f):
+		"""Create the kernels of all component-wise evaluated intrinsics."""
+		kernels = {}
+		for intrinsic, sigs in self.m_intrinsics.items():
+			for sig in sigs:
+				if self.intrinsic_modes.get(intrinsic + sig) == "math::component_wise":
+					_, params = self.split_signature(sig)
+					n_params = kernels.setdefault(intrinsic, len(params))
+					if n_params != len(params):
+						error("component-wise overloads of %s differ in the number of parameters"
+							% intrinsic)
+
+		for intrinsic in sorted(kernels.keys()):
+			args = [chr(ord('a') + idx) for idx in range(kernels[intrinsic])]
+
+			self.write(f, "/// Component-wise kernel for %s().\n" % intrinsic)
+			self.write(f, "template <typename T>\n")
+			self.write(f, "static void kernel_%s(T *res, T const * const args[], int n)\n" % intrinsic)
+			self.write(f, "{\n")
+			self.indent += 1
+			for idx, arg in enumerate(args):
+				self.write(f, "T const *%s = args[%d];\n" % (arg, idx))
+			self.write(f, "for (int j = 0; j < n; ++j) {\n")
+			self.indent += 1
+			self.write(f, "res[j] = %s(%s);\n" % (intrinsic, ", ".join([a + "[j]" for a in args])))
+			self.indent -= 1
+			self.write(f, "}\n")
+			self.indent -= 1
+			self.write(f, "}\n\n")
+
 	def finalize(self):
 		"""Create output."""
-		f = open(self.out_name, "w")
-		
+		f = code_emitter.CodeEmitter()
+
+		n_signatures = 0
+		for sigs in self.m_intrinsics.values():
+			n_signatures += len(sigs)
+		self.stats.add_module("math", len(self.m_intrinsics), n_signatures)
+
+		self.stats.begin_phase("create_signature_checker")
 		self.create_signature_checker(f)
+		self.stats.begin_phase("create_component_kernels")
+		self.create_component_kernels(f)
+		self.stats.begin_phase("evaluate_intrinsic_function")
+		func_start = f.tell()
 
 		self.write(f, "/// Evaluates an intrinsic function called on constant arguments.\n")
 		self.write(f, "///\n")
@@ -1133,6 +1064,7 @@ class SignatureParser:
 		
 		for intrinsic in keys:
 			mod_name = self.m_intrinsic_mods[intrinsic]
+			start = f.tell()
 			self.write(f, "case IDefinition::DS_INTRINSIC_%s_%s:\n" % (mod_name.upper(), intrinsic.upper()))
 			self.indent += 1
 			
@@ -1140,6 +1072,8 @@ class SignatureParser:
 			self.write(f, "break;\n");
 			
 			self.indent -= 1
+			self.stats.add_function(
+				"evaluate_intrinsic_function:%s::%s" % (mod_name, intrinsic), f.tell() - start)
 
 		self.write(f, "default:\n")
 		self.indent += 1
@@ -1153,35 +1087,59 @@ class SignatureParser:
 		self.indent -= 1
 
 		self.write(f, "}\n")
-		f.close()
+		self.stats.add_function("evaluate_intrinsic_function", f.tell() - func_start)
+		self.stats.set_counter("intrinsics", len(keys))
+		self.stats.set_counter("emitted_bytes", f.tell())
+		written = code_emitter.write_if_changed(self.out_name, f.getvalue())
+		self.stats.end_phase()
+		return written
 
 	def add_support(self, decl):
 		"""The given declaration is supported."""
-		decl = self.as_intrinsic_function(decl)
+		decl = mdl_decl_scanner.as_intrinsic_function(decl)
 		# NYI
 		pass
 		
 	def add_simple_math(self):
 		pass
 		
-def usage(args):
-	"""print usage info and exit"""
-	print("Usage: %s stdlib_directory outputfile" % args[0])
-	return 1
+def generate(stdlib_dir, out_name, ir, stats = None):
+	"""Generate out_name from the math declarations of the stdmodule IR ir.
+	   Returns True if out_name was (re)written."""
+	parser = SignatureParser("gen_intrinsic_eval.py", stdlib_dir, out_name, True, ir, stats)
+	if stats != None:
+		stats.begin_phase("parse")
+	parser.parse("math")
+	ir.store()
+	return parser.finalize()
 
 def main(args):
 	"""Process one file and generate signatures."""
-	if len(args) != 3:
-		return usage(args)
+	opt_parser = OptionParser(usage="usage: %prog [options] stdlib_directory outputfile")
+	opt_parser.add_option("--ir-cache",
+		help="directory caching the parsed stdmodule IR, shared with other generators",
+		dest="ir_cache",
+		default=None)
+	opt_parser.add_option("--stats",
+		help="write generation statistics as JSON to file STATS ('-' for stdout)",
+		dest="stats_name",
+		default=None)
+	(options, args) = opt_parser.parse_args(args[1:])
+
+	if len(args) != 2:
+		opt_parser.print_usage()
+		return 1
 
-	stdlib_dir = args[1]
-	out_name   = args[2]
-	strict     = True
+	stdlib_dir = args[0]
+	out_name   = args[1]
 	
 	try:
-		parser = SignatureParser(args[0], stdlib_dir, out_name, strict)
-		parser.parse("math")
-		parser.finalize()
+		stats = generator_stats.GeneratorStats("gen_intrinsic_eval")
+		stats.begin_phase("load_ir")
+		ir = stdmodule_ir.IntrinsicIR(stdlib_dir, options.ir_cache)
+		generate(stdlib_dir, out_name, ir, stats)
+		if options.stats_name != None:
+			stats.write(options.stats_name)
 		
 	except IOError as e:
 		error(str(e))
@@ -1190,4 +1148,3 @@ def main(args):
 
 if __name__ == "__main__":
 	sys.exit(main(sys.argv))
-
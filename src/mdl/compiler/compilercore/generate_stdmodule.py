@@ -34,6 +34,12 @@
 import glob, os, string, re
 import time
 import sys
+import subprocess
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
 
 try: # Python 2.2 has no optparse
     from optparse import OptionParser
@@ -103,15 +109,118 @@ def check_whitespace(src):
 
 
 def check_module(checker, src):
-    """Run a checker on a given module."""
+    """
+    Run a checker on a given module.
+    Returns a tuple (module_name, output of the checker, success).
+    """
     path, name = os.path.split(src)
     module_name, ext = header_filename, ext = os.path.splitext(name)
     if module_name == "distilling_support":
         # does not work with this simple logic because it is in nvidia AND requieres base import, so ignore
-        return
-    retval = os.system(checker + " " + path + " " + module_name)
-    if retval != 0:
-        sys.exit("Checking module '" + module_name + "' failed! Aborting.")
+        return (module_name, "", True)
+    proc = subprocess.Popen(checker + " " + path + " " + module_name, shell=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = proc.communicate()[0]
+    if not isinstance(output, str):
+        output = output.decode("utf-8", "replace")
+    return (module_name, output, proc.returncode == 0)
+
+
+def check_modules(checker, files, jobs):
+    """
+    Run a checker on all given modules, up to jobs checker processes at once.
+    The checker output is reported in module order, all failing modules are
+    reported before aborting.
+    """
+    if jobs > 1 and len(files) > 1:
+        # the checkers are separate processes, so threads are enough to drive them
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(min(jobs, len(files)))
+        try:
+            results = pool.map(lambda src: check_module(checker, src), files)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [check_module(checker, src) for src in files]
+
+    failed = []
+    for module_name, output, ok in results:
+        sys.stdout.write(output)
+        if not ok:
+            failed.append(module_name)
+    sys.stdout.flush()
+    if failed:
+        sys.exit("Checking module(s) '" + "', '".join(failed) + "' failed! Aborting.")
+
+
+def default_jobs():
+    """Return the default number of parallel checker runs."""
+    try:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+    except:
+        return 1
+
+
+def encode_text(text, key):
+    """
+    Return the bytes of text, optionally encoded with the simple XOR chiffre
+    data[i] ^ key[i % len(key)] ^ (i & 0xFF).
+    """
+    if not isinstance(text, bytes):
+        text = text.encode("utf-8")
+    data = bytearray(text)
+    if not key:
+        return data
+
+    # the chiffre is periodic with lcm(len(key), 256), so every strided slice
+    # data[j::period] is XORed with the same constant
+    kl = len(key)
+    a, b = kl, 256
+    while b:
+        a, b = b, a % b
+    period = min(kl * 256 // a, len(data))
+    for j in range(period):
+        c = ord(key[j % kl]) ^ (j & 0xFF)
+        if c != 0:
+            data[j::period] = data[j::period].translate(xor_tables[c])
+    return data
+
+
+# translation tables XORing every byte with a constant
+xor_tables = [bytes(bytearray([i ^ c for i in range(256)])) for c in range(256)]
+
+# bytes per line of the generated arrays
+ROW_LEN = 8
+
+
+def format_array(data):
+    """Return the initializer of an unsigned char array holding data."""
+    n = len(data)
+    row_fmt = "\n  " + " ".join(["0x%02x,"] * ROW_LEN)
+    n_rows = n // ROW_LEN
+    res = (row_fmt * n_rows) % tuple(data[:n_rows * ROW_LEN])
+    rest = n - n_rows * ROW_LEN
+    if rest > 0:
+        res += ("\n  " + " ".join(["0x%02x,"] * rest)) % tuple(data[n_rows * ROW_LEN:])
+    return res
+
+
+def write_file_if_changed(filename, content):
+    """Write a file unless it already has the given content."""
+    try:
+        f = open(filename)
+        old = f.read()
+        f.close()
+        if old == content:
+            return
+    except IOError:
+        pass
+    target = open(filename, "w")
+    target.write(content)
+    target.close()
+
 
 def write_cpp_header(module, blocks, target):
     # write header
@@ -131,7 +240,8 @@ def generate_cpp_file(files,
                       do_escape,
                       silent,
                       key,
-                      checker):
+                      checker,
+                      jobs = 1):
     """
     Generate C++ files (.cpp/.h) from parsed blocks.
     """
@@ -139,16 +249,21 @@ def generate_cpp_file(files,
     blocks = []
     for src in files:
         check_whitespace(src)
-        if checker:
-            check_module(checker, src)
         block = scan_src_file(prefix, src)
         blocks.append(block);
+    if checker:
+        check_modules(checker, files, jobs)
+
+    # encode all blocks
+    datas = []
+    for block in blocks:
+        datas.append(encode_text("\n".join(block.text) + "\n", key))
 
     header_filename, ext = os.path.splitext(dst)
     header_filename += '.h'
 
     # generate .cpp file
-    target = open(dst, "w+")
+    target = StringIO()
 
     write_cpp_header(module, blocks, target)
 
@@ -158,45 +273,21 @@ def generate_cpp_file(files,
     target.write('namespace ' + namespace + ' {\n\n')
 
     # write all blocks
-    for block in blocks:
+    for block, data in zip(blocks, datas):
         for str in block.comment:
             target.write("// " + str + '\n')
 
-        text = "\n".join(block.text) + "\n"
-        l = len(text)
-        kl = len(key)
-        target.write("unsigned char const " + block.name + "[%u] = {" % (l))
-        first = False
-        if key:
-            for i in range(l):
-                first = False
-                if i % 8 == 0:
-                    target.write('\n  ')
-                    first = True
-                code = ord(text[i]) ^ ord(key[i % kl]) ^ (i & 0xFF)
-                start = code
-                if not first:
-                    target.write(' ')
-                target.write("0x%02x," % code)
-            target.write('\n};\n\n');
-        else:
-            for i in range(l):
-                first = False
-                if i % 8 == 0:
-                    target.write('\n  ')
-                    first = True
-                if not first:
-                    target.write(' ')
-                target.write("0x%02x," % ord(text[i]))
-            target.write('\n};\n\n');
+        target.write("unsigned char const " + block.name + "[%u] = {" % (len(data)))
+        target.write(format_array(data))
+        target.write('\n};\n\n');
 
     # write footer
     target.write('}  // mi\n}  // ' + namespace + '\n')
-    target.close()
+    write_file_if_changed(dst, target.getvalue())
 
 
     # generate header file
-    target = open(header_filename, "w+")
+    target = StringIO()
     write_cpp_header(module, blocks, target)
 
     guard = header_filename[:].replace("\\", "/")
@@ -207,14 +298,12 @@ def generate_cpp_file(files,
     target.write('namespace ' + namespace + ' {\n\n')
 
     # write all blocks
-    for block in blocks:
-        text = "\n".join(block.text) + "\n"
-        l = len(text)
-        target.write("extern unsigned char const " + block.name + "[%u];\n" % (l))
+    for block, data in zip(blocks, datas):
+        target.write("extern unsigned char const " + block.name + "[%u];\n" % (len(data)))
 
     target.write('\n}  // mi\n}  // ' + namespace + '\n')
     target.write('#endif // ' + guard + '\n')
-    target.close()
+    write_file_if_changed(header_filename, target.getvalue())
 
 
 def main():
@@ -230,6 +319,7 @@ def main():
                 self.dst_path  = default_dst
                 self.silent    = False
                 self.namespace = "mdl"
+                self.jobs      = default_jobs()
         options = Options()
         args = []
         #print sys.argv
@@ -308,6 +398,11 @@ def main():
                           help="enforce module check",
                           dest="checker",
                           default=None)
+        parser.add_option("-j", "--jobs",
+                          help="number of module checks to run in parallel",
+                          type="int",
+                          dest="jobs",
+                          default=default_jobs())
         (options, args) = parser.parse_args()
 
     if len(args) == 0:
@@ -326,7 +421,8 @@ def main():
                       options.do_escape,
                       options.silent,
                       options.key,
-                      options.checker)
+                      options.checker,
+                      options.jobs)
 
 
 if __name__ == "__main__":
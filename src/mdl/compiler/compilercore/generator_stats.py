@@ -0,0 +1,103 @@
+#!/bin/env python
+#
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#  * Neither the name of NVIDIA CORPORATION nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Generation-time statistics of the intrinsic generators.
+#
+# Collects the wall time of the generation phases, the number of intrinsics and
+# signatures per module, the size of every emitted function and arbitrary counters,
+# and writes them as JSON, so the growth of the generated code can be tracked.
+# Used by:
+#  - gen_intrinsic_eval.py
+#  - gen_intrinsic_func.py
+#
+import sys
+import time
+import json
+
+class GeneratorStats:
+	"""Statistics of one generator run."""
+
+	def __init__(self, generator):
+		"""constructor"""
+		self.m_generator  = generator
+		self.m_start      = time.time()
+		self.m_phases     = []
+		self.m_phase      = None
+		self.m_modules    = {}
+		self.m_functions  = {}
+		self.m_counters   = {}
+
+	def begin_phase(self, name):
+		"""Start a new phase, ending the current one."""
+		self.end_phase()
+		self.m_phase = (name, time.time())
+
+	def end_phase(self):
+		"""End the current phase."""
+		if self.m_phase != None:
+			name, start = self.m_phase
+			self.m_phases.append((name, time.time() - start))
+			self.m_phase = None
+
+	def add_module(self, mod_name, n_intrinsics, n_signatures):
+		"""Register the number of intrinsics and signatures of a module."""
+		self.m_modules[mod_name] = {
+			"intrinsics" : n_intrinsics,
+			"signatures" : n_signatures
+		}
+
+	def add_function(self, name, n_bytes):
+		"""Register the number of bytes emitted for a generated function."""
+		self.m_functions[name] = self.m_functions.get(name, 0) + n_bytes
+
+	def set_counter(self, name, value):
+		"""Set a counter."""
+		self.m_counters[name] = value
+
+	def as_dict(self):
+		"""Return the statistics as a JSON compatible dictionary."""
+		self.end_phase()
+		return {
+			"generator"     : self.m_generator,
+			"total_seconds" : round(time.time() - self.m_start, 6),
+			"phases"        : [
+				{ "name" : name, "seconds" : round(t, 6) } for name, t in self.m_phases],
+			"modules"       : self.m_modules,
+			"functions"     : self.m_functions,
+			"counters"      : self.m_counters
+		}
+
+	def write(self, fname):
+		"""Write the statistics as JSON to the file fname, '-' means stdout."""
+		data = json.dumps(self.as_dict(), indent=1, sort_keys=True) + "\n"
+		if fname == "-":
+			sys.stdout.write(data)
+		else:
+			f = open(fname, "w")
+			f.write(data)
+			f.close()
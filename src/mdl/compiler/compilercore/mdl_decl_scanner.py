@@ -0,0 +1,191 @@
+#!/bin/env python
+#
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#  * Neither the name of NVIDIA CORPORATION nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Scanner for the exported function declarations of MDL modules, shared by all
+# SignatureParser based code generators.
+#
+# All functions work in linear time: declarations are tokenized in one pass and
+# consumed by index, and multi-line declarations are collected as a list of parts
+# that is joined once.
+#
+import sys
+import re
+
+# a token is either one of ",()" or a run of other non-space characters
+r_token = re.compile(r"[,()]|[^\s,()]+")
+
+# the intrinsic() annotation marking a compiler known function
+r_intrinsic = re.compile(r"\[\[\s+intrinsic\(\)[^]]*\]\];")
+
+# any annotation block
+r_annotation = re.compile(r"\[\[[^]]*\]\]")
+
+# change of the nesting depth caused by a token
+nesting = {
+	"("  :  1,
+	")"  : -1,
+	"["  :  1,
+	"]"  : -1,
+	"{"  :  1,
+	"}"  : -1,
+	"[[" :  1,
+	"]]" : -1,
+}
+
+def error(msg):
+	"""Write a message to stderr"""
+	sys.stderr.write("mdl_decl_scanner: Error: " + msg + "\n")
+
+def tokenize(decl):
+	"""Split a declaration into tokens."""
+	return r_token.findall(decl)
+
+def skip_until(token_set, tokens, pos):
+	"""Return the index of the first token at or after pos that is inside token_set and not
+	   nested inside parenthesis, or len(tokens) if there is none."""
+	depth = 0
+	n = len(tokens)
+	while pos < n:
+		tok = tokens[pos]
+		if depth == 0 and tok in token_set:
+			return pos
+		depth += nesting.get(tok, 0)
+		pos += 1
+	return n
+
+def get_type(tokens, pos):
+	"""Decode the type starting at tokens[pos], return the index after it and the type."""
+	if tokens[pos] == "uniform" or tokens[pos] == "varying":
+		# skip uniform and varying modifier
+		pos += 1
+	return pos + 1, tokens[pos]
+
+def token_at(tokens, pos):
+	"""Return the token at pos or None at the end of the token list."""
+	if pos < len(tokens):
+		return tokens[pos]
+	return None
+
+def parse_declaration(decl):
+	"""Parse a function declaration (without annotations).
+
+	Returns the tuple (ret_type, name, params), where params is a list of
+	(type, name, default) tuples and default is the default argument expression with
+	all whitespace removed, or "" if there is none."""
+	tokens = tokenize(decl)
+
+	pos, ret_type = get_type(tokens, 0)
+
+	name = tokens[pos]
+
+	if token_at(tokens, pos + 1) != '(':
+		error("unknown token '" + str(token_at(tokens, pos + 1)) + "' while processing '"
+			+ decl + "': '(' expected")
+		sys.exit(1)
+
+	pos += 2
+
+	params = []
+
+	if token_at(tokens, pos) != ')':
+		while True:
+			pos, t = get_type(tokens, pos)
+			param_name = tokens[pos]
+			pos += 1
+
+			default = ""
+			if token_at(tokens, pos) == '=':
+				# default argument
+				end = skip_until({',':None, ')':None}, tokens, pos + 1)
+				default = "".join(tokens[pos + 1:end])
+				pos = end
+
+			params.append((t, param_name, default))
+
+			tok = token_at(tokens, pos)
+			if tok == ')':
+				break
+			if tok != ',':
+				error("unknown token '" + str(tok) + "' while processing '"
+					+ decl + "': ',' expected")
+				sys.exit(1)
+			# skip the comma
+			pos += 1
+
+	return ret_type, name, params
+
+def as_intrinsic_function(decl):
+	"""Check if the given declaration is an intrinsic function declaration.
+
+	Returns the declaration without annotations or None."""
+	if decl[:5] == "const":
+		return None
+	if decl[:4] == "enum":
+		return None
+	if decl[:5] == "struct":
+		return None
+	if decl[:8] == "material":
+		return None
+	m = r_intrinsic.search(decl)
+	if m:
+		decl = decl[:m.start()]
+		# kill all other annotations
+		return r_annotation.sub("", decl).strip()
+	return None
+
+def scan_declarations(lines):
+	"""Iterate over all exported declarations found in the given lines.
+
+	Line comments are removed and declarations spanning several lines are
+	concatenated."""
+	parts = None
+	for line in lines:
+		l = line.strip()
+
+		# strip line comments
+		idx = l.find('//')
+		if idx != -1:
+			l = l[:idx]
+
+		if parts == None:
+			if l[:6] != "export":
+				continue
+			parts = [l[7:].strip()]
+		else:
+			parts.append(l)
+
+		if l.endswith(";"):
+			yield "".join(parts)
+			parts = None
+
+def scan_intrinsics(lines):
+	"""Iterate over all intrinsic function declarations found in the given lines."""
+	for decl in scan_declarations(lines):
+		decl = as_intrinsic_function(decl)
+		if decl:
+			yield decl
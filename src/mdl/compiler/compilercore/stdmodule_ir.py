@@ -0,0 +1,173 @@
+#!/bin/env python
+#
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#  * Neither the name of NVIDIA CORPORATION nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Intermediate representation of the intrinsic functions of the MDL standard modules.
+#
+# The IR holds, per module, all intrinsic function declarations with their return
+# type, name, parameter types, names and default arguments. It is serialized into a
+# cache directory inside the build directory, so the standard modules are parsed only
+# once per build and shared by all code generators. Every module is stored in its own
+# file, so generators running concurrently never drop the modules of each other:
+#  - gen_intrinsic_eval.py
+#  - gen_intrinsic_func.py
+#  - gen_libbsdf_runtime_header.py
+#  - gen_user_modules_runtime_header.py
+#  - gen_runtime_headers.py
+#
+import sys
+import os
+import hashlib
+import json
+import tempfile
+from collections import namedtuple
+
+import mdl_decl_scanner
+
+# An intrinsic function declaration. params is a list of (type, name, default) tuples.
+Declaration = namedtuple("Declaration", ["decl", "ret_type", "name", "params"])
+
+# bump this if the serialized format changes
+IR_VERSION = 2
+
+def write_file_atomic(path, text):
+	"""Replace the file path by text, concurrent readers see either the old or the new file."""
+	fd, tmp_name = tempfile.mkstemp(dir = os.path.dirname(path), prefix = ".tmp-")
+	try:
+		f = os.fdopen(fd, "w")
+		try:
+			f.write(text)
+		finally:
+			f.close()
+		os.chmod(tmp_name, 0o644)
+		if hasattr(os, "replace"):
+			os.replace(tmp_name, path)
+		else:
+			# python 2: os.rename() cannot replace an existing file on Windows
+			if sys.platform == "win32" and os.path.exists(path):
+				os.remove(path)
+			os.rename(tmp_name, path)
+	except:
+		if os.path.exists(tmp_name):
+			os.remove(tmp_name)
+		raise
+
+def buffer_digest(data):
+	"""Return the SHA-1 digest of a byte buffer."""
+	return hashlib.sha1(data).hexdigest()
+
+def tool_digest():
+	"""Return a digest identifying the code that creates the IR."""
+	h = hashlib.sha1(str(IR_VERSION).encode("utf-8"))
+	for fname in [__file__, mdl_decl_scanner.__file__]:
+		if fname.endswith(".pyc"):
+			fname = fname[:-1]
+		f = open(fname, "rb")
+		h.update(f.read())
+		f.close()
+	return h.hexdigest()
+
+def scan_lines(lines):
+	"""Return the list of intrinsic function declarations found in the given lines."""
+	res = []
+	for decl in mdl_decl_scanner.scan_intrinsics(lines):
+		ret_type, name, params = mdl_decl_scanner.parse_declaration(decl)
+		res.append(Declaration(decl, ret_type, name, params))
+	return res
+
+class IntrinsicIR:
+	"""The intrinsic function declarations of the standard modules, optionally cached."""
+
+	def __init__(self, stdlib_dir, cache_dir = None):
+		"""constructor"""
+		self.stdlib_dir = stdlib_dir
+		self.cache_dir  = cache_dir
+		self.m_modules  = {}
+		self.m_dirty    = set()
+		self.m_tool     = tool_digest()
+
+	def cache_file(self, mod_name):
+		"""Return the name of the cache file of the given module."""
+		return os.path.join(self.cache_dir, mod_name + ".json")
+
+	def load(self, mod_name):
+		"""Load the cached (digest, declarations) of a module, None if not cached or outdated."""
+		try:
+			f = open(self.cache_file(mod_name), "r")
+			data = json.load(f)
+			f.close()
+		except (IOError, ValueError):
+			return None
+		if not isinstance(data, dict) or data.get("tool") != self.m_tool:
+			return None
+		decls = []
+		for decl, ret_type, name, params in data["declarations"]:
+			decls.append(Declaration(decl, ret_type, name, [tuple(p) for p in params]))
+		return (data["digest"], decls)
+
+	def store(self):
+		"""Write the cache files of all (re)parsed modules."""
+		if not self.cache_dir or not self.m_dirty:
+			return
+		if not os.path.isdir(self.cache_dir):
+			try:
+				os.makedirs(self.cache_dir)
+			except OSError:
+				# created by a concurrently running generator
+				pass
+		for mod_name in sorted(self.m_dirty):
+			digest, decls = self.m_modules[mod_name]
+			data = {
+				"tool"         : self.m_tool,
+				"digest"       : digest,
+				"declarations" : [[d.decl, d.ret_type, d.name, d.params] for d in decls]
+			}
+
+			# several generators may run concurrently, so replace the file atomically
+			write_file_atomic(
+				self.cache_file(mod_name), json.dumps(data, indent = 1, sort_keys = True))
+		self.m_dirty = set()
+
+	def get_declarations(self, mdl_name):
+		"""Return the intrinsic function declarations of the given standard module."""
+		fname = os.path.join(self.stdlib_dir, mdl_name + ".mdl")
+		f = open(fname, "rb")
+		data = f.read()
+		f.close()
+		digest = buffer_digest(data)
+
+		entry = self.m_modules.get(mdl_name)
+		if entry == None and self.cache_dir:
+			entry = self.load(mdl_name)
+		if entry and entry[0] == digest:
+			self.m_modules[mdl_name] = entry
+			return entry[1]
+
+		decls = scan_lines(data.decode("utf-8").splitlines())
+		self.m_modules[mdl_name] = (digest, decls)
+		self.m_dirty.add(mdl_name)
+		return decls
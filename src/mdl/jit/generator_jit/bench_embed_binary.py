@@ -0,0 +1,141 @@
+#!/bin/env python
+#
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#  * Neither the name of NVIDIA CORPORATION nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Benchmark for embedding binary files into generated sources.
+#
+# Measures the time needed to write the sources with the former per-byte writer and
+# with embed_binary.py, and the time the C++ compiler needs to compile the result in
+# every embedding mode. Modes the compiler does not support are reported as such.
+# Defaults to the multi-scatter tables of libbsdf.
+#
+import sys
+import os
+import glob
+import shutil
+import subprocess
+import tempfile
+import time
+from optparse import OptionParser
+
+import embed_binary
+
+
+def xxd_per_byte(filename, fout):
+    """The former writer: one write call per byte."""
+    f = open(filename, "rb")
+    bytes = f.read()
+    f.close()
+
+    i = 0
+    fout.write("\t")
+    for byte in bytes:
+        if isinstance(byte, str):
+            byte = ord(byte)
+        fout.write("0x%02x, " % byte)
+        if i == 7:
+            fout.write("\n\t")
+            i = 0
+        else:
+            i += 1
+
+
+def write_source(out_name, files, mode, writer = None):
+    """Write a source file embedding all files, return the time needed."""
+    t = time.time()
+    with open(out_name, "w") as f:
+        for idx, fname in enumerate(files):
+            name = "data_%d" % idx
+            if writer:
+                f.write("unsigned char const %s[] = {\n" % name)
+                writer(fname, f)
+                f.write("};\n")
+            else:
+                embed_binary.write_array(f, "unsigned char const", name, fname, mode)
+        f.write("unsigned long long checksum() {\n    unsigned long long s = 0;\n")
+        for idx in range(len(files)):
+            f.write("    s += sizeof(data_%d) + data_%d[sizeof(data_%d) / 2];\n" % (idx, idx, idx))
+        f.write("    return s;\n}\n")
+    return time.time() - t
+
+
+def compile_source(cxx, src_name, std):
+    """Compile a source file, return the time needed or None if compilation failed."""
+    obj_name = src_name + ".o"
+    t = time.time()
+    res = subprocess.call(
+        [cxx, "-std=" + std, "-O2", "-c", src_name, "-o", obj_name],
+        stdout = open(os.devnull, "w"), stderr = open(os.devnull, "w"))
+    t = time.time() - t
+    return t if res == 0 else None
+
+
+def main(args):
+    this_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = OptionParser(usage="usage: %prog [options] [binary files]")
+    parser.add_option("-c", "--compiler",
+        help="C++ compiler used to measure the compile time (default $CXX or c++)",
+        dest="cxx", default=os.environ.get("CXX", "c++"))
+    parser.add_option("-s", "--std",
+        help="C++ standard used for the embed mode (default c++2c)",
+        dest="std", default="c++2c")
+    parser.add_option("-n", "--no-compile",
+        help="only measure the time needed to write the sources",
+        action="store_true", dest="no_compile", default=False)
+    (options, args) = parser.parse_args(args[1:])
+
+    files = args
+    if not files:
+        files = sorted(glob.glob(
+            os.path.join(this_dir, "..", "libbsdf", "multiscatter_tables", "*.bin")))
+    size = sum([os.path.getsize(f) for f in files])
+    print("%d files, %d bytes" % (len(files), size))
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        print("%-10s %10s %10s %10s" % ("writer", "write [s]", "size [KB]", "compile [s]"))
+        runs = [("per-byte", "hex", xxd_per_byte)]
+        runs += [(mode, mode, None) for mode in embed_binary.EMBED_MODES]
+        for name, mode, writer in runs:
+            src_name = os.path.join(tmp_dir, name + ".cpp")
+            t_write = write_source(src_name, files, mode, writer)
+            t_compile = None
+            if not options.no_compile:
+                t_compile = compile_source(
+                    options.cxx, src_name, options.std if mode == "embed" else "c++11")
+            print("%-10s %10.3f %10d %10s" % (
+                name,
+                t_write,
+                os.path.getsize(src_name) // 1024,
+                "-" if options.no_compile else
+                    ("%.3f" % t_compile if t_compile != None else "unsupported")))
+    finally:
+        shutil.rmtree(tmp_dir)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,133 @@
+#!/bin/env python
+#
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#  * Neither the name of NVIDIA CORPORATION nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Micro-benchmark for the overload dispatch of get_intrinsic_function().
+#
+# Replays the overload selection for every signature of every overloaded intrinsic,
+# once with the former chain of check_sig_*() calls and once with the generated
+# dispatch tables. Parameter types are modelled by their type codes, so the benchmark
+# reports the number of parameter type inspections of both strategies as well as the
+# time needed to replay them.
+#
+import sys
+import os
+import time
+from optparse import OptionParser
+
+from gen_intrinsic_func import SignatureParser, intrinsic_modules, builtins_source
+
+def chain_dispatch(probes):
+	"""Select overloads by trying the signature checkers in order."""
+	n_checks = 0
+	for sigs, params in probes:
+		for sig in sigs:
+			match = True
+			for expected, actual in zip(sig, params):
+				n_checks += 1
+				if expected != actual:
+					match = False
+					break
+			if match:
+				break
+	return n_checks
+
+def table_dispatch(probes):
+	"""Select overloads by computing the dispatch key and probing the dispatch table."""
+	n_checks = 0
+	for table, params in probes:
+		classes, bits, entries = table
+		key = 0
+		for param in params:
+			n_checks += 1
+			key = (key << bits) | classes[param]
+		entry = entries[key % len(entries)]
+		if entry == None or entry[0] != key:
+			raise Exception("dispatch failed")
+	return n_checks
+
+def run(name, func, probes, iterations):
+	"""Time one dispatch strategy."""
+	t = time.time()
+	for i in range(iterations):
+		n_checks = func(probes)
+	t = time.time() - t
+	print("%-8s %8d type inspections per round, %8.3f us per dispatch" %
+		(name, n_checks, t * 1e6 / (iterations * len(probes))))
+
+def main(args):
+	parser = OptionParser(usage="usage: %prog [options] stdlib_directory")
+	parser.add_option("-i", "--iterations",
+		help="number of rounds over all overloads",
+		type="int", dest="iterations", default=1000)
+	(options, args) = parser.parse_args(args[1:])
+
+	if len(args) != 1:
+		parser.print_usage()
+		return 1
+
+	sigparser = SignatureParser(sys.argv[0], args[0], os.devnull, True)
+	for module in intrinsic_modules:
+		sigparser.parse(module)
+	sigparser.parse_builtins(builtins_source)
+
+	intrinsics = []
+	for intrinsic in sigparser.m_intrinsics.keys():
+		if not sigparser.unsupported_intrinsics.get(intrinsic):
+			intrinsics.append(intrinsic)
+	intrinsics.sort()
+	sigparser.create_dispatch_tables(intrinsics)
+
+	chain_probes = []
+	table_probes = []
+	n_groups = 0
+	for intrinsic, n_params, sigs in sigparser.get_overload_groups(intrinsics):
+		table_idx = sigparser.m_dispatch_groups.get((intrinsic, n_params))
+		if table_idx == None:
+			continue
+		n_groups += 1
+		_, entries = sigparser.m_dispatch_tables[table_idx]
+		params = [sigparser.split_signature(sig)[1] for sig in sigs]
+
+		# the actual parameter types are modelled by their dispatch classes
+		type_classes = {}
+		for sig in params:
+			for param in sig:
+				type_classes[param] = sigparser.get_dispatch_class(param)
+		table = (sigparser.m_dispatch_classes, sigparser.m_dispatch_bits, entries)
+		checked_sigs = [[type_classes[p] for p in sig] for sig in params]
+		for sig in checked_sigs:
+			chain_probes.append((checked_sigs, sig))
+			table_probes.append((table, sig))
+
+	print("%d overload sets, %d overloads" % (n_groups, len(chain_probes)))
+	run("chain", chain_dispatch, chain_probes, options.iterations)
+	run("table", table_dispatch, table_probes, options.iterations)
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv))
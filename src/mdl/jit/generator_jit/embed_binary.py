@@ -0,0 +1,199 @@
+#!/bin/env python
+#
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#  * Neither the name of NVIDIA CORPORATION nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Embeds binary files (bitcode, tables) into generated C++ sources.
+#
+# Supported modes:
+#  - hex:    an initializer list of hex literals, works with every compiler
+#  - embed:  the C23/C++26 #embed directive, the compiler reads the file itself
+#  - incbin: an .incbin directive of the assembler inside a top-level asm block,
+#            works with GCC and Clang on ELF and Mach-O targets
+#
+# The embed and incbin modes reference the binary file by its absolute path, so the
+# compiler never has to parse megabytes of hex literals.
+#
+import os
+
+EMBED_MODES = ["hex", "embed", "incbin"]
+
+# bytes per line in hex mode
+ROW_LEN = 8
+
+# number of lines formatted at once in hex mode
+CHUNK_ROWS = 4096
+
+
+def read_file(filename):
+    """Return the content of a binary file."""
+    with open(filename, "rb") as f:
+        return f.read()
+
+
+def write_hex(fout, data, indent = "\t"):
+    """Write data as rows of comma separated hex literals."""
+    data = bytearray(data)
+    n = len(data)
+    if n == 0:
+        fout.write(indent)
+        return
+
+    # whole chunks of rows are formatted by a single format operation
+    sep = "\n" + indent
+    row_fmt = "0x%02x, " * ROW_LEN + sep
+    chunk_len = ROW_LEN * CHUNK_ROWS
+    chunk_fmt = row_fmt * CHUNK_ROWS
+
+    fout.write(indent)
+    ofs = 0
+    while ofs + chunk_len <= n:
+        fout.write(chunk_fmt % tuple(data[ofs:ofs + chunk_len]))
+        ofs += chunk_len
+
+    n_rows = (n - ofs) // ROW_LEN
+    if n_rows > 0:
+        fout.write((row_fmt * n_rows) % tuple(data[ofs:ofs + n_rows * ROW_LEN]))
+        ofs += n_rows * ROW_LEN
+
+    rest = n - ofs
+    if rest > 0:
+        fout.write(("0x%02x, " * rest) % tuple(data[ofs:]))
+
+
+def xxd(filename, fout, indent = "\t"):
+    """Write the content of a binary file as rows of hex literals."""
+    write_hex(fout, read_file(filename), indent)
+
+
+def c_string(s):
+    """Quote a string for C."""
+    return '"' + s.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def file_path(filename):
+    """Return the absolute path of a file usable in C string literals on all platforms."""
+    return os.path.abspath(filename).replace("\\", "/")
+
+
+def mangle(namespaces, name):
+    """Return the Itanium C++ ABI symbol name of a variable inside the given namespaces."""
+    if not namespaces:
+        return name
+    res = "_ZN"
+    for part in namespaces + [name]:
+        res += "%d%s" % (len(part), part)
+    return res + "E"
+
+
+incbin_prologue = """
+#ifndef MDL_EMBED_INCBIN_DEFINED
+#define MDL_EMBED_INCBIN_DEFINED
+#if !defined(__GNUC__)
+#error "the incbin embedding mode requires GCC or Clang"
+#endif
+#if defined(__APPLE__)
+#define MDL_EMBED_SECTION      ".const_data"
+#define MDL_EMBED_SYMBOL(name) "_" name
+#define MDL_EMBED_TYPE(name)   ""
+#else
+#define MDL_EMBED_SECTION      ".section .rodata"
+#define MDL_EMBED_SYMBOL(name) name
+#define MDL_EMBED_TYPE(name)   ".type " name ", %object\\n"
+#endif
+#endif
+"""
+
+# the output files the incbin prologue was already written to
+incbin_prologue_written = set()
+
+
+def write_array(
+    fout,
+    decl,
+    name,
+    filename,
+    mode = "hex",
+    offset = 0,
+    size = None,
+    namespaces = [],
+    indent = "\t"):
+    """
+    Write the definition of an unsigned char array holding (a part of) a binary file.
+
+    decl is the declaration prefix of the array in hex and embed mode, for instance
+    "static unsigned char const". In incbin mode the array is defined by the assembler,
+    so it always has external linkage; namespaces lists the namespaces the array lives
+    in, the caller must emit the declaration inside them.
+    """
+    if size == None:
+        size = os.path.getsize(filename) - offset
+
+    if mode == "hex":
+        fout.write("%s %s[] = {\n" % (decl, name))
+        with open(filename, "rb") as f:
+            f.seek(offset)
+            write_hex(fout, f.read(size), indent)
+        fout.write("};\n")
+
+    elif mode == "embed":
+        if offset != 0 or size != os.path.getsize(filename):
+            # #embed has no standard way to select a part of a file, so embed a copy
+            fname = os.path.join(os.path.dirname(fout.name), name + ".bin")
+            with open(filename, "rb") as f:
+                f.seek(offset)
+                write_file_if_changed(fname, f.read(size))
+            filename = fname
+        fout.write("%s %s[] = {\n#embed %s\n};\n" % (decl, name, c_string(file_path(filename))))
+
+    elif mode == "incbin":
+        sym = c_string(mangle(namespaces, name))
+        if fout.name not in incbin_prologue_written:
+            incbin_prologue_written.add(fout.name)
+            fout.write(incbin_prologue)
+        fout.write("__asm__(\n")
+        fout.write("    MDL_EMBED_SECTION \"\\n\"\n")
+        fout.write("    \".globl \" MDL_EMBED_SYMBOL(%s) \"\\n\"\n" % sym)
+        fout.write("    MDL_EMBED_TYPE(MDL_EMBED_SYMBOL(%s))\n" % sym)
+        fout.write("    \".balign 16\\n\"\n")
+        fout.write("    MDL_EMBED_SYMBOL(%s) \":\\n\"\n" % sym)
+        fout.write("    \".incbin \\\"%s\\\", %d, %d\\n\"\n" % (file_path(filename), offset, size))
+        fout.write("    \".text\\n\");\n")
+        fout.write("extern unsigned char const %s[%d];\n" % (name, size))
+
+    else:
+        raise ValueError("unknown embedding mode '%s'" % mode)
+
+
+def write_file_if_changed(filename, data):
+    """Write a binary file unless it already has the given content."""
+    try:
+        if read_file(filename) == data:
+            return
+    except IOError:
+        pass
+    with open(filename, "wb") as f:
+        f.write(data)
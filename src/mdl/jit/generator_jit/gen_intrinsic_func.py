@@ -34,6 +34,21 @@
 import sys
 import os
 import re
+import hashlib
+import json
+from optparse import OptionParser
+try:
+	from StringIO import StringIO
+except ImportError:
+	from io import StringIO
+
+# the stdmodule IR is shared with the compilercore generators
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+	"..", "..", "compiler", "compilercore"))
+import mdl_decl_scanner
+import stdmodule_ir
+import generator_stats
+import code_emitter
 
 def error(msg):
 	"""Write a message to stderr"""
@@ -49,15 +64,76 @@ def make_temp_file():
 	os.close(fd)
 	return name
 
+def file_digest(fname):
+	"""Return the SHA-1 digest of the content of a file or None if it cannot be read."""
+	try:
+		f = open(fname, "rb")
+	except IOError:
+		return None
+	digest = hashlib.sha1(f.read()).hexdigest()
+	f.close()
+	return digest
+
+class GeneratorCache:
+	"""Persistent cache of the content hashes of all generator inputs."""
+
+	def __init__(self, cache_name):
+		"""constructor"""
+		self.cache_name = cache_name
+		self.m_inputs = {}
+
+	def add_file(self, key, fname):
+		"""Register the content of the file fname as input key."""
+		digest = file_digest(fname)
+		if digest == None:
+			raise IOError("cannot read input file '%s'" % fname)
+		self.m_inputs[key] = digest
+
+	def add_value(self, key, value):
+		"""Register a string value (a buffer or generator options) as input key."""
+		self.m_inputs[key] = hashlib.sha1(value.encode("utf-8")).hexdigest()
+
+	def load(self):
+		"""Load the cache file, return None if it does not exist or is invalid."""
+		try:
+			f = open(self.cache_name, "r")
+			data = json.load(f)
+			f.close()
+		except (IOError, ValueError):
+			return None
+		if not isinstance(data, dict):
+			return None
+		return data
+
+	def is_up_to_date(self, out_name):
+		"""Check if out_name was generated from exactly the registered inputs."""
+		data = self.load()
+		if data == None or data.get("inputs") != self.m_inputs:
+			return False
+		digest = file_digest(out_name)
+		return digest != None and digest == data.get("output")
+
+	def store(self, out_name):
+		"""Remember the registered inputs and the digest of the generated output."""
+		data = { "inputs" : self.m_inputs, "output" : file_digest(out_name) }
+		code_emitter.write_if_changed(self.cache_name, json.dumps(data, indent=1, sort_keys=True) + "\n")
+
 class SignatureParser:
 	"""main signature parser"""
 
-	def __init__(self, script_name, indir, out_name, strict):
+	def __init__(self, script_name, indir, out_name, strict, ir = None, stats = None, prebuilt = False, intrinsic_stats = False):
 		"""constructor"""
 		self.debug = False
+		self.prebuilt = prebuilt
+		self.intrinsic_stats = intrinsic_stats
 		self.indir  = indir
+		if ir == None:
+			ir = stdmodule_ir.IntrinsicIR(indir)
+		self.ir = ir
+		if stats == None:
+			stats = generator_stats.GeneratorStats("gen_intrinsic_func")
+		self.stats = stats
 		self.out_name = out_name
-		self.r_intrinsic = re.compile(r"\[\[\s+intrinsic\(\)[^]]*\]\];")
 		self.curr_module = ""
 		self.m_intrinsics = {}
 		self.m_intrinsic_mods = {}
@@ -67,10 +143,23 @@ class SignatureParser:
 		self.m_func_index = {}
 		self.m_next_func_index = 0
 
+		# overload dispatch tables, see create_dispatch_tables()
+		self.m_dispatch_classes = {}
+		self.m_dispatch_bits    = 0
+		self.m_dispatch_tables  = []
+		self.m_dispatch_groups  = {}
+		self.m_used_checkers    = {}
+
 		self.unsupported_intrinsics = {}
 		self.intrinsic_modes = {}
 		self.cnst_mul = {}
 
+		# (intrinsic, signature) pairs whose bodies can be shared through the prebuilt
+		# intrinsic library, see find_prebuilt_intrinsics()
+		self.m_prebuilt = {}
+		# intrinsic, signature pairs whose derivatives are always zero, see find_zero_deriv_intrinsics()
+		self.m_zero_derivs = {}
+
 		# members of the generator class, a (type, name, comment) tupel
 		self.m_class_members      = {}
 		self.m_class_member_names = []
@@ -186,6 +275,8 @@ class SignatureParser:
 		self.m_c_runtime_functions = {}
 		# MDL atomic runtime functions
 		self.m_mdl_runtime_functions = {}
+		# SIMD-wide variants of C runtime functions, name -> number of lanes
+		self.m_vector_runtime_functions = {}
 
 		for type, code in self.m_types.items():
 			old_type = self.m_inv_types.setdefault(code, type)
@@ -306,95 +397,48 @@ class SignatureParser:
 		}
 		return cases.get(type_code, None)
 
-	def do_indentation(self, f):
-		"""Print current indentation."""
-		for i in range(self.indent):
-			f.write("    ")
+	def get_dispatch_class(self, type_code):
+		"""Return the class of a type code used to compute dispatch keys, or None if a
+		   parameter of this type cannot be identified exactly by its type kind."""
+		if self.get_atomic_type_kind(type_code):
+			return type_code
+		if type_code[0] == 'E':
+			# all enums are checked for TK_ENUM only
+			return "E"
+		if type_code[0] == 'U':
+			# unsupported types are not checked at all
+			return None
+		if type_code[1] == 'A':
+			if type_code[0] == 'F' and (type_code[2] == 'N' or type_code[2] == 'n'):
+				# deferred size float array
+				return "FAN"
+			return None
+		if (self.get_vector_type_kind(type_code) or self.get_matrix_type_kind(type_code) or
+				self.get_texture_shape(type_code)):
+			return type_code
+		return None
 
 	def write(self, f, s):
 		"""write string s to file f after doing indent."""
-		i = 0
-		for c in s:
-			if c != '\n':
-				break
-			f.write(c)
-			i += 1
-		s = s[i:]
-		if s == "":
-			return
-		self.do_indentation(f)
-		f.write(s)
+		code_emitter.write_indented(f, self.indent, s, newlines_first = True)
 
 	def format_code(self, f, code):
 		"""The (not so) smart code formater."""
-		skip_spaces = True
-		for c in code:
-			if skip_spaces:
-				# skip spaces
-				if c == '\n':
-					f.write(c)
-				if c.isspace():
-					continue
-				if c == '}' or c == ')':
-					self.indent -= 1
-				self.do_indentation(f)
-				skip_spaces = False
-				if c == '}' or c == ')':
-					f.write(c)
-					continue
-
-			if not skip_spaces:
-				# copy mode
-				f.write(c)
-				if c == '\n':
-					skip_spaces = True
-				elif c == '{' or c == '(':
-					self.indent += 1
-				elif c == '}' or c == ')':
-					self.indent -= 1
+		self.indent = code_emitter.format_code(f, self.indent, code)
 
 	def parse(self, mdl_name):
 		"""Parse a mdl module."""
 		self.curr_module = mdl_name
-		fname = self.indir + "/" + mdl_name + ".mdl"
-		f = open(fname, "r")
-		o = self.parse_file(f)
-		f.close()
+		for decl in self.ir.get_declarations(mdl_name):
+			if self.debug:
+				print(decl.decl)
+			self.get_signature(decl)
 
 	def parse_builtins(self, buffer):
 		"""Parse a mdl module given as buffer."""
 		self.curr_module = ""
 		o = self.parse_buffer(buffer)
 
-	def as_intrinsic_function(self, decl):
-		"""Check if the given declaration is an intrinsic function declaration."""
-		if decl[:5] == "const":
-			return None
-		if decl[:4] == "enum":
-			return None
-		if decl[:5] == "struct":
-			return None
-		if decl[:8] == "material":
-			return None
-		m = self.r_intrinsic.search(decl)
-		if m:
-			decl = decl[:m.start()]
-			# kill all other annotations
-			return re.sub(r'\[\[[^]]*\]\]', "", decl).strip()
-		return None
-
-	def get_type(self, tokens):
-		"""decode a type"""
-		start = 0
-		end   = 1
-		if tokens[0] == "uniform" or tokens[0] == "varying":
-			# skip uniform and varying modifier
-			end += 1
-			start += 1
-		ret_type = " ".join(tokens[start:end])
-
-		return tokens[end:], ret_type
-
 	def do_get_type_code(self, s):
 		"""get the type code"""
 		try:
@@ -456,6 +500,19 @@ class SignatureParser:
 			error("C runtime function '%s' already registered\n" % fname)
 		self.m_c_runtime_functions[fname] = signature
 
+	def register_vector_runtime_func(self, fname, width):
+		"""Register a SIMD-wide variant of a C runtime function."""
+		if self.m_c_runtime_functions.get(fname) == None:
+			error("C runtime function '%s' not registered\n" % fname)
+		self.m_vector_runtime_functions[fname] = width
+
+	def get_vector_runtime_width(self, runtime_enum):
+		"""Return the number of lanes of the SIMD-wide variant of a runtime function or 0."""
+		for fname, width in self.m_vector_runtime_functions.items():
+			if "RT_" + fname.upper() == runtime_enum:
+				return width
+		return 0
+
 	def register_mdl_runtime_func(self, fname, signature):
 		"""Register a mdl runtime function by name and signature."""
 		if self.m_mdl_runtime_functions.get(fname) != None:
@@ -855,82 +912,18 @@ class SignatureParser:
 			return self.is_builtin_supported(name, signature)
 		return False
 
-	def skip_until(self, token_set, tokens):
-		"""skip tokens until token_kind is found, handle parenthesis"""
-		r = 0
-		e = 0
-		g = 0
-		a = 0
-		l = len(tokens)
-		while l > 0:
-			tok = tokens[0]
-			if r == 0 and e == 0 and g == 0 and a == 0 and tok in token_set:
-				return tokens
-			if tok == '(':
-				r += 1
-			elif tok == ')':
-				r -= 1
-			elif tok == '[':
-				e += 1
-			elif tok == ']':
-				e -= 1
-			elif tok == '{':
-				g += 1
-			elif tok == '}':
-				g -= 1
-			elif tok == '[[':
-				a += 1
-			elif tok == ']]':
-				a -= 1
-			tokens = tokens[1:]
-			l -= 1
-
-		# do not return empty tokens, the parser do not like that
-		return [None]
-
 	def get_signature(self, decl):
 		"""Get the signature for a given function declaration."""
-		# poor man's scanner :-)
-		tokens = re.sub(r'[,()]', lambda m: ' ' + m.group(0) + ' ', decl).split()
-
-		tokens, ret_type = self.get_type(tokens)
-
-		name = tokens[0]
+		name = decl.name
 
 		self.m_intrinsic_mods[name] = self.curr_module
 
-		if tokens[1] != '(':
-			error("unknown token '" + tokens[1] + "' while processing '" + decl + "': '(' expected")
-			sys.exit(1)
-
-		tokens = tokens[2:]
-
-		args = []
-
-		if tokens[0] != ')':
-			while True:
-				tokens, t = self.get_type(tokens)
-				args.append(t)
-
-				# throw away the name
-				tokens = tokens[1:]
-
-				if tokens[0] == '=':
-					# default argument
-					tokens = self.skip_until({',':None, ')':None}, tokens[1:])
-				if tokens[0] == ')':
-					break
-				if tokens[0] != ',':
-					error("unknown token '" + tokens[1] + "' while processing '"
-						  + decl + "': ',' expected")
-					sys.exit(1)
-				# skip the comma
-				tokens = tokens[1:]
+		args = [t for t, _, _ in decl.params]
 
-		signature = self.create_signature(ret_type, args)
+		signature = self.create_signature(decl.ret_type, args)
 
 		if self.debug:
-			print("%s %s" % (decl, signature))
+			print("%s %s" % (decl.decl, signature))
 
 		if self.is_supported(self.curr_module, name, signature):
 			# insert the new signature for the given name
@@ -941,40 +934,14 @@ class SignatureParser:
 			_, params = self.split_signature(signature)
 			self.m_signatures["_".join(params)] = True
 		else:
-			warning("Cannot generate code for %s" % decl)
+			warning("Cannot generate code for %s" % decl.decl)
 
 	def parse_lines(self, lines):
 		"""Parse lines and retrieve intrinsic function definitions."""
-
-		start = False
-		curr_line = ""
-		for line in lines:
-			l = line.strip();
-
-			# strip line comments
-			idx = l.find('//')
-			if idx != -1:
-				l = l[:idx]
-
-			if not start:
-				if l[:6] == "export":
-					start = True
-					curr_line = l[7:].strip()
-			else:
-				curr_line += l
-			if start:
-				if l[-1] == ";":
-					start = False
-					decl = self.as_intrinsic_function(curr_line)
-					if not decl:
-						continue
-					if self.debug:
-						print(decl)
-					self.get_signature(decl)
-
-	def parse_file(self, f):
-		"""Parse a file and retrieve intrinsic function definitions."""
-		self.parse_lines(f.readlines())
+		for decl in stdmodule_ir.scan_lines(lines):
+			if self.debug:
+				print(decl.decl)
+			self.get_signature(decl)
 
 	def parse_buffer(self, buffer):
 		"""Parse a string and retrieve intrinsic function definitions."""
@@ -985,6 +952,7 @@ class SignatureParser:
 		if len(params) == 0:
 			# we don't need a check if no parameters exists
 			return False
+		self.m_used_checkers["_".join(params)] = True
 		if as_assert:
 			self.write(f, "MDL_ASSERT(check_sig_%s(f_type));\n" % "_".join(params))
 			return False
@@ -1029,6 +997,8 @@ class SignatureParser:
 		mode = self.intrinsic_modes.get(intrinsic + signature)
 		func_index = self.get_function_index((intrinsic, signature))
 
+		if self.intrinsic_stats:
+			self.write(f, "++m_intrinsic_usage[%d].calls[return_derivs];\n" % func_index)
 		self.write(f, "if (llvm::Function *func = m_intrinsics[%d * 2 + return_derivs])\n" %
 			func_index)
 		self.indent += 1
@@ -1036,6 +1006,12 @@ class SignatureParser:
 		self.indent -= 1
 		mod_name = self.m_intrinsic_mods[intrinsic]
 
+		if self.intrinsic_stats:
+			# the scope measures the construction, braces because we might be inside a case
+			self.write(f, "{\n")
+			self.indent += 1
+			self.write(f, "Construction_scope scope(*this, %d, return_derivs);\n" % func_index)
+
 		if mod_name == "state":
 			self.write(f, "if (m_use_user_state_module) {\n")
 			self.indent += 1;
@@ -1062,12 +1038,33 @@ class SignatureParser:
 			self.indent -= 1
 			self.write(f, "}\n")
 
+		if self.m_zero_derivs.get((intrinsic, signature)):
+			# share the body of the variant without derivatives
+			self.write(f, "if (return_derivs)\n")
+			self.indent += 1
+			self.write(f, "return m_intrinsics[%d * 2 + 1] = create_zero_deriv_intrinsic(\n" % func_index)
+			self.indent += 1
+			self.write(f, "func_def, get_intrinsic_function(func_def, /*return_derivs=*/ false), \"::%s\");\n" %
+				mod_name)
+			self.indent -= 2
+
 		suffix = signature
 		if suffix[-1] == '_':
 			# no parameters
 			suffix = suffix[:-1]
-		self.write(f, "return m_intrinsics[%d * 2 + return_derivs] = create_%s_%s_%s(func_def, return_derivs);\n" %
-			(func_index, mod_name, intrinsic, suffix))
+		if self.m_prebuilt.get((intrinsic, signature)):
+			self.write(f, "return m_intrinsics[%d * 2 + return_derivs] = get_prebuilt_intrinsic(\n" % func_index)
+			self.indent += 1
+			self.write(f, "func_def, return_derivs, \"::%s\", &MDL_runtime_creator::create_%s_%s_%s);\n" %
+				(mod_name, mod_name, intrinsic, suffix))
+			self.indent -= 1
+		else:
+			self.write(f, "return m_intrinsics[%d * 2 + return_derivs] = create_%s_%s_%s(func_def, return_derivs);\n" %
+				(func_index, mod_name, intrinsic, suffix))
+
+		if self.intrinsic_stats:
+			self.indent -= 1
+			self.write(f, "}\n")
 
 	def create_ir_constructor(self, f, intrinsic, signature):
 		"""Create the evaluation call for a given intrinsic, signature pair."""
@@ -1082,6 +1079,7 @@ class SignatureParser:
 			# no parameters
 			suffix = suffix[:-1]
 
+		start = f.tell()
 		self.write(f, "/// Generate LLVM IR for %s::%s_%s()\n" % (mod_name, intrinsic, suffix))
 		self.write(f, "llvm::Function *create_%s_%s_%s(mi::mdl::IDefinition const *func_def, bool return_derivs)\n" % (mod_name, intrinsic, suffix))
 		self.write(f, "{\n")
@@ -1089,6 +1087,106 @@ class SignatureParser:
 		self.create_ir_constructor_body(f, intrinsic, signature)
 		self.indent -= 1
 		self.write(f, "}\n\n")
+		self.stats.add_function("create_%s_%s_%s" % (mod_name, intrinsic, suffix), f.tell() - start)
+
+	# type codes of parameters and results a prebuilt body may use
+	prebuilt_type_codes = [
+		"BB", "B2", "B3", "B4", "II", "I2", "I3", "I4",
+		"FF", "F2", "F3", "F4", "DD", "D2", "D3", "D4", "CC",
+		"F22", "F23", "F24", "F32", "F33", "F34", "F42", "F43", "F44",
+		"D22", "D23", "D24", "D32", "D33", "D34", "D42", "D43", "D44"
+	]
+
+	# helpers whose result depends on the backend, the state or resources, bodies using
+	# them cannot be shared between code generators
+	prebuilt_deny_tokens = [
+		"get_runtime_func", "get_vector_runtime_func", "call_rt_func", "get_c_runtime_func", "get_internal_function",
+		"get_intrinsic_function", "find_stdlib_signature", "m_code_gen.create_context_data(",
+		"get_llvm_module", "get_exc_state", "get_ro_data", "get_cap_args", "get_wavelength",
+		"get_state_parameter", "get_attribute_table", "call_tex_attr_func", "call_attr_func",
+		"get_tex", "res_data", "is_texruntime", "m_target_lang", "m_fast_math",
+		"m_has_sincosf", "m_has_res_handler", "m_internal_space", "m_state_mode",
+		"m_use_user_state_module", "m_link_libmdlrt", "m_meters", "m_fold", "m_wavelength",
+		"m_num_texture", "error("
+	]
+
+	# the Print_value_kind of the element types printed by debug::print()
+	print_value_kinds = {
+		"BB": "BOOL", "II": "INT", "FF": "FLOAT", "DD": "DOUBLE", "SS": "STRING_ID",
+		"bool": "BOOL", "int": "INT", "float": "FLOAT", "double": "DOUBLE"
+	}
+
+	def is_prebuilt_candidate(self, intrinsic, signature):
+		"""Check if the IR of an intrinsic, signature pair depends only on its types."""
+		if self.m_intrinsic_mods[intrinsic] != "math":
+			return False
+		ret_type, params = self.split_signature(signature)
+		for type_code in [ret_type] + params:
+			if type_code not in self.prebuilt_type_codes:
+				return False
+
+		# render the body and check which helpers it uses
+		f = StringIO()
+		indent = self.indent
+		self.create_ir_constructor_body(f, intrinsic, signature)
+		self.indent = indent
+		body = f.getvalue()
+		for token in self.prebuilt_deny_tokens:
+			if token in body:
+				return False
+		return True
+
+	def find_prebuilt_intrinsics(self, intrinsics):
+		"""Collect all intrinsic, signature pairs served by the prebuilt intrinsic library."""
+		for intrinsic in intrinsics:
+			for signature in self.m_intrinsics[intrinsic]:
+				if self.is_prebuilt_candidate(intrinsic, signature):
+					self.m_prebuilt[(intrinsic, signature)] = True
+
+	# modes whose variant with derivatives requests argument derivatives,
+	# see set_known_function_argument_derivs()
+	deriv_args_modes = [
+		"state::transform_point", "state::transform_vector", "state::transform_normal",
+		"state::transform_scale", "scene::data_lookup_atomic", "scene::data_lookup_uniform_atomic",
+		"scene::data_lookup_vector", "scene::data_lookup_uniform_vector"
+	]
+
+	# the final expansion of the result to a dual with zero derivatives
+	zero_deriv_expansion = re.compile(
+		r"(// expand to dual[^\n]*\n\s*)?"
+		r"if \(inst\.get_return_derivs\(\)\)\s*\{[^\n]*\n"
+		r"\s*res = ctx\.get_dual\(res\);\n"
+		r"\s*\}\n"
+		r"(\s*ctx\.create_return\(res\);\n)")
+
+	def has_zero_derivatives(self, intrinsic, signature):
+		"""Check if the derivatives of an intrinsic, signature pair are always zero."""
+		mode = self.intrinsic_modes.get(intrinsic + signature)
+		if mode in self.deriv_args_modes:
+			return False
+		ret_type, params = self.split_signature(signature)
+		if self.m_intrinsic_mods[intrinsic] == "math" and intrinsic not in ["step", "emission_color"]:
+			# float based math functions request argument derivatives
+			if ret_type[0] in "FD" or ret_type == "CC":
+				return False
+
+		# render the body, it must not depend on return_derivs apart from the final expansion
+		f = StringIO()
+		indent = self.indent
+		self.create_ir_constructor_body(f, intrinsic, signature)
+		self.indent = indent
+		body = f.getvalue()
+		body = body.replace("Function_instance inst(m_code_gen.get_allocator(), func_def, return_derivs);", "")
+		body = body.replace("get_non_deriv_return_type", "")
+		body = self.zero_deriv_expansion.sub(r"\2", body)
+		return "deriv" not in body and "get_dual" not in body
+
+	def find_zero_deriv_intrinsics(self, intrinsics):
+		"""Collect all intrinsic, signature pairs whose derivatives are always zero."""
+		for intrinsic in intrinsics:
+			for signature in self.m_intrinsics[intrinsic]:
+				if self.has_zero_derivatives(intrinsic, signature):
+					self.m_zero_derivs[(intrinsic, signature)] = True
 
 	def get_runtime_enum(self, runtime_func):
 		"""Return the name of the Runtime_function enum value for the given runtime function."""
@@ -2784,14 +2882,53 @@ class SignatureParser:
 				dy  = ctx.create_insert(dy,  ctx.get_dual_dy(a_res[%(idx)d]),  %(idx)d);
 				""" % { "idx": i })
 
-			self.format_code(f, """
-				res = ctx.get_dual(val, dx, dy);
-			} else {
-				llvm::Value *args[%(len_params)d];
-				llvm::Value *tmp;
-				llvm::Function *elem_func = get_runtime_func(%(func_name)s);
-				res = llvm::ConstantAggregateZero::get(ctx_data->get_return_type());
-			""" % { "len_params": len(params), "func_name": f_name } )
+			use_vector_func = 0 < n_elems <= self.get_vector_runtime_width(f_name)
+
+			if use_vector_func:
+				self.format_code(f, """
+					res = ctx.get_dual(val, dx, dy);
+				} else {
+					llvm::Value *args[%(len_params)d];
+					llvm::Value *tmp;
+					res = llvm::ConstantAggregateZero::get(ctx_data->get_return_type());
+				""" % { "len_params": len(params) } )
+			else:
+				self.format_code(f, """
+					res = ctx.get_dual(val, dx, dy);
+				} else {
+					llvm::Value *args[%(len_params)d];
+					llvm::Value *tmp;
+					llvm::Function *elem_func = get_runtime_func(%(func_name)s);
+					res = llvm::ConstantAggregateZero::get(ctx_data->get_return_type());
+				""" % { "len_params": len(params), "func_name": f_name } )
+
+			if use_vector_func:
+				self.format_code(f, """
+				if (llvm::Function *vec_func = get_vector_runtime_func(%(func_name)s)) {
+					// all components at once
+					llvm::Type *vec_tp = vec_func->getReturnType();
+				""" % { "func_name": f_name })
+
+				for idx, param in enumerate(params):
+					p_name = chr(ord('a') + idx)
+					self.write(f, "args[%d] = llvm::UndefValue::get(vec_tp);\n" % idx)
+					for i in range(n_elems):
+						if self.is_atomic_type(param):
+							elem = p_name
+						else:
+							elem = "ctx.create_extract(%s, %d)" % (p_name, i)
+						self.write(f, "args[%d] = ctx->CreateInsertElement(args[%d], %s, uint64_t(%d));\n" %
+							(idx, idx, elem, i))
+
+				self.write(f, "tmp = ctx->CreateCall(vec_func, args);\n")
+				for i in range(n_elems):
+					self.write(f, "res = ctx.create_insert(res, ctx->CreateExtractElement(tmp, uint64_t(%d)), %d);\n" %
+						(i, i))
+
+				self.indent -= 1
+				self.write(f, "} else {\n")
+				self.indent += 1
+				self.write(f, "llvm::Function *elem_func = get_runtime_func(%s);\n" % f_name)
 
 			for i in range(n_elems):
 				for idx, param in enumerate(params):
@@ -2804,18 +2941,28 @@ class SignatureParser:
 				self.write(f, "tmp = ctx->CreateCall(elem_func, args);\n")
 				self.write(f, "res = ctx.create_insert(res, tmp, %s);\n" % i)
 
+			if use_vector_func:
+				self.format_code(f, "}\n")
 			self.format_code(f, "}\n")
 
 		elif mode == "math::eval_at_wavelength":
-			code = ""
-			idx = 0
-			for param in params:
-				code += """
-					(void)%s;""" % chr(ord('a') + idx)
-				idx = idx + 1
-			code += """
-			// FIXME: unsupported yet
-			res = llvm::Constant::getNullValue(ctx_data->get_return_type());
+			code = """
+			llvm::Function *eval_func = get_runtime_func(RT_MDL_EVAL_AT_WAVELENGTH);
+			llvm::Value    *color     = ctx.get_dual_val(a);
+			llvm::Value    *args[]    = {
+				ctx.create_extract(color, 0),
+				ctx.create_extract(color, 1),
+				ctx.create_extract(color, 2),
+				ctx.get_dual_val(b)
+			};
+			res = ctx->CreateCall(eval_func, args);
+
+			// need libmdlrt
+			m_code_gen.m_link_libmdlrt = true;
+
+			if (inst.get_return_derivs()) { // expand to dual
+				res = ctx.get_dual(res);
+			}
 			"""
 			self.format_code(f, code)
 
@@ -4555,8 +4702,8 @@ class SignatureParser:
 		elif mode == "scene::data_isvalid":
 			code = """
 			if (m_has_res_handler) {
-				MDL_ASSERT(!"not implemented yet");
-				res = nullptr;
+				// the resource handler does not provide scene data
+				res = ctx.get_constant(false);
 			} else {
 				llvm::Value *self_adr = ctx.create_simple_gep_in_bounds(
 					res_data, ctx.get_constant(Type_mapper::RDP_THREAD_DATA));
@@ -4581,8 +4728,10 @@ class SignatureParser:
 			if "_int" in intrinsic:
 				code = """
 				if (m_has_res_handler) {
-					MDL_ASSERT(!"not implemented yet");
-					res = nullptr;
+					// the resource handler does not provide scene data, return the default value
+					llvm::Value *tmp = ctx.create_local(ctx.get_return_type(), "tmp");
+					ctx.convert_and_store(b, tmp);
+					res = ctx->CreateLoad(tmp);
 				} else {
 					llvm::Value *self_adr = ctx.create_simple_gep_in_bounds(
 						res_data, ctx.get_constant(Type_mapper::RDP_THREAD_DATA));
@@ -4605,8 +4754,10 @@ class SignatureParser:
 			else:
 				code = """
 				if (m_has_res_handler) {
-					MDL_ASSERT(!"not implemented yet");
-					res = nullptr;
+					// the resource handler does not provide scene data, return the default value
+					llvm::Value *tmp = ctx.create_local(ctx.get_return_type(), "tmp");
+					ctx.convert_and_store(b, tmp);
+					res = ctx->CreateLoad(tmp);
 				} else {
 					llvm::Value *self_adr = ctx.create_simple_gep_in_bounds(
 						res_data, ctx.get_constant(Type_mapper::RDP_THREAD_DATA));
@@ -4653,8 +4804,10 @@ class SignatureParser:
 			if "_int" in intrinsic:
 				code = """
 				if (m_has_res_handler) {
-					MDL_ASSERT(!"not implemented yet");
-					res = nullptr;
+					// the resource handler does not provide scene data, return the default value
+					llvm::Value *tmp = ctx.create_local(ctx.get_return_type(), "tmp");
+					ctx.convert_and_store(b, tmp);
+					res = ctx->CreateLoad(tmp);
 				} else {
 					llvm::Value *self_adr = ctx.create_simple_gep_in_bounds(
 						res_data, ctx.get_constant(Type_mapper::RDP_THREAD_DATA));
@@ -4686,8 +4839,10 @@ class SignatureParser:
 			else:
 				code = """
 				if (m_has_res_handler) {
-					MDL_ASSERT(!"not implemented yet");
-					res = nullptr;
+					// the resource handler does not provide scene data, return the default value
+					llvm::Value *tmp = ctx.create_local(ctx.get_return_type(), "tmp");
+					ctx.convert_and_store(b, tmp);
+					res = ctx->CreateLoad(tmp);
 				} else {
 					llvm::Value *self_adr = ctx.create_simple_gep_in_bounds(
 						res_data, ctx.get_constant(Type_mapper::RDP_THREAD_DATA));
@@ -4804,9 +4959,35 @@ class SignatureParser:
 				%(what)s = ctx->CreateCall(conv_func, %(what)s);
 			"""
 
-			# PTX prolog
+			# buffered mode
+			values = []
+			tags = []
+			for idx, param in enumerate(params):
+				vector_chk = self.get_vector_type_and_size(param)
+				if param == "CC":
+					tag = "mi::mdl::PRINT_VALUE_FLOAT | (3u << 8) | (mi::mdl::PRINT_FLAG_COLOR << 16)"
+				elif vector_chk:
+					tag = "mi::mdl::PRINT_VALUE_%s | (%du << 8) | (mi::mdl::PRINT_FLAG_VECTOR << 16)" % (
+						self.print_value_kinds[vector_chk[0]], vector_chk[1])
+				elif self.get_atomic_type_kind(param):
+					tag = "mi::mdl::PRINT_VALUE_%s | (1u << 8)" % self.print_value_kinds[param]
+				else:
+					error("Unsupported debug::print() parameter type '%s'" % param)
+				values.append(chr(ord('a') + idx))
+				tags.append(tag)
+
 			code = """
-				if (m_target_lang == LLVM_code_generator::TL_PTX) {
+				if (m_code_gen.m_buffered_print) {
+					llvm::Value *values[] = { %s };
+					unsigned    tags[]   = {
+						%s
+					};
+					create_buffered_print(ctx, values, tags);
+			""" % (", ".join(values), ",\n".join(tags))
+			self.format_code(f, code)
+
+			# PTX prolog
+			code = """} else if (m_target_lang == LLVM_code_generator::TL_PTX) {
 					llvm::Function    *vprintf_func = get_runtime_func(RT_VPRINTF);
 					llvm::PointerType *void_ptr_tp = m_code_gen.m_type_mapper.get_void_ptr_type();
 					llvm::DataLayout   data_layout(m_code_gen.get_llvm_module());
@@ -5205,6 +5386,24 @@ class SignatureParser:
 		else:
 			# have overloads
 			signatures.sort()
+			_, params = self.split_signature(signatures[0])
+			table_idx = self.m_dispatch_groups.get((intrinsic, len(params)))
+			if table_idx != None:
+				# select the overload by its dispatch key, the slots are the indexes
+				# into the sorted signatures
+				self.write(f, "switch (dispatch_%d(get_dispatch_key(f_type))) {\n" % table_idx)
+				for slot, sig in enumerate(signatures):
+					self.write(f, "case %d:\n" % slot)
+					self.indent += 1
+					self.create_lazy_ir_construction(f, intrinsic, sig)
+					self.indent -= 1
+				self.write(f, "default:\n")
+				self.indent += 1
+				self.write(f, "break;\n")
+				self.indent -= 1
+				self.write(f, "}\n")
+				return
+
 			pre_if = ""
 			for sig in signatures:
 				params = sig.split('_')[1:]
@@ -5428,6 +5627,9 @@ class SignatureParser:
 			if sig == '':
 				# we don't need a check for the (void) signature
 				continue
+			if not self.m_used_checkers.get(sig):
+				# all overloads with this signature are selected by dispatch tables
+				continue
 
 			params = sig.split('_')
 			self.write(f, "/// Check that the given arguments have the signature %s.\n" % self.create_type_sig_tuple(params))
@@ -5467,6 +5669,192 @@ class SignatureParser:
 			self.indent -= 1
 			self.write(f, "}\n\n")
 
+	def create_dispatch_functions(self, f):
+		"""Create the dispatch key computation and the overload dispatch tables."""
+		if len(self.m_dispatch_tables) == 0:
+			return
+
+		atomics  = []
+		vectors  = {}
+		matrices = {}
+		textures = []
+		for cls in sorted(self.m_dispatch_classes.keys()):
+			code = self.m_dispatch_classes[cls]
+			if cls == "E" or cls == "FAN":
+				continue
+			atomic_chk = self.get_atomic_type_kind(cls)
+			vector_chk = self.get_vector_type_kind(cls)
+			matrix_chk = self.get_matrix_type_kind(cls)
+			if atomic_chk:
+				atomics.append((atomic_chk, code))
+			elif vector_chk:
+				vectors.setdefault(vector_chk, []).append(("size == %s" % cls[-1], code))
+			elif matrix_chk:
+				matrices.setdefault(matrix_chk, []).append(
+					("cols == %s && rows == %s" % (cls[-2], cls[-1]), code))
+			else:
+				textures.append((self.get_texture_shape(cls), code))
+
+		self.write(f, "/// An entry of an overload dispatch table.\n")
+		self.write(f, "struct Dispatch_entry {\n")
+		self.indent += 1
+		self.write(f, "uint64_t key;   ///< the dispatch key of the overload\n")
+		self.write(f, "int      slot;  ///< the index of the overload or -1 for an empty entry\n")
+		self.indent -= 1
+		self.write(f, "};\n\n")
+
+		self.write(f, "/// Get the dispatch code of a parameter type, 0 if no overload uses this type.\n")
+		self.write(f, "///\n")
+		self.write(f, "/// \\param p_type  an MDL type\n")
+		self.write(f, "static unsigned get_dispatch_type_code(mi::mdl::IType const *p_type)\n")
+		self.write(f, "{\n")
+		self.indent += 1
+		self.write(f, "p_type = p_type->skip_type_alias();\n")
+		self.write(f, "switch (p_type->get_kind()) {\n")
+		for kind, code in atomics:
+			self.write(f, "case %s:\n" % kind)
+			self.indent += 1
+			self.write(f, "return %d;\n" % code)
+			self.indent -= 1
+		if "E" in self.m_dispatch_classes:
+			self.write(f, "case mi::mdl::IType::TK_ENUM:\n")
+			self.indent += 1
+			self.write(f, "return %d;\n" % self.m_dispatch_classes["E"])
+			self.indent -= 1
+		if len(vectors) > 0:
+			self.write(f, "case mi::mdl::IType::TK_VECTOR:\n")
+			self.indent += 1
+			self.write(f, "{\n")
+			self.indent += 1
+			self.write(f, "mi::mdl::IType_vector const *v_type = cast<mi::mdl::IType_vector>(p_type);\n")
+			self.write(f, "int                         size    = v_type->get_size();\n")
+			self.write(f, "\n")
+			self.write(f, "switch (v_type->get_element_type()->get_kind()) {\n")
+			self.create_dispatch_kind_cases(f, vectors)
+			self.write(f, "}\n")
+			self.indent -= 1
+			self.write(f, "}\n")
+			self.write(f, "break;\n")
+			self.indent -= 1
+		if len(matrices) > 0:
+			self.write(f, "case mi::mdl::IType::TK_MATRIX:\n")
+			self.indent += 1
+			self.write(f, "{\n")
+			self.indent += 1
+			self.write(f, "mi::mdl::IType_matrix const *m_type = cast<mi::mdl::IType_matrix>(p_type);\n")
+			self.write(f, "mi::mdl::IType_vector const *v_type = m_type->get_element_type();\n")
+			self.write(f, "int                         cols    = m_type->get_columns();\n")
+			self.write(f, "int                         rows    = v_type->get_size();\n")
+			self.write(f, "\n")
+			self.write(f, "switch (v_type->get_element_type()->get_kind()) {\n")
+			self.create_dispatch_kind_cases(f, matrices)
+			self.write(f, "}\n")
+			self.indent -= 1
+			self.write(f, "}\n")
+			self.write(f, "break;\n")
+			self.indent -= 1
+		if len(textures) > 0:
+			self.write(f, "case mi::mdl::IType::TK_TEXTURE:\n")
+			self.indent += 1
+			self.write(f, "switch (cast<mi::mdl::IType_texture>(p_type)->get_shape()) {\n")
+			for shape, code in textures:
+				self.write(f, "case %s:\n" % shape)
+				self.indent += 1
+				self.write(f, "return %d;\n" % code)
+				self.indent -= 1
+			self.write(f, "default:\n")
+			self.indent += 1
+			self.write(f, "break;\n")
+			self.indent -= 1
+			self.write(f, "}\n")
+			self.write(f, "break;\n")
+			self.indent -= 1
+		if "FAN" in self.m_dispatch_classes:
+			self.write(f, "case mi::mdl::IType::TK_ARRAY:\n")
+			self.indent += 1
+			self.write(f, "{\n")
+			self.indent += 1
+			self.write(f, "mi::mdl::IType_array const *a_type = cast<mi::mdl::IType_array>(p_type);\n")
+			self.write(f, "if (!a_type->is_immediate_sized() &&\n")
+			self.write(f, "    a_type->get_element_type()->get_kind() == mi::mdl::IType::TK_FLOAT)\n")
+			self.indent += 1
+			self.write(f, "return %d;\n" % self.m_dispatch_classes["FAN"])
+			self.indent -= 2
+			self.write(f, "}\n")
+			self.write(f, "break;\n")
+			self.indent -= 1
+		self.write(f, "default:\n")
+		self.indent += 1
+		self.write(f, "break;\n")
+		self.indent -= 1
+		self.write(f, "}\n")
+		self.write(f, "return 0;\n")
+		self.indent -= 1
+		self.write(f, "}\n")
+
+		code = """
+		/// Compute the dispatch key of a function type from the codes of its parameter types.
+		///
+		/// \\param f_type  an MDL function type
+		static uint64_t get_dispatch_key(mi::mdl::IType_function const *f_type)
+		{
+			uint64_t key = 0;
+			for (int i = 0, n = f_type->get_parameter_count(); i < n; ++i) {
+				mi::mdl::IType const   *p_type;
+				mi::mdl::ISymbol const *p_sym;
+
+				f_type->get_parameter(i, p_type, p_sym);
+				key = (key << %d) | get_dispatch_type_code(p_type);
+			}
+			return key;
+		}
+		""" % self.m_dispatch_bits
+		self.format_code(f, code)
+		self.write(f, "\n")
+
+		for table_idx, (sigs, entries) in enumerate(self.m_dispatch_tables):
+			self.write(f, "/// Select one of the overloads\n")
+			for slot, sig in enumerate(sigs):
+				_, params = self.split_signature(sig)
+				self.write(f, "///  %d: %s\n" % (slot, self.create_type_sig_tuple(params)))
+			self.write(f, "///\n")
+			self.write(f, "/// \\param key  the dispatch key of the function type\n")
+			self.write(f, "///\n")
+			self.write(f, "/// \\return the index of the overload or -1 if none matches\n")
+			self.write(f, "static int dispatch_%d(uint64_t key)\n" % table_idx)
+			self.write(f, "{\n")
+			self.indent += 1
+			self.write(f, "static Dispatch_entry const table[%d] = {\n" % len(entries))
+			self.indent += 1
+			for entry in entries:
+				if entry == None:
+					self.write(f, "{ 0, -1 },\n")
+				else:
+					self.write(f, "{ UINT64_C(0x%x), %d },\n" % entry)
+			self.indent -= 1
+			self.write(f, "};\n")
+			self.write(f, "Dispatch_entry const &e = table[key %% %d];\n" % len(entries))
+			self.write(f, "return e.key == key ? e.slot : -1;\n")
+			self.indent -= 1
+			self.write(f, "}\n\n")
+
+	def create_dispatch_kind_cases(self, f, kinds):
+		"""Create the element kind cases of get_dispatch_type_code()."""
+		for kind in sorted(kinds.keys()):
+			self.write(f, "case %s:\n" % kind)
+			self.indent += 1
+			for cond, code in kinds[kind]:
+				self.write(f, "if (%s)\n" % cond)
+				self.indent += 1
+				self.write(f, "return %d;\n" % code)
+				self.indent -= 1
+			self.write(f, "break;\n")
+			self.indent -= 1
+		self.write(f, "default:\n")
+		self.indent += 1
+		self.write(f, "break;\n")
+		self.indent -= 1
+
 	def write_access_specifier(self, f, specifier):
 		"""Write a class access specifier"""
 		self.indent -= 1
@@ -5595,9 +5983,15 @@ class SignatureParser:
 			for (size_t i = 0, n = dimension_of(m_internal_funcs); i < n; ++i) {
 				m_internal_funcs[i] = NULL;
 			}
-		}
 
+			for (size_t i = 0, n = dimension_of(m_vector_runtime_funcs); i < n; ++i) {
+				m_vector_runtime_funcs[i] = NULL;
+			}
 		"""
+		if self.intrinsic_stats:
+			code += "memset(m_intrinsic_usage, 0, sizeof(m_intrinsic_usage));\n"
+			code += "m_curr_intrinsic = NUM_INTRINSICS;\n"
+		code += "}\n\n"
 		self.format_code(f, code)
 
 	def register_c_runtime(self):
@@ -5662,6 +6056,13 @@ class SignatureParser:
 		self.register_runtime_func("signf",   "II_FF")
 		self.register_runtime_func("sign",    "II_DD")
 
+		# SIMD-wide variants, used by the native backend in fast-math mode to compute
+		# component wise vector operations with a single call
+		self.register_vector_runtime_func("sinf", 4)
+		self.register_vector_runtime_func("cosf", 4)
+		self.register_vector_runtime_func("expf", 4)
+		self.register_vector_runtime_func("logf", 4)
+
 	def register_atomic_runtime(self):
 		self.register_mdl_runtime_func("mdl_clampi",      "II_IIIIII")
 		self.register_mdl_runtime_func("mdl_clampf",      "FF_FFFFFF")
@@ -5688,6 +6089,7 @@ class SignatureParser:
 		self.register_mdl_runtime_func("mdl_blackbody",        "FA3_FF")
 		self.register_mdl_runtime_func("mdl_emission_color",   "vv_ffffffII")
 		self.register_mdl_runtime_func("mdl_reflection_color", "vv_ffffffII")
+		self.register_mdl_runtime_func("mdl_eval_at_wavelength", "FF_FFFFFFFF")
 		# extra used by other functions
 		self.register_mdl_runtime_func("mdl_mini",        "II_IIII")
 		self.register_mdl_runtime_func("mdl_minf",        "FF_FFFF")
@@ -5818,6 +6220,55 @@ class SignatureParser:
 		self.indent -= 1
 		self.write(f, "};\n")
 
+	def generate_vector_runtime_funcs(self, f):
+		"""Generate the getters for the SIMD-wide variants of runtime functions."""
+		self.write(f, "\n")
+		self.write(f, "/// Get the name of the SIMD-wide variant of a C runtime function.\n")
+		self.write(f, "///\n")
+		self.write(f, "/// \\param[in]  code      The runtime function code.\n")
+		self.write(f, "/// \\param[out] width     The number of lanes.\n")
+		self.write(f, "/// \\param[out] n_params  The number of parameters.\n")
+		self.write(f, "///\n")
+		self.write(f, "/// \\return The name or NULL if the function has no SIMD-wide variant.\n")
+		self.write(f, "static char const *get_vector_runtime_func_name(\n")
+		self.indent += 1
+		self.write(f, "Runtime_function code,\n")
+		self.write(f, "unsigned         &width,\n")
+		self.write(f, "unsigned         &n_params)\n")
+		self.indent -= 1
+		self.write(f, "{\n")
+		self.indent += 1
+		self.write(f, "switch (code) {\n")
+		for fname in sorted(self.m_vector_runtime_functions.keys()):
+			width = self.m_vector_runtime_functions[fname]
+			_, params = self.split_signature(self.m_c_runtime_functions[fname])
+			self.write(f, "case RT_%s:\n" % fname.upper())
+			self.indent += 1
+			self.write(f, "width = %d;\n" % width)
+			self.write(f, "n_params = %d;\n" % len(params))
+			self.write(f, 'return "mdl_%s_x%d";\n' % (fname, width))
+			self.indent -= 1
+		self.write(f, "default:\n")
+		self.indent += 1
+		self.write(f, "break;\n")
+		self.indent -= 1
+		self.write(f, "}\n")
+		self.write(f, "width = 0;\n")
+		self.write(f, "n_params = 0;\n")
+		self.write(f, "return NULL;\n")
+		self.indent -= 1
+		self.write(f, "}\n")
+
+		code = """
+		/// Get the SIMD-wide variant of a C runtime function lazily.
+		///
+		/// \\param code  The runtime function code.
+		///
+		/// \\return The function or NULL if it has no SIMD-wide variant for the current target.
+		llvm::Function *get_vector_runtime_func(Runtime_function code);
+		"""
+		self.format_code(f, code)
+
 	def generate_runtime_func_cache(self, f):
 		"""Generate the lazy runtime function getter."""
 		self.write(f, "/// Get a runtime function lazily.\n")
@@ -5825,6 +6276,11 @@ class SignatureParser:
 		self.write(f, "/// \\param code  The runtime function code.\n")
 		self.write(f, "llvm::Function *get_runtime_func(Runtime_function code) {\n")
 		self.indent += 1
+		if self.intrinsic_stats:
+			self.write(f, "if (m_curr_intrinsic < NUM_INTRINSICS)\n")
+			self.indent += 1
+			self.write(f, "m_intrinsic_usage[m_curr_intrinsic].runtime_funcs[code / 32] |= 1u << (code % 32);\n")
+			self.indent -= 1
 		self.write(f, "llvm::Function *func = m_runtime_funcs[code];\n")
 
 		self.write(f, "if (func != NULL)\n")
@@ -5865,6 +6321,8 @@ class SignatureParser:
 		self.indent -= 1
 		self.write(f, "}\n")
 
+		self.generate_vector_runtime_funcs(f)
+
 		code = """
 		/// Return an LLVM type for a (single type) signature.
 		///
@@ -5934,6 +6392,27 @@ class SignatureParser:
 		llvm::Value *get_next_valist_pointer(Function_context &ctx,
 			llvm::Value *valist, int &offset, llvm::Type *operand_type);
 
+		/// Append a debug::print() record to the print buffer of the resource data.
+		///
+		/// \param ctx     the current function context
+		/// \param values  the printed values
+		/// \param tags    the print tag of every value: kind | (count << 8) | (flags << 16)
+		void create_buffered_print(
+			Function_context              &ctx,
+			llvm::ArrayRef<llvm::Value *> values,
+			llvm::ArrayRef<unsigned>      tags);
+
+		/// Create the variant with derivatives of an intrinsic function whose derivatives are
+		/// always zero. It calls the variant without derivatives and expands its result.
+		///
+		/// \param func_def   the definition of the intrinsic function
+		/// \param base_func  the variant without derivatives
+		/// \param mod_name   the name of the module of the intrinsic function
+		llvm::Function *create_zero_deriv_intrinsic(
+			mi::mdl::IDefinition const *func_def,
+			llvm::Function             *base_func,
+			char const                 *mod_name);
+
 		/// Call a runtime function.
 		///
 		/// \param ctx     the current function context
@@ -6009,6 +6488,78 @@ class SignatureParser:
 				for sig in signatures:
 					self.create_function_index((intrinsic, sig))
 
+	def get_overload_groups(self, intrinsics):
+		"""Return the sorted signatures of all intrinsics with overloads of the same length,
+		   as a list of (intrinsic, n_params, signatures) tuples."""
+		groups = []
+		for intrinsic in intrinsics:
+			l = {}
+			for sig in self.m_intrinsics[intrinsic]:
+				_, params = self.split_signature(sig)
+				l.setdefault(len(params), []).append(sig)
+			for n_params in sorted(l.keys()):
+				sigs = l[n_params]
+				if len(sigs) > 1:
+					groups.append((intrinsic, n_params, sorted(sigs)))
+		return groups
+
+	def get_dispatch_key(self, params):
+		"""Compute the dispatch key for the given parameter type codes."""
+		key = 0
+		for param in params:
+			key = (key << self.m_dispatch_bits) | self.m_dispatch_classes[self.get_dispatch_class(param)]
+		return key
+
+	def create_dispatch_tables(self, intrinsics):
+		"""Create a perfect hash table for every overload set that can be dispatched by
+		   the kinds of its parameter types.
+
+		   The dispatch key of a function type concatenates a small code for every parameter
+		   type, so it identifies the parameter types exactly. A table of size M is chosen
+		   such that all keys of the overload set are different modulo M."""
+		candidates = []
+		classes = {}
+		for intrinsic, n_params, sigs in self.get_overload_groups(intrinsics):
+			usable = True
+			for sig in sigs:
+				_, params = self.split_signature(sig)
+				for param in params:
+					cls = self.get_dispatch_class(param)
+					if cls == None:
+						usable = False
+						break
+					classes[cls] = True
+			if usable:
+				candidates.append((intrinsic, n_params, sigs))
+
+		# code 0 is reserved for parameter types not used by any overload set
+		for code, cls in enumerate(sorted(classes.keys())):
+			self.m_dispatch_classes[cls] = code + 1
+		self.m_dispatch_bits = len(self.m_dispatch_classes).bit_length()
+
+		tables = {}
+		for intrinsic, n_params, sigs in candidates:
+			if n_params * self.m_dispatch_bits > 64:
+				# key does not fit, use the signature checkers
+				continue
+			keys = tuple(self.get_dispatch_key(self.split_signature(sig)[1]) for sig in sigs)
+			if len(set(keys)) != len(keys):
+				# overloads not distinguishable by type kinds, use the signature checkers
+				continue
+
+			table_idx = tables.get(keys)
+			if table_idx == None:
+				size = len(keys)
+				while len(set(key % size for key in keys)) != len(keys):
+					size += 1
+				entries = [None] * size
+				for slot, key in enumerate(keys):
+					entries[key % size] = (key, slot)
+				table_idx = len(self.m_dispatch_tables)
+				self.m_dispatch_tables.append((sigs, entries))
+				tables[keys] = table_idx
+			self.m_dispatch_groups[(intrinsic, n_params)] = table_idx
+
 	def create_check_state_module(self, f):
 		code = """
 		/// Check whether the given module contains the given function and create an error if not.
@@ -6142,8 +6693,155 @@ class SignatureParser:
 		self.write(f, "\n")
 
 
+	def create_prebuilt_interface(self, f):
+		"""Create the declarations of the prebuilt intrinsic library functions."""
+		code = """
+		/// Type of the functions generating LLVM IR for an intrinsic function.
+		typedef llvm::Function *(MDL_runtime_creator::*Intrinsic_creator)(
+			mi::mdl::IDefinition const *func_def,
+			bool                       return_derivs);
+
+		/// Get an intrinsic function from the prebuilt intrinsic library.
+		///
+		/// If the library does not contain the body for the current configuration yet, it is
+		/// generated by the creator and added to the library.
+		///
+		/// \\param func_def       The definition of the intrinsic function
+		/// \\param return_derivs  If true, the funcion will return derivatives
+		/// \\param mod_name       The name of the module of the intrinsic function
+		/// \\param creator        The function generating LLVM IR for the intrinsic function
+		llvm::Function *get_prebuilt_intrinsic(
+			mi::mdl::IDefinition const *func_def,
+			bool                       return_derivs,
+			char const                 *mod_name,
+			Intrinsic_creator          creator);
+
+		"""
+		self.format_code(f, code)
+
+	def get_intrinsic_name(self, intrinsic, signature):
+		"""Return the MDL name of an intrinsic, signature pair."""
+		_, params = self.split_signature(signature)
+		name = "%s(%s)" % (intrinsic, ",".join([self.m_inv_types[p] for p in params]))
+		mod_name = self.m_intrinsic_mods[intrinsic]
+		if mod_name != "":
+			name = mod_name + "::" + name
+		return name
+
+	def create_intrinsic_stats_interface(self, f, intrinsics):
+		"""Create the types and functions used to record the intrinsic function usage."""
+		code = """
+		/// Usage statistics of one intrinsic function, the arrays are indexed by return_derivs.
+		struct Intrinsic_usage {
+			/// Number of requests.
+			size_t calls[2];
+
+			/// Number of constructions.
+			size_t constructions[2];
+
+			/// Time spent constructing the function in seconds.
+			double construction_time[2];
+
+			/// Bitset of the runtime functions requested while constructing the function.
+			unsigned runtime_funcs[(RT_LAST + 32) / 32];
+		};
+
+		/// Get the usage statistics of all intrinsic functions, indexed by the intrinsic index.
+		Intrinsic_usage const *get_intrinsic_usage() const { return m_intrinsic_usage; }
+
+		"""
+		self.format_code(f, code)
+
+		names = {}
+		for intrinsic in intrinsics:
+			for sig in self.m_intrinsics[intrinsic]:
+				names[self.get_function_index((intrinsic, sig))] = self.get_intrinsic_name(intrinsic, sig)
+
+		self.write(f, "/// Get the MDL name of an intrinsic function by its index.\n")
+		self.write(f, "static char const *get_intrinsic_name(size_t index)\n")
+		self.write(f, "{\n")
+		self.indent += 1
+		self.write(f, "static char const * const names[NUM_INTRINSICS] = {\n")
+		self.indent += 1
+		for idx in range(self.m_next_func_index):
+			self.write(f, "\"%s\",\n" % names[idx])
+		self.indent -= 1
+		self.write(f, "};\n")
+		self.write(f, "return index < NUM_INTRINSICS ? names[index] : NULL;\n")
+		self.indent -= 1
+		self.write(f, "}\n\n")
+
+		# same order as the Runtime_function enum
+		rt_names = ["RT_" + func.upper() for func in sorted(self.m_c_runtime_functions.keys())]
+		rt_names += ["RT_" + func.upper() for func in sorted(self.m_mdl_runtime_functions.keys())]
+
+		self.write(f, "/// Get the name of a runtime function.\n")
+		self.write(f, "static char const *get_runtime_func_name(Runtime_function code)\n")
+		self.write(f, "{\n")
+		self.indent += 1
+		self.write(f, "static char const * const names[RT_LAST + 1] = {\n")
+		self.indent += 1
+		for name in rt_names:
+			self.write(f, "\"%s\",\n" % name)
+		self.indent -= 1
+		self.write(f, "};\n")
+		self.write(f, "return names[code];\n")
+		self.indent -= 1
+		self.write(f, "}\n\n")
+
+	def create_construction_scope(self, f):
+		"""Create the helper class measuring the construction of intrinsic functions."""
+		code = """
+		/// Records the construction of an intrinsic function in the usage statistics.
+		class Construction_scope {
+		public:
+			/// Constructor, starts the construction of an intrinsic function.
+			Construction_scope(MDL_runtime_creator &creator, size_t index, bool return_derivs)
+			: m_creator(creator)
+			, m_index(index)
+			, m_return_derivs(return_derivs)
+			, m_outer(creator.m_curr_intrinsic)
+			, m_start(std::chrono::steady_clock::now())
+			{
+				creator.m_curr_intrinsic = index;
+			}
+
+			/// Destructor, ends the construction.
+			~Construction_scope()
+			{
+				Intrinsic_usage &usage = m_creator.m_intrinsic_usage[m_index];
+				usage.constructions[m_return_derivs] += 1;
+				usage.construction_time[m_return_derivs] += std::chrono::duration<double>(
+					std::chrono::steady_clock::now() - m_start).count();
+				m_creator.m_curr_intrinsic = m_outer;
+			}
+
+		private:
+			MDL_runtime_creator                   &m_creator;
+			size_t                                m_index;
+			bool                                  m_return_derivs;
+			size_t                                m_outer;
+			std::chrono::steady_clock::time_point m_start;
+		};
+
+		"""
+		self.format_code(f, code)
+
+	def collect_module_stats(self):
+		"""Register the number of intrinsics and signatures per module."""
+		modules = {}
+		for intrinsic, sigs in self.m_intrinsics.items():
+			mod_name = self.m_intrinsic_mods[intrinsic]
+			if mod_name == "":
+				mod_name = "<builtins>"
+			n_intrinsics, n_signatures = modules.get(mod_name, (0, 0))
+			modules[mod_name] = (n_intrinsics + 1, n_signatures + len(sigs))
+		for mod_name, (n_intrinsics, n_signatures) in modules.items():
+			self.stats.add_module(mod_name, n_intrinsics, n_signatures)
+
 	def finalize(self):
 		"""Create output."""
+		self.stats.begin_phase("prepare")
 
 		intrinsics = []
 		unsupported = []
@@ -6157,11 +6855,28 @@ class SignatureParser:
 		intrinsics.sort()
 
 		self.create_intrinsic_func_indexes(intrinsics)
+		self.create_dispatch_tables(intrinsics)
 
 		self.register_c_runtime()
 		self.register_atomic_runtime();
 
-		f = open(self.out_name, "w")
+		if self.prebuilt:
+			self.find_prebuilt_intrinsics(intrinsics)
+		self.find_zero_deriv_intrinsics(intrinsics)
+
+		self.collect_module_stats()
+		self.stats.set_counter("supported_intrinsics", len(intrinsics))
+		self.stats.set_counter("unsupported_intrinsics", len(unsupported))
+		self.stats.set_counter("intrinsic_functions", self.m_next_func_index)
+		self.stats.set_counter("c_runtime_functions", len(self.m_c_runtime_functions))
+		self.stats.set_counter("mdl_runtime_functions", len(self.m_mdl_runtime_functions))
+		self.stats.set_counter("dispatch_tables", len(self.m_dispatch_tables))
+		self.stats.set_counter("prebuilt_intrinsic_functions", len(self.m_prebuilt))
+		self.stats.set_counter("zero_deriv_intrinsic_functions", len(self.m_zero_derivs))
+		self.stats.begin_phase("class_interface")
+
+		# generate into memory first, the output file is only touched if its content changes
+		f = code_emitter.CodeEmitter()
 
 		# add class members
 		self.add_class_member("mi::mdl::IAllocator *",                "m_alloc",                      "The allocator.",               True)
@@ -6175,6 +6890,19 @@ class SignatureParser:
 		self.add_class_member("llvm::Function *",                     "m_runtime_funcs[RT_LAST + 1]", "Runtime functions.",           False)
 		self.add_class_member("llvm::Function *",                     "m_intrinsics[%d * 2]" % self.m_next_func_index, "Cache for intrinsic functions, with and without derivative returns.", False)
 		self.add_class_member("llvm::Function *",                     "m_internal_funcs[Internal_function::KI_NUM_INTERNAL_FUNCTIONS]", "Cache for internal functions.", False)
+		self.add_class_member("llvm::Function *",                     "m_vector_runtime_funcs[RT_LAST + 1]", "SIMD-wide variants of runtime functions.", False)
+
+		if self.intrinsic_stats:
+			self.add_class_member("Intrinsic_usage",                  "m_intrinsic_usage[NUM_INTRINSICS]", "Usage statistics of the intrinsic functions.", False)
+			self.add_class_member("size_t",                           "m_curr_intrinsic",             "The index of the intrinsic function under construction or NUM_INTRINSICS.", False)
+
+		if self.prebuilt:
+			# the handwritten part of the prebuilt intrinsic library is compiled only
+			# if the generated code supports it
+			self.write(f, "#define MDL_JIT_PREBUILT_INTRINSICS 1\n\n")
+		if self.intrinsic_stats:
+			# enables the handwritten statistics query
+			self.write(f, "#define MDL_JIT_INTRINSIC_STATS 1\n\n")
 
 		# start class
 		self.write(f, "class MDL_runtime_creator {\n")
@@ -6240,6 +6968,12 @@ class SignatureParser:
 
 		self.create_check_state_module(f)
 
+		if self.prebuilt:
+			self.create_prebuilt_interface(f)
+
+		if self.intrinsic_stats:
+			self.create_intrinsic_stats_interface(f, intrinsics)
+
 		self.write(f, "/// Generate LLVM IR for an intrinsic function.\n")
 		self.write(f, "///\n")
 		self.write(f, "/// \\param func_def       The definition of the intrinsic function\n")
@@ -6262,6 +6996,7 @@ class SignatureParser:
 
 		self.write(f, "switch (func_def->get_semantics()) {\n")
 
+		self.stats.begin_phase("get_intrinsic_function")
 		for intrinsic in intrinsics:
 			mod_name = self.m_intrinsic_mods[intrinsic]
 			if mod_name == "" and intrinsic == "color":
@@ -6304,14 +7039,22 @@ class SignatureParser:
 
 		self.write(f, "}\n")
 
+		self.stats.begin_phase("generate_runtime_func_cache")
 		self.generate_runtime_func_cache(f)
 
 		# generate private helper functions
 		self.write_access_specifier(f, "private")
 
+		if self.intrinsic_stats:
+			self.create_construction_scope(f)
+
+		self.stats.begin_phase("create_signature_checker")
 		self.create_signature_checker(f)
+		self.stats.begin_phase("create_dispatch_functions")
+		self.create_dispatch_functions(f)
 
 		# create the constructor functions
+		self.stats.begin_phase("create_ir_constructors")
 		for intrinsic in intrinsics:
 			sigs = self.m_intrinsics[intrinsic]
 
@@ -6336,37 +7079,102 @@ class SignatureParser:
 		self.indent -= 1
 		self.write(f, "};\n")
 
+		self.stats.begin_phase("write_output")
+		content = f.getvalue()
+		self.stats.set_counter("emitted_bytes", len(content))
+		written = code_emitter.write_if_changed(self.out_name, content)
 		f.close()
-
-def usage(args):
-	"""print usage info and exit"""
-	print("Usage: %s stdlib_directory outputfile" % args[0])
-	return 1
+		self.stats.end_phase()
+		return written
+
+# the modules containing intrinsic functions
+intrinsic_modules = ["math", "state", "df", "tex", "scene", "debug"]
+
+# intrinsic functions not declared inside a module
+builtins_source = """
+	// spectrum constructor
+	export color color(float[<N>] wavelenghts, float[N] amplitudes) uniform [[ intrinsic() ]];
+
+	"""
+
+def generate(stdlib_dir, out_name, ir, stats = None, prebuilt = False, intrinsic_stats = False):
+	"""Generate out_name from the intrinsic declarations of the stdmodule IR ir.
+	   Returns True if out_name was (re)written."""
+	parser = SignatureParser("gen_intrinsic_func.py", stdlib_dir, out_name, True, ir, stats, prebuilt,
+		intrinsic_stats)
+	if stats != None:
+		stats.begin_phase("parse")
+	for mod_name in intrinsic_modules:
+		parser.parse(mod_name)
+	parser.parse_builtins(builtins_source)
+	ir.store()
+	return parser.finalize()
 
 def main(args):
 	"""Process one file and generate signatures."""
-	if len(args) != 3:
-		return usage(args)
+	opt_parser = OptionParser(usage="usage: %prog [options] stdlib_directory outputfile")
+	opt_parser.add_option("--cache",
+		help="file caching the input hashes, defaults to <outputfile>.cache",
+		dest="cache_name",
+		default=None)
+	opt_parser.add_option("--ir-cache",
+		help="directory caching the parsed stdmodule IR, shared with other generators",
+		dest="ir_cache",
+		default=None)
+	opt_parser.add_option("--no-cache",
+		help="always regenerate the output",
+		action="store_false", dest="use_cache",
+		default=True)
+	opt_parser.add_option("--prebuilt",
+		help="share the bodies of intrinsics depending only on their types through the prebuilt intrinsic library",
+		action="store_true", dest="prebuilt",
+		default=False)
+	opt_parser.add_option("--intrinsic-stats",
+		help="instrument the generated code to record per-intrinsic usage and construction times",
+		action="store_true", dest="intrinsic_stats",
+		default=False)
+	opt_parser.add_option("--stats",
+		help="write generation statistics as JSON to file STATS ('-' for stdout), implies --no-cache",
+		dest="stats_name",
+		default=None)
+	(options, args) = opt_parser.parse_args(args[1:])
+
+	if len(args) != 2:
+		opt_parser.print_usage()
+		return 1
 
-	stdlib_dir = args[1]
-	out_name   = args[2]
-	strict     = True
+	stdlib_dir = args[0]
+	out_name   = args[1]
 
 	try:
-		parser = SignatureParser(args[0], stdlib_dir, out_name, strict)
-		parser.parse("math")
-		parser.parse("state")
-		parser.parse("df")
-		parser.parse("tex")
-		parser.parse("scene")
-		parser.parse("debug")
-		parser.parse_builtins(
-			"""
-			// spectrum constructor
-			export color color(float[<N>] wavelenghts, float[N] amplitudes) uniform [[ intrinsic() ]];
-
-			""")
-		parser.finalize()
+		stats = generator_stats.GeneratorStats("gen_intrinsic_func")
+		cache = None
+		if options.use_cache and options.stats_name == None:
+			cache_name = options.cache_name
+			if cache_name == None:
+				cache_name = out_name + ".cache"
+			cache = GeneratorCache(cache_name)
+			cache.add_file("generator", os.path.abspath(__file__))
+			cache.add_file("scanner", mdl_decl_scanner.__file__)
+			cache.add_file("ir", stdmodule_ir.__file__)
+			cache.add_file("emitter", code_emitter.__file__)
+			for mod_name in intrinsic_modules:
+				cache.add_file(mod_name, stdlib_dir + "/" + mod_name + ".mdl")
+			cache.add_value("<builtins>", builtins_source)
+			cache.add_value("<options>", "prebuilt=%s intrinsic_stats=%s" % (
+				options.prebuilt, options.intrinsic_stats))
+			if cache.is_up_to_date(out_name):
+				# nothing changed, do not even parse
+				return 0
+
+		stats.begin_phase("load_ir")
+		ir = stdmodule_ir.IntrinsicIR(stdlib_dir, options.ir_cache)
+		generate(stdlib_dir, out_name, ir, stats, options.prebuilt, options.intrinsic_stats)
+
+		if cache:
+			cache.store(out_name)
+		if options.stats_name != None:
+			stats.write(options.stats_name)
 
 	except IOError as e:
 		error(str(e))
@@ -6381,4 +7189,3 @@ if __name__ == "__main__":
 		sys.exit(main([sys.argv[0]] + dbg_args))
 	else:
 		sys.exit(main(sys.argv))
-
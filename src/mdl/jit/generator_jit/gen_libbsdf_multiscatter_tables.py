@@ -32,13 +32,142 @@
 import sys
 import os
 import struct
+import array
+from optparse import OptionParser
+
+import embed_binary
 
 copyright_str = """/******************************************************************************
  * Copyright 2020 NVIDIA Corporation. All rights reserved.
  *****************************************************************************/
 """
 
-def process_data_set(table_data_filename, fout):
+# Compressed tables are quantized to 16 bits over the value range of the table. Inside
+# each row of res_theta + 1 values, a value is predicted linearly from the two previous
+# ones, the first value of a row from the first value of the previous row. The zigzag
+# encoded residuals are stored with a Rice code, whose parameter (4 bits) is chosen per
+# row. Residuals whose quotient does not fit into 32 unary bits are escaped by 32 one
+# bits followed by the residual in 20 bits.
+# This must match decode_multiscatter_table() in generator_jit_libbsdf_data.cpp.
+
+QUANT_MAX   = 65535
+ESCAPE_LEN  = 32
+ESCAPE_BITS = 20
+
+def to_float32(value):
+    """Round a value to single precision."""
+    return struct.unpack("f", struct.pack("f", value))[0]
+
+def quantization(values):
+    """Return the offset and the step size (both single precision) used to quantize values."""
+    lo = min(values)
+    hi = max(values)
+    step = to_float32((hi - lo) / QUANT_MAX)
+    if step <= 0.0:
+        step = 1.0
+    return lo, step
+
+def predict(row, i, prev_first):
+    """Predict the i-th value of a row."""
+    if i == 0:
+        return prev_first
+    if i == 1:
+        return row[0]
+    return 2 * row[i - 1] - row[i - 2]
+
+def rice_length(zs, z_max, k):
+    """Return the length of the Rice code of the values zs (maximum z_max) with parameter k."""
+    n = len(zs) * (k + 1)
+    if z_max >> k < ESCAPE_LEN:
+        return n + sum([z >> k for z in zs])
+    for z in zs:
+        u = z >> k
+        n += u if u < ESCAPE_LEN else ESCAPE_LEN + ESCAPE_BITS - k - 1
+    return n
+
+def rice_bits(zs, k):
+    """Return the Rice code of the values zs with parameter k as a string of bits."""
+    res = []
+    for z in zs:
+        u = z >> k
+        if u < ESCAPE_LEN:
+            res.append("1" * u + "0")
+            if k > 0:
+                res.append(format(z & ((1 << k) - 1), "0%db" % k))
+        else:
+            res.append("1" * ESCAPE_LEN + format(z, "0%db" % ESCAPE_BITS))
+    return "".join(res)
+
+def encode_table(values, row_len):
+    """Compress a table of floats, return the packed bytes, offset and step."""
+    lo, step = quantization(values)
+    q = [min(max(int(round((v - lo) / step)), 0), QUANT_MAX) for v in values]
+
+    bits = []
+    prev_first = 0
+    for s in range(0, len(q), row_len):
+        row = q[s:s + row_len]
+        zs = []
+        for i in range(len(row)):
+            r = row[i] - predict(row, i, prev_first)
+            zs.append(2 * r if r >= 0 else -2 * r - 1)
+        prev_first = row[0]
+
+        z_max = max(zs)
+        k = min(range(16), key = lambda k: rice_length(zs, z_max, k))
+        bits.append(format(k, "04b"))
+        bits.append(rice_bits(zs, k))
+
+    bits = "".join(bits)
+    bits += "0" * (-len(bits) % 8)
+    packed = bytearray([int(bits[i:i + 8], 2) for i in range(0, len(bits), 8)])
+    return bytes(packed), lo, step
+
+def decode_table(packed, n_values, row_len, lo, step):
+    """Decompress a table, the reverse of encode_table()."""
+    bits = "".join([format(b, "08b") for b in bytearray(packed)])
+    pos = 0
+    res = []
+    prev_first = 0
+    for s in range(0, n_values, row_len):
+        k = int(bits[pos:pos + 4], 2)
+        pos += 4
+        row = []
+        for i in range(min(row_len, n_values - s)):
+            u = bits.find("0", pos, pos + ESCAPE_LEN) - pos
+            if u >= 0:
+                pos += u + 1
+                z = u << k
+                if k > 0:
+                    z |= int(bits[pos:pos + k], 2)
+                    pos += k
+            else:
+                pos += ESCAPE_LEN
+                z = int(bits[pos:pos + ESCAPE_BITS], 2)
+                pos += ESCAPE_BITS
+            r = -((z + 1) >> 1) if z & 1 else z >> 1
+            row.append(predict(row, i, prev_first) + r)
+        prev_first = row[0]
+        res.extend(row)
+
+    # same as the C++ decoder: both the product and the sum are rounded to single precision
+    scaled = array.array("f", [v * step for v in res])
+    return array.array("f", [lo + v for v in scaled]).tolist()
+
+def float_literal(value):
+    """Return a C float literal that is exactly the given single precision value."""
+    s = "%.9g" % value
+    if "." not in s and "e" not in s:
+        s += ".0"
+    return s + "f"
+
+def write_accessor(fout, name, body):
+    """Write the accessor function of a table."""
+    fout.write("\nunsigned char const *get_libbsdf_multiscatter_data_%s()\n{\n" % name)
+    fout.write(body)
+    fout.write("}\n")
+
+def process_data_set(table_data_filename, fout, mode, compress):
     f = open(table_data_filename, "rb")
     name_we = os.path.basename(table_data_filename)
     name = os.path.splitext(name_we)[0]
@@ -59,8 +188,9 @@ def process_data_set(table_data_filename, fout):
         return -1
 
     expected_buffer_size = (res_ior * 2 + 1) * res_roughness * (res_theta + 1) * 4
-    bytes = f.read()
-    buffer_size = len(bytes)
+    header_size = f.tell()
+    buffer_size = os.path.getsize(table_data_filename) - header_size
+    f.close()
     if expected_buffer_size != buffer_size:
         print("unexpected size of dataset %s" % name)
         print("- expected_buffer_size: %d" % expected_buffer_size)
@@ -71,32 +201,90 @@ def process_data_set(table_data_filename, fout):
     fout.write("unsigned const libbsdf_multiscatter_res_roughness_%s = %d;\n" % (name, res_roughness))
     fout.write("unsigned const libbsdf_multiscatter_res_ior_%s = %d;\n" % (name, res_ior))
 
-    # process the actual data after the header
-    fout.write("unsigned char const libbsdf_multiscatter_data_%s[] = {\n" % name)
-    i = 0
-    fout.write("    ")
-    for byte in bytes:
-        if isinstance(byte, str):
-            byte = ord(byte)
-        fout.write("0x%02x, " % byte)
-        if i == 7:
-            fout.write("\n    ")
-            i = 0
-        else:
-            i += 1
+    if not compress:
+        # process the actual data after the header
+        embed_binary.write_array(
+            fout,
+            "static unsigned char const",
+            "libbsdf_multiscatter_data_" + name,
+            table_data_filename,
+            mode,
+            offset = header_size,
+            namespaces = ["mi", "mdl", "libbsdf_data"],
+            indent = "    ")
+        write_accessor(fout, name, "    return libbsdf_multiscatter_data_%s;\n" % name)
+        return 0
 
-    fout.write("};\n")
-    return 0
+    f = open(table_data_filename, "rb")
+    f.seek(header_size)
+    data = f.read()
+    f.close()
+    values = array.array("f")
+    if sys.version_info[0] < 3:
+        values.fromstring(data)
+    else:
+        values.frombytes(data)
 
-def usage():
-    print("Usage: %s <output directory> <inputfile1> <inputfile2> ..." % sys.argv[0])
-    return 1
+    row_len = res_theta + 1
+    n_values = len(values)
+    packed, lo, step = encode_table(values, row_len)
+
+    # validate: the decoded values must be within half a quantization step
+    max_error = 0.5 * step
+    tolerance = max_error + 1e-6 * max(abs(lo), abs(lo + QUANT_MAX * step))
+    decoded = decode_table(packed, n_values, row_len, lo, step)
+    error = max([abs(a - b) for a, b in zip(decoded, values)])
+    if len(decoded) != n_values or error > tolerance:
+        print("validation of the compressed dataset %s failed" % name)
+        print("- maximum error: %g" % error)
+        print("- tolerance: %g" % tolerance)
+        return -1
+
+    print("  compressed to %d bytes (%.1f%%), maximum error %.3g" % (
+        len(packed), 100.0 * len(packed) / buffer_size, error))
+
+    packed_name = os.path.join(
+        os.path.dirname(os.path.abspath(fout.name)), "libbsdf_multiscatter_%s.packed" % name)
+    embed_binary.write_file_if_changed(packed_name, packed)
+
+    fout.write("// quantized to 16 bits, maximum absolute error %.3g\n" % max_error)
+    embed_binary.write_array(
+        fout,
+        "static unsigned char const",
+        "libbsdf_multiscatter_packed_" + name,
+        packed_name,
+        mode,
+        namespaces = ["mi", "mdl", "libbsdf_data"],
+        indent = "    ")
+    write_accessor(fout, name, (
+        "    static float data[%(n)d];\n"
+        "    static bool const decoded = decode_multiscatter_table(\n"
+        "        data, %(n)d, %(row_len)d, %(lo)s, %(step)s,\n"
+        "        libbsdf_multiscatter_packed_%(name)s,\n"
+        "        sizeof(libbsdf_multiscatter_packed_%(name)s));\n"
+        "    return decoded ? reinterpret_cast<unsigned char const *>(data) : NULL;\n") % {
+            "n"       : n_values,
+            "row_len" : row_len,
+            "lo"      : float_literal(lo),
+            "step"    : float_literal(step),
+            "name"    : name })
+    return 0
 
 def main(args):
-    if len(args) < 3:
-        return usage()
+    parser = OptionParser(usage="usage: %prog [options] <output file> <inputfile1> <inputfile2> ...")
+    parser.add_option("-m", "--mode",
+        help="how to embed the tables: " + ", ".join(embed_binary.EMBED_MODES),
+        type="choice", choices=embed_binary.EMBED_MODES, dest="mode", default="hex")
+    parser.add_option("-c", "--compress",
+        help="compress the tables, they are decompressed on first use",
+        action="store_true", dest="compress", default=False)
+    (options, args) = parser.parse_args(args[1:])
+
+    if len(args) < 2:
+        parser.print_usage()
+        return 1
 
-    with open(args[1], "w") as f:
+    with open(args[0], "w") as f:
         f.write(copyright_str)
         f.write("\n")
         f.write("#include <mdl/jit/generator_jit/generator_jit_libbsdf_data.h>\n")
@@ -106,8 +294,8 @@ def main(args):
         f.write("namespace libbsdf_data {\n")
 
         # process all files
-        for x in range(2, len(args)):
-            res = process_data_set(args[x], f)
+        for x in range(1, len(args)):
+            res = process_data_set(args[x], f, options.mode, options.compress)
             if (res < 0):
                 print("res: %s" % res)
                 return -1
@@ -29,28 +29,25 @@
 
 import sys
 import os
+from optparse import OptionParser
 
-def xxd(filename, fout):
-	f = open(filename, "rb")
-	bytes = f.read()
-
-	i = 0
-	fout.write("\t")
-	for byte in bytes:
-		if isinstance(byte, str):
-			byte = ord(byte)
-		fout.write("0x%02x, " % byte)
-		if i == 7:
-			fout.write("\n\t")
-			i = 0
-		else:
-			i += 1
+import embed_binary
 
 def main(args):
-	filter         = args[1]
-	#CUDA_DIR      = args[2].replace("\\","/") #re-enable in case we update to newer LLVM
-	MISRC_DIR      = args[2].replace("\\","/")
-	IntDir         = args[3]
+	parser = OptionParser(usage="usage: %prog [options] <filter> <MISRC directory> <output directory>")
+	parser.add_option("-m", "--mode",
+		help="how to embed the bitcode: " + ", ".join(embed_binary.EMBED_MODES),
+		type="choice", choices=embed_binary.EMBED_MODES, dest="mode", default="hex")
+	(options, args) = parser.parse_args(args[1:])
+
+	if len(args) != 3:
+		parser.print_usage()
+		sys.exit(1)
+
+	filter         = args[0]
+	#CUDA_DIR      = args[1].replace("\\","/") #re-enable in case we update to newer LLVM
+	MISRC_DIR      = args[1].replace("\\","/")
+	IntDir         = args[2]
 
 	#LIBDEVICE_DIR = CUDA_DIR + "/nvvm/libdevice" #re-enable in case we update to newer LLVM
 	LIBDEVICE_DIR = MISRC_DIR + "/libdevice"
@@ -74,9 +71,8 @@ def main(args):
 
 	print("Generating %s ..." % out_name)
 	f = open(IntDir + "/" + out_name, "w")
-	f.write("static unsigned char const glue_bitcode[] = {\n")
-	xxd(IntDir + "/" + bc_name, f)
-	f.write("};\n")
+	embed_binary.write_array(
+		f, "static unsigned char const", "glue_bitcode", IntDir + "/" + bc_name, options.mode)
 	f.close()
 
 if __name__ == "__main__":
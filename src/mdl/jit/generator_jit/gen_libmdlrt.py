@@ -31,6 +31,9 @@
 
 import sys
 import os
+from optparse import OptionParser
+
+import embed_binary
 
 copyright_str = """
 /******************************************************************************
@@ -38,44 +41,28 @@ copyright_str = """
  *****************************************************************************/
 """
 
-def xxd(filename, fout):
-    f = open(filename, "rb")
-    bytes = f.read()
-
-    i = 0
-    fout.write("\t")
-    for byte in bytes:
-        if isinstance(byte, str):
-            byte = ord(byte)
-        fout.write("0x%02x, " % byte)
-        if i == 7:
-            fout.write("\n\t")
-            i = 0
-        else:
-            i += 1
-
-
-def usage():
-    print("Usage: %s <inputfile> <output directory>" % sys.argv[0])
-    return 1
-
-
 def main(args):
-    if len(args) != 3:
-        return usage()
+    parser = OptionParser(usage="usage: %prog [options] <inputfile> <output directory>")
+    parser.add_option("-m", "--mode",
+        help="how to embed the bitcode: " + ", ".join(embed_binary.EMBED_MODES),
+        type="choice", choices=embed_binary.EMBED_MODES, dest="mode", default="hex")
+    (options, args) = parser.parse_args(args[1:])
+
+    if len(args) != 2:
+        parser.print_usage()
+        return 1
 
-    bc_name        = args[1]
-    IntDir         = args[2]
+    bc_name        = args[0]
+    IntDir         = args[1]
 
     out_name = "libmdlrt_bitcode.h"
 
     print("Generating %s ..." % out_name)
     with open(os.path.join(IntDir, out_name), "w") as f:
         f.write(copyright_str)
-        f.write("\n// Automatically generated from libmdlrt.bc\n\n"
-            "static unsigned char const libmdlrt_bitcode[] = {\n")
-        xxd(bc_name, f)
-        f.write("};\n")
+        f.write("\n// Automatically generated from libmdlrt.bc\n\n")
+        embed_binary.write_array(
+            f, "static unsigned char const", "libmdlrt_bitcode", bc_name, options.mode)
 
     return 0
 
@@ -0,0 +1,175 @@
+#!/bin/env python
+#*****************************************************************************
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#  * Neither the name of NVIDIA CORPORATION nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#*****************************************************************************
+
+# This script generates the MDL runtime headers for libbsdf and the user modules and
+# optionally the intrinsic generator sources from a single parse of the standard modules.
+#
+# The standard modules are parsed once, then the independent outputs are generated
+# concurrently. Every output is only rewritten if its content changed.
+#
+# Call it like this:
+# python gen_runtime_headers.py --libbsdf-header ../libbsdf/libbsdf_runtime.h
+#     --user-modules-header ../../../prod/bin/mdl_sdk_example/user_modules/mdl_runtime.h
+#     ../../compiler/stdmodule
+#
+# python 2.7 or 3.x is needed
+#
+import sys
+
+from optparse import OptionParser
+
+import runtime_header
+import stdmodule_ir
+import gen_libbsdf_runtime_header
+import gen_user_modules_runtime_header
+import gen_intrinsic_func
+import gen_intrinsic_eval
+
+def error(msg):
+	"""Write a message to stderr"""
+	sys.stderr.write("gen_runtime_headers: Error: " + msg + "\n")
+
+def run_stage(stage):
+	"""Generate one output, return (output name, rewritten, error message)."""
+	kind, out_name, stdlib_dir, ir, prebuilt, intrinsic_stats = stage
+	try:
+		if kind == "libbsdf":
+			written = gen_libbsdf_runtime_header.generate(ir, out_name)
+		elif kind == "user_modules":
+			written = gen_user_modules_runtime_header.generate(ir, out_name)
+		elif kind == "intrinsic_func":
+			written = gen_intrinsic_func.generate(stdlib_dir, out_name, ir, None, prebuilt, intrinsic_stats)
+		else:
+			written = gen_intrinsic_eval.generate(stdlib_dir, out_name, ir)
+	except Exception as e:
+		return (out_name, False, str(e))
+	return (out_name, written, None)
+
+def run_stages(stages, jobs):
+	"""Run all stages, up to jobs processes at once."""
+	if jobs > 1 and len(stages) > 1:
+		# the stages are CPU bound, so run them in processes, each gets its copy of the IR
+		import multiprocessing
+		pool = multiprocessing.Pool(min(jobs, len(stages)))
+		try:
+			return pool.map(run_stage, stages)
+		finally:
+			pool.close()
+			pool.join()
+	return [run_stage(stage) for stage in stages]
+
+def default_jobs():
+	"""Return the default number of parallel stages."""
+	try:
+		import multiprocessing
+		return multiprocessing.cpu_count()
+	except:
+		return 1
+
+def main(args):
+	"""Parse the standard modules once and generate all requested outputs."""
+	opt_parser = OptionParser(usage="usage: %prog [options] stdlib_directory")
+	opt_parser.add_option("--ir-cache",
+		help="directory caching the parsed stdmodule IR, shared with other generators",
+		dest="ir_cache",
+		default=None)
+	opt_parser.add_option("--libbsdf-header",
+		help="generate the libbsdf runtime header LIBBSDF_HEADER",
+		dest="libbsdf_header",
+		default=None)
+	opt_parser.add_option("--user-modules-header",
+		help="generate the user modules runtime header USER_MODULES_HEADER",
+		dest="user_modules_header",
+		default=None)
+	opt_parser.add_option("--intrinsic-func",
+		help="generate the JIT intrinsic functions INTRINSIC_FUNC (generator_jit_intrinsic_func.i)",
+		dest="intrinsic_func",
+		default=None)
+	opt_parser.add_option("--intrinsic-eval",
+		help="generate the intrinsic evaluator INTRINSIC_EVAL (compilercore_intrinsic_eval.i)",
+		dest="intrinsic_eval",
+		default=None)
+	opt_parser.add_option("--prebuilt",
+		help="passed to gen_intrinsic_func.py",
+		action="store_true", dest="prebuilt",
+		default=False)
+	opt_parser.add_option("--intrinsic-stats",
+		help="passed to gen_intrinsic_func.py",
+		action="store_true", dest="intrinsic_stats",
+		default=False)
+	opt_parser.add_option("-j", "--jobs",
+		help="number of outputs generated in parallel (default: number of CPUs)",
+		type="int", dest="jobs",
+		default=default_jobs())
+	opt_parser.add_option("-v", "--verbose",
+		help="report the rewritten outputs",
+		action="store_true", dest="verbose",
+		default=False)
+	(options, args) = opt_parser.parse_args(args[1:])
+
+	if len(args) != 1:
+		opt_parser.print_usage()
+		return 1
+
+	stdlib_dir = args[0]
+
+	# the outputs and the standard modules they need
+	outputs = [
+		("libbsdf",        options.libbsdf_header,      runtime_header.runtime_modules),
+		("user_modules",   options.user_modules_header, runtime_header.runtime_modules),
+		("intrinsic_func", options.intrinsic_func,      gen_intrinsic_func.intrinsic_modules),
+		("intrinsic_eval", options.intrinsic_eval,      ["math"]),
+	]
+
+	try:
+		# parse every needed module exactly once, the stages only read the IR
+		ir = stdmodule_ir.IntrinsicIR(stdlib_dir, options.ir_cache)
+		stages = []
+		for kind, out_name, modules in outputs:
+			if out_name == None:
+				continue
+			for mod_name in modules:
+				ir.get_declarations(mod_name)
+			stages.append((kind, out_name, stdlib_dir, ir, options.prebuilt, options.intrinsic_stats))
+		ir.store()
+
+		failed = False
+		for out_name, written, msg in run_stages(stages, options.jobs):
+			if msg != None:
+				error("%s: %s" % (out_name, msg))
+				failed = True
+			elif written and options.verbose:
+				print("Generated %s" % out_name)
+	except IOError as e:
+		error(str(e))
+		return 1
+	return 1 if failed else 0
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv))
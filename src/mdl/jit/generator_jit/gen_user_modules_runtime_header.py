@@ -32,13 +32,22 @@
 # Call it like this:
 # python gen_user_modules_runtime_header.py ../../compiler/stdmodule ../../../prod/bin/mdl_sdk_example/user_modules/mdl_runtime.h
 #
-# python 2.6 or higher is needed
+# python 2.7 or 3.x is needed
 #
 import sys
 import re
 import os
 
-from gen_intrinsic_func import SignatureParser, error
+from optparse import OptionParser
+
+import runtime_header
+import stdmodule_ir
+import code_emitter
+from runtime_header import reference_parameter_types
+
+def error(msg):
+    """Write a message to stderr"""
+    sys.stderr.write("gen_user_modules_runtime_header: Error: " + msg + "\n")
 
 type_map = {
     "int2": "vint2",
@@ -58,59 +67,6 @@ type_map = {
     "bool4": "vbool4",
 }
 
-reference_parameter_types = {
-    "bool2",
-    "bool3",
-    "bool4",
-    "color",
-    "double2",
-    "double3",
-    "double4",
-    "float2",
-    "float3",
-    "float4",
-    "int2",
-    "int3",
-    "int4"
-}
-
-
-def eat_until(token_set, tokens):
-    """eat tokens until token_kind is found and return them, handle parenthesis"""
-    r = 0
-    e = 0
-    g = 0
-    a = 0
-    l = len(tokens)
-    eaten_tokens = []
-    while l > 0:
-        tok = tokens[0]
-        if r == 0 and e == 0 and g == 0 and a == 0 and tok in token_set:
-            return eaten_tokens, tokens
-        if tok == '(':
-            r += 1
-        elif tok == ')':
-            r -= 1
-        elif tok == '[':
-            e += 1
-        elif tok == ']':
-            e -= 1
-        elif tok == '{':
-            g += 1
-        elif tok == '}':
-            g -= 1
-        elif tok == '[[':
-            a += 1
-        elif tok == ']]':
-            a -= 1
-        eaten_tokens.append(tokens[0])
-        tokens = tokens[1:]
-        l -= 1
-
-    # do not return empty tokens, the parser do not like that
-    return eaten_tokens, [None]
-
-
 def format_param(param):
     typename, name, defparam = param
 
@@ -126,121 +82,49 @@ def format_param(param):
     return res
 
 
-def parse_prototype(sigparser, decl, prototypes):
+def create_prototype(decl):
     """Get the C++ prototype for a given function declaration."""
-    # poor man's scanner :-)
-    tokens = re.sub(r'[,()]', lambda m: ' ' + m.group(0) + ' ', decl).split()
-
-    tokens, ret_type = sigparser.get_type(tokens)
-
-    name = tokens[0]
-
-    if tokens[1] != '(':
-        error("unknown token '" + tokens[1] + "' while processing '" + decl + "': '(' expected")
-        sys.exit(1)
-
-    tokens = tokens[2:]
-
-    params = []
-
-    if tokens[0] != ')':
-        while True:
-            tokens, t = sigparser.get_type(tokens)
-            paramname = tokens[0]
-            tokens = tokens[1:]
-
-            if tokens[0] == '=':
-                # default argument
-                defarg, tokens = eat_until({',':None, ')':None}, tokens[1:])
-            else:
-                defarg = []
-
-            params.append((t, paramname, ''.join(defarg)))
-
-            if tokens[0] == ')':
-                break
-            if tokens[0] != ',':
-                error("unknown token '" + tokens[1] + "' while processing '"
-                        + decl + "': ',' expected")
-                sys.exit(1)
-            # skip the comma
-            tokens = tokens[1:]
+    ret_type = decl.ret_type
+    name     = decl.name
+    params   = list(decl.params)
 
     ret_type = type_map.get(ret_type, ret_type)
 
     prototype = "%s %s(%s);" % (ret_type, name, ", ".join(map(format_param, params)))
     if "[" in ret_type or name == "transpose" or "[<N>]" in prototype or "color " in prototype:
         prototype = "// %s  (not supported yet)" % prototype
-    prototypes.append(prototype)
-
-
-def print_wrapped(parser, fileobj, line, wrap_pos = 99):
-    """print the given line (provided without newline at end) and wrap it at wrap_pos,
-       splitting the line at commas. Also handles commented out lines."""
-    orig_line = line
-    prefix = ""
-    next_prefix = "//     " if line.startswith("//") else "    "
-
-    while parser.indent * 4 + len(prefix) + len(line) >= wrap_pos:
-        splitpos = line.rfind(',', 0, wrap_pos - parser.indent * 4 - len(prefix))
-        if splitpos == -1:
-            raise Exception("Unable to split line: %s" % orig_line)
-        parser.write(fileobj, prefix + line[:splitpos + 1] + "\n")
-        line = line[splitpos + 1:].lstrip()
-        prefix = next_prefix
+    return prototype
 
-    parser.write(fileobj, prefix + line + "\n")
 
-
-def usage(args):
-    """print usage info and exit"""
-    print "Usage: %s stdlib_directory outputfile" % args[0]
-    return 1
+def generate(ir, out_name):
+    """Generate the user modules runtime header out_name, return True if it was (re)written."""
+    # copy the copyright from first 3 lines of state.cpp
+    copyright = runtime_header.read_copyright(os.path.join(os.path.dirname(out_name), "state.cpp"))
+    content = runtime_header.generate_header(
+        ir, copyright, "MDL_USER_MODULES_MDL_RUNTIME_H", create_prototype)
+    return code_emitter.write_if_changed(out_name, content)
 
 
 def main(args):
     """Process one file and generate signatures."""
-    if len(args) != 3:
-        return usage(args)
-
-    stdlib_dir = args[1]
-    out_name   = args[2]
-    strict     = True
-
-    prototypes = []
+    opt_parser = OptionParser(usage="usage: %prog [options] stdlib_directory outputfile")
+    opt_parser.add_option("--ir-cache",
+        help="directory caching the parsed stdmodule IR, shared with other generators",
+        dest="ir_cache",
+        default=None)
+    (options, args) = opt_parser.parse_args(args[1:])
+
+    if len(args) != 2:
+        opt_parser.print_usage()
+        return 1
 
-    # monkey patch SignatureParser to generate signature names suitable for C++ header files
-    SignatureParser.get_signature = (
-        lambda self, decl: parse_prototype(self, decl, prototypes))
+    stdlib_dir = args[0]
+    out_name   = args[1]
 
     try:
-        parser = SignatureParser(args[0], stdlib_dir, out_name, strict)
-
-        # copy the copyright from first 3 lines of state.cpp
-        state_cpp_path = os.path.join(os.path.dirname(out_name), "state.cpp")
-        with open(state_cpp_path) as f:
-            copyright = "".join([next(f) for x in xrange(3)])
-
-        with open(out_name, "w") as f:
-            parser.write(f, copyright)
-            parser.write(f, "\n#ifndef MDL_USER_MODULES_MDL_RUNTIME_H\n"
-                "#define MDL_USER_MODULES_MDL_RUNTIME_H\n")
-
-            for module_name in ["math", "debug"]:
-                # clear list before parsing next module
-                del prototypes[:]
-
-                parser.parse(module_name)
-
-                parser.write(f, "\nnamespace %s\n" % module_name)
-                parser.write(f, "{\n")
-                parser.indent += 1
-                for prototype in prototypes:
-                    print_wrapped(parser, f, prototype)
-                parser.indent -= 1
-                parser.write(f, "}\n")
-
-            parser.write(f, "\n#endif  // MDL_USER_MODULES_MDL_RUNTIME_H\n")
+        ir = stdmodule_ir.IntrinsicIR(stdlib_dir, options.ir_cache)
+        generate(ir, out_name)
+        ir.store()
 
     except Exception as e:
         error(str(e))
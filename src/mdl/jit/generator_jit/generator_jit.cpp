@@ -82,10 +82,22 @@ Code_generator_jit::Code_generator_jit(
         MDL_JIT_OPTION_FAST_MATH,
         "true",
         "Enables unsafe math optimizations of the JIT code generator");
+    m_options.add_option(
+        MDL_JIT_OPTION_BUFFERED_PRINT,
+        "false",
+        "Write the output of debug::print() into the print buffer of the resource data");
     m_options.add_option(
         MDL_JIT_OPTION_INLINE_AGGRESSIVELY,
         "false",
         "Instructs the JIT code generator to aggressively inline functions");
+    m_options.add_option(
+        MDL_JIT_OPTION_PREBUILT_INTRINSICS,
+        "true",
+        "Take the bodies of type-only intrinsic functions from the process-wide prebuilt library");
+    m_options.add_option(
+        MDL_JIT_OPTION_VECTOR_RUNTIME,
+        "false",
+        "Compute component-wise float vector math with SIMD-wide runtime functions");
     m_options.add_option(
         MDL_JIT_OPTION_EVAL_DAG_TERNARY_STRICTLY,
         "true",
@@ -175,9 +187,18 @@ mi::base::IInterface const *Code_generator_jit::get_interface(
     if (interface_id == IPrinter_interface::IID()) {
         return m_builder.create<JIT_code_printer>(m_builder.get_allocator());
     }
+    if (interface_id == IJIT_intrinsic_stats::IID()) {
+        return m_builder.create<JIT_intrinsic_stats>(m_builder.get_allocator());
+    }
     return Base::get_interface(interface_id);
 }
 
+// Print the usage statistics of the intrinsic functions as JSON.
+bool JIT_intrinsic_stats::print(IOutput_stream *out) const
+{
+    return LLVM_code_generator::print_intrinsic_stats(out);
+}
+
 // Compile a whole module.
 IGenerated_code_executable *Code_generator_jit::compile(
     IModule const    *module,
@@ -426,6 +447,9 @@ IGenerated_code_lambda_function *Code_generator_jit::compile_into_const_function
         // copy the render state usage
         code->set_render_state_usage(code_gen.get_render_state_usage());
 
+        // collect the output of debug::print() per call in buffered print mode
+        code->set_buffered_print(code_gen.is_buffered_print_enabled());
+
         // create the argument block layout if any arguments are captured
         if (code_gen.get_captured_arguments_llvm_type() != NULL) {
             mi::base::Handle<Generated_code_value_layout> layout(
@@ -516,6 +540,9 @@ IGenerated_code_lambda_function *Code_generator_jit::compile_into_switch_functio
         // copy the render state usage
         code->set_render_state_usage(code_gen.get_render_state_usage());
 
+        // collect the output of debug::print() per call in buffered print mode
+        code->set_buffered_print(code_gen.is_buffered_print_enabled());
+
         // create the argument block layout if any arguments are captured
         if (code_gen.get_captured_arguments_llvm_type() != NULL) {
             mi::base::Handle<Generated_code_value_layout> layout(
@@ -593,6 +620,7 @@ IGenerated_code_executable *Code_generator_jit::compile_into_switch_function_for
         hasher.update(m_options.get_float_option(MDL_CG_OPTION_WAVELENGTH_MAX));
         hasher.update(m_options.get_int_option(MDL_JIT_OPTION_OPT_LEVEL));
         hasher.update(m_options.get_bool_option(MDL_JIT_OPTION_FAST_MATH));
+        hasher.update(m_options.get_bool_option(MDL_JIT_OPTION_VECTOR_RUNTIME));
         hasher.update(m_options.get_bool_option(MDL_JIT_OPTION_INLINE_AGGRESSIVELY));
         hasher.update(m_options.get_bool_option(MDL_JIT_OPTION_EVAL_DAG_TERNARY_STRICTLY));
         hasher.update(m_options.get_bool_option(MDL_JIT_OPTION_DISABLE_EXCEPTIONS));
@@ -601,6 +629,7 @@ IGenerated_code_executable *Code_generator_jit::compile_into_switch_function_for
         hasher.update(m_options.get_string_option(MDL_JIT_OPTION_TEX_LOOKUP_CALL_MODE));
         hasher.update(m_options.get_bool_option(MDL_JIT_OPTION_MAP_STRINGS_TO_IDS));
         hasher.update(m_options.get_string_option(MDL_JIT_OPTION_SCENE_DATA_NAMES));
+        hasher.update(m_options.get_bool_option(MDL_JIT_OPTION_BUFFERED_PRINT));
 
         hasher.final(cache_key);
 
@@ -754,6 +783,9 @@ IGenerated_code_lambda_function *Code_generator_jit::compile_into_generic_functi
         // copy the render state usage
         code->set_render_state_usage(code_gen.get_render_state_usage());
 
+        // collect the output of debug::print() per call in buffered print mode
+        code->set_buffered_print(code_gen.is_buffered_print_enabled());
+
         // create the argument block layout if any arguments are captured
         if (code_gen.get_captured_arguments_llvm_type() != NULL) {
             mi::base::Handle<Generated_code_value_layout> layout(
@@ -943,6 +975,9 @@ IGenerated_code_executable *Code_generator_jit::compile_distribution_function_cp
         // copy the render state usage
         code->set_render_state_usage(code_gen.get_render_state_usage());
 
+        // collect the output of debug::print() per call in buffered print mode
+        code->set_buffered_print(code_gen.is_buffered_print_enabled());
+
         // create the argument block layout if any arguments are captured
         if (code_gen.get_captured_arguments_llvm_type() != NULL) {
             mi::base::Handle<Generated_code_value_layout> layout(
@@ -1260,6 +1295,7 @@ IGenerated_code_executable *Code_generator_jit::compile_into_source(
         hasher.update(m_options.get_float_option(MDL_CG_OPTION_WAVELENGTH_MAX));
         hasher.update(m_options.get_int_option(MDL_JIT_OPTION_OPT_LEVEL));
         hasher.update(m_options.get_bool_option(MDL_JIT_OPTION_FAST_MATH));
+        hasher.update(m_options.get_bool_option(MDL_JIT_OPTION_VECTOR_RUNTIME));
         hasher.update(m_options.get_bool_option(MDL_JIT_OPTION_INLINE_AGGRESSIVELY));
         hasher.update(m_options.get_bool_option(MDL_JIT_OPTION_EVAL_DAG_TERNARY_STRICTLY));
         hasher.update(m_options.get_bool_option(MDL_JIT_OPTION_DISABLE_EXCEPTIONS));
@@ -1268,6 +1304,7 @@ IGenerated_code_executable *Code_generator_jit::compile_into_source(
         hasher.update(m_options.get_string_option(MDL_JIT_OPTION_TEX_LOOKUP_CALL_MODE));
         hasher.update(m_options.get_bool_option(MDL_JIT_OPTION_MAP_STRINGS_TO_IDS));
         hasher.update(m_options.get_string_option(MDL_JIT_OPTION_SCENE_DATA_NAMES));
+        hasher.update(m_options.get_bool_option(MDL_JIT_OPTION_BUFFERED_PRINT));
 
         if (code_kind == IGenerated_code_executable::CK_HLSL) {
             hasher.update(m_options.get_bool_option(MDL_JIT_OPTION_HLSL_USE_RESOURCE_DATA));
@@ -1515,6 +1552,9 @@ IGenerated_code_executable *Code_generator_jit::compile_unit(
         // copy the render state usage
         code->set_render_state_usage(unit->get_render_state_usage());
 
+        // collect the output of debug::print() per call in buffered print mode
+        code->set_buffered_print(unit->is_buffered_print_enabled());
+
         // add all argument block layouts
         for (size_t i = 0, num = unit.get_arg_block_layout_count(); i < num; ++i)
             code->add_captured_arguments_layout(
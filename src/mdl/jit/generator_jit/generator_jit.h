@@ -305,6 +305,23 @@ private:
     Resource_tag_map m_resource_tag_map;
 };
 
+///
+/// Implementation of the usage statistics of the intrinsic functions.
+///
+class JIT_intrinsic_stats : public Allocator_interface_implement<IJIT_intrinsic_stats>
+{
+    typedef Allocator_interface_implement<IJIT_intrinsic_stats> Base;
+public:
+    /// Constructor.
+    explicit JIT_intrinsic_stats(IAllocator *alloc)
+    : Base(alloc)
+    {
+    }
+
+    /// Print the usage statistics of the intrinsic functions as JSON.
+    bool print(IOutput_stream *out) const MDL_FINAL;
+};
+
 ///
 /// Implementation of the code generator for executable code.
 ///
@@ -86,6 +86,7 @@ Function_context::Function_context(
 , m_di_function(NULL)
 , m_dilb_stack(DILB_stack::container_type(alloc))
 , m_accesible_parameters(alloc)
+, m_scene_data_memo_slots(alloc)
 {
     // fill the array type map
     Function_instance::Array_instances const &ais(func_inst.get_array_instances());
@@ -225,6 +226,7 @@ Function_context::Function_context(
  , m_di_function()
  , m_dilb_stack(DILB_stack::container_type(alloc))
  , m_accesible_parameters(alloc)
+ , m_scene_data_memo_slots(alloc)
 {
     // set fast-math flags
     llvm::FastMathFlags FMF;
@@ -3381,6 +3383,38 @@ llvm::Value *Function_context::get_tex_lookup_func(
     return llvm::UndefValue::get(f_type);
 }
 
+// Get the memoization slot of a uniform scene data lookup in the current function.
+bool Function_context::get_scene_data_memo_slot(
+    llvm::Function *callee,
+    llvm::Value    *name,
+    llvm::Value    *def_value,
+    llvm::Type     *type,
+    llvm::Value    *&valid_adr,
+    llvm::Value    *&value_adr)
+{
+    // no start point to invalidate the slot in modification mode
+    if (m_body_start_point == NULL)
+        return false;
+
+    for (size_t i = 0, n = m_scene_data_memo_slots.size(); i < n; ++i) {
+        Scene_data_memo_slot const &slot = m_scene_data_memo_slots[i];
+        if (slot.callee == callee && slot.name == name && slot.def_value == def_value) {
+            valid_adr = slot.valid_adr;
+            value_adr = slot.value_adr;
+            return true;
+        }
+    }
+
+    llvm::Type *flag_type = llvm::IntegerType::get(m_llvm_context, 1);
+    valid_adr = create_local(flag_type, "memo_valid");
+    value_adr = create_local(type, "memo_value");
+    new llvm::StoreInst(llvm::ConstantInt::getFalse(flag_type), valid_adr, m_body_start_point);
+
+    Scene_data_memo_slot slot = { callee, name, def_value, valid_adr, value_adr };
+    m_scene_data_memo_slots.push_back(slot);
+    return true;
+}
+
 // Get the current line (computed from current position debug info)
 int Function_context::get_dbg_curr_line()
 {
@@ -834,6 +834,28 @@ public:
         llvm::Value                                    *self,
         mi::mdl::Type_mapper::Tex_handler_vtable_index index);
 
+    /// Get the memoization slot of a uniform scene data lookup in the current function,
+    /// create one if necessary.
+    /// The slot is invalidated at the function start, so a memoized value lives for one
+    /// invocation of the function, in which the object and hence all uniform scene data
+    /// are fixed.
+    ///
+    /// \param[in]  callee     the lookup function
+    /// \param[in]  name       the constant scene data name (id)
+    /// \param[in]  def_value  the constant default value
+    /// \param[in]  type       the LLVM type of the looked up value
+    /// \param[out] valid_adr  the address of an i1 flag, true if the slot is filled
+    /// \param[out] value_adr  the address of the memoized value
+    ///
+    /// \return false if no slot can be created in this context
+    bool get_scene_data_memo_slot(
+        llvm::Function *callee,
+        llvm::Value    *name,
+        llvm::Value    *def_value,
+        llvm::Type     *type,
+        llvm::Value    *&valid_adr,
+        llvm::Value    *&value_adr);
+
     /// Get the current line (computed from current position debug info)
     int get_dbg_curr_line();
 
@@ -1007,6 +1029,20 @@ private:
 
     /// Helper: Accessible function parameters when translating an expression.
     Definition_vector m_accesible_parameters;
+
+    /// A memoization slot of a uniform scene data lookup.
+    struct Scene_data_memo_slot {
+        llvm::Function *callee;     ///< the lookup function
+        llvm::Value    *name;       ///< the constant scene data name (id)
+        llvm::Value    *def_value;  ///< the constant default value
+        llvm::Value    *valid_adr;  ///< address of the flag, true if the value was looked up
+        llvm::Value    *value_adr;  ///< address of the looked up value
+    };
+
+    typedef mi::mdl::vector<Scene_data_memo_slot>::Type Scene_data_memo_slots;
+
+    /// The memoization slots of uniform scene data lookups of the current function.
+    Scene_data_memo_slots m_scene_data_memo_slots;
 };
 
 }  // mdl
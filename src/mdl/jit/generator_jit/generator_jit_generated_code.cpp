@@ -28,6 +28,11 @@
 
 #include "pch.h"
 
+#include <cstdio>
+#include <cstring>
+
+#include <mi/mdl/mdl_streams.h>
+
 #include <mdl/compiler/compilercore/compilercore_errors.h>
 #include <mdl/compiler/compilercore/compilercore_mdl.h>
 #include <mdl/compiler/compilercore/compilercore_printers.h>
@@ -1261,6 +1266,7 @@ Generated_code_lambda_function::Generated_code_lambda_function(
     IGenerated_code_executable::SU_ALL_UNIFORM_MASK)
 , m_captured_arguments_layouts(get_allocator())
 , m_mappend_strings(get_allocator())
+, m_buffered_print(false)
 {
 }
 
@@ -1443,6 +1449,155 @@ void Generated_code_lambda_function::term()
     }
 }
 
+// The number of words of the print buffer of one call in buffered print mode.
+static unsigned const PRINT_BUFFER_WORDS = 4096;
+
+// Constructor.
+Generated_code_lambda_function::Print_scope::Print_scope(
+    Generated_code_lambda_function const &code,
+    Res_data_pair                        &pair)
+: m_code(code)
+{
+    m_buffer.data     = NULL;
+    m_buffer.capacity = PRINT_BUFFER_WORDS;
+    m_buffer.head     = 0;
+    m_buffer.tail     = 0;
+    m_buffer.dropped  = 0;
+
+    if (code.m_buffered_print) {
+        IAllocator *alloc = code.m_jitted_code->get_allocator();
+        m_buffer.data = reinterpret_cast<tct_uint *>(
+            alloc->malloc(PRINT_BUFFER_WORDS * sizeof(tct_uint)));
+        pair.set_print_buffer(&m_buffer);
+    }
+}
+
+// Destructor.
+Generated_code_lambda_function::Print_scope::~Print_scope()
+{
+    if (m_buffer.data == NULL)
+        return;
+
+    IAllocator *alloc = m_code.m_jitted_code->get_allocator();
+    unsigned   used   = m_buffer.head - m_buffer.tail;
+    if (used > m_buffer.capacity)
+        used = m_buffer.capacity;
+    unsigned end = m_buffer.tail + used;
+
+    // records are complete up to the head or the first dropped record
+    for (unsigned pos = m_buffer.tail; pos != end;) {
+        unsigned n_words = word(pos);
+        if (n_words == MDL_PRINT_RECORD_DROPPED || n_words == 0 || n_words > end - pos)
+            break;
+
+        string line(alloc);
+        for (unsigned p = pos + 1, rec_end = pos + n_words; p != rec_end;) {
+            unsigned tag   = word(p++);
+            unsigned kind  = tag & 0xff;
+            unsigned count = (tag >> 8) & 0xff;
+            unsigned flags = tag >> 16;
+
+            char const *open  = "";
+            char const *close = "";
+            if (flags & PRINT_FLAG_COLOR) {
+                open  = "(";
+                close = ")";
+            } else if (flags & PRINT_FLAG_VECTOR) {
+                open  = "<";
+                close = ">";
+            }
+
+            line += open;
+            for (unsigned i = 0; i < count; ++i) {
+                if (i > 0)
+                    line += ", ";
+                format_element(line, p, kind);
+            }
+            line += close;
+        }
+        pos += n_words;
+
+        // print like debug::print() does without buffering
+        if (i_debug_log != NULL) {
+            i_debug_log->write(line.c_str());
+        } else {
+            printf("%s", line.c_str());
+        }
+    }
+
+    if (m_buffer.dropped > 0) {
+        char buf[96];
+        snprintf(
+            buf, sizeof(buf),
+            "[%u debug::print() calls dropped, the print buffer is full]\n",
+            m_buffer.dropped);
+        buf[sizeof(buf) - 1] = '\0';
+        if (i_debug_log != NULL) {
+            i_debug_log->write(buf);
+        } else {
+            printf("%s", buf);
+        }
+    }
+
+    alloc->free(m_buffer.data);
+}
+
+// Format one element of a printed value.
+void Generated_code_lambda_function::Print_scope::format_element(
+    string   &line,
+    unsigned &pos,
+    unsigned kind) const
+{
+    char buf[64];
+
+    switch (kind) {
+    case PRINT_VALUE_BOOL:
+        line += word(pos++) != 0 ? "true" : "false";
+        return;
+    case PRINT_VALUE_INT:
+        snprintf(buf, sizeof(buf), "%d", int(word(pos++)));
+        break;
+    case PRINT_VALUE_FLOAT:
+        {
+            unsigned bits = word(pos++);
+            float    f;
+            memcpy(&f, &bits, sizeof(f));
+            snprintf(buf, sizeof(buf), "%f", f);
+        }
+        break;
+    case PRINT_VALUE_DOUBLE:
+        {
+            mi::Uint64 lo   = word(pos++);
+            mi::Uint64 hi   = word(pos++);
+            mi::Uint64 bits = lo | (hi << 32);
+            double     d;
+            memcpy(&d, &bits, sizeof(d));
+            snprintf(buf, sizeof(buf), "%f", d);
+        }
+        break;
+    case PRINT_VALUE_STRING_ID:
+        {
+            char const *s = m_code.get_string_constant(word(pos++));
+            line += s != NULL ? s : "";
+        }
+        return;
+    case PRINT_VALUE_STRING_PTR:
+        {
+            // native code, the address is valid in this process
+            mi::Uint64 lo = word(pos++);
+            mi::Uint64 hi = word(pos++);
+            char const *s = reinterpret_cast<char const *>(size_t(lo | (hi << 32)));
+            line += s != NULL ? s : "";
+        }
+        return;
+    default:
+        MDL_ASSERT(!"unexpected print value kind");
+        return;
+    }
+    buf[sizeof(buf) - 1] = '\0';
+    line += buf;
+}
+
 // Run the environment function on the current transaction.
 bool Generated_code_lambda_function::run_environment(
     size_t                          index,
@@ -1453,6 +1608,7 @@ bool Generated_code_lambda_function::run_environment(
     if (!m_aborted && index < m_jitted_funcs.size()) {
         Exc_state     exc(m_exc_handler, m_aborted);
         Res_data_pair pair(m_res_data, tex_data);
+        Print_scope   print(*this, pair);
 
         if (setjmp(exc.env) == 0) {
             Env_func *env_func = reinterpret_cast<Env_func *>(m_jitted_funcs[index]);
@@ -1472,6 +1628,7 @@ bool Generated_code_lambda_function::run(bool &result)
     if (!m_aborted && m_jitted_funcs.size() > 0) {
         Exc_state     exc(m_exc_handler, m_aborted);
         Res_data_pair pair(m_res_data, NULL);
+        Print_scope   print(*this, pair);
 
         if (setjmp(exc.env) == 0) {
             Lambda_func_bool *bool_func = reinterpret_cast<Lambda_func_bool *>(m_jitted_funcs[0]);
@@ -1488,6 +1645,7 @@ bool Generated_code_lambda_function::run(int &result)
     if (!m_aborted && m_jitted_funcs.size() > 0) {
         Exc_state     exc(m_exc_handler, m_aborted);
         Res_data_pair pair(m_res_data, NULL);
+        Print_scope   print(*this, pair);
 
         if (setjmp(exc.env) == 0) {
             Lambda_func_int *int_func = reinterpret_cast<Lambda_func_int *>(m_jitted_funcs[0]);
@@ -1504,6 +1662,7 @@ bool Generated_code_lambda_function::run(unsigned &result)
     if (!m_aborted && m_jitted_funcs.size() > 0) {
         Exc_state     exc(m_exc_handler, m_aborted);
         Res_data_pair pair(m_res_data, NULL);
+        Print_scope   print(*this, pair);
 
         if (setjmp(exc.env) == 0) {
             Lambda_func_unsigned *unsigned_func =
@@ -1521,6 +1680,7 @@ bool Generated_code_lambda_function::run(float &result)
     if (!m_aborted && m_jitted_funcs.size() > 0) {
         Exc_state     exc(m_exc_handler, m_aborted);
         Res_data_pair pair(m_res_data, NULL);
+        Print_scope   print(*this, pair);
 
         if (setjmp(exc.env) == 0) {
             Lambda_func_float *float_func =
@@ -1538,6 +1698,7 @@ bool Generated_code_lambda_function::run(Float2_struct &result)
     if (!m_aborted && m_jitted_funcs.size() > 0) {
         Exc_state     exc(m_exc_handler, m_aborted);
         Res_data_pair pair(m_res_data, NULL);
+        Print_scope   print(*this, pair);
 
         if (setjmp(exc.env) == 0) {
             Lambda_func_float2 *float2_func =
@@ -1555,6 +1716,7 @@ bool Generated_code_lambda_function::run(Float3_struct &result)
     if (!m_aborted && m_jitted_funcs.size() > 0) {
         Exc_state     exc(m_exc_handler, m_aborted);
         Res_data_pair pair(m_res_data, NULL);
+        Print_scope   print(*this, pair);
 
         if (setjmp(exc.env) == 0) {
             Lambda_func_float3 *float3_func =
@@ -1572,6 +1734,7 @@ bool Generated_code_lambda_function::run(Float4_struct &result)
     if (!m_aborted && m_jitted_funcs.size() > 0) {
         Exc_state     exc(m_exc_handler, m_aborted);
         Res_data_pair pair(m_res_data, NULL);
+        Print_scope   print(*this, pair);
 
         if (setjmp(exc.env) == 0) {
             Lambda_func_float4 *float4_func =
@@ -1589,6 +1752,7 @@ bool Generated_code_lambda_function::run(Matrix3x3_struct &result)
     if (!m_aborted && m_jitted_funcs.size() > 0) {
         Exc_state     exc(m_exc_handler, m_aborted);
         Res_data_pair pair(m_res_data, NULL);
+        Print_scope   print(*this, pair);
 
         if (setjmp(exc.env) == 0) {
             Lambda_func_float3x3 *float3x3_func =
@@ -1606,6 +1770,7 @@ bool Generated_code_lambda_function::run(Matrix4x4_struct &result)
     if (!m_aborted && m_jitted_funcs.size() > 0) {
         Exc_state     exc(m_exc_handler, m_aborted);
         Res_data_pair pair(m_res_data, NULL);
+        Print_scope   print(*this, pair);
 
         if (setjmp(exc.env) == 0) {
             Lambda_func_float4x4 *float4x4_func =
@@ -1623,6 +1788,7 @@ bool Generated_code_lambda_function::run(char const *&result)
     if (!m_aborted && m_jitted_funcs.size() > 0) {
         Exc_state     exc(m_exc_handler, m_aborted);
         Res_data_pair pair(m_res_data, NULL);
+        Print_scope   print(*this, pair);
 
         if (setjmp(exc.env) == 0) {
             Lambda_func_string *string_func =
@@ -1645,6 +1811,7 @@ bool Generated_code_lambda_function::run_core(
     if (!m_aborted && m_jitted_funcs.size() > 0) {
         Exc_state     exc(m_exc_handler, m_aborted);
         Res_data_pair pair(m_res_data, tex_data);
+        Print_scope   print(*this, pair);
 
         if (setjmp(exc.env) == 0) {
             Core_func *core_func = reinterpret_cast<Core_func *>(m_jitted_funcs[0]);
@@ -1665,6 +1832,7 @@ bool Generated_code_lambda_function::run_generic(
     if (!m_aborted && index < m_jitted_funcs.size()) {
         Exc_state     exc(m_exc_handler, m_aborted);
         Res_data_pair pair(m_res_data, tex_data);
+        Print_scope   print(*this, pair);
 
         if (setjmp(exc.env) == 0) {
             Gen_func *gen_func = reinterpret_cast<Gen_func *>(m_jitted_funcs[index]);
@@ -1685,6 +1853,7 @@ bool Generated_code_lambda_function::run_init(
     if (!m_aborted && index < m_jitted_funcs.size()) {
         Exc_state     exc(m_exc_handler, m_aborted);
         Res_data_pair pair(m_res_data, tex_data);
+        Print_scope   print(*this, pair);
 
         if (setjmp(exc.env) == 0) {
             Init_func *init_func = reinterpret_cast<Init_func *>(m_jitted_funcs[index]);
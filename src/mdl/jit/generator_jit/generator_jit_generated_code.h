@@ -789,7 +789,7 @@ public:
         /// \param res_data     the resource data, shared by ALL threads
         /// \param thread_data  additional "per thread" data, passed to the resource handler
         Res_data_pair(Res_data const &res_data, void *thread_data)
-            : m_shared_data(&res_data), m_thread_data(thread_data)
+            : m_shared_data(&res_data), m_thread_data(thread_data), m_print_buffer(NULL)
         {
         }
 
@@ -799,12 +799,18 @@ public:
         /// Get the thread data.
         void *get_thread_data() const { return m_thread_data; }
 
+        /// Set the print buffer receiving the output of debug::print().
+        void set_print_buffer(Print_buffer *buffer) { m_print_buffer = buffer; }
+
     private:
         /// The read-only texture data, shared between ALL threads.
         Res_data const *m_shared_data;
 
         /// Per-thread data.
         void           *m_thread_data;
+
+        /// The print buffer of the current call in buffered print mode, otherwise NULL.
+        void           *m_print_buffer;
     };
 
 public:
@@ -1107,7 +1113,45 @@ public:
     /// \param id  the assigned id for this constant
     void add_mapped_string(char const *s, size_t id);
 
+    /// Enable or disable collecting the output of debug::print() of every call.
+    ///
+    /// \param enable  true, if the code was compiled in buffered print mode
+    void set_buffered_print(bool enable) { m_buffered_print = enable; }
+
 private:
+    /// Helper class collecting the output of debug::print() of one call in buffered print mode.
+    /// The output is written to the debug log when the call returns.
+    class Print_scope {
+    public:
+        /// Constructor, sets the print buffer of the resource data pair if the code was compiled
+        /// in buffered print mode.
+        ///
+        /// \param code  the lambda function which is called
+        /// \param pair  the resource data pair of the call
+        Print_scope(Generated_code_lambda_function const &code, Res_data_pair &pair);
+
+        /// Destructor, prints the collected output.
+        ~Print_scope();
+
+    private:
+        /// Format one element of a printed value.
+        ///
+        /// \param line  the line to append to
+        /// \param pos   the position of the element in the buffer, advanced to the next element
+        /// \param kind  the Print_value_kind of the element
+        void format_element(string &line, unsigned &pos, unsigned kind) const;
+
+        /// Get the word at the given position of the ring buffer.
+        unsigned word(unsigned pos) const { return m_buffer.data[pos & (m_buffer.capacity - 1)]; }
+
+    private:
+        /// The called lambda function.
+        Generated_code_lambda_function const &m_code;
+
+        /// The print buffer, its data is NULL if the output is not buffered.
+        Print_buffer m_buffer;
+    };
+
     /// Register a new non-texture resource tag.
     ///
     /// \param tag   the tag
@@ -1380,6 +1424,9 @@ private:
 
     /// The mapped strings
     Mappend_string_vector m_mappend_strings;
+
+    /// If true, the output of debug::print() is collected per call and printed on return.
+    bool m_buffered_print;
 };
 
 }  // mdl
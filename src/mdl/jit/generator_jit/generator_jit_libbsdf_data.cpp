@@ -27,4 +27,122 @@
  *****************************************************************************/
  
 #include "pch.h"
+
+#include "generator_jit_libbsdf_data.h"
+
+namespace mi {
+namespace mdl {
+namespace libbsdf_data {
+
+// Compressed tables are quantized to 16 bits. Inside each row, a value is predicted linearly
+// from the two previous values, the first value of a row from the first value of the previous
+// row. The zigzag encoded residuals are stored with a Rice code whose parameter is stored
+// in front of every row, see gen_libbsdf_multiscatter_tables.py.
+
+namespace {
+
+/// Reads a bit stream, most significant bit first.
+class Bit_reader {
+public:
+    /// Constructor.
+    Bit_reader(unsigned char const *data, size_t size)
+    : m_data(data)
+    , m_size(size)
+    , m_pos(0)
+    , m_overrun(false)
+    {
+    }
+
+    /// Read one bit.
+    unsigned get_bit()
+    {
+        size_t byte = m_pos >> 3;
+        if (byte >= m_size) {
+            m_overrun = true;
+            return 0;
+        }
+        unsigned bit = (m_data[byte] >> (7 - (m_pos & 7))) & 1;
+        ++m_pos;
+        return bit;
+    }
+
+    /// Read n bits.
+    unsigned get_bits(unsigned n)
+    {
+        unsigned res = 0;
+        for (unsigned i = 0; i < n; ++i) {
+            res = (res << 1) | get_bit();
+        }
+        return res;
+    }
+
+    /// Returns true if the reader tried to read beyond the end of the stream.
+    bool overrun() const { return m_overrun; }
+
+private:
+    unsigned char const *m_data;
+    size_t              m_size;
+    size_t              m_pos;
+    bool                m_overrun;
+};
+
+/// The number of unary bits that marks an escaped residual.
+unsigned const ESCAPE_LEN  = 32;
+
+/// The number of bits of an escaped residual.
+unsigned const ESCAPE_BITS = 20;
+
+/// The maximum quantized value.
+int const QUANT_MAX = 65535;
+
+}  // anonymous
+
+// Decode a compressed multi-scatter table.
+bool decode_multiscatter_table(
+    float               *dst,
+    size_t              n_values,
+    size_t              row_len,
+    float               offset,
+    float               step,
+    unsigned char const *packed,
+    size_t              packed_size)
+{
+    Bit_reader bits(packed, packed_size);
+
+    int prev_first = 0;
+    for (size_t s = 0; s < n_values; s += row_len) {
+        unsigned k = bits.get_bits(4);
+        size_t   n = n_values - s < row_len ? n_values - s : row_len;
+
+        int q1 = 0;  // the previous value
+        int q2 = 0;  // the value before the previous one
+        for (size_t i = 0; i < n; ++i) {
+            unsigned u = 0;
+            while (u < ESCAPE_LEN && bits.get_bit() != 0) {
+                ++u;
+            }
+            unsigned z = u < ESCAPE_LEN ? (u << k) | bits.get_bits(k) : bits.get_bits(ESCAPE_BITS);
+            int      r = (z & 1) != 0 ? -int((z + 1) >> 1) : int(z >> 1);
+
+            int q = r + (i == 0 ? prev_first : i == 1 ? q1 : 2 * q1 - q2);
+            if (q < 0 || q > QUANT_MAX || bits.overrun()) {
+                return false;
+            }
+            if (i == 0) {
+                prev_first = q;
+            }
+            q2 = q1;
+            q1 = q;
+
+            float scaled = float(q) * step;
+            dst[s + i] = offset + scaled;
+        }
+    }
+    return true;
+}
+
+}  // libbsdf_data
+}  // mdl
+}  // mi
+
 #include "libbsdf_multiscatter_tables.cpp"
@@ -1193,6 +1193,12 @@ LLVM_code_generator::LLVM_code_generator(
     options.get_string_option(MDL_JIT_OPTION_LINK_LIBBSDF_DF_HANDLE_SLOT_MODE)))
 , m_incremental(incremental)
 , m_texruntime_with_derivs(options.get_bool_option(MDL_JIT_OPTION_TEX_RUNTIME_WITH_DERIVATIVES))
+, m_use_prebuilt_intrinsics(options.get_bool_option(MDL_JIT_OPTION_PREBUILT_INTRINSICS))
+, m_use_vector_runtime(
+    target_lang == TL_NATIVE && options.get_bool_option(MDL_JIT_OPTION_VECTOR_RUNTIME))
+, m_buffered_print(
+    (target_lang == TL_PTX || target_lang == TL_NATIVE) &&
+    options.get_bool_option(MDL_JIT_OPTION_BUFFERED_PRINT))
 , m_deriv_infos(NULL)
 , m_cur_func_deriv_info(NULL)
 , m_tex_calls_mode(parse_call_mode(
@@ -2577,7 +2583,8 @@ LLVM_context_data::Flags LLVM_code_generator::get_function_flags(IDefinition con
     if (def->get_property(mi::mdl::IDefinition::DP_USES_TEXTURES) ||
         def->get_property(mi::mdl::IDefinition::DP_USES_SCENE_DATA) ||
         def->get_property(mi::mdl::IDefinition::DP_READ_TEX_ATTR) ||
-        def->get_property(mi::mdl::IDefinition::DP_READ_LP_ATTR))
+        def->get_property(mi::mdl::IDefinition::DP_READ_LP_ATTR) ||
+        uses_print_buffer(def))
     {
         flags |= LLVM_context_data::FL_HAS_RES;
     }
@@ -2700,7 +2707,8 @@ LLVM_context_data *LLVM_code_generator::declare_function(
             def->get_property(mi::mdl::IDefinition::DP_USES_TEXTURES) ||
             def->get_property(mi::mdl::IDefinition::DP_USES_SCENE_DATA) ||
             def->get_property(mi::mdl::IDefinition::DP_READ_TEX_ATTR) ||
-            def->get_property(mi::mdl::IDefinition::DP_READ_LP_ATTR)
+            def->get_property(mi::mdl::IDefinition::DP_READ_LP_ATTR) ||
+            uses_print_buffer(def)
         ))
     {
         // add a hidden resource_data parameter
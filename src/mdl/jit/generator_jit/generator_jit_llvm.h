@@ -72,6 +72,7 @@ class ILambda_call_transformer;
 class ILambda_resource_attribute;
 class IMDL_exception_handler;
 class IModule;
+class IOutput_stream;
 class IResource_manager;
 class IStatement;
 class IStatement_compound;
@@ -1331,6 +1332,12 @@ public:
         return m_state_usage_analysis.get_module_state_usage();
     }
 
+    /// Returns true if debug::print() writes into the print buffer of the resource data.
+    bool is_buffered_print_enabled() const { return m_buffered_print; }
+
+    /// Returns true if float vector math may use the SIMD-wide runtime functions.
+    bool is_vector_runtime_enabled() const { return m_use_vector_runtime; }
+
     /// Get the MDL types of the captured arguments if any.
     Type_vector const &get_captured_argument_mdl_types() const {
         return m_captured_args_mdl_types;
@@ -2624,6 +2631,11 @@ private:
     /// \return -1 if the parameter is not an index, its bound (>=0) otherwise
     int is_index_argument(mi::mdl::IDefinition::Semantics sema, int i);
 
+    /// Check if the given semantics is a uniform scene data lookup.
+    ///
+    /// \param sema  the semantic of the called function
+    static bool is_uniform_scene_data_lookup(mi::mdl::IDefinition::Semantics sema);
+
     /// Translate a call to a compiler known function to LLVM IR.
     ///
     /// \param ctx        the function context
@@ -2960,6 +2972,13 @@ private:
     /// \param creator  the runtime creator
     static void terminate_mdl_runtime(MDL_runtime_creator *creator);
 
+    /// Print the usage statistics of the intrinsic functions of all terminated runtimes as JSON.
+    ///
+    /// \param out  the output stream
+    ///
+    /// \return false if the intrinsic functions were generated without instrumentation
+    static bool print_intrinsic_stats(IOutput_stream *out);
+
     /// Handle out of bounds.
     ///
     /// \param exc_state  the exception state
@@ -2991,6 +3010,11 @@ private:
         return m_target_lang != TL_HLSL || m_hlsl_use_resource_data;
     }
 
+    /// Returns true if the given function needs the print buffer of the resource data.
+    bool uses_print_buffer(mi::mdl::IDefinition const *def) const {
+        return m_buffered_print && def->get_property(mi::mdl::IDefinition::DP_CONTAINS_DEBUG);
+    }
+
     /// Specifies, whether an exception state parameter should be provided to subfunctions
     /// which could cause exceptions.
     bool target_uses_exception_state_parameter() const {
@@ -3656,6 +3680,15 @@ private:
     /// If true, the texture lookup functions with derivatives will be used.
     bool m_texruntime_with_derivs;
 
+    /// If true, intrinsic function bodies are taken from the prebuilt intrinsic library.
+    bool m_use_prebuilt_intrinsics;
+
+    /// If true, float vector math may use the SIMD-wide runtime functions.
+    bool m_use_vector_runtime;
+
+    /// If true, debug::print() writes into the print buffer of the resource data.
+    bool m_buffered_print;
+
     /// If non-null, the derivative analysis information.
     Derivative_infos const *m_deriv_infos;
 
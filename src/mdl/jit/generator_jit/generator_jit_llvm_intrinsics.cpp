@@ -38,9 +38,15 @@
 
 #include <base/system/stlext/i_stlext_restore.h>
 
+#include <algorithm>
+#include <chrono>
+#include <deque>
+#include <map>
+#include <string>
 #include <vector>
 
 #include <llvm/Bitcode/BitcodeReader.h>
+#include <llvm/Bitcode/BitcodeWriter.h>
 #include <llvm/ExecutionEngine/ExecutionEngine.h>
 #include <llvm/IR/Attributes.h>
 #include <llvm/IR/Constants.h>
@@ -65,6 +71,7 @@
 #include "generator_jit_llvm.h"
 #include "generator_jit_context.h"
 #include "generator_jit_generated_code.h"
+#include "generator_jit_vector_runtime.h"
 
 #include <mi/mdl/mdl_generated_executable.h>
 #include <mi/mdl/mdl_streams.h>
@@ -1204,6 +1211,15 @@ float df_light_profile_pdf(
 const int VPRINTF_BUFFER_ALIGNMENT = 8;  // In Bytes.
 const int VPRINTF_BUFFER_ROUND_UP = 8;   // In Bytes.
 
+// Print_buffer access index.
+enum Print_buffer_index {
+    PB_DATA     = 0,  // the words of the ring buffer
+    PB_CAPACITY = 1,  // the number of words, a power of two
+    PB_HEAD     = 2,  // the next word to write
+    PB_TAIL     = 3,  // the first word not yet read by the host
+    PB_DROPPED  = 4,  // the number of dropped records
+};
+
 
 #include "generator_jit_intrinsic_func.i"
 
@@ -1235,6 +1251,9 @@ typedef void   (*VV_lbDD)(LB *, double);
 typedef void   (*VV_lbCS)(LB *, char const *);
 typedef void   (*VV_xsIIZZCSII)(Exc_state &, int, size_t, char const *, int);
 typedef void   (*VV_xsCSII)(Exc_state &, char const *, int);
+#ifdef MDL_JIT_HAS_VECTOR_RUNTIME
+typedef __m128 (*F4_F4)(__m128);
+#endif
 
 template <typename Signature>
 struct Signature_trait {
@@ -1520,6 +1539,43 @@ case en: \
 #undef EXTERNAL_CMATH
 }
 
+// Get the SIMD-wide variant of a C runtime function lazily.
+llvm::Function *MDL_runtime_creator::get_vector_runtime_func(Runtime_function code)
+{
+#ifdef MDL_JIT_HAS_VECTOR_RUNTIME
+    // the vector variants are approximations, only use them if they were requested
+    // and fast-math is allowed
+    if (!m_code_gen.is_vector_runtime_enabled() || !m_fast_math)
+        return NULL;
+
+    if (llvm::Function *func = m_vector_runtime_funcs[code])
+        return func;
+
+    unsigned width = 0, n_params = 0;
+    char const *name = get_vector_runtime_func_name(code, width, n_params);
+    if (name == NULL)
+        return NULL;
+
+    llvm::Type *vec_tp = llvm::VectorType::get(m_code_gen.m_type_mapper.get_float_type(), width);
+    llvm::SmallVector<llvm::Type *, 2> arg_types(n_params, vec_tp);
+
+    llvm::Function *func = llvm::Function::Create(
+        llvm::FunctionType::get(vec_tp, arg_types, /*isVarArg=*/false),
+        llvm::GlobalValue::ExternalLinkage,
+        name,
+        m_code_gen.get_llvm_module());
+    func->setCallingConv(llvm::CallingConv::C);
+    func->setDoesNotThrow();
+    func->setDoesNotAccessMemory();
+
+    m_vector_runtime_funcs[code] = func;
+    return func;
+#else
+    (void)code;
+    return NULL;
+#endif
+}
+
 // Return an LLVM type for a (single type) signature.
 llvm::Type *MDL_runtime_creator::type_from_signature(
     char const * &signature,
@@ -1817,6 +1873,188 @@ llvm::Value *MDL_runtime_creator::get_next_valist_pointer(Function_context &ctx,
     return cast_inst;
 }
 
+// Append a debug::print() record to the print buffer of the resource data.
+void MDL_runtime_creator::create_buffered_print(
+    Function_context              &ctx,
+    llvm::ArrayRef<llvm::Value *> values,
+    llvm::ArrayRef<unsigned>      tags)
+{
+    llvm::IntegerType *int_tp  = m_code_gen.m_type_mapper.get_int_type();
+    llvm::IntegerType *long_tp = llvm::Type::getInt64Ty(m_code_gen.m_llvm_context);
+
+    // collect the words of the record, the first one is the header
+    llvm::SmallVector<llvm::Value *, 16> words;
+    words.push_back(NULL);
+
+    for (size_t i = 0, n = values.size(); i < n; ++i) {
+        llvm::Value *val   = values[i];
+        llvm::Type  *tp    = val->getType();
+        unsigned    kind  = tags[i] & 0xff;
+        unsigned    count = (tags[i] >> 8) & 0xff;
+
+        if (kind == mi::mdl::PRINT_VALUE_STRING_ID && tp->isPointerTy()) {
+            // strings are not mapped to IDs
+            kind = mi::mdl::PRINT_VALUE_STRING_PTR;
+        }
+        words.push_back(ctx.get_constant(int((tags[i] & ~0xffu) | kind)));
+
+        for (unsigned j = 0; j < count; ++j) {
+            llvm::Value *elem = val;
+            if (llvm::isa<llvm::ArrayType>(tp)) {
+                unsigned idxes[1] = { j };
+                elem = ctx->CreateExtractValue(val, idxes);
+            } else if (llvm::isa<llvm::VectorType>(tp)) {
+                elem = ctx->CreateExtractElement(val, ctx.get_constant(int(j)));
+            }
+
+            switch (kind) {
+            case mi::mdl::PRINT_VALUE_BOOL:
+                elem = ctx->CreateICmpNE(elem, llvm::Constant::getNullValue(elem->getType()));
+                words.push_back(ctx->CreateZExt(elem, int_tp));
+                break;
+            case mi::mdl::PRINT_VALUE_INT:
+            case mi::mdl::PRINT_VALUE_STRING_ID:
+                words.push_back(ctx->CreateZExtOrTrunc(elem, int_tp));
+                break;
+            case mi::mdl::PRINT_VALUE_FLOAT:
+                words.push_back(ctx->CreateBitCast(elem, int_tp));
+                break;
+            case mi::mdl::PRINT_VALUE_DOUBLE:
+            case mi::mdl::PRINT_VALUE_STRING_PTR:
+                {
+                    // two words, low word first
+                    llvm::Value *bits = kind == mi::mdl::PRINT_VALUE_DOUBLE ?
+                        ctx->CreateBitCast(elem, long_tp) :
+                        ctx->CreatePtrToInt(elem, long_tp);
+                    words.push_back(ctx->CreateTrunc(bits, int_tp));
+                    words.push_back(ctx->CreateTrunc(ctx->CreateLShr(bits, 32), int_tp));
+                }
+                break;
+            default:
+                MDL_ASSERT(!"unexpected print value kind");
+                break;
+            }
+        }
+    }
+
+    int n_words = int(words.size());
+    words[0] = ctx.get_constant(n_words);
+
+    llvm::Type *members[] = {
+        int_tp->getPointerTo(),  // data
+        int_tp,                  // capacity
+        int_tp,                  // head
+        int_tp,                  // tail
+        int_tp                   // dropped
+    };
+    llvm::StructType *buf_tp = llvm::StructType::get(m_code_gen.m_llvm_context, members);
+
+    llvm::Value *res_data = ctx.get_resource_data_parameter();
+    llvm::Value *buf_adr  = ctx.create_simple_gep_in_bounds(
+        res_data, ctx.get_constant(Type_mapper::RDP_PRINT_BUFFER));
+    llvm::Value *buf      = ctx->CreateBitCast(ctx->CreateLoad(buf_adr), buf_tp->getPointerTo());
+
+    llvm::BasicBlock *reserve_bb = ctx.create_bb("print_reserve");
+    llvm::BasicBlock *write_bb   = ctx.create_bb("print_write");
+    llvm::BasicBlock *drop_bb    = ctx.create_bb("print_drop");
+    llvm::BasicBlock *mark_bb    = ctx.create_bb("print_mark");
+    llvm::BasicBlock *end_bb     = ctx.create_bb("print_end");
+
+    // no print buffer, discard the output
+    ctx->CreateCondBr(ctx->CreateIsNull(buf), end_bb, reserve_bb);
+
+    // reserve the words of the record
+    ctx->SetInsertPoint(reserve_bb);
+    llvm::Value *n        = ctx.get_constant(n_words);
+    llvm::Value *capacity = ctx->CreateLoad(
+        ctx.create_simple_gep_in_bounds(buf, ctx.get_constant(int(PB_CAPACITY))));
+    llvm::Value *tail     = ctx->CreateLoad(
+        ctx.create_simple_gep_in_bounds(buf, ctx.get_constant(int(PB_TAIL))));
+    llvm::Value *start    = ctx->CreateAtomicRMW(
+        llvm::AtomicRMWInst::Add,
+        ctx.create_simple_gep_in_bounds(buf, ctx.get_constant(int(PB_HEAD))),
+        n,
+        llvm::AtomicOrdering::Monotonic);
+    llvm::Value *data     = ctx->CreateLoad(
+        ctx.create_simple_gep_in_bounds(buf, ctx.get_constant(int(PB_DATA))));
+    llvm::Value *used     = ctx->CreateSub(start, tail);
+    llvm::Value *mask     = ctx->CreateSub(capacity, ctx.get_constant(1));
+    llvm::Value *fits     = ctx->CreateICmpULE(ctx->CreateAdd(used, n), capacity);
+
+    // we expect the buffer to be large enough
+    ctx.CreateWeightedCondBr(fits, write_bb, drop_bb, 1, 0);
+
+    // write the record
+    ctx->SetInsertPoint(write_bb);
+    for (int i = 0; i < n_words; ++i) {
+        llvm::Value *pos = ctx->CreateAnd(ctx->CreateAdd(start, ctx.get_constant(i)), mask);
+        ctx->CreateStore(words[i], ctx->CreateGEP(data, ctx->CreateZExt(pos, long_tp)));
+    }
+    ctx->CreateBr(end_bb);
+
+    // the record does not fit, count it
+    ctx->SetInsertPoint(drop_bb);
+    ctx->CreateAtomicRMW(
+        llvm::AtomicRMWInst::Add,
+        ctx.create_simple_gep_in_bounds(buf, ctx.get_constant(int(PB_DROPPED))),
+        ctx.get_constant(1),
+        llvm::AtomicOrdering::Monotonic);
+    ctx->CreateCondBr(ctx->CreateICmpULT(used, capacity), mark_bb, end_bb);
+
+    // the first dropped record starts inside the free space, mark it, so the host stops there
+    ctx->SetInsertPoint(mark_bb);
+    llvm::Value *pos = ctx->CreateAnd(start, mask);
+    ctx->CreateStore(
+        ctx.get_constant(int(MDL_PRINT_RECORD_DROPPED)),
+        ctx->CreateGEP(data, ctx->CreateZExt(pos, long_tp)));
+    ctx->CreateBr(end_bb);
+
+    ctx->SetInsertPoint(end_bb);
+}
+
+// Create the variant with derivatives of an intrinsic function whose derivatives are always zero.
+llvm::Function *MDL_runtime_creator::create_zero_deriv_intrinsic(
+    mi::mdl::IDefinition const *func_def,
+    llvm::Function             *base_func,
+    char const                 *mod_name)
+{
+    Function_instance inst(m_code_gen.get_allocator(), func_def, /*return_derivs=*/ true);
+    LLVM_context_data *ctx_data = m_code_gen.get_or_create_context_data(NULL, inst, mod_name);
+    llvm::Function    *func     = ctx_data->get_function();
+    unsigned          flags     = ctx_data->get_function_flags();
+
+    Function_context ctx(m_alloc, m_code_gen, inst, func, flags);
+
+    func->setLinkage(llvm::GlobalValue::InternalLinkage);
+    if (m_code_gen.is_always_inline_enabled())
+        func->addFnAttr(llvm::Attribute::AlwaysInline);
+
+    Function_instance base_inst(m_code_gen.get_allocator(), func_def, /*return_derivs=*/ false);
+    LLVM_context_data *base_data = m_code_gen.get_context_data(base_inst);
+
+    // no argument derivatives are requested, so both variants have the same parameters
+    // apart from the struct return
+    llvm::SmallVector<llvm::Value *, 8> args;
+    llvm::Value *base_res = NULL;
+    if (base_data->is_sret_return()) {
+        base_res = ctx.create_local(base_data->get_return_type(), "base_result");
+        args.push_back(base_res);
+    }
+    llvm::Function::arg_iterator arg_it = func->arg_begin();
+    if (ctx_data->is_sret_return())
+        ++arg_it;
+    for (llvm::Function::arg_iterator end = func->arg_end(); arg_it != end; ++arg_it)
+        args.push_back(&*arg_it);
+
+    llvm::Value *res = ctx->CreateCall(base_func, args);
+    if (base_res != NULL)
+        res = ctx->CreateLoad(base_res);
+
+    // expand to dual, the derivatives are zero
+    ctx.create_return(ctx.get_dual(res));
+    return func;
+}
+
 
 // Call a runtime function.
 llvm::Value *MDL_runtime_creator::call_rt_func(
@@ -2525,6 +2763,11 @@ llvm::Function *MDL_runtime_creator::create_runtime_func(
         MARK_EXTERNAL(func);  // mi::mdl::spectral::mdl_reflection_color in libmdlrt
         return func;
 
+    case RT_MDL_EVAL_AT_WAVELENGTH:
+        func->setDoesNotThrow();
+        MARK_EXTERNAL(func);  // mdl_eval_at_wavelength in libmdlrt
+        return func;
+
     case RT_MDL_DEBUGBREAK:
         func->setDoesNotThrow();
         MARK_NATIVE(func);  // debug::debugbreak
@@ -3178,6 +3421,14 @@ void LLVM_code_generator::register_native_runtime_functions(Jitted_code *jitted_
 
     REG_FUNC2("mdl_blackbody", check_sig<FA3_FF>(mi::mdl::spectral::mdl_blackbody));
 
+#ifdef MDL_JIT_HAS_VECTOR_RUNTIME
+    // Functions from MDL_runtime_creator::get_vector_runtime_func
+    REG_FUNC2("mdl_sinf_x4", check_sig<F4_F4>(vector_runtime::sinf_x4));
+    REG_FUNC2("mdl_cosf_x4", check_sig<F4_F4>(vector_runtime::cosf_x4));
+    REG_FUNC2("mdl_expf_x4", check_sig<F4_F4>(vector_runtime::expf_x4));
+    REG_FUNC2("mdl_logf_x4", check_sig<F4_F4>(vector_runtime::logf_x4));
+#endif
+
     REG_FUNC2("mdl_debugbreak", check_sig<VV_>(debug::debugbreak));
     REG_FUNC2("mdl_assertfail", check_sig<VV_CSCSCSII>(debug::assertfail));
     REG_FUNC2("mdl_print_begin", check_sig<lb_>(debug::print_begin));
@@ -3890,6 +4141,25 @@ llvm::Function *MDL_runtime_creator::get_internal_function(Internal_function con
     return m_internal_funcs[kind];
 }
 
+// Check if the given semantics is a uniform scene data lookup.
+bool LLVM_code_generator::is_uniform_scene_data_lookup(mi::mdl::IDefinition::Semantics sema)
+{
+    switch (sema) {
+    case mi::mdl::IDefinition::DS_INTRINSIC_SCENE_DATA_LOOKUP_UNIFORM_INT:
+    case mi::mdl::IDefinition::DS_INTRINSIC_SCENE_DATA_LOOKUP_UNIFORM_INT2:
+    case mi::mdl::IDefinition::DS_INTRINSIC_SCENE_DATA_LOOKUP_UNIFORM_INT3:
+    case mi::mdl::IDefinition::DS_INTRINSIC_SCENE_DATA_LOOKUP_UNIFORM_INT4:
+    case mi::mdl::IDefinition::DS_INTRINSIC_SCENE_DATA_LOOKUP_UNIFORM_FLOAT:
+    case mi::mdl::IDefinition::DS_INTRINSIC_SCENE_DATA_LOOKUP_UNIFORM_FLOAT2:
+    case mi::mdl::IDefinition::DS_INTRINSIC_SCENE_DATA_LOOKUP_UNIFORM_FLOAT3:
+    case mi::mdl::IDefinition::DS_INTRINSIC_SCENE_DATA_LOOKUP_UNIFORM_FLOAT4:
+    case mi::mdl::IDefinition::DS_INTRINSIC_SCENE_DATA_LOOKUP_UNIFORM_COLOR:
+        return true;
+    default:
+        return false;
+    }
+}
+
 // Check if the given argument is an index.
 int LLVM_code_generator::is_index_argument(mi::mdl::IDefinition::Semantics sema, int i)
 {
@@ -4043,6 +4313,10 @@ llvm::Value *LLVM_code_generator::translate_call_intrinsic_function(
     mi::mdl::IDefinition::Semantics sema = callee_def->get_semantics();
     int n_args = call_expr->get_argument_count();
 
+    // uniform scene data lookups with constant arguments are looked up once per invocation
+    bool memoize = is_uniform_scene_data_lookup(sema);
+    llvm::Value *memo_key[2] = { NULL, NULL };
+
     mi::mdl::IType_function const *func_tp =
         mi::mdl::cast<mi::mdl::IType_function>(callee_def->get_type());
 
@@ -4054,6 +4328,13 @@ llvm::Value *LLVM_code_generator::translate_call_intrinsic_function(
 
         Expression_result expr_res = call_expr->translate_argument(*this, ctx, i, arg_is_deriv);
 
+        if (memoize) {
+            if (i < 2 && expr_res.is_value() && expr_res.is_constant())
+                memo_key[i] = expr_res.as_value(ctx);
+            else
+                memoize = false;
+        }
+
         mi::mdl::IType const   *p_type = NULL;
         mi::mdl::ISymbol const *p_sym = NULL;
 
@@ -4155,6 +4436,21 @@ llvm::Value *LLVM_code_generator::translate_call_intrinsic_function(
             ctx->SetInsertPoint(ok_bb);
         }
     }
+
+    llvm::Value      *memo_valid_adr = NULL;
+    llvm::Value      *memo_value_adr = NULL;
+    llvm::BasicBlock *memo_end_bb    = NULL;
+
+    if (memoize && ctx.get_scene_data_memo_slot(
+            callee, memo_key[0], memo_key[1], res_type, memo_valid_adr, memo_value_adr)) {
+        // skip the call if the value was already looked up
+        llvm::BasicBlock *lookup_bb = ctx.create_bb("memo_lookup");
+        memo_end_bb = ctx.create_bb("memo_end");
+
+        ctx->CreateCondBr(ctx->CreateLoad(memo_valid_adr), memo_end_bb, lookup_bb);
+        ctx->SetInsertPoint(lookup_bb);
+    }
+
     // call it
     llvm::Value *res = ctx->CreateCall(callee, args);
 
@@ -4163,6 +4459,15 @@ llvm::Value *LLVM_code_generator::translate_call_intrinsic_function(
         res = ctx->CreateLoad(sret_res);
     }
 
+    if (memo_end_bb != NULL) {
+        ctx->CreateStore(res, memo_value_adr);
+        ctx->CreateStore(llvm::ConstantInt::getTrue(m_llvm_context), memo_valid_adr);
+        ctx->CreateBr(memo_end_bb);
+
+        ctx->SetInsertPoint(memo_end_bb);
+        res = ctx->CreateLoad(memo_value_adr);
+    }
+
     // derivative result was requested, but not delivered by intrinsic?
     if (m_type_mapper.is_deriv_type(call_expr->get_type()) &&
             !m_type_mapper.is_deriv_type(res->getType())) {
@@ -4211,13 +4516,478 @@ MDL_runtime_creator *LLVM_code_generator::create_mdl_runtime(
         encoding);
 }
 
+#ifdef MDL_JIT_INTRINSIC_STATS
+
+namespace {
+
+/// The process-wide usage statistics of the intrinsic functions.
+///
+/// The statistics of a runtime creator are merged when the creator is terminated.
+class Intrinsic_stats_registry {
+public:
+    typedef MDL_runtime_creator::Intrinsic_usage Intrinsic_usage;
+
+    /// Merge the usage statistics of a runtime creator.
+    static void merge(Intrinsic_usage const *usage)
+    {
+        mi::base::Lock::Block block(&m_lock);
+
+        for (size_t i = 0; i < MDL_runtime_creator::NUM_INTRINSICS; ++i) {
+            Intrinsic_usage       &dst = m_usage[i];
+            Intrinsic_usage const &src = usage[i];
+
+            for (size_t j = 0; j < 2; ++j) {
+                dst.calls[j]             += src.calls[j];
+                dst.constructions[j]     += src.constructions[j];
+                dst.construction_time[j] += src.construction_time[j];
+            }
+            for (size_t j = 0, n = dimension_of(dst.runtime_funcs); j < n; ++j)
+                dst.runtime_funcs[j] |= src.runtime_funcs[j];
+        }
+    }
+
+    /// Get a snapshot of the usage statistics.
+    static void get(Intrinsic_usage *usage)
+    {
+        mi::base::Lock::Block block(&m_lock);
+
+        for (size_t i = 0; i < MDL_runtime_creator::NUM_INTRINSICS; ++i)
+            usage[i] = m_usage[i];
+    }
+
+private:
+    /// The lock protecting the statistics.
+    static mi::base::Lock m_lock;
+
+    /// The merged statistics of all terminated runtime creators.
+    static Intrinsic_usage m_usage[MDL_runtime_creator::NUM_INTRINSICS];
+};
+
+mi::base::Lock Intrinsic_stats_registry::m_lock;
+Intrinsic_stats_registry::Intrinsic_usage
+    Intrinsic_stats_registry::m_usage[MDL_runtime_creator::NUM_INTRINSICS];
+
+/// Orders intrinsic functions by descending total construction time.
+struct Construction_time_greater {
+    typedef MDL_runtime_creator::Intrinsic_usage Intrinsic_usage;
+
+    /// Constructor.
+    explicit Construction_time_greater(Intrinsic_usage const *usage)
+    : m_usage(usage)
+    {
+    }
+
+    bool operator()(size_t a, size_t b) const
+    {
+        double ta = m_usage[a].construction_time[0] + m_usage[a].construction_time[1];
+        double tb = m_usage[b].construction_time[0] + m_usage[b].construction_time[1];
+        if (ta != tb)
+            return ta > tb;
+        return a < b;
+    }
+
+    Intrinsic_usage const *m_usage;
+};
+
+}  // anonymous
+
+#endif // MDL_JIT_INTRINSIC_STATS
+
 // Terminate the runtime.
 void LLVM_code_generator::terminate_mdl_runtime(MDL_runtime_creator *creator)
 {
+#ifdef MDL_JIT_INTRINSIC_STATS
+    Intrinsic_stats_registry::merge(creator->get_intrinsic_usage());
+#endif
+
     // just call the destructor
     creator->~MDL_runtime_creator();
 }
 
+// Print the usage statistics of the intrinsic functions as JSON.
+bool LLVM_code_generator::print_intrinsic_stats(IOutput_stream *out)
+{
+#ifdef MDL_JIT_INTRINSIC_STATS
+    typedef MDL_runtime_creator::Intrinsic_usage Intrinsic_usage;
+
+    std::vector<Intrinsic_usage> usage(MDL_runtime_creator::NUM_INTRINSICS);
+    Intrinsic_stats_registry::get(usage.data());
+
+    // only report requested intrinsics, most expensive first
+    std::vector<size_t> order;
+    for (size_t i = 0; i < MDL_runtime_creator::NUM_INTRINSICS; ++i) {
+        if (usage[i].calls[0] + usage[i].calls[1] > 0)
+            order.push_back(i);
+    }
+    std::sort(order.begin(), order.end(), Construction_time_greater(usage.data()));
+
+    char buf[1024];
+    out->write("{\n  \"intrinsics\": [");
+    for (size_t i = 0, n = order.size(); i < n; ++i) {
+        Intrinsic_usage const &u = usage[order[i]];
+
+        snprintf(
+            buf, sizeof(buf),
+            "%s\n    {\n"
+            "      \"name\": \"%s\",\n"
+            "      \"calls\": [%lu, %lu],\n"
+            "      \"constructions\": [%lu, %lu],\n"
+            "      \"construction_ms\": [%.3f, %.3f],\n"
+            "      \"runtime_functions\": [",
+            i > 0 ? "," : "",
+            MDL_runtime_creator::get_intrinsic_name(order[i]),
+            (unsigned long)u.calls[0], (unsigned long)u.calls[1],
+            (unsigned long)u.constructions[0], (unsigned long)u.constructions[1],
+            u.construction_time[0] * 1000.0, u.construction_time[1] * 1000.0);
+        out->write(buf);
+
+        bool first = true;
+        for (int code = 0; code <= MDL_runtime_creator::RT_LAST; ++code) {
+            if ((u.runtime_funcs[code / 32] & (1u << (code % 32))) == 0)
+                continue;
+            if (!first)
+                out->write(", ");
+            first = false;
+            out->write_char('"');
+            out->write(MDL_runtime_creator::get_runtime_func_name(
+                MDL_runtime_creator::Runtime_function(code)));
+            out->write_char('"');
+        }
+        out->write("]\n    }");
+    }
+    out->write(order.empty() ? "]\n}\n" : "\n  ]\n}\n");
+    out->flush();
+    return true;
+#else
+    (void)out;
+    return false;
+#endif
+}
+
+#ifdef MDL_JIT_PREBUILT_INTRINSICS
+
+namespace {
+
+/// The process-wide library of prebuilt intrinsic functions.
+///
+/// Every entry holds the bitcode of a module containing exactly one intrinsic function body and
+/// the declarations of the LLVM intrinsics called by it. The key of an entry describes the code
+/// generator configuration the body was built for. The size of the library is bounded, if it
+/// would exceed MAX_BYTES, the oldest entries are removed.
+class Prebuilt_intrinsic_library {
+public:
+    /// The maximum number of bitcode bytes held by the library.
+    static size_t const MAX_BYTES = 32 * 1024 * 1024;
+
+    /// Find the bitcode of a prebuilt function.
+    ///
+    /// \param key      the key of the function
+    /// \param bitcode  a copy of the bitcode if found
+    ///
+    /// \return false if the library does not contain the function
+    static bool find(std::string const &key, std::string &bitcode)
+    {
+        mi::base::Lock::Block block(&m_lock);
+
+        Entry_map::const_iterator it = m_entries.find(key);
+        if (it == m_entries.end())
+            return false;
+        bitcode = it->second;
+        return true;
+    }
+
+    /// Add the bitcode of a prebuilt function, the first entry for a key wins.
+    static void add(std::string const &key, std::string const &bitcode)
+    {
+        mi::base::Lock::Block block(&m_lock);
+
+        if (bitcode.size() > MAX_BYTES)
+            return;
+        if (!m_entries.insert(Entry_map::value_type(key, bitcode)).second)
+            return;
+        m_order.push_back(key);
+        m_size += bitcode.size();
+
+        while (m_size > MAX_BYTES) {
+            Entry_map::iterator it = m_entries.find(m_order.front());
+            m_size -= it->second.size();
+            m_entries.erase(it);
+            m_order.pop_front();
+        }
+    }
+
+private:
+    typedef std::map<std::string, std::string> Entry_map;
+
+    /// The lock protecting the entries.
+    static mi::base::Lock m_lock;
+
+    /// The bitcode of all prebuilt functions.
+    static Entry_map m_entries;
+
+    /// The keys of the entries, oldest first.
+    static std::deque<std::string> m_order;
+
+    /// The number of bitcode bytes of all entries.
+    static size_t m_size;
+};
+
+mi::base::Lock                        Prebuilt_intrinsic_library::m_lock;
+Prebuilt_intrinsic_library::Entry_map Prebuilt_intrinsic_library::m_entries;
+std::deque<std::string>               Prebuilt_intrinsic_library::m_order;
+size_t                                Prebuilt_intrinsic_library::m_size = 0;
+
+/// Maps the types of a parsed prebuilt module to the types of the current module.
+///
+/// Parsing bitcode into a context which already contains a named struct type creates a new
+/// type with a numbered name suffix, these are mapped back to the original types.
+class Prebuilt_type_remapper : public llvm::ValueMapTypeRemapper {
+public:
+    /// Constructor.
+    ///
+    /// \param module  the destination module
+    explicit Prebuilt_type_remapper(llvm::Module *module)
+    : m_module(module)
+    {
+    }
+
+    /// Map a type of the prebuilt module to a type of the destination module.
+    llvm::Type *remapType(llvm::Type *type) override
+    {
+        Type_map::const_iterator it = m_type_map.find(type);
+        if (it != m_type_map.end())
+            return it->second;
+
+        // no recursive types here, but be safe
+        m_type_map[type] = type;
+        llvm::Type *res = do_remap(type);
+        m_type_map[type] = res;
+        return res;
+    }
+
+private:
+    /// Map a type not visited yet.
+    llvm::Type *do_remap(llvm::Type *type)
+    {
+        switch (type->getTypeID()) {
+        case llvm::Type::StructTyID:
+            {
+                llvm::StructType *s_type = llvm::cast<llvm::StructType>(type);
+                llvm::SmallVector<llvm::Type *, 8> elems;
+                for (llvm::Type *e_type : s_type->elements())
+                    elems.push_back(remapType(e_type));
+
+                if (s_type->isLiteral())
+                    return llvm::StructType::get(
+                        type->getContext(), elems, s_type->isPacked());
+
+                llvm::StringRef name = s_type->getName();
+                size_t pos = name.rfind('.');
+                if (pos == llvm::StringRef::npos || pos + 1 == name.size() ||
+                        name.find_first_not_of("0123456789", pos + 1) != llvm::StringRef::npos)
+                    return type;
+
+                llvm::StructType *orig = m_module->getTypeByName(name.substr(0, pos));
+                if (orig == NULL ||
+                        orig->isPacked() != s_type->isPacked() ||
+                        orig->elements() != llvm::makeArrayRef(elems))
+                    return type;
+                return orig;
+            }
+        case llvm::Type::PointerTyID:
+            return llvm::PointerType::get(
+                remapType(type->getPointerElementType()),
+                type->getPointerAddressSpace());
+        case llvm::Type::ArrayTyID:
+            return llvm::ArrayType::get(
+                remapType(type->getArrayElementType()),
+                type->getArrayNumElements());
+        case llvm::Type::VectorTyID:
+            return llvm::VectorType::get(
+                remapType(type->getVectorElementType()),
+                type->getVectorNumElements());
+        case llvm::Type::FunctionTyID:
+            {
+                llvm::FunctionType *f_type = llvm::cast<llvm::FunctionType>(type);
+                llvm::SmallVector<llvm::Type *, 8> params;
+                for (llvm::Type *p_type : f_type->params())
+                    params.push_back(remapType(p_type));
+                return llvm::FunctionType::get(
+                    remapType(f_type->getReturnType()), params, f_type->isVarArg());
+            }
+        default:
+            return type;
+        }
+    }
+
+private:
+    typedef std::map<llvm::Type *, llvm::Type *> Type_map;
+
+    /// The destination module.
+    llvm::Module *m_module;
+
+    /// Already mapped types.
+    Type_map m_type_map;
+};
+
+/// Write a generated intrinsic function as bitcode of a module containing only this function.
+///
+/// \param func     the generated function
+/// \param bitcode  the bitcode on success
+///
+/// \return false, if the function references anything besides LLVM intrinsics
+static bool write_prebuilt_intrinsic(llvm::Function *func, std::string &bitcode)
+{
+    llvm::Module lib_mod("prebuilt_intrinsic", func->getContext());
+    lib_mod.setDataLayout(func->getParent()->getDataLayout());
+
+    llvm::Function *lib_func = llvm::Function::Create(
+        func->getFunctionType(), llvm::GlobalValue::ExternalLinkage, func->getName(), &lib_mod);
+
+    llvm::ValueToValueMapTy vmap;
+    llvm::Function::arg_iterator lib_arg_it = lib_func->arg_begin();
+    for (llvm::Argument &arg : func->args()) {
+        lib_arg_it->setName(arg.getName());
+        vmap[&arg] = &*lib_arg_it++;
+    }
+
+    // only calls to LLVM intrinsics are allowed, anything else binds the body to the module
+    for (llvm::BasicBlock &bb : *func) {
+        for (llvm::Instruction &inst : bb) {
+            for (llvm::Value *op : inst.operands()) {
+                if (llvm::isa<llvm::ConstantExpr>(op))
+                    return false;
+                if (llvm::isa<llvm::GlobalValue>(op)) {
+                    llvm::Function *callee = llvm::dyn_cast<llvm::Function>(op);
+                    if (callee == NULL || !callee->isIntrinsic())
+                        return false;
+                    if (vmap.count(callee) == 0) {
+                        vmap[callee] = lib_mod.getOrInsertFunction(
+                            callee->getName(),
+                            callee->getFunctionType(),
+                            callee->getAttributes());
+                    }
+                }
+            }
+        }
+    }
+
+    llvm::SmallVector<llvm::ReturnInst *, 8> returns;
+    llvm::CloneFunctionInto(lib_func, func, vmap, /*ModuleLevelChanges=*/true, returns);
+
+    llvm::raw_string_ostream os(bitcode);
+    llvm::WriteBitcodeToFile(lib_mod, os);
+    os.flush();
+    return true;
+}
+
+/// Clone the body of a prebuilt intrinsic function into its declaration.
+///
+/// \param func     the declaration of the intrinsic function
+/// \param bitcode  the bitcode of the prebuilt function
+///
+/// \return false, if the prebuilt function does not fit to the declaration
+static bool clone_prebuilt_intrinsic(llvm::Function *func, std::string const &bitcode)
+{
+    llvm::Expected<std::unique_ptr<llvm::Module> > lib_mod = llvm::parseBitcodeFile(
+        llvm::MemoryBufferRef(bitcode, "prebuilt_intrinsic"), func->getContext());
+    if (!lib_mod) {
+        llvm::consumeError(lib_mod.takeError());
+        MDL_ASSERT(!"Parsing prebuilt intrinsic failed");
+        return false;
+    }
+
+    llvm::Function *lib_func = lib_mod.get()->getFunction(func->getName());
+    if (lib_func == NULL || lib_func->isDeclaration())
+        return false;
+
+    llvm::Module *module = func->getParent();
+    Prebuilt_type_remapper type_remapper(module);
+    if (type_remapper.remapType(lib_func->getFunctionType()) != func->getFunctionType())
+        return false;
+
+    llvm::ValueToValueMapTy vmap;
+    llvm::Function::arg_iterator arg_it = func->arg_begin();
+    for (llvm::Argument &lib_arg : lib_func->args()) {
+        arg_it->setName(lib_arg.getName());
+        vmap[&lib_arg] = &*arg_it++;
+    }
+
+    for (llvm::Function &callee : lib_mod.get()->functions()) {
+        if (&callee == lib_func)
+            continue;
+        MDL_ASSERT(callee.isIntrinsic() && "only LLVM intrinsics are written");
+        vmap[&callee] = module->getOrInsertFunction(
+            callee.getName(),
+            llvm::cast<llvm::FunctionType>(type_remapper.remapType(callee.getFunctionType())),
+            callee.getAttributes());
+    }
+
+    llvm::SmallVector<llvm::ReturnInst *, 8> returns;
+    llvm::CloneFunctionInto(
+        func, lib_func, vmap, /*ModuleLevelChanges=*/true, returns, "", NULL, &type_remapper);
+    return true;
+}
+
+}  // anonymous
+
+// Get an intrinsic function from the prebuilt intrinsic library.
+llvm::Function *MDL_runtime_creator::get_prebuilt_intrinsic(
+    mi::mdl::IDefinition const *func_def,
+    bool                       return_derivs,
+    char const                 *mod_name,
+    Intrinsic_creator          creator)
+{
+    // debug info refers to the current module and cannot be shared
+    if (!m_code_gen.m_use_prebuilt_intrinsics ||
+            m_code_gen.get_debug_info_builder() != NULL ||
+            m_code_gen.generate_full_debug_info())
+        return (this->*creator)(func_def, return_derivs);
+
+    Function_instance inst(m_code_gen.get_allocator(), func_def, return_derivs);
+    LLVM_context_data *ctx_data = m_code_gen.get_or_create_context_data(NULL, inst, mod_name);
+    llvm::Function    *func     = ctx_data->get_function();
+
+    // the body depends on the types and the math flags of the code generator only
+    std::string key;
+    {
+        Type_mapper const &type_mapper = m_code_gen.get_type_mapper();
+
+        llvm::raw_string_ostream os(key);
+        os << func->getName() << ' ' << return_derivs
+            << ' ' << int(m_code_gen.m_target_lang)
+            << ' ' << unsigned(type_mapper.get_type_mapping_mode())
+            << ' ' << type_mapper.get_state_mapping()
+            << ' ' << m_code_gen.is_fast_math_enabled()
+            << ' ' << m_code_gen.is_finite_math_enabled()
+            << ' ' << m_code_gen.is_reciprocal_math_enabled()
+            << ' ' << m_code_gen.is_always_inline_enabled()
+            << ' ' << m_code_gen.m_opt_level
+            << ' ' << func->getParent()->getDataLayoutStr();
+        os.flush();
+    }
+
+    std::string bitcode;
+    if (Prebuilt_intrinsic_library::find(key, bitcode)) {
+        if (clone_prebuilt_intrinsic(func, bitcode)) {
+            func->setLinkage(llvm::GlobalValue::InternalLinkage);
+            if (m_code_gen.is_always_inline_enabled())
+                func->addFnAttr(llvm::Attribute::AlwaysInline);
+            return func;
+        }
+        // does not fit, generate it
+        return (this->*creator)(func_def, return_derivs);
+    }
+
+    // first use in this configuration: generate it and add it to the library
+    func = (this->*creator)(func_def, return_derivs);
+    if (func != NULL && write_prebuilt_intrinsic(func, bitcode))
+        Prebuilt_intrinsic_library::add(key, bitcode);
+    return func;
+}
+
+#endif // MDL_JIT_PREBUILT_INTRINSICS
+
 // Retrieve the out-of-bounce reporting routine.
 llvm::Function *LLVM_code_generator::get_out_of_bounds() const
 {
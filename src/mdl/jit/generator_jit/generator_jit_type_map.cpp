@@ -1520,7 +1520,8 @@ llvm::StructType *Type_mapper::construct_res_data_pair_type(
 
     llvm::Type *members[] = {
         m_type_void_ptr,        // shared data
-        m_type_void_ptr         // thread data
+        m_type_void_ptr,        // thread data
+        m_type_void_ptr         // print buffer
     };
 
     llvm::StructType *res =
@@ -1540,6 +1541,8 @@ llvm::StructType *Type_mapper::construct_res_data_pair_type(
             offsetof(Pair, m_shared_data));
         MDL_ASSERT(sl->getElementOffset(RDP_THREAD_DATA) ==
             offsetof(Pair, m_thread_data));
+        MDL_ASSERT(sl->getElementOffset(RDP_PRINT_BUFFER) ==
+            offsetof(Pair, m_print_buffer));
     }
 #endif
 
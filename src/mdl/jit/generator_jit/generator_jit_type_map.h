@@ -159,8 +159,9 @@ public:
 
     // Res_data_pair access index.
     enum Res_data_pair_indexes {
-        RDP_SHARED_DATA = 0,  ///< The shared resource data.
-        RDP_THREAD_DATA = 1,  ///< The thread resource data.
+        RDP_SHARED_DATA  = 0,  ///< The shared resource data.
+        RDP_THREAD_DATA  = 1,  ///< The thread resource data.
+        RDP_PRINT_BUFFER = 2,  ///< The print buffer.
     };
 
     /// Texture handler vtable access index.
@@ -263,6 +264,12 @@ public:
         return (m_tm_mode & TM_NO_REFERENCE) == 0;
     }
 
+    /// Get the type mapping mode.
+    Type_mapping_mode get_type_mapping_mode() const { return m_tm_mode; }
+
+    /// Get the state mapping flags.
+    unsigned get_state_mapping() const { return m_state_mapping; }
+
     /// Checks if bitangents are used.
     bool use_bitangents() const {
         return (m_state_mapping & SM_USE_BITANGENT) != 0;
@@ -0,0 +1,265 @@
+/******************************************************************************
+ * Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ *  * Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  * Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in the
+ *    documentation and/or other materials provided with the distribution.
+ *  * Neither the name of NVIDIA CORPORATION nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ *****************************************************************************/
+
+// SIMD-wide variants of C runtime functions for the native backend.
+//
+// The polynomial approximations are the single precision ones of the Cephes math library,
+// evaluated on four lanes with SSE2. They are used in fast-math mode only and trade the
+// correct rounding of the C runtime for speed, the maximum error is a few ulp.
+// The sine and cosine reduce their argument modulo pi/4 in extended precision, which is
+// accurate up to a magnitude of 8192 only. Lanes with larger arguments are computed by the
+// C runtime.
+
+#include "pch.h"
+
+#include <cmath>
+
+#include "generator_jit_vector_runtime.h"
+
+#ifdef MDL_JIT_HAS_VECTOR_RUNTIME
+
+namespace mi {
+namespace mdl {
+namespace vector_runtime {
+
+namespace {
+
+/// Select a where mask is set, b otherwise.
+inline __m128 select(__m128 mask, __m128 a, __m128 b)
+{
+    return _mm_or_ps(_mm_and_ps(mask, a), _mm_andnot_ps(mask, b));
+}
+
+/// Returns a mask set for all lanes which are infinite or NaN.
+inline __m128 is_not_finite(__m128 x)
+{
+    __m128 d = _mm_sub_ps(x, x);
+    return _mm_cmpunord_ps(d, d);
+}
+
+/// Evaluates the sine and cosine polynomials for the reduced argument.
+///
+/// \param x         the argument
+/// \param cos_mode  true to compute the cosine, false for the sine
+inline __m128 sin_cos(__m128 x, bool cos_mode)
+{
+    __m128 const sign_mask = _mm_castsi128_ps(_mm_set1_epi32(int(0x80000000)));
+
+    __m128 sign = cos_mode ? _mm_setzero_ps() : _mm_and_ps(x, sign_mask);
+    __m128 ax   = _mm_andnot_ps(sign_mask, x);
+
+    // octant of the argument, rounded to the next even one
+    __m128i j = _mm_cvttps_epi32(_mm_mul_ps(ax, _mm_set1_ps(1.27323954473516f)));
+    j = _mm_add_epi32(j, _mm_set1_epi32(1));
+    j = _mm_and_si128(j, _mm_set1_epi32(~1));
+    __m128 y = _mm_cvtepi32_ps(j);
+
+    if (cos_mode)
+        j = _mm_sub_epi32(j, _mm_set1_epi32(2));
+
+    // the sine polynomial is used where bit 1 of the (shifted) octant is clear
+    __m128 poly_mask = _mm_castsi128_ps(
+        _mm_cmpeq_epi32(_mm_and_si128(j, _mm_set1_epi32(2)), _mm_setzero_si128()));
+
+    // octants 4 .. 7 flip the sign
+    __m128i flip = cos_mode ?
+        _mm_andnot_si128(j, _mm_set1_epi32(4)) :
+        _mm_and_si128(j, _mm_set1_epi32(4));
+    sign = _mm_xor_ps(sign, _mm_castsi128_ps(_mm_slli_epi32(flip, 29)));
+
+    // extended precision modular arithmetic: ax - y * pi/4
+    ax = _mm_add_ps(ax, _mm_mul_ps(y, _mm_set1_ps(-0.78515625f)));
+    ax = _mm_add_ps(ax, _mm_mul_ps(y, _mm_set1_ps(-2.4187564849853515625e-4f)));
+    ax = _mm_add_ps(ax, _mm_mul_ps(y, _mm_set1_ps(-3.77489497744594108e-8f)));
+
+    __m128 z = _mm_mul_ps(ax, ax);
+
+    // cosine polynomial
+    __m128 c = _mm_set1_ps(2.443315711809948e-5f);
+    c = _mm_add_ps(_mm_mul_ps(c, z), _mm_set1_ps(-1.388731625493765e-3f));
+    c = _mm_add_ps(_mm_mul_ps(c, z), _mm_set1_ps(4.166664568298827e-2f));
+    c = _mm_mul_ps(_mm_mul_ps(c, z), z);
+    c = _mm_sub_ps(c, _mm_mul_ps(z, _mm_set1_ps(0.5f)));
+    c = _mm_add_ps(c, _mm_set1_ps(1.0f));
+
+    // sine polynomial
+    __m128 s = _mm_set1_ps(-1.9515295891e-4f);
+    s = _mm_add_ps(_mm_mul_ps(s, z), _mm_set1_ps(8.3321608736e-3f));
+    s = _mm_add_ps(_mm_mul_ps(s, z), _mm_set1_ps(-1.6666654611e-1f));
+    s = _mm_add_ps(_mm_mul_ps(_mm_mul_ps(s, z), ax), ax);
+
+    __m128 res = _mm_xor_ps(select(poly_mask, s, c), sign);
+    return _mm_or_ps(res, is_not_finite(x));
+}
+
+/// The largest argument magnitude the reduction of sin_cos() handles accurately.
+float const SIN_COS_MAX_ARG = 8192.0f;
+
+/// Scalar sine of the C runtime.
+float scalar_sin(float x)
+{
+    return std::sin(x);
+}
+
+/// Scalar cosine of the C runtime.
+float scalar_cos(float x)
+{
+    return std::cos(x);
+}
+
+/// Recomputes the lanes of res whose argument is too large for sin_cos() with a scalar
+/// function.
+///
+/// \param res     the result of sin_cos()
+/// \param x       the argument
+/// \param scalar  the scalar function
+inline __m128 fix_large_args(__m128 res, __m128 x, float (*scalar)(float))
+{
+    __m128 const sign_mask = _mm_castsi128_ps(_mm_set1_epi32(int(0x80000000)));
+
+    int large = _mm_movemask_ps(
+        _mm_cmpgt_ps(_mm_andnot_ps(sign_mask, x), _mm_set1_ps(SIN_COS_MAX_ARG)));
+    if (large == 0)
+        return res;
+
+    float args[4], vals[4];
+    _mm_storeu_ps(args, x);
+    _mm_storeu_ps(vals, res);
+    for (int i = 0; i < 4; ++i) {
+        if (large & (1 << i))
+            vals[i] = scalar(args[i]);
+    }
+    return _mm_loadu_ps(vals);
+}
+
+}  // anonymous
+
+// Computes sinf() of four lanes at once.
+__m128 sinf_x4(__m128 x)
+{
+    return fix_large_args(sin_cos(x, /*cos_mode=*/false), x, scalar_sin);
+}
+
+// Computes cosf() of four lanes at once.
+__m128 cosf_x4(__m128 x)
+{
+    return fix_large_args(sin_cos(x, /*cos_mode=*/true), x, scalar_cos);
+}
+
+// Computes expf() of four lanes at once.
+__m128 expf_x4(__m128 x)
+{
+    __m128 nan_mask = _mm_cmpunord_ps(x, x);
+
+    __m128 cx = _mm_min_ps(x, _mm_set1_ps(88.7228391116729996f));
+    cx = _mm_max_ps(cx, _mm_set1_ps(-103.972076416015625f));
+
+    // exp(x) = 2^n * exp(r), n = round(x / ln(2))
+    __m128 fx = _mm_add_ps(_mm_mul_ps(cx, _mm_set1_ps(1.44269504088896341f)), _mm_set1_ps(0.5f));
+    __m128 tx = _mm_cvtepi32_ps(_mm_cvttps_epi32(fx));
+    fx = _mm_sub_ps(tx, _mm_and_ps(_mm_cmpgt_ps(tx, fx), _mm_set1_ps(1.0f)));
+
+    cx = _mm_sub_ps(cx, _mm_mul_ps(fx, _mm_set1_ps(0.693359375f)));
+    cx = _mm_sub_ps(cx, _mm_mul_ps(fx, _mm_set1_ps(-2.12194440e-4f)));
+    __m128 z = _mm_mul_ps(cx, cx);
+
+    __m128 y = _mm_set1_ps(1.9875691500e-4f);
+    y = _mm_add_ps(_mm_mul_ps(y, cx), _mm_set1_ps(1.3981999507e-3f));
+    y = _mm_add_ps(_mm_mul_ps(y, cx), _mm_set1_ps(8.3334519073e-3f));
+    y = _mm_add_ps(_mm_mul_ps(y, cx), _mm_set1_ps(4.1665795894e-2f));
+    y = _mm_add_ps(_mm_mul_ps(y, cx), _mm_set1_ps(1.6666665459e-1f));
+    y = _mm_add_ps(_mm_mul_ps(y, cx), _mm_set1_ps(5.0000001201e-1f));
+    y = _mm_add_ps(_mm_mul_ps(y, z), cx);
+    y = _mm_add_ps(y, _mm_set1_ps(1.0f));
+
+    // build 2^n, split into two factors to reach the denormal and the overflow range
+    __m128i n  = _mm_cvttps_epi32(fx);
+    __m128i n1 = _mm_srai_epi32(n, 1);
+    __m128i n2 = _mm_sub_epi32(n, n1);
+    __m128 p1 = _mm_castsi128_ps(_mm_slli_epi32(_mm_add_epi32(n1, _mm_set1_epi32(0x7f)), 23));
+    __m128 p2 = _mm_castsi128_ps(_mm_slli_epi32(_mm_add_epi32(n2, _mm_set1_epi32(0x7f)), 23));
+    y = _mm_mul_ps(_mm_mul_ps(y, p1), p2);
+
+    // saturate outside of the representable range
+    y = select(_mm_cmpgt_ps(x, _mm_set1_ps(88.7228391116729996f)), _mm_set1_ps(HUGE_VALF), y);
+    y = select(_mm_cmplt_ps(x, _mm_set1_ps(-103.972076416015625f)), _mm_setzero_ps(), y);
+    return _mm_or_ps(y, nan_mask);
+}
+
+// Computes logf() of four lanes at once.
+__m128 logf_x4(__m128 x)
+{
+    __m128 zero_mask = _mm_cmpeq_ps(x, _mm_setzero_ps());
+    __m128 nan_mask  = _mm_or_ps(_mm_cmplt_ps(x, _mm_setzero_ps()), _mm_cmpunord_ps(x, x));
+    __m128 inf_mask  = _mm_cmpeq_ps(x, _mm_set1_ps(HUGE_VALF));
+
+    // scale denormals into the normal range
+    __m128 denorm_mask = _mm_cmplt_ps(x, _mm_set1_ps(1.17549435e-38f));
+    __m128 sx = select(denorm_mask, _mm_mul_ps(x, _mm_set1_ps(33554432.0f)), x);
+    __m128 e_bias = _mm_and_ps(denorm_mask, _mm_set1_ps(25.0f));
+
+    // split into mantissa in [0.5, 1) and exponent
+    __m128i bits = _mm_castps_si128(sx);
+    __m128i ei   = _mm_sub_epi32(_mm_srli_epi32(bits, 23), _mm_set1_epi32(0x7e));
+    __m128  e    = _mm_sub_ps(_mm_cvtepi32_ps(ei), e_bias);
+    __m128  m    = _mm_castsi128_ps(_mm_or_si128(
+        _mm_and_si128(bits, _mm_set1_epi32(0x807fffff)), _mm_set1_epi32(0x3f000000)));
+
+    // m in [sqrt(0.5), sqrt(2)): m - 1, e otherwise 2 * m - 1, e - 1
+    __m128 small_mask = _mm_cmplt_ps(m, _mm_set1_ps(0.707106781186547524f));
+    e = _mm_sub_ps(e, _mm_and_ps(small_mask, _mm_set1_ps(1.0f)));
+    m = _mm_add_ps(_mm_sub_ps(m, _mm_set1_ps(1.0f)), _mm_and_ps(small_mask, m));
+
+    __m128 z = _mm_mul_ps(m, m);
+
+    __m128 y = _mm_set1_ps(7.0376836292e-2f);
+    y = _mm_add_ps(_mm_mul_ps(y, m), _mm_set1_ps(-1.1514610310e-1f));
+    y = _mm_add_ps(_mm_mul_ps(y, m), _mm_set1_ps(1.1676998740e-1f));
+    y = _mm_add_ps(_mm_mul_ps(y, m), _mm_set1_ps(-1.2420140846e-1f));
+    y = _mm_add_ps(_mm_mul_ps(y, m), _mm_set1_ps(1.4249322787e-1f));
+    y = _mm_add_ps(_mm_mul_ps(y, m), _mm_set1_ps(-1.6668057665e-1f));
+    y = _mm_add_ps(_mm_mul_ps(y, m), _mm_set1_ps(2.0000714765e-1f));
+    y = _mm_add_ps(_mm_mul_ps(y, m), _mm_set1_ps(-2.4999993993e-1f));
+    y = _mm_add_ps(_mm_mul_ps(y, m), _mm_set1_ps(3.3333331174e-1f));
+    y = _mm_mul_ps(_mm_mul_ps(y, m), z);
+
+    y = _mm_add_ps(y, _mm_mul_ps(e, _mm_set1_ps(-2.12194440e-4f)));
+    y = _mm_sub_ps(y, _mm_mul_ps(z, _mm_set1_ps(0.5f)));
+    __m128 res = _mm_add_ps(m, y);
+    res = _mm_add_ps(res, _mm_mul_ps(e, _mm_set1_ps(0.693359375f)));
+
+    res = select(zero_mask, _mm_set1_ps(-HUGE_VALF), res);
+    res = select(inf_mask, x, res);
+    return _mm_or_ps(res, nan_mask);
+}
+
+}  // vector_runtime
+}  // mdl
+}  // mi
+
+#endif // MDL_JIT_HAS_VECTOR_RUNTIME
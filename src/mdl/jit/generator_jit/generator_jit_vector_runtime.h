@@ -0,0 +1,64 @@
+/******************************************************************************
+ * Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ *  * Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  * Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in the
+ *    documentation and/or other materials provided with the distribution.
+ *  * Neither the name of NVIDIA CORPORATION nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ *****************************************************************************/
+
+#ifndef MDL_GENERATOR_JIT_VECTOR_RUNTIME_H
+#define MDL_GENERATOR_JIT_VECTOR_RUNTIME_H 1
+
+// The SIMD-wide runtime functions are called by JIT compiled code with vector arguments
+// passed in SSE registers, which matches the C ABI of __m128 on x86-64 only.
+#if defined(__x86_64__) || defined(_M_X64)
+#define MDL_JIT_HAS_VECTOR_RUNTIME 1
+#endif
+
+#ifdef MDL_JIT_HAS_VECTOR_RUNTIME
+
+#include <emmintrin.h>
+
+namespace mi {
+namespace mdl {
+namespace vector_runtime {
+
+/// Computes sinf() of four lanes at once.
+__m128 sinf_x4(__m128 x);
+
+/// Computes cosf() of four lanes at once.
+__m128 cosf_x4(__m128 x);
+
+/// Computes expf() of four lanes at once.
+__m128 expf_x4(__m128 x);
+
+/// Computes logf() of four lanes at once.
+__m128 logf_x4(__m128 x);
+
+}  // vector_runtime
+}  // mdl
+}  // mi
+
+#endif // MDL_JIT_HAS_VECTOR_RUNTIME
+
+#endif // MDL_GENERATOR_JIT_VECTOR_RUNTIME_H
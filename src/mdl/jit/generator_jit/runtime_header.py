@@ -0,0 +1,119 @@
+#!/bin/env python
+#*****************************************************************************
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#  * Neither the name of NVIDIA CORPORATION nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#*****************************************************************************
+
+# Common parts of the MDL runtime header generators.
+#
+# The runtime headers declare the intrinsic functions of the math and debug standard
+# modules for code compiled with clang into runtime libraries. Used by:
+#  - gen_libbsdf_runtime_header.py
+#  - gen_user_modules_runtime_header.py
+#  - gen_runtime_headers.py
+#
+import os
+import sys
+
+# the stdmodule IR and the code emitter are shared with the compilercore generators
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+	"..", "..", "compiler", "compilercore"))
+import code_emitter
+
+# the modules whose intrinsic functions are declared in the runtime headers
+runtime_modules = ["math", "debug"]
+
+# parameter types passed by reference
+reference_parameter_types = {
+	"bool2",
+	"bool3",
+	"bool4",
+	"color",
+	"double2",
+	"double3",
+	"double4",
+	"float2",
+	"float3",
+	"float4",
+	"int2",
+	"int3",
+	"int4"
+}
+
+def read_copyright(fname, n_lines = 3):
+	"""Return the copyright comment from the first lines of file fname."""
+	with open(fname) as f:
+		return "".join([next(f) for x in range(n_lines)])
+
+class HeaderWriter:
+	"""Writes indented code into a CodeEmitter."""
+
+	def __init__(self, f):
+		"""constructor"""
+		self.f      = f
+		self.indent = 0
+
+	def write(self, s):
+		"""write string s after doing indent."""
+		code_emitter.write_indented(self.f, self.indent, s, newlines_first = True)
+
+	def print_wrapped(self, line, wrap_pos = 99):
+		"""print the given line (provided without newline at end) and wrap it at wrap_pos,
+		   splitting the line at commas. Also handles commented out lines."""
+		orig_line = line
+		prefix = ""
+		next_prefix = "//     " if line.startswith("//") else "    "
+
+		while self.indent * 4 + len(prefix) + len(line) >= wrap_pos:
+			splitpos = line.rfind(',', 0, wrap_pos - self.indent * 4 - len(prefix))
+			if splitpos == -1:
+				raise Exception("Unable to split line: %s" % orig_line)
+			self.write(prefix + line[:splitpos + 1] + "\n")
+			line = line[splitpos + 1:].lstrip()
+			prefix = next_prefix
+
+		self.write(prefix + line + "\n")
+
+def generate_header(ir, copyright, guard, create_prototype):
+	"""Return the content of a runtime header declaring the intrinsic functions of the
+	   runtime modules, using create_prototype to get the C++ prototype of a declaration."""
+	w = HeaderWriter(code_emitter.CodeEmitter())
+	w.write(copyright)
+	w.write("\n#ifndef %s\n#define %s\n" % (guard, guard))
+
+	for module_name in runtime_modules:
+		prototypes = [create_prototype(decl) for decl in ir.get_declarations(module_name)]
+
+		w.write("\nnamespace %s\n" % module_name)
+		w.write("{\n")
+		w.indent += 1
+		for prototype in prototypes:
+			w.print_wrapped(prototype)
+		w.indent -= 1
+		w.write("}\n")
+
+	w.write("\n#endif  // %s\n" % guard)
+	return w.f.getvalue()
@@ -52,6 +52,7 @@ struct MDL_SDK_Res_data_pair
 {
     void             *shared_data;
     void             *thread_data;
+    void             *print_buffer;
 };
 
 enum BSDF_event_flags
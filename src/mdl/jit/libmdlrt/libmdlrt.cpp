@@ -39,6 +39,8 @@ namespace math
     float floor(float a);
 
     float max(float a, float b);
+
+    float min(float a, float b);
 }
 
 /// known color spaces
@@ -169,6 +171,148 @@ static const float D65[SPECTRAL_XYZ_RES] = {
     46.4182014465000f, 56.6118011475000f, 66.8053970337000f, 65.0941009521000f,
     63.3828010559000f };
 
+// Smits' basis spectra for the reconstruction of reflectivity spectra from linear sRGB colors
+static const float srgb_relative_s001[SPECTRAL_XYZ_RES] = {
+    0.7019792349932337f, 0.6846481206398503f, 0.7130972973175185f, 0.73266714528591f,
+    0.7521753527278733f, 0.7709287265054129f, 0.789839815385755f, 0.8235606525250434f,
+    0.8786107875615614f, 0.9819578876471478f, 0.9910198164593675f, 0.9950480136097326f,
+    0.9436353765848104f, 0.9998792177404764f, 0.8488676690307428f, 0.9961770321993882f,
+    0.819092009947177f, 0.8693280726453727f, 0.9359223559126267f, 0.9802148013732643f,
+    0.9873919496528827f, 0.762498683698901f, 0.5875320200030119f, 0.4455357629379469f,
+    0.3232452860337242f, 0.2146231663481411f, 0.1105830203391148f, 0.0023782638867893f,
+    8.907415964553439e-05f, 0.001459913011225042f, 0.000932672955839528f, 0.000332958270090708f,
+    5.026192962762771e-05f, 0.0005468218660104641f, 7.520923086520859e-06f, 0.000885416183660951f,
+    -1.19178209634363e-07f, 0.0007289616144523989f, 0.000326890655394145f, 0.001424896636224957f,
+    0.0003527845099592017f, -8.012812441338113e-09f, 0.0009917620535089787f, 1.245433710223703e-05f,
+    0.022436988878166f, 0.03782700617187142f, 0.04913846245879957f, 0.05246541472255685f,
+    0.0529704236704063f, 0.05254462732520614f, 0.04843639157899395f, 0.03970815158454097f,
+    0.03664607804454036f, 0.03154054908408425f, 0.02478502138590596f, 0.01393860143108826f,
+    0.009836566488988556f, 0.01147597456619223f, 0.007181309279230294f, 0.004978538278526919f,
+    0.006539008248039237f, 0.01095034160017993f, 0.0109789375214253f, 0.01409519276126715f,
+    0.01862123601479276f, 0.02041807717078808f, 0.01884598225610058f, 0.01844385324779113f,
+    0.01781522663191143f, 0.01833787401095953f, 0.01832286864208541f, 0.01710461264404163f,
+    0.01443757237003768f, 0.01175290346527167f, 0.01065350510302022f, 0.009188972800416986f,
+    0.008063881046835971f, 0.005098166251734971f, 5.422131514926884e-05f, 0.002542644119214575f,
+    0.002116346517627834f };
+
+static const float srgb_relative_s010[SPECTRAL_XYZ_RES] = {
+    0.002428537529314051f, 6.788575489867908e-05f, 6.725626688651855e-05f, 2.780309549871995e-05f,
+    0.0001642419921234072f, 5.763471518867129e-06f, 5.392158138202386e-05f, 5.633821650198947e-05f,
+    0.001085841124899043f, 0.001542727200739068f, 0.001755915747138698f, 0.002978211441831637f,
+    0.006060253896220232f, 0.003772278489164609f, 0.002326931076834186f, 0.003654542281162972f,
+    0.02285080189212957f, 0.002708705188365274f, 0.1104034162421462f, 0.2133837707508288f,
+    0.300326370173519f, 0.3959033734614398f, 0.4892826946021689f, 0.5993517446694732f,
+    0.7121688716618624f, 0.8435459116087931f, 0.9938065493525754f, 1.000001235762447f,
+    0.9992469168279198f, 0.9915923757631233f, 0.9909168538280776f, 0.9996072617681397f,
+    0.937281181520349f, 0.9317232523774757f, 0.9883561064022359f, 0.9922479572295444f,
+    0.9941673691633653f, 0.9985359085448036f, 0.9878459218067155f, 0.8322731621066195f,
+    0.6984117028125799f, 0.5727468209020763f, 0.4692579042443153f, 0.3730414922792309f,
+    0.280613551850835f, 0.1946980728242398f, 0.1082447267895803f, 0.02520999283290681f,
+    0.006141589723264229f, 0.001013331676766215f, 0.001443509543830193f, 0.004209544629105652f,
+    0.001405712097424739f, 0.001973862631341417f, 0.05136508935635808f, 3.163895405110858e-05f,
+    0.0001260002231503179f, 4.783931540578573e-07f, 0.001283808690240014f, 4.453436854069161e-07f,
+    8.693190387596512e-05f, 5.828184541748892e-05f, 3.404341008510898e-05f, 7.792065213889864e-05f,
+    6.24850801866107e-05f, 6.203694436050002e-05f, 0.0002714203171743757f, 4.270219312287799e-05f,
+    0.0008897247523153642f, 0.0001024151643443927f, 5.259823329273516e-05f, 2.389690630557454e-05f,
+    7.149778971355259e-05f, 6.0800633311615e-05f, 0.0001404541923251892f, 0.0005937210299316007f,
+    3.088735749824894e-05f, 6.35367462307171e-06f, 0.0006393304224797922f, 0.01346534081537606f,
+    0.01917413941812931f };
+
+static const float srgb_relative_s011[SPECTRAL_XYZ_RES] = {
+    0.9852372687657427f, 0.9846461448598636f, 0.9842181168286804f, 0.9820795718731994f,
+    0.980908895691984f, 0.9806632318681796f, 0.983496790349518f, 0.9698103528752705f,
+    0.9999942309347318f, 0.9902332330378104f, 0.980671310124241f, 0.9997821728218059f,
+    0.9998435958874569f, 0.9637050530712068f, 0.9819268206703333f, 0.9580966578157672f,
+    0.9861377896731414f, 0.98039475475582f, 0.9900915548710708f, 0.9960395156653334f,
+    0.9679930768852574f, 0.9703363170988208f, 0.9881077374359308f, 0.9860523177565927f,
+    0.9818462586206771f, 0.98141110425357f, 0.9864619138129831f, 0.9999430993926f,
+    0.9948758896915102f, 0.9990386938270237f, 0.9747010523347619f, 0.9821749791741461f,
+    0.9699863670717512f, 0.9711202022392692f, 0.9739864797102679f, 0.9923676996500138f,
+    0.9739053096311008f, 0.9578995081865905f, 0.9598141779686484f, 0.977596207801394f,
+    0.9791296522933828f, 0.9997606161795909f, 0.6462254092564765f, 0.3175132325090445f,
+    0.004523671684868114f, 0.002502457341269776f, 0.001233459757027489f, 0.000936083629012735f,
+    0.002646736908561008f, 0.004442677337263667f, 0.0003693672074181718f, 1.647397357418257e-10f,
+    0.004929919926435872f, 0.004852191496855301f, 0.00180880598553168f, 0.0009583177383734065f,
+    0.003334066177884495f, 0.0029070809420053f, 0.0009951298711094784f, 0.0001915726723507745f,
+    0.00407679894708919f, 0.006079228740884422f, 0.008546938247397044f, 0.008327999812784568f,
+    0.01044950849066689f, 0.00860578763189987f, 0.01043024314890605f, 0.008169598743991447f,
+    0.009146838075391751f, 0.00713403189306838f, 0.007255173568464483f, 0.005702724361243096f,
+    0.005162330311683921f, 0.004036826019850519f, 0.003332656635873184f, 0.002554748804969853f,
+    0.001942155644468927f, 0.001522783667325949f, 0.001139008439336342f, 0.0009492905384319335f,
+    0.0008275735558370947f };
+
+static const float srgb_relative_s100[SPECTRAL_XYZ_RES] = {
+    0.0007409220676516125f, 0.004849830418717687f, 0.001842751401660805f, 0.007147352338464253f,
+    0.002019158696403484f, 0.003399533567782214f, 0.005118727330893039f, 0.01436073227948874f,
+    0.002419732549565436f, 0.01418418901778661f, 0.003728704086479323f, 0.003051349822643837f,
+    0.006183308407595969f, 0.007974818904756625f, 0.01049069043626785f, 0.02332968717302015f,
+    0.01047712451887445f, 0.001501131209837158f, 0.006241064560863381f, 0.005919984587085966f,
+    0.01255884422334294f, 0.1993577551512564f, 0.1563219533493726f, 9.217926200122406e-09f,
+    0.00137385336296364f, 0.004067686225423722f, 0.008848539328186855f, 0.01771450860144669f,
+    0.0006550149504790936f, 0.04564819791631125f, 0.0005973170963574637f, 0.01157964800558073f,
+    0.001793711467677789f, 0.01844966493138794f, 0.008534775177902874f, 0.01302599042800331f,
+    0.009637548915778088f, 0.04437545679889537f, 0.02017691805169797f, 0.05806322380947027f,
+    0.03139649449404591f, 0.006782877013468136f, 0.01850192015876473f, 1.001180576302825f,
+    1.004041261789702f, 1.005840378008476f, 1.001013576582545f, 1.000120028586126f,
+    1.002787210417777f, 1.00199084532196f, 0.9989448506546621f, 0.9949326704045063f,
+    0.996205638445032f, 1.001897631835025f, 1.001521715477919f, 1.000566593664006f,
+    0.9964151908264555f, 0.9894564557816521f, 0.9911424364083202f, 0.9697669641242773f,
+    0.9874082114233729f, 0.9951578595580749f, 0.9740327270229423f, 0.9791985776406157f,
+    0.9994266731163705f, 1.003316424976203f, 0.7629036447514228f, 0.5329690363217223f,
+    0.3670684680826211f, 0.2566466651644825f, 0.1823105116309411f, 0.1303484789186605f,
+    0.09227206861235453f, 0.06321385581926865f, 0.04203572740819442f, 0.0273487439689453f,
+    0.01793053684638936f, 0.01253976251611535f, 0.00928451372181338f, 0.007160666338817392f,
+    0.00602276013321131f };
+
+static const float srgb_relative_s101[SPECTRAL_XYZ_RES] = {
+    0.03966424360978084f, 0.0666842669979759f, 0.1360126372165655f, 0.2971177379492205f,
+    0.6035414481466175f, 0.9604698342966149f, 0.9961111272763699f, 0.9893097234761996f,
+    0.9790692122822285f, 0.9851651899109966f, 0.999999996531761f, 0.9998209398606008f,
+    0.9980340098084008f, 0.9997635473018051f, 0.9938224951813093f, 0.9993339721766316f,
+    0.999904227363565f, 0.9980040890818495f, 0.9999325874316333f, 0.9984926086588051f,
+    0.9991469943857181f, 0.0008135094923077957f, 0.03460074425022895f, 0.002309867592728061f,
+    0.5218622061089874f, 0.0009286292974522437f, 0.4249726437829449f, 0.2864387932040004f,
+    1.395450039132218e-06f, 0.0005263805378643016f, 0.02020544774928343f, 0.001656886053709783f,
+    0.0005813948547832987f, 0.0008397357404892978f, 0.01208138694789209f, 0.0649510446178299f,
+    0.02045289273519157f, 0.0009498973779616948f, 0.035448624429127f, 0.0008299230684262193f,
+    0.001662311966121321f, 0.002062681203665928f, 0.9349351684727306f, 0.9964466864906643f,
+    0.9048723983685156f, 0.991621724066827f, 0.9636433895989418f, 0.9184728713334172f,
+    0.8288598907749665f, 0.9932109191470992f, 0.9512612373755814f, 0.9413027178685172f,
+    0.9441527171417219f, 0.9615074164960868f, 0.9702440264806318f, 0.9675526946187083f,
+    0.9911763458230497f, 0.9299073733355203f, 0.7039599622841168f, 0.508576178361903f,
+    0.3625286331688867f, 0.2461308619590631f, 0.1634964918146734f, 0.1137658593769352f,
+    0.08179347675587997f, 0.05930370101535327f, 0.04254910835403532f, 0.02846534673463662f,
+    0.01873930431404859f, 0.01352658514667865f, 0.009998525028822347f, 0.007271355044460738f,
+    0.005155246536688316f, 0.003363287960474204f, 0.002150347422884713f, 0.001352280895826105f,
+    0.0008289800665591715f, 0.0006540553970425129f, 0.0005142962893266951f, 0.0003910890502297751f,
+    0.0002902010637260777f };
+
+static const float srgb_relative_s110[SPECTRAL_XYZ_RES] = {
+    0.2322510131596014f, 0.2338053649341241f, 0.2305391334750355f, 0.2240444825302954f,
+    0.222290950620112f, 0.2190033756545315f, 0.2112729916051158f, 0.2036218909071616f,
+    0.1944355163449629f, 0.1838858465678188f, 0.1692374684140473f, 0.1440249952295104f,
+    0.1141703026730981f, 0.0828879074816061f, 0.04345924010348871f, 1.119134705546143e-06f,
+    0.0001354503969870913f, 0.0001498310029654226f, 5.626623085494553e-06f, 7.71358463214078e-10f,
+    1.211763175967828e-06f, 0.2022857130064065f, 0.3995860977711797f, 0.5943020896119411f,
+    0.7741579535977097f, 0.9520321516189659f, 0.9940615250215923f, 0.9933115010271515f,
+    0.9942523021512848f, 0.9877539267090167f, 0.9932153305868361f, 0.9943442666382879f,
+    0.9883384138810725f, 0.9881696929910966f, 0.9856156539578474f, 0.9842044355170503f,
+    0.9890423933794129f, 0.9768486236609222f, 0.9682982479615889f, 0.9896401562297059f,
+    0.9886085130157716f, 0.974561811337312f, 0.9952720520794776f, 0.9964823787510263f,
+    0.9787564547167399f, 0.9816676253894546f, 0.95277294659181f, 0.9632527644893615f,
+    0.959762550690106f, 0.9997641361779183f, 0.9730804694801571f, 0.9849302183589388f,
+    0.9812787815901709f, 0.987263388006969f, 0.9979069536466842f, 0.9999880057301322f,
+    0.9958804110904349f, 0.9902337154682648f, 0.9948438379481567f, 0.9648758292879309f,
+    0.9240360398987943f, 0.8840765095223057f, 0.8404526340004388f, 0.7958322238012531f,
+    0.7634595178216689f, 0.7234047109580162f, 0.6843540312649222f, 0.652787251042751f,
+    0.6262623429713907f, 0.5950317233987727f, 0.5678228727842928f, 0.5340687103718186f,
+    0.5016722470544752f, 0.4567691233785649f, 0.4067748059137121f, 0.3387787400013262f,
+    0.2813882684603767f, 0.2455242826762348f, 0.1966594839904222f, 0.1578683035764035f,
+    0.1365928227215609f };
+
+
+
+
 //  blackbody emitter, compute intensity at specific wavelength (in nm)
 //  and temperature (in Kelvin) using Planck's law 
 static float blackbody(const float lambda, const float temperature)
@@ -372,9 +516,9 @@ extern "C" void mdl_emission_color(
         num_values);
     convert_XYZ_to_cs(target, XYZ, CS_sRGB);
 
-    math::max(target[0], 0.0f);
-    math::max(target[1], 0.0f);
-    math::max(target[2], 0.0f);
+    target[0] = math::max(target[0], 0.0f);
+    target[1] = math::max(target[1], 0.0f);
+    target[2] = math::max(target[2], 0.0f);
 }
 
 extern "C" void mdl_reflection_color(
@@ -432,3 +576,58 @@ extern "C" void mdl_blackbody(float sRGB[3], float kelvin)
     sRGB[1] = math::max(sRGB[1], 0.0f);
     sRGB[2] = math::max(sRGB[2], 0.0f);
 }
+
+extern "C" float mdl_eval_at_wavelength(float r, float g, float b, float lambda)
+{
+    // the spectrum is continued constantly outside the tabulated range
+    if (!(lambda > SPECTRAL_XYZ_LAMBDA_MIN))
+        lambda = SPECTRAL_XYZ_LAMBDA_MIN;
+    else if (lambda > SPECTRAL_XYZ_LAMBDA_MAX)
+        lambda = SPECTRAL_XYZ_LAMBDA_MAX;
+
+    // Smits' method: the spectrum is a linear combination of the basis spectra, so evaluate
+    // each of them at the wavelength instead of reconstructing the whole spectrum
+    const float c111 = math::min(r, math::min(g, b));
+    float value = c111;
+
+    r -= c111;
+    g -= c111;
+    b -= c111;
+
+    if (r > 0.0f && g > 0.0f) {
+        const float c110 = math::min(r, g);
+        value += c110 * get_value_lerp(
+            srgb_relative_s110, SPECTRAL_XYZ_RES,
+            SPECTRAL_XYZ_LAMBDA_MIN, SPECTRAL_XYZ_LAMBDA_MAX, lambda);
+        r -= c110;
+        g -= c110;
+    } else if (r > 0.0f && b > 0.0f) {
+        const float c101 = math::min(r, b);
+        value += c101 * get_value_lerp(
+            srgb_relative_s101, SPECTRAL_XYZ_RES,
+            SPECTRAL_XYZ_LAMBDA_MIN, SPECTRAL_XYZ_LAMBDA_MAX, lambda);
+        r -= c101;
+        b -= c101;
+    } else {
+        const float c011 = math::min(g, b);
+        value += c011 * get_value_lerp(
+            srgb_relative_s011, SPECTRAL_XYZ_RES,
+            SPECTRAL_XYZ_LAMBDA_MIN, SPECTRAL_XYZ_LAMBDA_MAX, lambda);
+        g -= c011;
+        b -= c011;
+    }
+
+    if (r > 0.0f)
+        value += r * get_value_lerp(
+            srgb_relative_s100, SPECTRAL_XYZ_RES,
+            SPECTRAL_XYZ_LAMBDA_MIN, SPECTRAL_XYZ_LAMBDA_MAX, lambda);
+    if (g > 0.0f)
+        value += g * get_value_lerp(
+            srgb_relative_s010, SPECTRAL_XYZ_RES,
+            SPECTRAL_XYZ_LAMBDA_MIN, SPECTRAL_XYZ_LAMBDA_MAX, lambda);
+    if (b > 0.0f)
+        value += b * get_value_lerp(
+            srgb_relative_s001, SPECTRAL_XYZ_RES,
+            SPECTRAL_XYZ_LAMBDA_MIN, SPECTRAL_XYZ_LAMBDA_MAX, lambda);
+    return value;
+}
@@ -43,4 +43,6 @@ extern "C" void mdl_reflection_color(
 
 extern "C" void mdl_blackbody(float sRGB[3], float kelvin);
 
+extern "C" float mdl_eval_at_wavelength(float r, float g, float b, float lambda);
+
 #endif // MDL_LIBMDLRT_H
@@ -0,0 +1,237 @@
+"""
+Persistent test discovery cache.
+
+The cache remembers, per test suite, the tests and subdirectories found in
+each searched directory and the keyword lines (RUN:, REQUIRES:, ...) parsed
+from each test file, so that later lit runs neither walk unchanged
+directories nor re-read unchanged test files.
+
+A directory entry is reused while the modification time of the directory and
+the effective configuration used to search it (test format, suffixes and
+excludes) are unchanged. The configuration files themselves are still loaded
+on every run, they are Python code and may depend on parameters and on the
+environment. Only directories searched by file based test formats are cached.
+
+The keyword lines of a test are reused while the modification time and the
+size of the test file and the set of keywords are unchanged.
+
+Each test suite is stored in its own JSON file inside the cache directory.
+The files are replaced atomically, so several lit processes (e.g. the shards
+of a test run) can share one cache directory.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import lit
+import lit.util
+from lit.formats.base import FileBasedTest
+
+# The version of the cache file format, bump it on incompatible changes.
+CACHE_VERSION = 1
+
+# Entries younger than this (in seconds) are not stored: a change made within
+# the timestamp granularity of the file system could go unnoticed otherwise.
+RACY_INTERVAL = 2.0
+
+def fileStamp(path):
+    """fileStamp(path) -> [mtime, size] or None if path does not exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime, st.st_size]
+
+def isFileBased(test_format):
+    """isFileBased(test_format) -> bool
+
+    Check if test_format finds the tests of a directory like FileBasedTest,
+    i.e. only depending on the file names, the suffixes and the excludes.
+    """
+    if not isinstance(test_format, FileBasedTest):
+        return False
+    method = type(test_format).getTestsInDirectory
+    base = FileBasedTest.getTestsInDirectory
+    # Python 2 creates a new unbound method object on every access.
+    return getattr(method, '__func__', method) is getattr(base, '__func__', base)
+
+def configFingerprint(config):
+    """configFingerprint(config) -> the parts of config affecting discovery"""
+    test_format = config.test_format
+    if test_format is None:
+        format_name = ''
+    else:
+        format_name = '%s.%s' % (type(test_format).__module__,
+                                 type(test_format).__name__)
+    return [format_name, sorted(config.suffixes), sorted(config.excludes)]
+
+class DiscoveryCache(object):
+    """DiscoveryCache - The on-disk test discovery cache of a lit run."""
+
+    def __init__(self, cache_dir, lit_config):
+        self.cache_dir = cache_dir
+        self.lit_config = lit_config
+        # Entries created after this time are racy.
+        self.start_time = time.time()
+        # The loaded suites, the file name of a suite maps to
+        # [data, dirty, suite].
+        self.suites = {}
+        # The file names of the suites, by (source root, exec root).
+        self.suite_names = {}
+        # The stamps of directories being searched, (file name, dir) maps to
+        # [stamp, fingerprint].
+        self.pending = {}
+        # The keyword lines handed out to tests, by full test name.
+        self.handed_out = {}
+        self.dirs_reused = 0
+        self.dirs_searched = 0
+        self.scripts_reused = 0
+        self.scripts_parsed = 0
+
+    def _getSuite(self, ts):
+        """_getSuite(ts) -> (file name, suite entry) of the given test suite"""
+        key = (ts.source_root, ts.exec_root)
+        name = self.suite_names.get(key)
+        if name is None:
+            digest = hashlib.sha1(lit.util.to_bytes('\0'.join(key)))
+            self.suite_names[key] = name = 'discovery-%s.json' % (
+                digest.hexdigest()[:16],)
+        entry = self.suites.get(name)
+        if entry is None:
+            data = None
+            try:
+                f = open(os.path.join(self.cache_dir, name))
+                try:
+                    data = json.load(f)
+                finally:
+                    f.close()
+            except (IOError, OSError, ValueError):
+                pass
+            if not isinstance(data, dict) or \
+                    data.get('version') != CACHE_VERSION or \
+                    data.get('lit') != lit.__version__ or \
+                    data.get('source_root') != ts.source_root or \
+                    data.get('exec_root') != ts.exec_root:
+                data = { 'version' : CACHE_VERSION,
+                         'lit' : lit.__version__,
+                         'source_root' : ts.source_root,
+                         'exec_root' : ts.exec_root,
+                         'dirs' : {},
+                         'scripts' : {} }
+            self.suites[name] = entry = [data, False, ts]
+        return name, entry
+
+    def getDirectory(self, ts, path_in_suite, config):
+        """
+        getDirectory(ts, path_in_suite, config) -> (tests, subdirs) or None
+
+        Return the names of the tests and of the subdirectories found in the
+        given directory by a previous run, or None if the directory must be
+        searched. In the latter case, storeDirectory() should be called with
+        the search results.
+        """
+        if config.test_format is not None and \
+                not isFileBased(config.test_format):
+            return None
+
+        name, entry = self._getSuite(ts)
+        dir_key = '/'.join(path_in_suite)
+        stamp = fileStamp(ts.getSourcePath(path_in_suite))
+        fingerprint = configFingerprint(config)
+        cached = entry[0]['dirs'].get(dir_key)
+        if cached is not None and stamp is not None and \
+                cached['stamp'] == stamp[0] and \
+                cached['config'] == fingerprint:
+            self.dirs_reused += 1
+            return cached['tests'], cached['subdirs']
+
+        self.dirs_searched += 1
+        if stamp is not None:
+            self.pending[(name, dir_key)] = [stamp[0], fingerprint]
+        return None
+
+    def storeDirectory(self, ts, path_in_suite, tests, subdirs):
+        """
+        storeDirectory(ts, path_in_suite, tests, subdirs)
+
+        Remember the results of searching a directory for which getDirectory()
+        returned None.
+        """
+        name, entry = self._getSuite(ts)
+        dir_key = '/'.join(path_in_suite)
+        pending = self.pending.pop((name, dir_key), None)
+        if pending is None:
+            return
+        stamp, fingerprint = pending
+        if stamp >= self.start_time - RACY_INTERVAL:
+            entry[0]['dirs'].pop(dir_key, None)
+        else:
+            entry[0]['dirs'][dir_key] = { 'stamp' : stamp,
+                                          'config' : fingerprint,
+                                          'tests' : list(tests),
+                                          'subdirs' : list(subdirs) }
+        entry[1] = True
+
+    def attachScript(self, test):
+        """
+        attachScript(test)
+
+        Hand the cached keyword lines of a test to the test. They are checked
+        and, if outdated, replaced when the test is executed, see
+        lit.TestRunner.getIntegratedTestScriptCommands().
+        """
+        name, entry = self._getSuite(test.suite)
+        cached = entry[0]['scripts'].get('/'.join(test.path_in_suite))
+        if cached is None:
+            cached = [None, None, None]
+        else:
+            self.handed_out[test.getFullName()] = cached
+        test.script_commands = cached
+
+    def storeScripts(self, tests):
+        """
+        storeScripts(tests)
+
+        Remember the keyword lines of the given (executed) tests.
+        """
+        for test in tests:
+            cached = test.script_commands
+            if cached is None or cached[0] is None:
+                continue
+            if cached == self.handed_out.get(test.getFullName()):
+                self.scripts_reused += 1
+                continue
+            self.scripts_parsed += 1
+            name, entry = self._getSuite(test.suite)
+            key = '/'.join(test.path_in_suite)
+            if cached[0][0] >= self.start_time - RACY_INTERVAL:
+                entry[0]['scripts'].pop(key, None)
+            else:
+                entry[0]['scripts'][key] = cached
+            entry[1] = True
+
+    def save(self):
+        """save() - Write all changed suites to the cache directory."""
+        for name, entry in self.suites.items():
+            data, dirty, ts = entry
+            if not dirty:
+                continue
+            try:
+                lit.util.write_file_atomic(
+                    os.path.join(self.cache_dir, name),
+                    json.dumps(data, sort_keys=True))
+            except (IOError, OSError) as e:
+                self.lit_config.warning(
+                    'unable to write the discovery cache of test suite %r: %s'
+                    % (ts.name, e))
+            entry[1] = False
+
+    def summary(self):
+        """summary() -> a description of the cache hits and misses"""
+        return ('discovery cache: %d of %d directories and %d of %d test '
+                'scripts reused' % (
+                    self.dirs_reused, self.dirs_reused + self.dirs_searched,
+                    self.scripts_reused,
+                    self.scripts_reused + self.scripts_parsed))
@@ -26,7 +26,8 @@ class LitConfig(object):
                  maxIndividualTestTime = 0,
                  maxFailures = None,
                  parallelism_groups = {},
-                 echo_all_commands = False):
+                 echo_all_commands = False,
+                 result_cache = None):
         # The name of the test runner.
         self.progname = progname
         # The items to add to the PATH environment variable.
@@ -68,6 +69,8 @@ class LitConfig(object):
         self.maxFailures = maxFailures
         self.parallelism_groups = parallelism_groups
         self.echo_all_commands = echo_all_commands
+        # The lit.ResultCache.ResultCache of passing results, or None.
+        self.result_cache = result_cache
 
     @property
     def maxIndividualTestTime(self):
@@ -0,0 +1,198 @@
+"""
+Content-addressed cache of passing test results.
+
+Each shell test is keyed by a hash of everything its result is assumed to
+depend on: the test source, its RUN lines with all substitutions resolved, the
+test configuration (features, environment, format), the executables named in
+the RUN lines (looked up in the PATH of the test) and the existing files passed
+to them. If a test passed before with the same key, it is reported as passed
+again without being executed.
+
+The cache directory holds one file per passing key, so the cache can be shared
+by concurrent lit processes and persisted across CI runs by keeping the
+directory. Files not named on a RUN line, e.g. inputs read through a
+directory argument, are not part of the key.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+import lit
+import lit.ShUtil as ShUtil
+import lit.Test
+import lit.TestRunner
+import lit.util
+from lit.ShCommands import Command, Pipeline, Seq
+
+# The version of the cache key, bump it if the key computation changes.
+CACHE_VERSION = 1
+
+# Commands running the command given as their arguments.
+kWrapperCommands = ('env', 'not')
+
+# The environment variables not part of the key, lit points them to a new
+# temporary directory in every run.
+kIgnoredVariables = ('TMPDIR', 'TMP', 'TEMP', 'TEMPDIR')
+
+# The output of a test result taken from the cache.
+kCachedOutput = 'Test passed in a previous run with the same inputs ' \
+                '(result cache)'
+
+def _commands(node):
+    """_commands(node) - yield the commands of a parsed RUN line"""
+    if isinstance(node, Command):
+        yield node
+    elif isinstance(node, Pipeline):
+        for command in node.commands:
+            yield command
+    elif isinstance(node, Seq):
+        for command in _commands(node.lhs):
+            yield command
+        for command in _commands(node.rhs):
+            yield command
+
+def _executables(args):
+    """_executables(args) - yield the executables run by a command"""
+    while args and isinstance(args[0], str):
+        yield args[0]
+        name = os.path.splitext(os.path.basename(args[0]))[0]
+        if name not in kWrapperCommands:
+            break
+        args = args[1:]
+        # Skip the options of the wrapper and the variables set by env.
+        while args and isinstance(args[0], str) and \
+                (args[0].startswith('-') or '=' in args[0]):
+            if args[0] == '-u':
+                args = args[1:]
+            args = args[1:]
+
+class ResultCache(object):
+    """ResultCache - The on-disk cache of passing test results."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        # The digests of the files hashed by this process, by path. Each entry
+        # is [mtime, size, digest].
+        self.file_digests = {}
+
+    def _fileDigest(self, path):
+        """_fileDigest(path) -> the hash of the content of a file or None"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        cached = self.file_digests.get(path)
+        if cached is not None and cached[0] == st.st_mtime and \
+                cached[1] == st.st_size:
+            return cached[2]
+        h = hashlib.sha1()
+        try:
+            f = open(path, 'rb')
+            try:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    h.update(block)
+            finally:
+                f.close()
+        except (IOError, OSError):
+            return None
+        digest = h.hexdigest()
+        self.file_digests[path] = [st.st_mtime, st.st_size, digest]
+        return digest
+
+    def getKey(self, test, litConfig, script, useExternalSh):
+        """
+        getKey(test, litConfig, script, useExternalSh) -> key or None
+
+        Compute the cache key of a shell test from its RUN lines with the
+        substitutions applied. Returns None if the test can not be cached.
+        """
+        config = test.config
+        source_digest = self._fileDigest(test.getSourcePath())
+        if source_digest is None:
+            return None
+        tmpDir, tmpBase = lit.TestRunner.getTempPaths(test)
+        execdir = os.path.dirname(test.getExecPath())
+        paths = config.environment.get('PATH')
+
+        executables = []
+        files = []
+        for ln in script:
+            ln = re.sub(lit.TestRunner.kPdbgRegex, ": '\\1'; ", ln)
+            try:
+                parsed = ShUtil.ShParser(ln, litConfig.isWindows,
+                                         config.pipefail).parse()
+            except:
+                return None
+            for command in _commands(parsed):
+                args = command.args
+                for name in _executables(args):
+                    path = lit.util.which(name, paths)
+                    executables.append(
+                        [name, path and self._fileDigest(path)])
+                inputs = [arg for arg in args[1:] if isinstance(arg, str)]
+                inputs += [filename for op, filename in command.redirects
+                           if op[0] == '<' and isinstance(filename, str)]
+                for arg in inputs:
+                    path = os.path.normpath(os.path.join(execdir, arg))
+                    # The outputs of previous runs are no inputs.
+                    if path.startswith(tmpDir + os.sep) or \
+                            path.startswith(tmpBase):
+                        continue
+                    if os.path.isfile(path):
+                        files.append([arg, self._fileDigest(path)])
+
+        data = { 'version' : CACHE_VERSION,
+                 'lit' : lit.__version__,
+                 'test' : test.getFullName(),
+                 'source' : source_digest,
+                 'script' : script,
+                 'external_sh' : bool(useExternalSh),
+                 'executables' : executables,
+                 'files' : files,
+                 'features' : sorted(config.available_features),
+                 'limit_to_features' : sorted(config.limit_to_features),
+                 'environment' : sorted(
+                     item for item in config.environment.items()
+                     if item[0] not in kIgnoredVariables),
+                 'pipefail' : config.pipefail,
+                 'valgrind' : litConfig.valgrindArgs,
+                 'timeout' : litConfig.maxIndividualTestTime }
+        return hashlib.sha1(
+            lit.util.to_bytes(json.dumps(data, sort_keys=True))).hexdigest()
+
+    def _getPath(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def hasPassed(self, key):
+        """hasPassed(key) -> whether a test with the given key passed"""
+        return os.path.exists(self._getPath(key))
+
+    def storePass(self, key, test):
+        """storePass(key, test) - Remember that a test with key passed."""
+        try:
+            lit.util.write_file_atomic(self._getPath(key),
+                                       test.getFullName() + '\n')
+        except (IOError, OSError):
+            # Not caching a result only costs a later rerun.
+            pass
+
+    def getCachedResult(self):
+        """getCachedResult() -> a new result of a test which passed before"""
+        result = lit.Test.Result(lit.Test.PASS, kCachedOutput)
+        result.result_cache = 'hit'
+        return result
+
+    def summary(self, tests):
+        """summary(tests) -> a description of the cache hits and misses"""
+        hits = misses = stored = 0
+        for test in tests:
+            status = test.result and test.result.result_cache
+            if status == 'hit':
+                hits += 1
+            elif status is not None:
+                misses += 1
+                stored += (status == 'stored')
+        return 'result cache: %d hits, %d misses, %d results stored' % (
+            hits, misses, stored)
@@ -137,6 +137,9 @@ class Result(object):
         self.metrics = {}
         # The micro-test results reported by this test.
         self.microResults = {}
+        # How the result cache was used for this test (see lit.ResultCache):
+        # None, 'hit', 'miss' or 'stored'.
+        self.result_cache = None
 
     def addMetric(self, name, value):
         """
@@ -220,6 +223,11 @@ class Test:
         # triple parts. All of them must be False for the test to run.
         self.unsupported = []
 
+        # The keyword lines of the test script, a [stamp, keywords, commands]
+        # list maintained by the discovery cache, or None if it is disabled.
+        # See lit.TestRunner.getIntegratedTestScriptCommands().
+        self.script_commands = None
+
         # The test result, once complete.
         self.result = None
 
@@ -20,6 +20,7 @@ except ImportError:
     from io import StringIO
 
 from lit.ShCommands import GlobItem
+import lit.DiscoveryCache
 import lit.ShUtil as ShUtil
 import lit.Test as Test
 import lit.util
@@ -1179,6 +1180,31 @@ def parseIntegratedTestScriptCommands(source_path, keywords):
     finally:
         f.close()
 
+def getIntegratedTestScriptCommands(test, keywords):
+    """
+    getIntegratedTestScriptCommands(test, keywords) -> commands
+
+    Like parseIntegratedTestScriptCommands() for the source of the given test,
+    but if the discovery cache is enabled, reuse the commands cached for the
+    test if the test file and the keywords did not change, and remember the
+    parsed commands otherwise.
+    """
+    source_path = test.getSourcePath()
+    if test.script_commands is None:
+        return parseIntegratedTestScriptCommands(source_path, keywords)
+
+    keywords = sorted(keywords)
+    stamp = lit.DiscoveryCache.fileStamp(source_path)
+    cached_stamp, cached_keywords, commands = test.script_commands
+    if stamp is not None and stamp == cached_stamp and \
+            keywords == cached_keywords:
+        return commands
+
+    commands = [list(command) for command in
+                parseIntegratedTestScriptCommands(source_path, keywords)]
+    test.script_commands = [stamp, keywords, commands]
+    return commands
+
 def getTempPaths(test):
     """Get the temporary location, this is always relative to the test suite
     root, not test source root."""
@@ -1468,10 +1494,8 @@ def parseIntegratedTestScript(test, additional_parsers=[],
         keyword_parsers[parser.keyword] = parser
         
     # Collect the test lines from the script.
-    sourcepath = test.getSourcePath()
     for line_number, command_type, ln in \
-            parseIntegratedTestScriptCommands(sourcepath,
-                                              keyword_parsers.keys()):
+            getIntegratedTestScriptCommands(test, keyword_parsers.keys()):
         parser = keyword_parsers[command_type]
         parser.parseLine(line_number, ln)
         if command_type == 'END.' and parser.getValue() is True:
@@ -1568,6 +1592,14 @@ def executeShTest(test, litConfig, useExternalSh,
                                              normalize_slashes=useExternalSh)
     script = applySubstitutions(script, substitutions)
 
+    # Skip the test if it passed before with the same inputs.
+    resultCache = litConfig.result_cache
+    cacheKey = None
+    if resultCache is not None:
+        cacheKey = resultCache.getKey(test, litConfig, script, useExternalSh)
+        if cacheKey is not None and resultCache.hasPassed(cacheKey):
+            return resultCache.getCachedResult()
+
     # Re-run failed tests up to test_retry_attempts times.
     attempts = 1
     if hasattr(test.config, 'test_retry_attempts'):
@@ -1580,4 +1612,10 @@ def executeShTest(test, litConfig, useExternalSh,
     # will be printed separately in the test summary.
     if i > 0 and res.code == Test.PASS:
         res.code = Test.FLAKYPASS
+
+    if cacheKey is not None:
+        res.result_cache = 'miss'
+        if res.code == Test.PASS:
+            resultCache.storePass(cacheKey, test)
+            res.result_cache = 'stored'
     return res
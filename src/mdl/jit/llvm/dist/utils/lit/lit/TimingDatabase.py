@@ -0,0 +1,156 @@
+"""
+Persistent per-test timing data.
+
+The timing database remembers, for each test, the time its last execution
+took (Result.elapsed) and whether it failed. lit uses it to start the tests
+expected to take longest first, so that no slow test is left to run alone at
+the end of a parallel run, optionally to start the tests which failed last time
+first, and to balance the shards of --num-shards by time instead of by count.
+
+The database is a JSON file. It is replaced atomically, and the timings stored
+by other lit processes in the meantime are kept. Runs of a shard only read the
+file, so all shards of a test run select their tests from the same timings.
+"""
+
+import heapq
+import json
+
+import lit.Test
+import lit.util
+
+# The version of the database file format, bump it on incompatible changes.
+DATABASE_VERSION = 1
+
+class TimingDatabase(object):
+    """TimingDatabase - The per-test timing data of previous lit runs."""
+
+    def __init__(self, path, lit_config):
+        self.path = path
+        self.lit_config = lit_config
+        # The entries of the tests, by full test name: [elapsed, failed].
+        self.tests = self._load()
+        # The entries updated by this run.
+        self.updated = {}
+
+    def _load(self):
+        """_load() -> the test entries stored in the database file"""
+        try:
+            f = open(self.path)
+            try:
+                data = json.load(f)
+            finally:
+                f.close()
+        except (IOError, OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or \
+                data.get('version') != DATABASE_VERSION or \
+                not isinstance(data.get('tests'), dict):
+            return {}
+        return data['tests']
+
+    def getElapsed(self, test):
+        """getElapsed(test) -> the previous execution time of test or None"""
+        entry = self.tests.get(test.getFullName())
+        if entry is None:
+            return None
+        return entry[0]
+
+    def hasFailed(self, test):
+        """hasFailed(test) -> whether the previous execution of test failed"""
+        entry = self.tests.get(test.getFullName())
+        return entry is not None and entry[1]
+
+    def sortTests(self, tests, failures_first=False):
+        """
+        sortTests(tests, [failures_first])
+
+        Sort the tests such that the tests expected to take longest come
+        first. Tests without timing data are expected to be slow, they might
+        be new. Early tests (see TestingConfig.is_early) stay first and, if
+        failures_first is set, the tests which failed last time come next.
+        """
+        def sortKey(test):
+            elapsed = self.getElapsed(test)
+            return (not test.isEarlyTest(),
+                    failures_first and not self.hasFailed(test),
+                    elapsed is not None,
+                    -(elapsed or 0.0),
+                    test.getFullName())
+        tests.sort(key=sortKey)
+
+    def selectShard(self, tests, num_shards, run_shard):
+        """
+        selectShard(tests, num_shards, run_shard) -> (shard tests, shard time,
+                                                       total time)
+
+        Split the tests into num_shards shards of about the same expected
+        time and return the tests of shard run_shard (counting from 1), in
+        their original order. Tests without timing data are expected to take
+        the mean time of the tests with timing data.
+
+        All shards must see the same timing data to select disjoint shards.
+        """
+        known = [elapsed for elapsed in map(self.getElapsed, tests)
+                 if elapsed is not None]
+        default = sum(known) / len(known) if known else 1.0
+        expected = []
+        for index, test in enumerate(tests):
+            elapsed = self.getElapsed(test)
+            if elapsed is None:
+                elapsed = default
+            expected.append((-elapsed, test.getFullName(), index))
+        expected.sort()
+
+        # Longest processing time first: hand each test to the shard with the
+        # least expected time so far.
+        shards = [(0.0, shard) for shard in range(num_shards)]
+        selected = []
+        shard_time = 0.0
+        for neg_elapsed, name, index in expected:
+            load, shard = heapq.heappop(shards)
+            heapq.heappush(shards, (load - neg_elapsed, shard))
+            if shard == run_shard - 1:
+                selected.append(index)
+                shard_time -= neg_elapsed
+        total_time = -sum(neg_elapsed for neg_elapsed, _, _ in expected)
+        selected.sort()
+        return [tests[index] for index in selected], shard_time, total_time
+
+    def update(self, tests):
+        """
+        update(tests)
+
+        Remember the execution times and results of the given (executed)
+        tests.
+        """
+        for test in tests:
+            result = test.result
+            if result is None or result.elapsed is None:
+                continue
+            # Tests which were not run are marked UNRESOLVED without output.
+            if result.code == lit.Test.UNRESOLVED and not result.output:
+                continue
+            # Results taken from the result cache do not tell the time the
+            # test takes, keep the time of its last execution.
+            if result.result_cache == 'hit':
+                continue
+            entry = [result.elapsed, result.code.isFailure]
+            self.tests[test.getFullName()] = entry
+            self.updated[test.getFullName()] = entry
+
+    def save(self):
+        """save() - Write the database file, if any test was updated."""
+        if not self.updated:
+            return
+        # Keep the timings stored by other lit processes since we loaded.
+        tests = self._load()
+        tests.update(self.updated)
+        try:
+            lit.util.write_file_atomic(
+                self.path, json.dumps({ 'version' : DATABASE_VERSION,
+                                        'tests' : tests },
+                                      sort_keys=True, indent=0))
+        except (IOError, OSError) as e:
+            self.lit_config.warning('unable to write the timing data %r: %s'
+                                    % (self.path, e))
+        self.updated = {}
@@ -7,6 +7,7 @@ import platform
 import signal
 import subprocess
 import sys
+import tempfile
 import threading
 
 
@@ -145,6 +146,32 @@ def mkdir_p(path):
             raise
 
 
+def write_file_atomic(path, data):
+    """write_file_atomic(path, data) - Replace the file "path" with the string
+    "data", such that concurrent readers see either the old or the new
+    content, never a partially written file."""
+    dirname = os.path.dirname(os.path.abspath(path))
+    mkdir_p(dirname)
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix='.tmp-')
+    try:
+        f = os.fdopen(fd, 'wb')
+        try:
+            f.write(to_bytes(data))
+        finally:
+            f.close()
+        if hasattr(os, 'replace'):
+            os.replace(tmp_path, path)
+        else:
+            # Python 2: os.rename() cannot replace an existing file on Windows.
+            if platform.system() == 'Windows' and os.path.exists(path):
+                os.remove(path)
+            os.rename(tmp_path, path)
+    except:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
 def listdir_files(dirname, suffixes=None, exclude_filenames=None):
     """Yields files in a directory.
 
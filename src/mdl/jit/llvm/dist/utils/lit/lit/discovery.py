@@ -126,7 +126,8 @@ def getLocalConfig(ts, path_in_suite, litConfig, cache):
 
     return search(path_in_suite)
 
-def getTests(path, litConfig, testSuiteCache, localConfigCache):
+def getTests(path, litConfig, testSuiteCache, localConfigCache,
+             discoveryCache=None):
     # Find the test suite for this input and its relative path.
     ts,path_in_suite = getTestSuite(path, litConfig, testSuiteCache)
     if ts is None:
@@ -138,10 +139,11 @@ def getTests(path, litConfig, testSuiteCache, localConfigCache):
                                                         path_in_suite))
 
     return ts, getTestsInSuite(ts, path_in_suite, litConfig,
-                               testSuiteCache, localConfigCache)
+                               testSuiteCache, localConfigCache,
+                               discoveryCache)
 
 def getTestsInSuite(ts, path_in_suite, litConfig,
-                    testSuiteCache, localConfigCache):
+                    testSuiteCache, localConfigCache, discoveryCache=None):
     # Check that the source path exists (errors here are reported by the
     # caller).
     source_path = ts.getSourcePath(path_in_suite)
@@ -151,29 +153,58 @@ def getTestsInSuite(ts, path_in_suite, litConfig,
     # Check if the user named a test directly.
     if not os.path.isdir(source_path):
         lc = getLocalConfig(ts, path_in_suite[:-1], litConfig, localConfigCache)
-        yield Test.Test(ts, path_in_suite, lc)
+        test = Test.Test(ts, path_in_suite, lc)
+        if discoveryCache is not None:
+            discoveryCache.attachScript(test)
+        yield test
         return
 
     # Otherwise we have a directory to search for tests, start by getting the
     # local configuration.
     lc = getLocalConfig(ts, path_in_suite, litConfig, localConfigCache)
 
-    # Search for tests.
-    if lc.test_format is not None:
-        for res in lc.test_format.getTestsInDirectory(ts, path_in_suite,
-                                                      litConfig, lc):
-            yield res
+    # Reuse the search results of a previous run if the directory did not
+    # change.
+    cached = None
+    if discoveryCache is not None:
+        cached = discoveryCache.getDirectory(ts, path_in_suite, lc)
+
+    if cached is not None:
+        test_names, subdirs = cached
+        for filename in test_names:
+            test = Test.Test(ts, path_in_suite + (filename,), lc)
+            discoveryCache.attachScript(test)
+            yield test
+    else:
+        # Search for tests.
+        test_names = []
+        if lc.test_format is not None:
+            for res in lc.test_format.getTestsInDirectory(ts, path_in_suite,
+                                                          litConfig, lc):
+                if discoveryCache is not None:
+                    test_names.append(res.path_in_suite[-1])
+                    discoveryCache.attachScript(res)
+                yield res
+
+        # Find the subdirectories.
+        subdirs = []
+        for filename in os.listdir(source_path):
+            # FIXME: This doesn't belong here?
+            if filename in ('Output', '.svn', '.git') or \
+                    filename in lc.excludes:
+                continue
+
+            # Ignore non-directories.
+            if os.path.isdir(os.path.join(source_path, filename)):
+                subdirs.append(filename)
+
+        if discoveryCache is not None:
+            discoveryCache.storeDirectory(ts, path_in_suite, test_names,
+                                          subdirs)
 
     # Search subdirectories.
-    for filename in os.listdir(source_path):
-        # FIXME: This doesn't belong here?
-        if filename in ('Output', '.svn', '.git') or filename in lc.excludes:
-            continue
-
-        # Ignore non-directories.
+    for filename in subdirs:
         file_sourcepath = os.path.join(source_path, filename)
-        if not os.path.isdir(file_sourcepath):
-            continue
 
         # Check for nested test suites, first in the execpath in case there is a
         # site configuration and then in the source path.
@@ -197,10 +228,11 @@ def getTestsInSuite(ts, path_in_suite, litConfig,
         # Otherwise, load from the nested test suite, if present.
         if sub_ts is not None:
             subiter = getTestsInSuite(sub_ts, subpath_in_suite, litConfig,
-                                      testSuiteCache, localConfigCache)
+                                      testSuiteCache, localConfigCache,
+                                      discoveryCache)
         else:
             subiter = getTestsInSuite(ts, subpath, litConfig, testSuiteCache,
-                                      localConfigCache)
+                                      localConfigCache, discoveryCache)
 
         N = 0
         for res in subiter:
@@ -209,12 +241,16 @@ def getTestsInSuite(ts, path_in_suite, litConfig,
         if sub_ts and not N:
             litConfig.warning('test suite %r contained no tests' % sub_ts.name)
 
-def find_tests_for_inputs(lit_config, inputs):
+def find_tests_for_inputs(lit_config, inputs, discovery_cache=None):
     """
-    find_tests_for_inputs(lit_config, inputs) -> [Test]
+    find_tests_for_inputs(lit_config, inputs, [discovery_cache]) -> [Test]
 
     Given a configuration object and a list of input specifiers, find all the
     tests to execute.
+
+    If discovery_cache is given, it is a lit.DiscoveryCache.DiscoveryCache
+    used to skip the search of unchanged directories. It is saved after the
+    discovery.
     """
 
     # Expand '@...' form in inputs.
@@ -239,7 +275,8 @@ def find_tests_for_inputs(lit_config, inputs):
     for input in actual_inputs:
         prev = len(tests)
         tests.extend(getTests(input, lit_config,
-                              test_suite_cache, local_config_cache)[1])
+                              test_suite_cache, local_config_cache,
+                              discovery_cache)[1])
         if prev == len(tests):
             lit_config.warning('input %r contained no tests' % input)
 
@@ -248,6 +285,9 @@ def find_tests_for_inputs(lit_config, inputs):
         sys.stderr.write('%d errors, exiting.\n' % lit_config.numErrors)
         sys.exit(2)
 
+    if discovery_cache is not None:
+        discovery_cache.save()
+
     return tests
 
 def load_test_suite(inputs):
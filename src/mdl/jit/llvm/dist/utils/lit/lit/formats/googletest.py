@@ -1,7 +1,14 @@
 from __future__ import absolute_import
+import json
 import os
+import re
+import signal
 import subprocess
 import sys
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree
 
 import lit.Test
 import lit.TestRunner
@@ -10,9 +17,34 @@ from .base import TestFormat
 
 kIsWindows = sys.platform in ['win32', 'cygwin']
 
+# The longest --gtest_filter argument passed to a test executable, longer
+# filters are split across several processes. Windows limits a command line to
+# 32767 characters.
+kMaxFilterLength = 16000
+
+# The markers gtest prints to stdout when a test starts and ends.
+kTestStartRE = re.compile(r'^\[ RUN      \] (\S+)$')
+kTestEndRE = re.compile(r'^\[ +(OK|FAILED|SKIPPED) +\] (\S+) \((\d+) ms\)$')
+
 class GoogleTest(TestFormat):
-    def __init__(self, test_sub_dirs, test_suffix):
+    def __init__(self, test_sub_dirs, test_suffix, batch_size=1,
+                 batch_output='xml'):
+        """
+        Tests are found in the executables ending in test_suffix inside of the
+        test_sub_dirs (separated by ';') of a test directory.
+
+        batch_size is the number of tests executed by one process of a test
+        executable. 1 runs every test in its own process, 0 splits the tests of
+        an executable evenly across the workers. batch_output selects the
+        format of the gtest report the results of a batch are read from,
+        'xml' or 'json' (which requires googletest 1.8.1 or later).
+        """
         self.test_sub_dirs = os.path.normcase(str(test_sub_dirs)).split(';')
+        self.batch_size = int(batch_size)
+        if batch_output not in ('xml', 'json'):
+            raise ValueError("unsupported gtest output format: %r"
+                             % (batch_output,))
+        self.batch_output = batch_output
 
         # On Windows, assume tests will also end in '.exe'.
         exe_suffix = str(test_suffix)
@@ -96,13 +128,18 @@ class GoogleTest(TestFormat):
                     yield lit.Test.Test(testSuite, testPath, localConfig,
                                         file_path=execpath)
 
-    def execute(self, test, litConfig):
+    def getTestPathAndName(self, test):
+        """getTestPathAndName(test) - (executable, gtest name)"""
         testPath,testName = os.path.split(test.getSourcePath())
         while not os.path.exists(testPath):
             # Handle GTest parametrized and typed tests, whose name includes
             # some '/'s.
             testPath, namePrefix = os.path.split(testPath)
             testName = namePrefix + '/' + testName
+        return testPath, testName
+
+    def execute(self, test, litConfig):
+        testPath, testName = self.getTestPathAndName(test)
 
         cmd = [testPath, '--gtest_filter=' + testName]
         cmd = self.maybeAddPythonToCmd(cmd)
@@ -133,6 +170,250 @@ class GoogleTest(TestFormat):
 
         return lit.Test.PASS,''
 
+    def getBatchKey(self, test):
+        """getBatchKey(test) - key or None
+
+        Return the key of the tests which can be executed in one process with
+        the given test (see executeBatch()), or None if the test is executed on
+        its own."""
+        if self.batch_size == 1:
+            return None
+        return test.getFilePath()
+
+    def executeBatch(self, tests, litConfig):
+        """executeBatch(tests, litConfig) - [Result]
+
+        Execute tests of one gtest executable in as few processes as possible
+        and return their results in the same order.
+
+        The results are read from the gtest report of each process. A test
+        which crashes the executable is rerun on its own, a test which reaches
+        the timeout ends the batch as well. The tests a batch did not get to
+        run are batched again."""
+        if litConfig.noExecute:
+            return [lit.Test.Result(lit.Test.PASS, '') for test in tests]
+
+        names = [self.getTestPathAndName(test)[1] for test in tests]
+        testPath = self.getTestPathAndName(tests[0])[0]
+        results = [None] * len(tests)
+        pending = list(range(len(tests)))
+        while pending:
+            # Take as many tests as fit into the filter.
+            batch = pending[:1]
+            length = len(names[pending[0]])
+            for index in pending[1:]:
+                length += len(names[index]) + 1
+                if length > kMaxFilterLength:
+                    break
+                batch.append(index)
+            pending = pending[len(batch):]
+
+            batch_names = [names[index] for index in batch]
+            batch_results, running = self.runBatch(
+                testPath, batch_names, tests[0], litConfig)
+            # Without any result and without a test of the batch to blame
+            # nothing could be read from the batch at all, running it again
+            # would not make progress.
+            failed = not batch_results and running not in batch_names
+            not_run = []
+            for index in batch:
+                result = batch_results.get(names[index])
+                if result is not None:
+                    results[index] = result
+                elif names[index] == running or failed:
+                    # The test crashed the executable, or the batch failed.
+                    results[index] = self.executeOne(tests[index], litConfig)
+                else:
+                    not_run.append(index)
+            pending = not_run + pending
+        return results
+
+    def executeOne(self, test, litConfig):
+        """executeOne(test, litConfig) - Result
+
+        Execute a single test of a batch in its own process."""
+        start_time = time.time()
+        result = self.execute(test, litConfig)
+        if isinstance(result, tuple):
+            result = lit.Test.Result(*result)
+        result.elapsed = time.time() - start_time
+        return result
+
+    def runBatch(self, testPath, testNames, test, litConfig):
+        """runBatch(testPath, testNames, test, litConfig) - (results, running)
+
+        Run the given tests of a gtest executable in one process. Return the
+        results of the tests which completed, by name, and the name of the
+        test which was running when the process died, or None."""
+        fd, report_path = tempfile.mkstemp(suffix='.' + self.batch_output)
+        os.close(fd)
+        # gtest only writes the report when all tests completed.
+        os.remove(report_path)
+
+        cmd = [testPath, '--gtest_filter=' + ':'.join(testNames),
+               '--gtest_output=%s:%s' % (self.batch_output, report_path)]
+        cmd = self.maybeAddPythonToCmd(cmd)
+        if litConfig.useValgrind:
+            cmd = litConfig.valgrindArgs + cmd
+
+        try:
+            out, exitCode = self.runWatched(cmd, test.config.environment,
+                                            litConfig.maxIndividualTestTime)
+            report = None
+            if exitCode is not None and os.path.exists(report_path):
+                try:
+                    report = self.readReport(report_path)
+                except (IOError, OSError, ValueError, KeyError, TypeError,
+                        xml.etree.ElementTree.ParseError):
+                    pass
+        finally:
+            if os.path.exists(report_path):
+                os.remove(report_path)
+
+        outputs, finished, running = self.splitOutput(out)
+        if report is not None:
+            if exitCode and all(passed for passed, _ in report.values()):
+                # The executable failed outside of the tests, e.g. in a static
+                # destructor, run the tests on their own to see which fails.
+                return {}, None
+            finished = report
+            running = None
+
+        results = {}
+        if exitCode is None and running in testNames:
+            # The batch was killed as the running test reached the timeout.
+            result = lit.Test.Result(
+                lit.Test.TIMEOUT, 'Reached timeout of {} seconds'.format(
+                    litConfig.maxIndividualTestTime))
+            result.elapsed = litConfig.maxIndividualTestTime
+            results[running] = result
+        for name in testNames:
+            if name not in finished:
+                continue
+            passed, elapsed = finished[name]
+            if litConfig.maxIndividualTestTime and \
+                    elapsed > litConfig.maxIndividualTestTime:
+                result = lit.Test.Result(
+                    lit.Test.TIMEOUT, 'Reached timeout of {} seconds'.format(
+                        litConfig.maxIndividualTestTime))
+            elif passed:
+                result = lit.Test.Result(lit.Test.PASS, '')
+            else:
+                result = lit.Test.Result(lit.Test.FAIL, outputs.get(name, ''))
+            result.elapsed = elapsed
+            results[name] = result
+        return results, running
+
+    def runWatched(self, cmd, env, timeout):
+        """runWatched(cmd, env, timeout) - (out, exitCode)
+
+        Run a batch and return its stdout and exit code. Every test of the
+        batch gets the timeout of an individual test: the process is killed
+        when it did not print a gtest test marker for timeout seconds (0 for
+        no timeout), the exit code is None then."""
+        p = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             env=env, close_fds=lit.util.kUseCloseFDs)
+        p.stdin.close()
+        lines = []
+        # The time the last test marker was read, in a list to be updated by
+        # the reader thread.
+        last_marker = [time.time()]
+
+        def readStdout():
+            for ln in iter(p.stdout.readline, b''):
+                lines.append(ln)
+                ln = lit.util.to_string(ln).rstrip()
+                if kTestStartRE.match(ln) or kTestEndRE.match(ln):
+                    last_marker[0] = time.time()
+
+        def readStderr():
+            # Drain stderr so that the process does not block on it.
+            for ln in iter(p.stderr.readline, b''):
+                pass
+
+        readers = [threading.Thread(target=readStdout),
+                   threading.Thread(target=readStderr)]
+        for reader in readers:
+            reader.daemon = True
+            reader.start()
+        killed = False
+        while readers[0].is_alive():
+            if timeout <= 0:
+                readers[0].join()
+                break
+            remaining = last_marker[0] + timeout - time.time()
+            if remaining <= 0:
+                # The batch may run a shell, kill all its children as well.
+                lit.util.killProcessAndChildren(p.pid)
+                killed = True
+                break
+            readers[0].join(remaining)
+        for reader in readers:
+            reader.join()
+        exitCode = p.wait()
+
+        # Detect Ctrl-C in subprocess.
+        if exitCode == -signal.SIGINT:
+            raise KeyboardInterrupt
+
+        out = lit.util.to_string(b''.join(lines))
+        return out, None if killed else exitCode
+
+    def readReport(self, path):
+        """readReport(path) - {name: (passed, elapsed)}
+
+        Read the gtest XML or JSON report of a batch. Skipped tests are left
+        out, they are rerun on their own."""
+        tests = {}
+        if self.batch_output == 'json':
+            with open(path) as f:
+                data = json.load(f)
+            for suite in data['testsuites']:
+                for case in suite['testsuite']:
+                    if case.get('status', 'RUN') != 'RUN' or \
+                            case.get('result', 'COMPLETED') != 'COMPLETED':
+                        continue
+                    name = case['classname'] + '.' + case['name']
+                    tests[name] = (not case.get('failures'),
+                                   float(case['time'].rstrip('s')))
+        else:
+            root = xml.etree.ElementTree.parse(path).getroot()
+            for case in root.iter('testcase'):
+                if case.get('status', 'run') != 'run' or \
+                        case.get('result', 'completed') != 'completed':
+                    continue
+                name = case.get('classname') + '.' + case.get('name')
+                tests[name] = (case.find('failure') is None,
+                               float(case.get('time')))
+        return tests
+
+    def splitOutput(self, out):
+        """splitOutput(out) - (outputs, finished, running)
+
+        Split the stdout of a batch at the gtest test markers. Return the
+        output of each test, the (passed, elapsed) pairs of the tests which
+        completed and the name of the test which did not complete, or None."""
+        outputs = {}
+        finished = {}
+        running = None
+        lines = []
+        for ln in out.splitlines(True):
+            m = kTestStartRE.match(ln.rstrip())
+            if m:
+                running = m.group(1)
+                lines = []
+                continue
+            lines.append(ln)
+            m = kTestEndRE.match(ln.rstrip())
+            if m and m.group(2) == running:
+                outputs[running] = ''.join(lines)
+                if m.group(1) != 'SKIPPED':
+                    finished[running] = (m.group(1) == 'OK',
+                                         int(m.group(3)) / 1000.0)
+                running = None
+        return outputs, finished, running
+
     def maybeAddPythonToCmd(self, cmd):
         """Insert the python exe into the command if cmd[0] ends in .py
 
@@ -24,6 +24,9 @@ import lit.Test
 import lit.run
 import lit.util
 import lit.discovery
+import lit.DiscoveryCache
+import lit.ResultCache
+import lit.TimingDatabase
 
 class TestingProgressDisplay(object):
     def __init__(self, opts, numTests, progressBar=None):
@@ -282,6 +285,14 @@ def main_with_tmp(builtinParameters):
     execution_group.add_argument("--max-failures", dest="maxFailures",
                      help="Stop execution after the given number of failures.",
                      action="store", type=int, default=None)
+    execution_group.add_argument("--result-cache", dest="resultCache",
+                     metavar="DIR",
+                     help=("Cache passing results in the given directory and "
+                           "skip shell tests which passed before with the "
+                           "same source, RUN lines, configuration, tools and "
+                           "input files"),
+                     action="store",
+                     default=os.environ.get("LIT_RESULT_CACHE"))
 
     selection_group = parser.add_argument_group("Test Selection")
     selection_group.add_argument("--max-tests", dest="maxTests", metavar="N",
@@ -311,6 +322,27 @@ def main_with_tmp(builtinParameters):
                      action="store", type=int,
                      default=os.environ.get("LIT_RUN_SHARD"))
 
+    selection_group.add_argument("--discovery-cache", dest="discoveryCache",
+                     metavar="DIR",
+                     help=("Cache the discovered tests and their parsed RUN "
+                           "lines in the given directory, to skip searching "
+                           "unchanged directories and tests in later runs"),
+                     action="store",
+                     default=os.environ.get("LIT_DISCOVERY_CACHE"))
+    selection_group.add_argument("--timing-data", dest="timingData",
+                     metavar="FILE",
+                     help=("Record the execution time of each test in the "
+                           "given file and run the tests expected to take "
+                           "longest first. Also balances --num-shards by "
+                           "time, all shards must read the same file. Runs "
+                           "of a shard only read the file"),
+                     action="store",
+                     default=os.environ.get("LIT_TIMING_DATA"))
+    selection_group.add_argument("--failures-first", dest="failuresFirst",
+                     help=("Run the tests which failed in the previous run "
+                           "first (requires --timing-data)"),
+                     action="store_true", default=False)
+
     debug_group = parser.add_argument_group("Debug and Experimental Options")
     debug_group.add_argument("--debug",
                       help="Enable debugging (for 'lit' development)",
@@ -342,6 +374,9 @@ def main_with_tmp(builtinParameters):
     if opts.maxFailures == 0:
         parser.error("Setting --max-failures to 0 does not have any effect.")
 
+    if opts.failuresFirst and not opts.timingData:
+        parser.error("--failures-first requires --timing-data")
+
     if opts.echoAllCommands:
         opts.showOutput = True
 
@@ -365,6 +400,10 @@ def main_with_tmp(builtinParameters):
 
     isWindows = platform.system() == 'Windows'
 
+    resultCache = None
+    if opts.resultCache:
+        resultCache = lit.ResultCache.ResultCache(opts.resultCache)
+
     # Create the global config object.
     litConfig = lit.LitConfig.LitConfig(
         progname = os.path.basename(sys.argv[0]),
@@ -382,11 +421,17 @@ def main_with_tmp(builtinParameters):
         maxIndividualTestTime = maxIndividualTestTime,
         maxFailures = opts.maxFailures,
         parallelism_groups = {},
-        echo_all_commands = opts.echoAllCommands)
+        echo_all_commands = opts.echoAllCommands,
+        result_cache = resultCache)
 
     # Perform test discovery.
+    discoveryCache = None
+    if opts.discoveryCache:
+        discoveryCache = lit.DiscoveryCache.DiscoveryCache(opts.discoveryCache,
+                                                           litConfig)
     run = lit.run.Run(litConfig,
-                      lit.discovery.find_tests_for_inputs(litConfig, inputs))
+                      lit.discovery.find_tests_for_inputs(litConfig, inputs,
+                                                          discoveryCache))
 
     # After test discovery the configuration might have changed
     # the maxIndividualTestTime. If we explicitly set this on the
@@ -430,6 +475,9 @@ def main_with_tmp(builtinParameters):
                 for test in ts_tests:
                     print('  %s' % (test.getFullName(),))
 
+        if discoveryCache is not None and litConfig.debug:
+            litConfig.note(discoveryCache.summary())
+
         # Exit.
         sys.exit(0)
 
@@ -446,11 +494,18 @@ def main_with_tmp(builtinParameters):
         run.tests = [result_test for result_test in run.tests
                      if rex.search(result_test.getFullName())]
 
+    timingDatabase = None
+    if opts.timingData:
+        timingDatabase = lit.TimingDatabase.TimingDatabase(opts.timingData,
+                                                           litConfig)
+
     # Then select the order.
     if opts.shuffle:
         random.shuffle(run.tests)
     elif opts.incremental:
         sort_by_incremental_cache(run)
+    elif timingDatabase is not None:
+        timingDatabase.sortTests(run.tests, opts.failuresFirst)
     else:
         run.tests.sort(key = lambda t: (not t.isEarlyTest(), t.getFullName()))
 
@@ -463,19 +518,29 @@ def main_with_tmp(builtinParameters):
         if (opts.runShard < 1) or (opts.runShard > opts.numShards):
             parser.error("--run-shard must be between 1 and --num-shards (inclusive)")
         num_tests = len(run.tests)
-        # Note: user views tests and shard numbers counting from 1.
-        test_ixs = range(opts.runShard - 1, num_tests, opts.numShards)
-        run.tests = [run.tests[i] for i in test_ixs]
-        # Generate a preview of the first few test indices in the shard
-        # to accompany the arithmetic expression, for clarity.
-        preview_len = 3
-        ix_preview = ", ".join([str(i+1) for i in test_ixs[:preview_len]])
-        if len(test_ixs) > preview_len:
-            ix_preview += ", ..."
-        litConfig.note('Selecting shard %d/%d = size %d/%d = tests #(%d*k)+%d = [%s]' %
-                       (opts.runShard, opts.numShards,
-                        len(run.tests), num_tests,
-                        opts.numShards, opts.runShard, ix_preview))
+        if timingDatabase is not None:
+            # Balance the shards by the expected time of their tests.
+            run.tests, shard_time, total_time = timingDatabase.selectShard(
+                run.tests, opts.numShards, opts.runShard)
+            litConfig.note('Selecting shard %d/%d = size %d/%d = expected '
+                           'time %.2fs/%.2fs' %
+                           (opts.runShard, opts.numShards,
+                            len(run.tests), num_tests,
+                            shard_time, total_time))
+        else:
+            # Note: user views tests and shard numbers counting from 1.
+            test_ixs = range(opts.runShard - 1, num_tests, opts.numShards)
+            run.tests = [run.tests[i] for i in test_ixs]
+            # Generate a preview of the first few test indices in the shard
+            # to accompany the arithmetic expression, for clarity.
+            preview_len = 3
+            ix_preview = ", ".join([str(i+1) for i in test_ixs[:preview_len]])
+            if len(test_ixs) > preview_len:
+                ix_preview += ", ..."
+            litConfig.note('Selecting shard %d/%d = size %d/%d = tests #(%d*k)+%d = [%s]' %
+                           (opts.runShard, opts.numShards,
+                            len(run.tests), num_tests,
+                            opts.numShards, opts.runShard, ix_preview))
 
     # Finally limit the number of tests, if desired.
     if opts.maxTests is not None:
@@ -535,6 +600,23 @@ def main_with_tmp(builtinParameters):
     if not opts.quiet:
         print('Testing Time: %.2fs' % (testing_time,))
 
+    if resultCache is not None:
+        litConfig.note(resultCache.summary(run.tests))
+
+    # Remember the execution times of the tests. The shards of a run select
+    # their tests by the timing data, so they must all see the same file: a
+    # shard saving its timings would change the shards of the later ones.
+    if timingDatabase is not None and (opts.numShards or 1) == 1:
+        timingDatabase.update(run.tests)
+        timingDatabase.save()
+
+    # Remember the RUN lines parsed during the run.
+    if discoveryCache is not None:
+        discoveryCache.storeScripts(run.tests)
+        discoveryCache.save()
+        if litConfig.debug:
+            litConfig.note(discoveryCache.summary())
+
     # Write out the test data, if requested.
     if opts.output_path is not None:
         write_test_results(run, litConfig, testing_time, opts.output_path)
@@ -55,21 +55,61 @@ class Run(object):
         return _execute_test_impl(test, self.lit_config,
                                   self.parallelism_semaphores)
 
-    def execute_tests_in_pool(self, jobs, max_time):
-        # We need to issue many wait calls, so compute the final deadline and
-        # subtract time.time() from that as we go along.
+    def group_tests(self, jobs):
+        """
+        group_tests(jobs) -> [[test index]]
+
+        Split the tests into the work items handed to the workers. Tests of a
+        format supporting batched execution (see
+        lit.formats.GoogleTest.executeBatch) are grouped by their batch key
+        and split into batches of the batch size of the format, or evenly
+        across the jobs if the batch size is 0. All other tests are executed
+        on their own.
+        """
+        groups = []
+        batches = {}
+        for test_index, test in enumerate(self.tests):
+            test_format = test.config.test_format
+            get_batch_key = getattr(test_format, 'getBatchKey', None)
+            key = get_batch_key(test) if get_batch_key else None
+            if key is None:
+                groups.append([test_index])
+                continue
+            key = (id(test_format), key)
+            group = batches.get(key)
+            if group is None:
+                batches[key] = group = []
+                groups.append(group)
+            group.append(test_index)
+
+        work_items = []
+        for group in groups:
+            if len(group) == 1:
+                work_items.append(group)
+                continue
+            batch_size = self.tests[group[0]].config.test_format.batch_size
+            if batch_size <= 0:
+                batch_size = (len(group) + jobs - 1) // jobs
+            for i in range(0, len(group), batch_size):
+                work_items.append(group[i:i+batch_size])
+        return work_items
+
+    def execute_tests_in_pool(self, jobs, max_time, work_items):
+        # Compute the final deadline, the result queue is polled until then.
         deadline = None
         if max_time:
             deadline = time.time() + max_time
 
-        # Start a process pool. Copy over the data shared between all test runs.
+        # Start a process pool. Copy over the data shared between all test runs,
+        # including the tests themselves: the workers only get test indexes.
         # FIXME: Find a way to capture the worker process stderr. If the user
         # interrupts the workers before we make it into our task callback, they
         # will each raise a KeyboardInterrupt exception and print to stderr at
         # the same time.
         pool = multiprocessing.Pool(jobs, worker_initializer,
                                     (self.lit_config,
-                                     self.parallelism_semaphores))
+                                     self.parallelism_semaphores,
+                                     self.tests))
 
         # Install a console-control signal handler on Windows.
         if win32api is not None:
@@ -81,34 +121,54 @@ class Run(object):
                 return True
             win32api.SetConsoleCtrlHandler(console_ctrl_handler, True)
 
+        # The results of the chunks, put by the pool's result thread.
+        done = queue.Queue()
+        work_queue = _WorkQueue(work_items, jobs)
+        def submit():
+            chunk = work_queue.take()
+            if chunk is None:
+                return False
+            pool.apply_async(worker_run_tests, args=(chunk,),
+                             callback=done.put)
+            return True
+
+        finished = False
         try:
-            async_results = [pool.apply_async(worker_run_one_test,
-                                              args=(test_index, test),
-                                              callback=self.consume_test_result)
-                             for test_index, test in enumerate(self.tests)]
-            pool.close()
-
-            # Wait for all results to come in. The callback that runs in the
-            # parent process will update the display.
-            for a in async_results:
+            # Keep every worker busy with a second chunk queued behind the
+            # one it is executing.
+            outstanding = 0
+            while outstanding < 2 * jobs and submit():
+                outstanding += 1
+
+            while outstanding:
+                # Python condition variables cannot be interrupted unless
+                # they have a timeout. This can make lit unresponsive to
+                # KeyboardInterrupt, so do a busy wait with a timeout.
+                timeout = 1
                 if deadline:
-                    a.wait(deadline - time.time())
-                else:
-                    # Python condition variables cannot be interrupted unless
-                    # they have a timeout. This can make lit unresponsive to
-                    # KeyboardInterrupt, so do a busy wait with a timeout.
-                    while not a.ready():
-                        a.wait(1)
-                if not a.successful():
-                    a.get() # Exceptions raised here come from the worker.
+                    timeout = min(timeout, deadline - time.time())
+                    if timeout <= 0:
+                        break
+                try:
+                    records = done.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+                outstanding -= 1
+                # A chunk failing in the worker leaves its tests unresolved.
+                if records is not None:
+                    self.consume_test_results(records)
+                    work_queue.update(records)
                 if self.hit_max_failures:
                     break
-        except:
-            # Stop the workers and wait for any straggling results to come in
-            # if we exited without waiting on every async result.
-            pool.terminate()
-            raise
+                if submit():
+                    outstanding += 1
+            finished = not outstanding
         finally:
+            # Stop the workers if we exited without waiting on every chunk.
+            if finished:
+                pool.close()
+            else:
+                pool.terminate()
             pool.join()
 
     def execute_tests(self, display, jobs, max_time=None):
@@ -142,45 +202,47 @@ class Run(object):
 
         self.failure_count = 0
         self.hit_max_failures = False
+        work_items = self.group_tests(jobs)
         if self.lit_config.singleProcess:
-            global child_lit_config
-            child_lit_config = self.lit_config
-            for test_index, test in enumerate(self.tests):
-                result = worker_run_one_test(test_index, test)
-                self.consume_test_result(result)
+            worker_initializer(self.lit_config, self.parallelism_semaphores,
+                               self.tests)
+            for test_indexes in work_items:
+                self.consume_test_results(worker_run_tests([test_indexes]))
+                if self.hit_max_failures:
+                    break
         else:
-            self.execute_tests_in_pool(jobs, max_time)
+            self.execute_tests_in_pool(jobs, max_time, work_items)
 
         # Mark any tests that weren't run as UNRESOLVED.
         for test in self.tests:
             if test.result is None:
                 test.setResult(lit.Test.Result(lit.Test.UNRESOLVED, '', 0.0))
 
-    def consume_test_result(self, pool_result):
-        """Test completion callback for worker_run_one_test
+    def consume_test_results(self, records):
+        """Handle the results of a chunk of work items, see worker_run_tests
 
-        Updates the test result status in the parent process. Each task in the
-        pool returns the test index and the result, and we use the index to look
-        up the original test object. Also updates the progress bar as tasks
-        complete.
+        Updates the test result status in the parent process. Each chunk
+        returns the test indexes and the result records, and we use the
+        indexes to look up the original test objects. Also updates the
+        progress bar as chunks complete.
         """
-        # Don't add any more test results after we've hit the maximum failure
-        # count.  Otherwise we're racing with the main thread, which is going
-        # to terminate the process pool soon.
-        if self.hit_max_failures:
-            return
-
-        (test_index, test_with_result) = pool_result
-        # Update the parent process copy of the test. This includes the result,
-        # XFAILS, REQUIRES, and UNSUPPORTED statuses.
-        assert self.tests[test_index].file_path == test_with_result.file_path, \
-                "parent and child disagree on test path"
-        self.tests[test_index] = test_with_result
-        self.display.update(test_with_result)
+        for test_index, record in records:
+            # Don't add any more test results after we've hit the maximum
+            # failure count, the pool is terminated.
+            if self.hit_max_failures:
+                return
+            self.consume_test_result(test_index, record)
+
+    def consume_test_result(self, test_index, record):
+        """Updates the parent process copy of one test, see
+        consume_test_results"""
+        test = self.tests[test_index]
+        _apply_result_record(test, record)
+        self.display.update(test)
 
         # If we've finished all the tests or too many tests have failed, notify
         # the main thread that we've stopped testing.
-        self.failure_count += (test_with_result.result.code == lit.Test.FAIL)
+        self.failure_count += (test.result.code == lit.Test.FAIL)
         if self.lit_config.maxFailures and \
                 self.failure_count == self.lit_config.maxFailures:
             self.hit_max_failures = True
@@ -223,33 +285,168 @@ def _execute_test_impl(test, lit_config, parallelism_semaphores):
 
     test.setResult(result)
 
+def _execute_batch_impl(tests, lit_config, parallelism_semaphores):
+    """Execute the tests of one batch, see Run.group_tests"""
+    if len(tests) == 1:
+        _execute_test_impl(tests[0], lit_config, parallelism_semaphores)
+        return
+
+    pg = tests[0].config.parallelism_group
+    if callable(pg):
+        pg = pg(tests[0])
+
+    results = None
+    semaphore = None
+    try:
+        if pg:
+            semaphore = parallelism_semaphores[pg]
+        if semaphore:
+            semaphore.acquire()
+        start_time = time.time()
+        results = tests[0].config.test_format.executeBatch(tests, lit_config)
+        if len(results) != len(tests) or \
+                not all(isinstance(result, lit.Test.Result)
+                        for result in results):
+            raise ValueError("unexpected result from batch execution")
+        # Tests without a time of their own share the time of the batch.
+        elapsed = (time.time() - start_time) / len(tests)
+        for result in results:
+            if result.elapsed is None:
+                result.elapsed = elapsed
+    except KeyboardInterrupt:
+        raise
+    except:
+        if lit_config.debug:
+            raise
+        output = 'Exception during script execution:\n'
+        output += traceback.format_exc()
+        output += '\n'
+        results = [lit.Test.Result(lit.Test.UNRESOLVED, output)
+                   for test in tests]
+    finally:
+        if semaphore:
+            semaphore.release()
+
+    for test, result in zip(tests, results):
+        test.setResult(result)
+
+def _result_record(test):
+    """_result_record(test) -> the compact record of the result of test
+
+    The record holds what the parent process needs of an executed test: the
+    result (with the XFAIL handling applied), the XFAIL, REQUIRES and
+    UNSUPPORTED statuses and the keyword lines parsed for the discovery cache.
+    """
+    result = test.result
+    return (result.code, result.elapsed, result.output, result.metrics,
+            result.microResults, result.result_cache, test.xfails,
+            test.requires, test.unsupported, test.script_commands)
+
+def _apply_result_record(test, record):
+    """_apply_result_record(test, record) - Set the result of a test from the
+    record made by _result_record"""
+    (code, elapsed, output, metrics, microResults, result_cache,
+     test.xfails, test.requires, test.unsupported,
+     test.script_commands) = record
+    result = lit.Test.Result(code, output, elapsed)
+    result.metrics = metrics
+    result.microResults = microResults
+    result.result_cache = result_cache
+    # Not setResult(), the XFAIL handling was already applied.
+    test.result = result
+
+class _WorkQueue(object):
+    """
+    The work items of a run not handed out to the workers yet.
+
+    The work items are handed out in chunks, each chunk is one task of the
+    pool. Chunks hold about kChunkTime seconds of work, based on the execution
+    time of the tests which completed most recently, but never more than a
+    1/(2*jobs) share of the remaining tests so the workers finish at about the
+    same time.
+    """
+
+    # The execution time of a chunk aimed at (in seconds).
+    kChunkTime = 0.05
+
+    def __init__(self, work_items, jobs):
+        self.work_items = work_items
+        self.jobs = jobs
+        self.next_item = 0
+        self.remaining_tests = sum(len(item) for item in work_items)
+        # The moving average of the execution time of a test, None until the
+        # first chunk completed.
+        self.test_time = None
+
+    def take(self):
+        """take() -> the next chunk of work items, or None if all are taken"""
+        if self.next_item == len(self.work_items):
+            return None
+        size = max(1, self.remaining_tests // (2 * self.jobs))
+        if self.test_time is None:
+            size = 1
+        elif self.test_time > 0:
+            size = max(1, min(size, int(self.kChunkTime / self.test_time)))
+        chunk = []
+        num_tests = 0
+        while num_tests < size and self.next_item < len(self.work_items):
+            item = self.work_items[self.next_item]
+            self.next_item += 1
+            chunk.append(item)
+            num_tests += len(item)
+        self.remaining_tests -= num_tests
+        return chunk
+
+    def update(self, records):
+        """update(records) - Account for the result records of a chunk"""
+        elapsed = [record[1] for _, record in records
+                   if record[1] is not None]
+        if not elapsed:
+            return
+        test_time = sum(elapsed) / len(elapsed)
+        if self.test_time is None:
+            self.test_time = test_time
+        else:
+            self.test_time = (self.test_time + test_time) / 2
+
 child_lit_config = None
 child_parallelism_semaphores = None
+child_tests = None
 
-def worker_initializer(lit_config, parallelism_semaphores):
+def worker_initializer(lit_config, parallelism_semaphores, tests):
     """Copy expensive repeated data into worker processes"""
     global child_lit_config
     child_lit_config = lit_config
     global child_parallelism_semaphores
     child_parallelism_semaphores = parallelism_semaphores
+    global child_tests
+    child_tests = tests
 
-def worker_run_one_test(test_index, test):
-    """Run one test in a multiprocessing.Pool
+def worker_run_tests(work_items):
+    """Run a chunk of work items, single tests or batches, in a
+    multiprocessing.Pool
 
     Side effects in this function and functions it calls are not visible in the
     main lit process.
 
     Arguments and results of this function are pickled, so they should be cheap
     to copy. For efficiency, we copy all data needed to execute all tests into
-    each worker and store it in the child_* global variables. This reduces the
-    cost of each task.
+    each worker and store it in the child_* global variables, the work items
+    only name the tests by their index in child_tests. This reduces the cost of
+    each task.
 
-    Returns an index and a Result, which the parent process uses to update
-    the display.
+    Returns a list of test indexes and result records (see _result_record),
+    which the parent process uses to update the display.
     """
     try:
-        _execute_test_impl(test, child_lit_config, child_parallelism_semaphores)
-        return (test_index, test)
+        records = []
+        for test_indexes in work_items:
+            tests = [child_tests[test_index] for test_index in test_indexes]
+            _execute_batch_impl(tests, child_lit_config,
+                                child_parallelism_semaphores)
+            records.extend((test_index, _result_record(test))
+                           for test_index, test in zip(test_indexes, tests))
+        return records
     except KeyboardInterrupt as e:
         # If a worker process gets an interrupt, abort it immediately.
         abort_now()
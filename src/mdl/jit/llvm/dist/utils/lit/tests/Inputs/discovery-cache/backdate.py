@@ -0,0 +1,29 @@
+# Create test suite files with modification times in the past, so they are
+# not considered racy by the discovery cache.
+#
+#   backdate.py copy SRC DST - copy the directory tree SRC to DST
+#   backdate.py add FILE     - add a test FILE to an existing directory
+
+import os
+import shutil
+import sys
+import time
+
+def backdate(path):
+    past = time.time() - 3600
+    os.utime(path, (past, past))
+
+if __name__ == '__main__':
+    if sys.argv[1] == 'copy':
+        shutil.copytree(sys.argv[2], sys.argv[3])
+        for dirpath, dirnames, filenames in os.walk(sys.argv[3]):
+            for name in filenames:
+                backdate(os.path.join(dirpath, name))
+            backdate(dirpath)
+    else:
+        path = sys.argv[2]
+        f = open(path, 'w')
+        f.write('# RUN: true\n')
+        f.close()
+        backdate(path)
+        backdate(os.path.dirname(path))
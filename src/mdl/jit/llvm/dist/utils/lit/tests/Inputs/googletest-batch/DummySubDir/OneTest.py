@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+import json
+import os
+import sys
+
+tests = ['FirstTest.subTestA', 'FirstTest.subTestB', 'FirstTest.subTestC',
+         'FirstTest.subTestD', 'ParameterizedTest/0.subTest',
+         'ParameterizedTest/1.subTest']
+
+if len(sys.argv) == 2 and sys.argv[1] == "--gtest_list_tests":
+    print("""\
+FirstTest.
+  subTestA
+  subTestB
+  subTestC
+  subTestD
+ParameterizedTest/0.
+  subTest
+ParameterizedTest/1.
+  subTest""")
+    sys.exit(0)
+elif not 2 <= len(sys.argv) <= 3 or \
+        not sys.argv[1].startswith("--gtest_filter="):
+    raise ValueError("unexpected arguments: %r" % (sys.argv[1:],))
+
+filter = sys.argv[1].split('=',1)[1].split(':')
+for test_name in filter:
+    if test_name not in tests:
+        raise SystemExit("error: invalid test name: %r" % (test_name,))
+report = None
+if len(sys.argv) == 3:
+    if not sys.argv[2].startswith("--gtest_output="):
+        raise ValueError("unexpected argument: %r" % (sys.argv[2],))
+    report = sys.argv[2].split('=',1)[1].split(':',1)
+
+with open(os.environ['GTEST_BATCH_LOG'], 'a') as log:
+    log.write('run: %s\n' % (' '.join(filter),))
+
+print('[==========] Running %d tests from 2 test cases.' % (len(filter),))
+if report is not None and os.environ.get('GTEST_BATCH_UNKNOWN') == '1':
+    # Crash a batch in a test lit does not know.
+    print('[ RUN      ] UnknownTest.subTest')
+    sys.stdout.flush()
+    os._exit(1)
+cases = []
+for test_name in tests:
+    if test_name not in filter:
+        continue
+    print('[ RUN      ] ' + test_name)
+    sys.stdout.flush()
+    failed = False
+    if test_name == 'FirstTest.subTestA':
+        print('I am subTest A, I PASS')
+    elif test_name == 'FirstTest.subTestB':
+        print('I am subTest B, I FAIL')
+        print('And I have two lines of output')
+        failed = True
+    elif test_name == 'FirstTest.subTestC':
+        print('I am subTest C, I CRASH')
+        sys.stdout.flush()
+        os._exit(1)
+    else:
+        print('I PASS')
+    if failed:
+        print('[  FAILED  ] %s (0 ms)' % (test_name,))
+    else:
+        print('[       OK ] %s (0 ms)' % (test_name,))
+    cases.append((test_name, failed))
+
+failures = [test_name for test_name, failed in cases if failed]
+print('[==========] %d tests from 2 test cases ran. (0 ms total)' % (
+    len(cases),))
+print('[  PASSED  ] %d test%s.' % (len(cases) - len(failures),
+                                   '' if len(cases) - len(failures) == 1
+                                   else 's'))
+for test_name in failures:
+    print('[  FAILED  ] ' + test_name)
+
+if report is not None:
+    format, path = report
+    with open(path, 'w') as f:
+        if format == 'json':
+            suites = {}
+            for test_name, failed in cases:
+                classname, name = test_name.split('.')
+                case = {'name': name, 'classname': classname, 'status': 'RUN',
+                        'result': 'COMPLETED', 'time': '0.002s'}
+                if failed:
+                    case['failures'] = [{'failure': 'I FAIL', 'type': ''}]
+                suites.setdefault(classname, []).append(case)
+            json.dump({'testsuites': [{'name': classname, 'testsuite': cases}
+                                      for classname, cases in
+                                      sorted(suites.items())]}, f)
+        else:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            f.write('<testsuites name="AllTests">\n')
+            for test_name, failed in cases:
+                classname, name = test_name.split('.')
+                f.write('  <testcase name="%s" status="run" time="0.002" '
+                        'classname="%s">' % (name, classname))
+                if failed:
+                    f.write('<failure message="I FAIL" type=""/>')
+                f.write('</testcase>\n')
+            f.write('</testsuites>\n')
+sys.exit(1 if failures else 0)
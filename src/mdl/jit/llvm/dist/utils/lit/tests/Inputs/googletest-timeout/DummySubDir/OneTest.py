@@ -3,10 +3,7 @@
 import sys
 import time
 
-if len(sys.argv) != 2:
-    raise ValueError("unexpected number of args")
-
-if sys.argv[1] == "--gtest_list_tests":
+if len(sys.argv) == 2 and sys.argv[1] == "--gtest_list_tests":
     print("""\
 FirstTest.
   subTestA
@@ -14,22 +11,29 @@ FirstTest.
   subTestC
 """)
     sys.exit(0)
-elif not sys.argv[1].startswith("--gtest_filter="):
-    raise ValueError("unexpected argument: %r" % (sys.argv[1]))
+elif not 2 <= len(sys.argv) <= 3 or \
+        not sys.argv[1].startswith("--gtest_filter="):
+    raise ValueError("unexpected arguments: %r" % (sys.argv[1:],))
 
-test_name = sys.argv[1].split('=',1)[1]
-if test_name == 'FirstTest.subTestA':
-    print('I am subTest A, I PASS')
-    print('[  PASSED  ] 1 test.')
-    sys.exit(0)
-elif test_name == 'FirstTest.subTestB':
-    print('I am subTest B, I am slow')
-    time.sleep(6)
-    print('[  PASSED  ] 1 test.')
-    sys.exit(0)
-elif test_name == 'FirstTest.subTestC':
-    print('I am subTest C, I will hang')
-    while True:
-        pass
-else:
-    raise SystemExit("error: invalid test name: %r" % (test_name,))
+# In batched mode several tests are run and a report is requested, the report
+# is never written as the batch does not complete.
+for test_name in sys.argv[1].split('=',1)[1].split(':'):
+    print('[ RUN      ] ' + test_name)
+    sys.stdout.flush()
+    if test_name == 'FirstTest.subTestA':
+        print('I am subTest A, I PASS')
+    elif test_name == 'FirstTest.subTestB':
+        print('I am subTest B, I am slow')
+        sys.stdout.flush()
+        time.sleep(6)
+    elif test_name == 'FirstTest.subTestC':
+        print('I am subTest C, I will hang')
+        sys.stdout.flush()
+        while True:
+            pass
+    else:
+        raise SystemExit("error: invalid test name: %r" % (test_name,))
+    print('[       OK ] %s (0 ms)' % (test_name,))
+    sys.stdout.flush()
+print('[  PASSED  ] 1 test.')
+sys.exit(0)
@@ -0,0 +1,42 @@
+# Check the persistent discovery cache.
+#
+# RUN: rm -rf %t.suite %t.cache
+# RUN: %{python} %{inputs}/discovery-cache/backdate.py copy \
+# RUN:   %{inputs}/discovery %t.suite
+#
+# The first run searches all directories, the second one reuses them.
+#
+# RUN: %{lit} %t.suite --discovery-cache %t.cache \
+# RUN:   -j 1 --debug --show-tests > %t.out1 2> %t.err1
+# RUN: FileCheck --check-prefix=CHECK-FIRST < %t.err1 %s
+# RUN: %{lit} %t.suite --discovery-cache %t.cache \
+# RUN:   -j 1 --debug --show-tests > %t.out2 2> %t.err2
+# RUN: FileCheck --check-prefix=CHECK-SECOND < %t.err2 %s
+# RUN: diff %t.out1 %t.out2
+#
+# CHECK-FIRST: discovery cache: 0 of 3 directories and 0 of 0 test scripts reused
+# CHECK-SECOND: discovery cache: 3 of 3 directories and 0 of 0 test scripts reused
+#
+# Adding a test invalidates its directory only.
+#
+# RUN: %{python} %{inputs}/discovery-cache/backdate.py add \
+# RUN:   %t.suite/subdir/test-four.py
+# RUN: %{lit} %t.suite --discovery-cache %t.cache \
+# RUN:   -j 1 --debug --show-tests > %t.out3 2> %t.err3
+# RUN: FileCheck --check-prefix=CHECK-ADDED-ERR < %t.err3 %s
+# RUN: FileCheck --check-prefix=CHECK-ADDED-OUT < %t.out3 %s
+#
+# CHECK-ADDED-ERR: discovery cache: 2 of 3 directories and 0 of 0 test scripts reused
+# CHECK-ADDED-OUT: top-level-suite :: subdir/test-four
+#
+# The RUN lines parsed while executing the tests are reused by the next run.
+#
+# RUN: %{lit} %t.suite/subsuite --discovery-cache %t.cache \
+# RUN:   -j 1 --debug > %t.out4 2> %t.err4
+# RUN: %{lit} %t.suite/subsuite --discovery-cache %t.cache \
+# RUN:   -j 1 --debug > %t.out5 2> %t.err5
+# RUN: FileCheck --check-prefix=CHECK-RUN1 < %t.err4 %s
+# RUN: FileCheck --check-prefix=CHECK-RUN2 < %t.err5 %s
+#
+# CHECK-RUN1: discovery cache: {{[0-9]+}} of 1 directories and 0 of 2 test scripts reused
+# CHECK-RUN2: discovery cache: {{[0-9]+}} of 1 directories and 2 of 2 test scripts reused
@@ -0,0 +1,80 @@
+# Check the batched execution of the GoogleTest format.
+#
+# All tests of the executable in one batch. The crashing test is rerun on its
+# own, the tests it did not get to run are batched again.
+#
+# RUN: rm -f %t.xml.log
+# RUN: not %{lit} -j 1 -v %{inputs}/googletest-batch \
+# RUN:   --param log=%t.xml.log > %t.xml.out
+# RUN: FileCheck < %t.xml.out %s
+# RUN: FileCheck --check-prefix=CHECK-ONE-BATCH < %t.xml.log %s
+#
+# RUN: rm -f %t.json.log
+# RUN: not %{lit} -j 1 -v %{inputs}/googletest-batch --param batch_output=json \
+# RUN:   --param log=%t.json.log > %t.json.out
+# RUN: FileCheck < %t.json.out %s
+# RUN: FileCheck --check-prefix=CHECK-ONE-BATCH < %t.json.log %s
+#
+# Batches of two tests.
+#
+# RUN: rm -f %t.two.log
+# RUN: not %{lit} -j 1 -v %{inputs}/googletest-batch --param batch_size=2 \
+# RUN:   --param log=%t.two.log > %t.two.out
+# RUN: FileCheck < %t.two.out %s
+# RUN: FileCheck --check-prefix=CHECK-TWO-BATCHES < %t.two.log %s
+#
+# A batch which crashes in a test it was not asked to run is not retried, its
+# tests are run on their own.
+#
+# RUN: rm -f %t.unknown.log
+# RUN: not %{lit} -j 1 -v %{inputs}/googletest-batch --param unknown=1 \
+# RUN:   --param log=%t.unknown.log > %t.unknown.out
+# RUN: FileCheck --check-prefix=CHECK-UNKNOWN-OUT < %t.unknown.out %s
+# RUN: FileCheck --check-prefix=CHECK-UNKNOWN < %t.unknown.log %s
+#
+# END.
+
+# CHECK: -- Testing:
+# CHECK: PASS: googletest-batch :: {{[Dd]ummy[Ss]ub[Dd]ir}}/OneTest.py/FirstTest.subTestA
+# CHECK: FAIL: googletest-batch :: {{[Dd]ummy[Ss]ub[Dd]ir}}/OneTest.py/FirstTest.subTestB
+# CHECK-NEXT: *** TEST 'googletest-batch :: {{[Dd]ummy[Ss]ub[Dd]ir}}/OneTest.py/FirstTest.subTestB' FAILED ***
+# CHECK-NEXT: I am subTest B, I FAIL
+# CHECK-NEXT: And I have two lines of output
+# CHECK: ***
+# CHECK: FAIL: googletest-batch :: {{[Dd]ummy[Ss]ub[Dd]ir}}/OneTest.py/FirstTest.subTestC
+# CHECK-NEXT: *** TEST 'googletest-batch :: {{[Dd]ummy[Ss]ub[Dd]ir}}/OneTest.py/FirstTest.subTestC' FAILED ***
+# CHECK: I am subTest C, I CRASH
+# CHECK: ***
+# CHECK: PASS: googletest-batch :: {{[Dd]ummy[Ss]ub[Dd]ir}}/OneTest.py/FirstTest.subTestD
+# CHECK: PASS: googletest-batch :: {{[Dd]ummy[Ss]ub[Dd]ir}}/OneTest.py/ParameterizedTest/0.subTest
+# CHECK: PASS: googletest-batch :: {{[Dd]ummy[Ss]ub[Dd]ir}}/OneTest.py/ParameterizedTest/1.subTest
+# CHECK: Failing Tests (2)
+# CHECK: Expected Passes    : 4
+# CHECK: Unexpected Failures: 2
+
+# CHECK-ONE-BATCH: run: FirstTest.subTestA FirstTest.subTestB FirstTest.subTestC FirstTest.subTestD ParameterizedTest/0.subTest ParameterizedTest/1.subTest
+# CHECK-ONE-BATCH-NEXT: run: FirstTest.subTestC
+# CHECK-ONE-BATCH-NEXT: run: FirstTest.subTestD ParameterizedTest/0.subTest ParameterizedTest/1.subTest
+# CHECK-ONE-BATCH-NOT: run:
+
+# CHECK-TWO-BATCHES: run: FirstTest.subTestA FirstTest.subTestB
+# CHECK-TWO-BATCHES-NEXT: run: FirstTest.subTestC FirstTest.subTestD
+# CHECK-TWO-BATCHES-NEXT: run: FirstTest.subTestC
+# CHECK-TWO-BATCHES-NEXT: run: FirstTest.subTestD
+# CHECK-TWO-BATCHES-NEXT: run: ParameterizedTest/0.subTest ParameterizedTest/1.subTest
+# CHECK-TWO-BATCHES-NOT: run:
+
+# CHECK-UNKNOWN-OUT: PASS: googletest-batch :: {{[Dd]ummy[Ss]ub[Dd]ir}}/OneTest.py/FirstTest.subTestA
+# CHECK-UNKNOWN-OUT: FAIL: googletest-batch :: {{[Dd]ummy[Ss]ub[Dd]ir}}/OneTest.py/FirstTest.subTestB
+# CHECK-UNKNOWN-OUT: FAIL: googletest-batch :: {{[Dd]ummy[Ss]ub[Dd]ir}}/OneTest.py/FirstTest.subTestC
+# CHECK-UNKNOWN-OUT: Expected Passes    : 4
+# CHECK-UNKNOWN-OUT: Unexpected Failures: 2
+
+# CHECK-UNKNOWN: run: FirstTest.subTestA FirstTest.subTestB FirstTest.subTestC FirstTest.subTestD ParameterizedTest/0.subTest ParameterizedTest/1.subTest
+# CHECK-UNKNOWN-NEXT: run: FirstTest.subTestA
+# CHECK-UNKNOWN-NEXT: run: FirstTest.subTestB
+# CHECK-UNKNOWN-NEXT: run: FirstTest.subTestC
+# CHECK-UNKNOWN-NEXT: run: FirstTest.subTestD
+# CHECK-UNKNOWN-NEXT: run: ParameterizedTest/0.subTest
+# CHECK-UNKNOWN-NEXT: run: ParameterizedTest/1.subTest
+# CHECK-UNKNOWN-NOT: run:
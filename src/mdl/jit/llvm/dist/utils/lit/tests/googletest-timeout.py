@@ -12,6 +12,13 @@
 # RUN: --param set_timeout=1 > %t.cfgset.out 2> %t.cfgset.err
 # RUN: FileCheck < %t.cfgset.out %s
 
+# Check that the per test timeout is enforced when running GTest tests in
+# batches.
+#
+# RUN: not %{lit} -j 1 -v %{inputs}/googletest-timeout --timeout=1 \
+# RUN: --param batch=1 > %t.batch.out
+# RUN: FileCheck < %t.batch.out %s
+
 # CHECK: -- Testing:
 # CHECK: PASS: googletest-timeout :: {{[Dd]ummy[Ss]ub[Dd]ir}}/OneTest.py/FirstTest.subTestA
 # CHECK: TIMEOUT: googletest-timeout :: {{[Dd]ummy[Ss]ub[Dd]ir}}/OneTest.py/FirstTest.subTestB
@@ -0,0 +1,44 @@
+# Check the result cache.
+#
+# RUN: rm -rf %t.suite %t.cache
+# RUN: cp -r %{inputs}/result-cache %t.suite
+#
+# The first run executes all tests and stores the passing results, the second
+# one only executes the failing test.
+#
+# RUN: not %{lit} -j 1 -a %t.suite --result-cache %t.cache \
+# RUN:   > %t.out1 2> %t.err1
+# RUN: FileCheck --check-prefix=CHECK-FIRST < %t.err1 %s
+# RUN: rm -f %t.timing.json
+# RUN: not %{lit} -j 1 -a %t.suite --result-cache %t.cache \
+# RUN:   --timing-data %t.timing.json > %t.out2 2> %t.err2
+# RUN: FileCheck --check-prefix=CHECK-SECOND-ERR < %t.err2 %s
+# RUN: FileCheck --check-prefix=CHECK-SECOND-OUT < %t.out2 %s
+# RUN: FileCheck --check-prefix=CHECK-SECOND-TIMING < %t.timing.json %s
+#
+# CHECK-FIRST: result cache: 0 hits, 3 misses, 2 results stored
+# CHECK-SECOND-ERR: result cache: 2 hits, 1 misses, 0 results stored
+# CHECK-SECOND-OUT: PASS: result-cache :: data.txt
+# CHECK-SECOND-OUT-NEXT: Test passed in a previous run with the same inputs (result cache)
+#
+# Only the executed test gets timing data.
+#
+# CHECK-SECOND-TIMING-NOT: data.txt
+# CHECK-SECOND-TIMING: "result-cache :: fail.txt"
+# CHECK-SECOND-TIMING-NOT: pass.txt
+#
+# Changing a file named on a RUN line invalidates the test.
+#
+# RUN: echo changed > %t.suite/data.in
+# RUN: not %{lit} -j 1 %t.suite --result-cache %t.cache \
+# RUN:   > %t.out3 2> %t.err3
+# RUN: FileCheck --check-prefix=CHECK-CHANGED < %t.err3 %s
+#
+# CHECK-CHANGED: result cache: 1 hits, 2 misses, 1 results stored
+#
+# Without the cache everything is executed.
+#
+# RUN: not %{lit} -j 1 -a %t.suite > %t.out4 2> %t.err4
+# RUN: FileCheck --check-prefix=CHECK-NO-CACHE < %t.out4 %s
+#
+# CHECK-NO-CACHE-NOT: result cache
@@ -0,0 +1,72 @@
+# Check the scheduling by the timing data of previous runs.
+#
+# Tests without timing data come first, the other tests longest first.
+#
+# RUN: cp %{inputs}/timing-data/timing.json %t.order.json
+# RUN: not %{lit} -j 1 -v %{inputs}/timing-data \
+# RUN:   --timing-data %t.order.json > %t.order.out
+# RUN: FileCheck --check-prefix=CHECK-ORDER < %t.order.out %s
+#
+# CHECK-ORDER: -- Testing: 6 tests
+# CHECK-ORDER-NEXT: PASS: timing-data :: new.txt
+# CHECK-ORDER-NEXT: PASS: timing-data :: b.txt
+# CHECK-ORDER-NEXT: PASS: timing-data :: d.txt
+# CHECK-ORDER-NEXT: PASS: timing-data :: c.txt
+# CHECK-ORDER-NEXT: FAIL: timing-data :: fail.txt
+# CHECK-ORDER: PASS: timing-data :: a.txt
+#
+# The executed tests are recorded.
+#
+# RUN: FileCheck --check-prefix=CHECK-DATA < %t.order.json %s
+#
+# CHECK-DATA: "timing-data :: fail.txt": [
+# CHECK-DATA-NEXT: {{[0-9.e-]+}},
+# CHECK-DATA-NEXT: true
+# CHECK-DATA: "timing-data :: new.txt": [
+# CHECK-DATA-NEXT: {{[0-9.e-]+}},
+# CHECK-DATA-NEXT: false
+#
+# The tests which failed last time come first if requested.
+#
+# RUN: cp %{inputs}/timing-data/timing.json %t.failures.json
+# RUN: not %{lit} -j 1 -v %{inputs}/timing-data \
+# RUN:   --timing-data %t.failures.json --failures-first > %t.failures.out
+# RUN: FileCheck --check-prefix=CHECK-FAILURES < %t.failures.out %s
+#
+# CHECK-FAILURES: -- Testing: 6 tests
+# CHECK-FAILURES-NEXT: FAIL: timing-data :: fail.txt
+# CHECK-FAILURES: PASS: timing-data :: new.txt
+# CHECK-FAILURES-NEXT: PASS: timing-data :: b.txt
+#
+# RUN: not %{lit} -j 1 %{inputs}/timing-data --failures-first 2> %t.err
+# RUN: FileCheck --check-prefix=CHECK-FAILURES-ERR < %t.err %s
+#
+# CHECK-FAILURES-ERR: error: --failures-first requires --timing-data
+#
+# The shards are balanced by time, new tests are expected to take the mean
+# time (1.32s). The shards share one file, which they do not change, so the
+# shards run one after another are disjoint.
+#
+# RUN: cp %{inputs}/timing-data/timing.json %t.shard.json
+# RUN: %{lit} -j 1 -v %{inputs}/timing-data --timing-data %t.shard.json \
+# RUN:   --num-shards 2 --run-shard 1 > %t.shard1.out 2> %t.shard1.err
+# RUN: FileCheck --check-prefix=CHECK-SHARD1-ERR < %t.shard1.err %s
+# RUN: FileCheck --check-prefix=CHECK-SHARD1-OUT < %t.shard1.out %s
+#
+# CHECK-SHARD1-ERR: note: Selecting shard 1/2 = size 2/6 = expected time 4.00s/7.92s
+# CHECK-SHARD1-OUT: -- Testing: 2 of 6 tests
+# CHECK-SHARD1-OUT-NEXT: PASS: timing-data :: b.txt
+# CHECK-SHARD1-OUT-NEXT: PASS: timing-data :: c.txt
+#
+# RUN: not %{lit} -j 1 -v %{inputs}/timing-data --timing-data %t.shard.json \
+# RUN:   --num-shards 2 --run-shard 2 > %t.shard2.out 2> %t.shard2.err
+# RUN: FileCheck --check-prefix=CHECK-SHARD2-ERR < %t.shard2.err %s
+# RUN: FileCheck --check-prefix=CHECK-SHARD2-OUT < %t.shard2.out %s
+# RUN: diff %{inputs}/timing-data/timing.json %t.shard.json
+#
+# CHECK-SHARD2-ERR: note: Selecting shard 2/2 = size 4/6 = expected time 3.92s/7.92s
+# CHECK-SHARD2-OUT: -- Testing: 4 of 6 tests
+# CHECK-SHARD2-OUT-NEXT: PASS: timing-data :: new.txt
+# CHECK-SHARD2-OUT-NEXT: PASS: timing-data :: d.txt
+# CHECK-SHARD2-OUT-NEXT: FAIL: timing-data :: fail.txt
+# CHECK-SHARD2-OUT: PASS: timing-data :: a.txt
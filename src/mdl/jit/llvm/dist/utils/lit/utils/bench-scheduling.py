@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+"""
+Measure the scheduling overhead of lit.
+
+Runs lit on the no-op test suite in examples/no-op-tests, whose tests do no
+work, and reports the testing time per test for several numbers of workers.
+Pass --lit to measure another lit, e.g. an older checkout, for comparison.
+
+Expects to be run from the base lit directory.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+def run_lit(lit, suite, tests, jobs):
+    """run_lit(lit, suite, tests, jobs) -> testing time in seconds"""
+    cmd = [sys.executable, lit, '-s', '-j', str(jobs), suite,
+           '--param', 'tests=%d' % (tests,)]
+    out = subprocess.check_output(cmd, universal_newlines=True)
+    m = re.search(r'^Testing Time: ([0-9.]+)s$', out, re.M)
+    if m is None:
+        raise SystemExit('error: no testing time in the output of %r:\n%s'
+                         % (' '.join(cmd), out))
+    return float(m.group(1))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--lit', default='lit.py',
+                        help='the lit.py to measure [Default: lit.py]')
+    parser.add_argument('--tests', type=int, default=20000,
+                        help='the number of no-op tests [Default: 20000]')
+    parser.add_argument('-j', '--jobs', type=int, action='append',
+                        help='a number of workers, may be repeated '
+                        '[Default: 1, 2 and 8]')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per number of workers, the fastest one is '
+                        'reported [Default: 3]')
+    opts = parser.parse_args()
+
+    suite = os.path.join('examples', 'no-op-tests')
+    if not os.path.isfile(opts.lit) or not os.path.isdir(suite):
+        parser.error('expected to be run from the base lit directory')
+
+    print('%-8s %12s %14s' % ('workers', 'time [s]', 'per test [us]'))
+    for jobs in opts.jobs or [1, 2, 8]:
+        elapsed = min(run_lit(opts.lit, suite, opts.tests, jobs)
+                      for i in range(opts.repeat))
+        print('%-8d %12.2f %14.1f' % (jobs, elapsed,
+                                      elapsed * 1e6 / opts.tests))
+
+if __name__ == '__main__':
+    main()
@@ -38,49 +38,81 @@ namespace libbsdf_data {
 unsigned const libbsdf_multiscatter_res_theta_beckmann_smith = 64;
 unsigned const libbsdf_multiscatter_res_roughness_beckmann_smith = 64;
 unsigned const libbsdf_multiscatter_res_ior_beckmann_smith = 16;
-unsigned char const libbsdf_multiscatter_data_beckmann_smith[] = { 0 };
+static unsigned char const libbsdf_multiscatter_data_beckmann_smith[] = { 0 };
+unsigned char const *get_libbsdf_multiscatter_data_beckmann_smith()
+{
+    return libbsdf_multiscatter_data_beckmann_smith;
+}
 
 // Automatically generated from beckmann_vc.bin
 unsigned const libbsdf_multiscatter_res_theta_beckmann_vc = 64;
 unsigned const libbsdf_multiscatter_res_roughness_beckmann_vc = 64;
 unsigned const libbsdf_multiscatter_res_ior_beckmann_vc = 16;
-unsigned char const libbsdf_multiscatter_data_beckmann_vc[] = { 0 };
+static unsigned char const libbsdf_multiscatter_data_beckmann_vc[] = { 0 };
+unsigned char const *get_libbsdf_multiscatter_data_beckmann_vc()
+{
+    return libbsdf_multiscatter_data_beckmann_vc;
+}
 
 // Automatically generated from phong_vc.bin
 unsigned const libbsdf_multiscatter_res_theta_phong_vc = 64;
 unsigned const libbsdf_multiscatter_res_roughness_phong_vc = 64;
 unsigned const libbsdf_multiscatter_res_ior_phong_vc = 16;
-unsigned char const libbsdf_multiscatter_data_phong_vc[] = { 0 };
+static unsigned char const libbsdf_multiscatter_data_phong_vc[] = { 0 };
+unsigned char const *get_libbsdf_multiscatter_data_phong_vc()
+{
+    return libbsdf_multiscatter_data_phong_vc;
+}
 
 // Automatically generated from disk_bs.bin
 unsigned const libbsdf_multiscatter_res_theta_disk_bs = 64;
 unsigned const libbsdf_multiscatter_res_roughness_disk_bs = 64;
 unsigned const libbsdf_multiscatter_res_ior_disk_bs = 0;
-unsigned char const libbsdf_multiscatter_data_disk_bs[] = { 0 };
+static unsigned char const libbsdf_multiscatter_data_disk_bs[] = { 0 };
+unsigned char const *get_libbsdf_multiscatter_data_disk_bs()
+{
+    return libbsdf_multiscatter_data_disk_bs;
+}
 
 // Automatically generated from ggx_smith.bin
 unsigned const libbsdf_multiscatter_res_theta_ggx_smith = 64;
 unsigned const libbsdf_multiscatter_res_roughness_ggx_smith = 64;
 unsigned const libbsdf_multiscatter_res_ior_ggx_smith = 16;
-unsigned char const libbsdf_multiscatter_data_ggx_smith[] = { 0 };
+static unsigned char const libbsdf_multiscatter_data_ggx_smith[] = { 0 };
+unsigned char const *get_libbsdf_multiscatter_data_ggx_smith()
+{
+    return libbsdf_multiscatter_data_ggx_smith;
+}
 
 // Automatically generated from ggx_vc.bin
 unsigned const libbsdf_multiscatter_res_theta_ggx_vc = 64;
 unsigned const libbsdf_multiscatter_res_roughness_ggx_vc = 64;
 unsigned const libbsdf_multiscatter_res_ior_ggx_vc = 16;
-unsigned char const libbsdf_multiscatter_data_ggx_vc[] = { 0 };
+static unsigned char const libbsdf_multiscatter_data_ggx_vc[] = { 0 };
+unsigned char const *get_libbsdf_multiscatter_data_ggx_vc()
+{
+    return libbsdf_multiscatter_data_ggx_vc;
+}
 
 // Automatically generated from sink_vc.bin
 unsigned const libbsdf_multiscatter_res_theta_sink_vc = 64;
 unsigned const libbsdf_multiscatter_res_roughness_sink_vc = 64;
 unsigned const libbsdf_multiscatter_res_ior_sink_vc = 0;
-unsigned char const libbsdf_multiscatter_data_sink_vc[] = { 0 };
+static unsigned char const libbsdf_multiscatter_data_sink_vc[] = { 0 };
+unsigned char const *get_libbsdf_multiscatter_data_sink_vc()
+{
+    return libbsdf_multiscatter_data_sink_vc;
+}
 
 // Automatically generated from ward_gm.bin
 unsigned const libbsdf_multiscatter_res_theta_ward_gm = 64;
 unsigned const libbsdf_multiscatter_res_roughness_ward_gm = 64;
 unsigned const libbsdf_multiscatter_res_ior_ward_gm = 0;
-unsigned char const libbsdf_multiscatter_data_ward_gm[] = { 0 };
+static unsigned char const libbsdf_multiscatter_data_ward_gm[] = { 0 };
+unsigned char const *get_libbsdf_multiscatter_data_ward_gm()
+{
+    return libbsdf_multiscatter_data_ward_gm;
+}
 }
 }
 }